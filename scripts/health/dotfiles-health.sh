@@ -32,248 +32,66 @@ if [[ "$TEST_HOME" == "/c/users/"* ]]; then
     TEST_HOME="/c/Users${TEST_HOME#/c/users}"
 fi
 
-OLD_SYSTEM_PACKAGES=(emacs hammerspoon nvim alfred-settings autohotkey)
+# Legacy package names (OLD_SYSTEM_PACKAGES) live in src/dotfiles_pm/doctor.py
 
 # =============================================================================
 # SHARED SYMLINK DETECTION
 # =============================================================================
 
-# Check if a single symlink is broken
-# Usage: _is_symlink_broken "/path/to/symlink"
-# Returns: 0 if broken, 1 if valid
-_is_symlink_broken() {
-    local link="$1"
-    local target=$(readlink "$link" 2>/dev/null || true)
-
-    # Test target existence from the symlink's directory context (handles relative paths)
-    local link_dir=$(dirname "$link")
-    if [[ -z "$target" ]] || ! (cd "$link_dir" && test -e "$target"); then
-        return 0  # Broken
-    else
-        return 1  # Valid
-    fi
+# Scan and classify dotfiles symlinks with the Python scanner, which walks the
+# stow target directories in parallel and resolves links in-process
+# Usage: _scan_symlinks
+# Outputs: one "status<TAB>link<TAB>target" line per dotfiles symlink, where
+#          status is current, legacy, broken or outside
+_scan_symlinks() {
+    python3 "$DOTFILES_DIR/src/dotfiles_pm/doctor.py" symlinks --list \
+        --home "$TEST_HOME" --dotfiles-dir "$DOTFILES_DIR"
 }
 
-# Find broken symlinks that point to dotfiles directory
-# Usage: _find_broken_symlinks
+# Find broken symlinks that point to the dotfiles repo
 # Sets: FOUND_BROKEN_SYMLINKS array with broken symlink paths
-# Get standard dotfile search directories
-# Returns: array of directories to search for symlinks
-_get_search_directories() {
-    local dirs=()
-    dirs+=("$TEST_HOME")  # Home directory (depth 1 only)
-    [[ -d "$TEST_HOME/.config" ]] && dirs+=("$TEST_HOME/.config")
-    [[ -d "$TEST_HOME/.local/share/applications" ]] && dirs+=("$TEST_HOME/.local/share/applications")
-
-    # Common dotfile directories
-    local dotfile_dirs=("$TEST_HOME/.hammerspoon" "$TEST_HOME/.tmux" "$TEST_HOME/.gnupg" "$TEST_HOME/.spacemacs.d" "$TEST_HOME/.doom.d")
-    if [[ "$OSTYPE" == "darwin"* ]]; then
-        dotfile_dirs+=("$TEST_HOME/Library/Application Support/Code/User" "$TEST_HOME/Library/Application Support/Cursor/User" "$TEST_HOME/Library/Keybindings")
-    elif [[ -d "$TEST_HOME/AppData" ]]; then
-        dotfile_dirs+=("$TEST_HOME/AppData/Local" "$TEST_HOME/AppData/Roaming")
-    fi
-
-    for dir in "${dotfile_dirs[@]}"; do
-        [[ -d "$dir" ]] && dirs+=("$dir")
-    done
-
-    printf '%s\n' "${dirs[@]}"
-}
-
-# Core function to find broken symlinks in dotfile locations
-# Args: filter_dotfiles_only (true/false) - if true, only include symlinks pointing to dotfiles repo
-# Sets FOUND_BROKEN_SYMLINKS array with results
 _find_broken_symlinks() {
-    local filter_dotfiles_only="${1:-false}"
     FOUND_BROKEN_SYMLINKS=()
 
-    # Get search directories using shared function
-    local search_dirs=()
-    while IFS= read -r dir; do
-        search_dirs+=("$dir")
-    done < <(_get_search_directories)
-
-    # Find broken symlinks using find (fd doesn't handle broken symlinks well)
-    for dir in "${search_dirs[@]}"; do
-        local depth_args=""
-        [[ "$dir" == "$TEST_HOME" ]] && depth_args="-maxdepth 1"
-
-        # Exclude Temp directory on Windows
-        local exclude_args=""
-        if [[ "$dir" == *"AppData/Local"* ]]; then
-            exclude_args="-path '*/Temp/*' -prune -o"
-        fi
-
-        while IFS= read -r link; do
-            if [[ "$filter_dotfiles_only" == "true" ]]; then
-                _check_dotfile_symlink "$link" && FOUND_BROKEN_SYMLINKS+=("$link")
-            else
-                FOUND_BROKEN_SYMLINKS+=("$link")
-            fi
-        done < <(eval "find \"$dir\" $depth_args $exclude_args -type l -exec test ! -e {} \; -print" 2>/dev/null)
-    done
-}
-
-# Helper function to check if broken symlink points to dotfiles directory
-_check_dotfile_symlink() {
-    local link="$1"
-    local target=$(readlink "$link" 2>/dev/null || true)
-
-    # Check if target contains the actual dotfiles directory path
-    if [[ "$target" == *"$DOTFILES_DIR"* ]]; then
-        return 0
-    fi
-
-    # For relative paths, resolve from the link's directory
-    local link_dir=$(dirname "$link")
-    local resolved_target=""
-    if [[ -n "$target" ]]; then
-        if [[ "$OSTYPE" == "darwin"* ]]; then
-            # macOS realpath doesn't support -m flag
-            resolved_target=$(cd "$link_dir" 2>/dev/null && realpath "$target" 2>/dev/null || echo "")
-        else
-            # Linux realpath supports -m for missing paths
-            resolved_target=$(cd "$link_dir" 2>/dev/null && realpath -m "$target" 2>/dev/null || echo "")
-        fi
-    fi
-
-    if [[ -n "$resolved_target" ]] && [[ "$resolved_target" == *"$DOTFILES_DIR"* ]]; then
-        return 0
-    fi
-
-    # Also check for common dotfiles directory patterns
-    [[ "$target" == *"/dotfiles/"* ]] || [[ "$target" == *"/.dotfiles/"* ]] || [[ "$target" == *"dotfiles/"* ]]
+    local status link target
+    while IFS=$'\t' read -r status link target; do
+        [[ "$status" == "broken" ]] && FOUND_BROKEN_SYMLINKS+=("$link")
+    done < <(_scan_symlinks)
 }
 
-# Categorize symlinks by type (new system, legacy, broken)
-# Sets: NEW_LINKS, OLD_LINKS, BROKEN_LINKS, WARNINGS, ERRORS arrays
-
 # Categorize symlinks by type (new system, legacy, broken)
 # Sets: NEW_LINKS, OLD_LINKS, BROKEN_LINKS, WARNINGS, ERRORS arrays
 _categorize_symlinks() {
-    # Initialize arrays
     NEW_LINKS=()
     OLD_LINKS=()
     BROKEN_LINKS=()
     WARNINGS=()
     ERRORS=()
 
-    # First, find broken symlinks pointing to dotfiles directory (filtered)
-    _find_broken_symlinks true
-    # Safely copy array, handling empty case
-    if [[ ${#FOUND_BROKEN_SYMLINKS[@]} -gt 0 ]]; then
-        BROKEN_LINKS=("${FOUND_BROKEN_SYMLINKS[@]}")
-        for link in "${BROKEN_LINKS[@]}"; do
-            ERRORS+=("Broken symlink: $link")
-        done
-    else
-        BROKEN_LINKS=()
-    fi
-
-    # Now categorize non-broken symlinks that point to dotfiles
-    # Use same search locations as _find_broken_symlinks for consistency
-    local search_dirs=()
-    while IFS= read -r dir; do
-        search_dirs+=("$dir")
-    done < <(_get_search_directories)
+    local status link target display_link
+    while IFS=$'\t' read -r status link target; do
+        # Make display path relative to home if possible
+        display_link="$link"
+        [[ "$link" == "$TEST_HOME/"* ]] && display_link="${link#$TEST_HOME/}"
 
-    # Find all non-broken symlinks that point to dotfiles
-    if command -v fd >/dev/null 2>&1; then
-        for dir in "${search_dirs[@]}"; do
-            local depth_args=""
-            [[ "$dir" == "$TEST_HOME" ]] && depth_args="--max-depth 1"
-
-            while IFS= read -r link; do
-                # Skip if broken (already handled)
-                local is_broken=false
-                if [[ ${#BROKEN_LINKS[@]} -gt 0 ]]; then
-                    for broken in "${BROKEN_LINKS[@]}"; do
-                        [[ "$link" == "$broken" ]] && is_broken=true && break
-                    done
-                fi
-                [[ "$is_broken" == "true" ]] && continue
-
-                # Only process symlinks that point to dotfiles
-                if [[ -L "$link" ]] && [[ -e "$link" ]] && _check_dotfile_symlink "$link"; then
-                    local target=$(readlink "$link" 2>/dev/null || continue)
-                    local display_link="$link"
-
-                    # Make display path relative to home if possible
-                    [[ "$link" == "$TEST_HOME/"* ]] && display_link="${link#$TEST_HOME/}"
-
-                    if [[ "$target" == *"/configs/"* ]]; then
-                        # New system link
-                        NEW_LINKS+=("$display_link -> $target")
-                    else
-                        # Check if it's an old system package
-                        local is_old=false
-                        for pkg in "${OLD_SYSTEM_PACKAGES[@]}"; do
-                            if [[ "$target" == *"/$pkg"* ]]; then
-                                OLD_LINKS+=("$display_link -> $target")
-                                WARNINGS+=("Legacy symlink detected: $display_link -> $target")
-                                is_old=true
-                                break
-                            fi
-                        done
-                        if [[ "$is_old" == "false" ]]; then
-                            NEW_LINKS+=("$display_link -> $target")
-                        fi
-                    fi
-                fi
-            done < <(fd --hidden --type symlink $depth_args . "$dir" 2>/dev/null)
-        done
-    else
-        # Fallback to find (same logic as fd version)
-        for dir in "${search_dirs[@]}"; do
-            local depth_args=""
-            [[ "$dir" == "$TEST_HOME" ]] && depth_args="-maxdepth 1"
-
-            # Exclude Temp directory on Windows
-            local exclude_args=""
-            if [[ "$dir" == *"AppData/Local"* ]]; then
-                exclude_args="-path '*/Temp/*' -prune -o"
-            fi
-
-            while IFS= read -r link; do
-                # Skip if broken (already handled)
-                local is_broken=false
-                if [[ ${#BROKEN_LINKS[@]} -gt 0 ]]; then
-                    for broken in "${BROKEN_LINKS[@]}"; do
-                        [[ "$link" == "$broken" ]] && is_broken=true && break
-                    done
-                fi
-                [[ "$is_broken" == "true" ]] && continue
-
-                # Only process symlinks that point to dotfiles
-                if [[ -L "$link" ]] && [[ -e "$link" ]] && _check_dotfile_symlink "$link"; then
-                    local target=$(readlink "$link" 2>/dev/null || continue)
-                    local display_link="$link"
-
-                    # Make display path relative to home if possible
-                    [[ "$link" == "$TEST_HOME/"* ]] && display_link="${link#$TEST_HOME/}"
-
-                    if [[ "$target" == *"/configs/"* ]]; then
-                        # New system link
-                        NEW_LINKS+=("$display_link -> $target")
-                    else
-                        # Check if it's an old system package
-                        local is_old=false
-                        for pkg in "${OLD_SYSTEM_PACKAGES[@]}"; do
-                            if [[ "$target" == *"/$pkg"* ]]; then
-                                OLD_LINKS+=("$display_link -> $target")
-                                WARNINGS+=("Legacy symlink detected: $display_link -> $target")
-                                is_old=true
-                                break
-                            fi
-                        done
-                        if [[ "$is_old" == "false" ]]; then
-                            NEW_LINKS+=("$display_link -> $target")
-                        fi
-                    fi
-                fi
-            done < <(eval "find \"$dir\" $depth_args $exclude_args -type l -print" 2>/dev/null)
-        done
-    fi
+        case "$status" in
+            broken)
+                BROKEN_LINKS+=("$link")
+                ERRORS+=("Broken symlink: $link")
+                ;;
+            legacy)
+                OLD_LINKS+=("$display_link -> $target")
+                WARNINGS+=("Legacy symlink detected: $display_link -> $target")
+                ;;
+            outside)
+                NEW_LINKS+=("$display_link -> $target")
+                WARNINGS+=("Symlink points outside $DOTFILES_DIR: $display_link -> $target")
+                ;;
+            current)
+                NEW_LINKS+=("$display_link -> $target")
+                ;;
+        esac
+    done < <(_scan_symlinks)
 }
 
 
@@ -998,7 +816,7 @@ dotfiles_cleanup_broken_links() {
     echo
 
     # Use shared detection logic, filtering to only dotfiles-related
-    _find_broken_symlinks true
+    _find_broken_symlinks
 
     if [[ ${#FOUND_BROKEN_SYMLINKS[@]} -eq 0 ]]; then
         echo "✅ No broken symlinks found!"
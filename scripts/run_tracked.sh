@@ -9,9 +9,13 @@ AUTO_CLOSE="${5:-false}"
 
 # === Environment Setup ===
 # Source user's shell environment for PATH without loading interactive configs
-# Priority: zsh (if available) → bash (fallback)
+# Priority: environment captured by the orchestrator (login_env.py) →
+#           zsh (if available) → bash (fallback)
 
-if command -v zsh >/dev/null 2>&1; then
+if [ -n "$DOTFILES_LOGIN_ENV" ] && [ -r "$DOTFILES_LOGIN_ENV" ]; then
+    # Already exported from .zshenv/.zprofile (or .bash_profile) once per session
+    . "$DOTFILES_LOGIN_ENV"
+elif command -v zsh >/dev/null 2>&1; then
     # Zsh available: Source .zshenv + .zprofile (PATH setup, no interactive bloat)
     eval "$(zsh -c '
         [[ -f ~/.zshenv ]] && source ~/.zshenv
@@ -38,15 +42,76 @@ echo "━━━━━━━━━━━━━━━━━━━━━━━━
 echo "💻 Command: $COMMAND"
 echo ""
 
-# Write starting status
-echo "{\"status\": \"running\", \"timestamp\": $(date +%s), \"operation\": \"$OPERATION\"}" > "$STATUS_FILE"
+# === Status protocol ===
+# The status file is replaced atomically (write + mv) and always holds one
+# JSON object with: protocol, status, operation, pid (this wrapper),
+# child_pid (the subshell running the command), started (epoch seconds),
+# timestamp, elapsed (seconds since start), bytes (log size so far) and the
+# limits the orchestrator asked for: timeout and stall_timeout (seconds, null
+# for the orchestrator's defaults).
+#   running:   rewritten every $HEARTBEAT_INTERVAL seconds with a heartbeat
+#              counter and last_output (when the log last grew), so the
+#              orchestrator can tell a slow command from a hung one
+#   completed: written once with exit_code and ended
+HEARTBEAT_INTERVAL="${DOTFILES_TRACKED_HEARTBEAT:-5}"
+LIMITS="\"timeout\": ${DOTFILES_TRACKED_TIMEOUT:-null}, \"stall_timeout\": ${DOTFILES_TRACKED_STALL_TIMEOUT:-null}"
+CHILD_PID_FILE="${STATUS_FILE}.child"
+CHILD_PID=""
+STARTED=$(date +%s)
 
-# Run command with tee to capture output
-eval "$COMMAND" 2>&1 | tee "$LOG_FILE"
+log_bytes() {
+    if [ -f "$LOG_FILE" ]; then
+        echo $(( $(wc -c < "$LOG_FILE") ))
+    else
+        echo 0
+    fi
+}
+
+# Usage: write_status <status> <bytes> [extra JSON fields, with leading comma]
+write_status() {
+    printf '{"protocol": 2, "status": "%s", "operation": "%s", "pid": %s, "child_pid": %s, "started": %s, "timestamp": %s, "elapsed": %s, "bytes": %s, %s%s}\n' \
+        "$1" "$OPERATION" "$$" "${CHILD_PID:-null}" "$STARTED" "$(date +%s)" "$SECONDS" "$2" "$LIMITS" "${3:-}" \
+        > "$STATUS_FILE.tmp"
+    mv -f "$STATUS_FILE.tmp" "$STATUS_FILE"
+}
+
+heartbeat() {
+    local beat=0 last_bytes=-1 last_output="$STARTED" bytes
+    while :; do
+        if [ -z "$CHILD_PID" ] && [ -s "$CHILD_PID_FILE" ]; then
+            CHILD_PID=$(cat "$CHILD_PID_FILE")
+        fi
+        bytes=$(log_bytes)
+        if [ "$bytes" -ne "$last_bytes" ]; then
+            last_bytes=$bytes
+            last_output=$(date +%s)
+        fi
+        write_status running "$bytes" ", \"heartbeat\": $beat, \"last_output\": $last_output"
+        beat=$((beat + 1))
+        sleep "$HEARTBEAT_INTERVAL"
+    done
+}
+
+rm -f "$CHILD_PID_FILE"
+SECONDS=0
+heartbeat &
+HEARTBEAT_PID=$!
+
+# Run command with tee to capture output. The subshell records its own PID
+# (sh's parent) so a hung command can be killed along with its children.
+(
+    sh -c 'echo $PPID' > "$CHILD_PID_FILE"
+    eval "$COMMAND"
+) 2>&1 | tee "$LOG_FILE"
 EXIT_CODE=${PIPESTATUS[0]}
 
+kill "$HEARTBEAT_PID" 2>/dev/null
+wait "$HEARTBEAT_PID" 2>/dev/null
+CHILD_PID=$(cat "$CHILD_PID_FILE" 2>/dev/null)
+rm -f "$CHILD_PID_FILE"
+
 # Write completion status
-echo "{\"status\": \"completed\", \"exit_code\": $EXIT_CODE, \"timestamp\": $(date +%s), \"operation\": \"$OPERATION\"}" > "$STATUS_FILE"
+write_status completed "$(log_bytes)" ", \"exit_code\": $EXIT_CODE, \"ended\": $(date +%s)"
 
 # Footer
 echo ""
@@ -63,6 +63,16 @@ if [ ! -f "${STOW_FILE}" ]; then
     exit 1
 fi
 
+# Package list from the compiled machine class bundle (src/dotfiles_pm/pm_bundle.py),
+# falling back to parsing stow.txt here when python3 isn't available
+STOW_LIST=$(mktemp)
+trap 'rm -f "$STOW_LIST"' EXIT
+if ! { command -v python3 >/dev/null 2>&1 \
+        && python3 -m src.dotfiles_pm.pm_bundle --stow --machine-class "${DOTFILES_MACHINE_CLASS}" > "${STOW_LIST}" 2>>"${LOG_FILE}"; }; then
+    log_verbose "Machine class bundle unavailable, reading ${STOW_FILE} directly"
+    cp "${STOW_FILE}" "${STOW_LIST}"
+fi
+
 # Read stow.txt and process each line
 cd configs
 while IFS= read -r stow_entry; do
@@ -226,7 +236,7 @@ while IFS= read -r stow_entry; do
     else
         log_verbose "Directory not found, skipping: $stow_package"
     fi
-done < "../${STOW_FILE}"
+done < "${STOW_LIST}"
 
 cd ..
 log_verbose "Returned to root directory"
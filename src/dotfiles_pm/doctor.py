@@ -5,16 +5,161 @@ Cross-platform system health checks (doctor command)
 Checks:
 - PATH validation (broken entries, version-specific paths, duplicates)
 - Tool availability (expected tools are findable)
-- Package manager health
+- Package manager health (brew and pacman locks)
+- Tracked operations (orphaned status files, stale terminal registry)
+- Dotfiles symlinks (broken, legacy, pointing outside the repo)
+
+Checks register themselves in DOCTOR_CHECKS with @register_check and run
+concurrently, each with its own timeout.
+
+Usage:
+    python3 src/dotfiles_pm/doctor.py [--json] [--check NAME]... [--skip NAME]...
+    python3 src/dotfiles_pm/doctor.py symlinks [--list] [--remove-broken]
 """
 
+import argparse
+import json
 import os
+import shutil
 import sys
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field, asdict
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Tuple, Optional
 import platform
 
+# Add current directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+DOTFILES_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Packages from the pre-configs/ layout; links into them are leftovers
+OLD_SYSTEM_PACKAGES = ['emacs', 'hammerspoon', 'nvim', 'alfred-settings', 'autohotkey']
+
+
+# Binaries pm_detect and the PMs invoke; a shadowed copy means the wrong toolchain is managed
+PM_BINARIES = [
+    'brew', 'mas', 'apt', 'pacman', 'dnf', 'zypper', 'scoop', 'choco', 'winget',
+    'npm', 'node', 'pip', 'pip3', 'pipx', 'python', 'python3',
+    'cargo', 'rustup', 'gem', 'ruby', 'emacs', 'nvim', 'git', 'sudo',
+]
+
+# A PATH entry slower than this to probe makes every command lookup noticeably slower
+SLOW_PATH_ENTRY_SECONDS = 0.02
+
+NETWORK_FILESYSTEMS = {'nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'afpfs', 'fuse.sshfs', 'fuse.rclone', '9p', 'davfs'}
+
+
+@dataclass
+class PathEntryInfo:
+    """One PATH entry as seen by the index"""
+    path: str
+    position: int
+    exists: bool
+    probe_seconds: float  # cost of looking up a missing command in this entry
+    network: bool
+    binaries: List[str] = field(default_factory=list)
+
+
+@dataclass
+class PathIndex:
+    """Every executable on PATH, in lookup order"""
+    entries: List[PathEntryInfo]
+    # binary name -> full paths, first one wins
+    binaries: Dict[str, List[str]]
+
+    def miss_cost(self) -> float:
+        """Estimated seconds the shell spends before reporting 'command not found'"""
+        return sum(entry.probe_seconds for entry in self.entries)
+
+    def shadowed(self, names: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """
+        Binaries found in more than one entry, resolving to different files.
+
+        Symlinks to the same file (e.g. /usr/local/bin/npm -> ../lib/node/npm)
+        are aliases, not shadowing.
+        """
+        result = {}
+        for name in names if names is not None else self.binaries:
+            distinct: Dict[str, str] = {}
+            for location in self.binaries.get(name, []):
+                distinct.setdefault(os.path.realpath(location), location)
+            if len(distinct) > 1:
+                result[name] = list(distinct.values())
+        return result
+
+
+def _network_mounts() -> List[str]:
+    """Mount points of network filesystems (Linux /proc/mounts only)"""
+    try:
+        with open('/proc/mounts') as f:
+            return [fields[1] for fields in (line.split() for line in f)
+                    if len(fields) > 2 and fields[2] in NETWORK_FILESYSTEMS]
+    except OSError:
+        return []
+
+
+def _is_executable(entry: os.DirEntry, pathext: Optional[List[str]]) -> Optional[str]:
+    """Return the command name an entry provides, or None"""
+    try:
+        if not entry.is_file():
+            return None
+    except OSError:
+        return None
+    if pathext is not None:
+        stem, ext = os.path.splitext(entry.name)
+        return stem.lower() if ext.lower() in pathext else None
+    return entry.name if os.access(entry.path, os.X_OK) else None
+
+
+def _index_entry(path: str, position: int, network_mounts: List[str],
+                 pathext: Optional[List[str]]) -> PathEntryInfo:
+    """Probe and list one PATH entry"""
+    start = time.perf_counter()
+    try:
+        os.stat(os.path.join(path, '.dotfiles-doctor-probe'))
+    except OSError:
+        pass
+    probe = time.perf_counter() - start
+
+    network = path.startswith('\\\\') or any(
+        path == mount or path.startswith(mount.rstrip('/') + '/') for mount in network_mounts
+    )
+    info = PathEntryInfo(path=path, position=position, exists=os.path.isdir(path),
+                         probe_seconds=probe, network=network)
+    if info.exists:
+        try:
+            with os.scandir(path) as it:
+                info.binaries = sorted(filter(None, (_is_executable(e, pathext) for e in it)))
+        except OSError:
+            pass
+    return info
+
+
+def build_path_index(entries: List[str], max_workers: int = 8) -> PathIndex:
+    """
+    Index every executable on PATH.
+
+    Entries are listed concurrently; lookup order is kept for the result.
+    """
+    pathext = None
+    if platform.system() == 'Windows':
+        pathext = [ext.lower() for ext in os.environ.get('PATHEXT', '.COM;.EXE;.BAT;.CMD').split(';') if ext]
+    network_mounts = _network_mounts()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        infos = list(pool.map(lambda item: _index_entry(item[1], item[0], network_mounts, pathext),
+                              enumerate(entries)))
+
+    binaries: Dict[str, List[str]] = {}
+    for info in infos:
+        for name in info.binaries:
+            binaries.setdefault(name, []).append(os.path.join(info.path, name))
+    return PathIndex(entries=infos, binaries=binaries)
+
 
 class PathDoctor:
     """Cross-platform PATH health checker"""
@@ -24,12 +169,22 @@ class PathDoctor:
         self.path_separator = os.pathsep  # : on Unix, ; on Windows
         self.issues: List[Dict] = []
         self.warnings: List[Dict] = []
+        self._index: Optional[PathIndex] = None
+
+    @property
+    def index(self) -> PathIndex:
+        """Binary index of the current PATH, built on first use"""
+        if self._index is None:
+            self._index = build_path_index(self.get_current_path_entries())
+        return self._index
 
     def check_all(self) -> Tuple[List[Dict], List[Dict]]:
         """Run all PATH checks, return (issues, warnings)"""
         self.check_broken_paths()
         self.check_version_specific_paths()
         self.check_duplicate_paths()
+        self.check_shadowed_binaries()
+        self.check_slow_entries()
         return (self.issues, self.warnings)
 
     def get_current_path_entries(self) -> List[str]:
@@ -102,6 +257,33 @@ class PathDoctor:
                 # Path might not exist or be resolvable, skip normalization
                 pass
 
+    def check_shadowed_binaries(self, names: Optional[List[str]] = None):
+        """Check for PM-relevant binaries where an earlier PATH entry hides another copy"""
+        for name, locations in self.index.shadowed(names or PM_BINARIES).items():
+            self.warnings.append({
+                'type': 'shadowed_binary',
+                'severity': 'warning',
+                'binary': name,
+                'locations': locations,
+                'message': f'{name} is shadowed: {locations[0]} hides {", ".join(locations[1:])}',
+                'suggestion': 'Reorder PATH so the copy your package manager maintains comes first'
+            })
+
+    def check_slow_entries(self):
+        """Check for PATH entries that make every command lookup slower"""
+        for entry in self.index.entries:
+            if not (entry.network or entry.probe_seconds > SLOW_PATH_ENTRY_SECONDS):
+                continue
+            reason = 'on a network filesystem' if entry.network else f'took {entry.probe_seconds * 1000:.0f}ms to probe'
+            self.warnings.append({
+                'type': 'slow_path_entry',
+                'severity': 'warning',
+                'path': entry.path,
+                'message': f'PATH entry #{entry.position + 1} is {reason}: {entry.path} '
+                           f'(a missed lookup costs ~{self.index.miss_cost() * 1000:.0f}ms in total)',
+                'suggestion': 'Move it to the end of PATH or remove it'
+            })
+
 
 class ToolDoctor:
     """Check availability of expected development tools"""
@@ -132,10 +314,8 @@ class ToolDoctor:
         return (self.issues, self.warnings)
 
     def is_tool_available(self, tool: str) -> bool:
-        """Check if a tool is available in PATH"""
-        # Use 'where' on Windows, 'which' on Unix
-        cmd = 'where' if platform.system() == 'Windows' else 'which'
-        return os.system(f'{cmd} {tool} > /dev/null 2>&1') == 0
+        """Check if a tool is available in PATH (honours PATHEXT on Windows)"""
+        return shutil.which(tool) is not None
 
 
 class PacmanDoctor:
@@ -177,7 +357,7 @@ class PacmanDoctor:
             return False
         else:
             # On Linux, check if pacman exists
-            return os.system('which pacman > /dev/null 2>&1') == 0
+            return shutil.which('pacman') is not None
 
     def _get_pacman_lock_path(self) -> Optional[Path]:
         """Get the pacman database lock file path"""
@@ -194,6 +374,388 @@ class PacmanDoctor:
         return None
 
 
+@dataclass
+class SymlinkRecord:
+    """A dotfiles-related symlink and its classification"""
+    path: str
+    target: str  # raw readlink() value
+    status: str  # 'current', 'legacy', 'broken' or 'outside'
+
+
+def get_symlink_search_dirs(home: Path) -> List[Tuple[Path, bool]]:
+    """
+    Get the directories stow links into, as (directory, recursive) pairs.
+
+    The home directory itself is only searched one level deep.
+    """
+    dirs = [(home, False)]
+    candidates = [
+        home / '.config', home / '.local' / 'share' / 'applications',
+        home / '.hammerspoon', home / '.tmux', home / '.gnupg', home / '.spacemacs.d', home / '.doom.d',
+    ]
+    if sys.platform == 'darwin':
+        support = home / 'Library' / 'Application Support'
+        candidates += [support / 'Code' / 'User', support / 'Cursor' / 'User', home / 'Library' / 'Keybindings']
+    elif (home / 'AppData').is_dir():
+        candidates += [home / 'AppData' / 'Local', home / 'AppData' / 'Roaming']
+
+    dirs.extend((d, True) for d in candidates if d.is_dir() and not d.is_symlink())
+    return dirs
+
+
+def _scan_directory(directory: str, recursive: bool) -> Tuple[List[str], List[str]]:
+    """List one directory, returning (symlinks, subdirectories to descend into)"""
+    links, subdirs = [], []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_symlink():
+                    links.append(entry.path)
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    # Windows temp dirs are huge and never hold dotfiles
+                    if entry.name != 'Temp' or not directory.endswith(os.path.join('AppData', 'Local')):
+                        subdirs.append(entry.path)
+    except OSError:
+        pass
+    return links, subdirs
+
+
+def find_symlinks(search_dirs: List[Tuple[Path, bool]], max_workers: int = 8) -> List[str]:
+    """
+    Find all symlinks under the search directories.
+
+    Directories are listed concurrently: each listed subdirectory becomes a
+    new task, so one deep tree doesn't serialize the scan.
+    """
+    links: List[str] = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {pool.submit(_scan_directory, str(d), recursive): recursive for d, recursive in search_dirs}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                recursive = pending.pop(future)
+                found, subdirs = future.result()
+                links.extend(found)
+                for subdir in subdirs:
+                    pending[pool.submit(_scan_directory, subdir, recursive)] = recursive
+    return sorted(links)
+
+
+def classify_symlink(path: str, dotfiles_dir: Path) -> Optional[SymlinkRecord]:
+    """
+    Classify one symlink, or return None if it has nothing to do with dotfiles.
+
+    Links count as dotfiles links when they resolve into dotfiles_dir or their
+    target looks like a dotfiles checkout. Broken beats every other status.
+    """
+    try:
+        target = os.readlink(path)
+    except OSError:
+        return None
+
+    resolved = os.path.realpath(path)
+    repo = os.path.realpath(dotfiles_dir)
+    in_repo = resolved.startswith(repo + os.sep)
+    dotfiles_like = in_repo or 'dotfiles/' in target
+    if not dotfiles_like:
+        return None
+
+    if not os.path.exists(path):
+        status = 'broken'
+    elif not in_repo:
+        status = 'outside'
+    else:
+        parts = Path(os.path.relpath(resolved, repo)).parts
+        if parts[0] != 'configs' and any(part in OLD_SYSTEM_PACKAGES for part in parts):
+            status = 'legacy'
+        else:
+            status = 'current'
+    return SymlinkRecord(path=path, target=target, status=status)
+
+
+class SymlinkDoctor:
+    """Scan stow target directories for broken, legacy and stray dotfiles symlinks"""
+
+    def __init__(self, home: Optional[Path] = None, dotfiles_dir: Optional[Path] = None):
+        self.home = home or Path.home()
+        self.dotfiles_dir = dotfiles_dir or DOTFILES_DIR
+        self.records: List[SymlinkRecord] = []
+        self.issues: List[Dict] = []
+        self.warnings: List[Dict] = []
+
+    def scan(self) -> List[SymlinkRecord]:
+        """Find and classify every dotfiles symlink"""
+        links = find_symlinks(get_symlink_search_dirs(self.home))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            records = pool.map(lambda link: classify_symlink(link, self.dotfiles_dir), links)
+        self.records = [r for r in records if r is not None]
+        return self.records
+
+    def by_status(self, status: str) -> List[SymlinkRecord]:
+        return [r for r in self.records if r.status == status]
+
+    def check_all(self) -> Tuple[List[Dict], List[Dict]]:
+        """Scan symlinks, return (issues, warnings)"""
+        self.scan()
+        for record in self.by_status('broken'):
+            self.issues.append({
+                'type': 'broken_symlink',
+                'severity': 'error',
+                'path': record.path,
+                'message': f'Broken symlink: {record.path} -> {record.target}',
+                'suggestion': 'Remove with: just doctor-fix-broken-links'
+            })
+        for record in self.by_status('legacy'):
+            self.warnings.append({
+                'type': 'legacy_symlink',
+                'severity': 'warning',
+                'path': record.path,
+                'message': f'Legacy symlink detected: {record.path} -> {record.target}',
+                'suggestion': 'Remove it and run: just stow'
+            })
+        for record in self.by_status('outside'):
+            self.warnings.append({
+                'type': 'outside_repo_symlink',
+                'severity': 'warning',
+                'path': record.path,
+                'message': f'Symlink points outside {self.dotfiles_dir}: {record.path} -> {record.target}',
+                'suggestion': 'It probably comes from another dotfiles checkout; remove it and run: just stow'
+            })
+        return (self.issues, self.warnings)
+
+    def health_status(self) -> Tuple[str, str]:
+        """Summarize scanned links the way dotfiles-health.sh does"""
+        current, legacy = len(self.by_status('current')), len(self.by_status('legacy'))
+        if self.by_status('broken'):
+            return 'CRITICAL', 'System has critical issues that need attention'
+        if legacy and current:
+            return 'MIXED', 'System is in a mixed state (partial migration)'
+        if legacy:
+            return 'LEGACY', 'System is using legacy configuration structure'
+        if self.by_status('outside'):
+            return 'WARNING', 'System is functional but has warnings'
+        if current < 5:
+            return 'EMPTY', 'Few dotfiles configurations found - system needs stowing'
+        return 'HEALTHY', 'All systems operational'
+
+    def remove_broken(self) -> Tuple[List[str], List[str]]:
+        """Delete broken dotfiles symlinks, return (removed, failed)"""
+        removed, failed = [], []
+        for record in self.by_status('broken'):
+            try:
+                os.unlink(record.path)
+                removed.append(record.path)
+            except OSError:
+                failed.append(record.path)
+        return removed, failed
+
+
+# Seconds a status file may say "running" before its terminal is assumed gone
+ORPHANED_STATUS_AGE = 6 * 3600
+
+
+@dataclass
+class DoctorCheck:
+    """A registered health check"""
+    name: str
+    description: str
+    func: Callable[[], Tuple[List[Dict], List[Dict]]]
+    timeout: float = 10.0
+    platforms: Optional[Tuple[str, ...]] = None  # platform.system() values; None means all
+
+    def applies(self) -> bool:
+        return self.platforms is None or platform.system() in self.platforms
+
+
+@dataclass
+class CheckResult:
+    """Outcome of running one check"""
+    name: str
+    status: str  # 'ok', 'warning', 'error', 'timeout'
+    duration: float
+    issues: List[Dict] = field(default_factory=list)
+    warnings: List[Dict] = field(default_factory=list)
+
+
+# Registry of checks, in display order
+DOCTOR_CHECKS: Dict[str, DoctorCheck] = {}
+
+
+def register_check(name: str, description: str, timeout: float = 10.0,
+                   platforms: Optional[Tuple[str, ...]] = None):
+    """
+    Decorator registering a function as a doctor check.
+
+    The function takes no arguments and returns (issues, warnings) lists of
+    dicts with at least 'severity' and 'message' keys.
+    """
+    def decorator(func):
+        DOCTOR_CHECKS[name] = DoctorCheck(name, description, func, timeout, platforms)
+        return func
+    return decorator
+
+
+@register_check('path', 'PATH entries exist, are version-agnostic and unique')
+def check_path() -> Tuple[List[Dict], List[Dict]]:
+    return PathDoctor().check_all()
+
+
+@register_check('tools', 'Expected development tools are on PATH')
+def check_tools() -> Tuple[List[Dict], List[Dict]]:
+    return ToolDoctor().check_all()
+
+
+@register_check('brew-lock', 'Homebrew is not locked', platforms=('Darwin', 'Linux'))
+def check_brew_lock() -> Tuple[List[Dict], List[Dict]]:
+    if not shutil.which('brew'):
+        return [], []
+    from pms.brew_utils import BrewLockManager
+
+    is_locked, message = BrewLockManager().is_brew_locked()
+    if not is_locked:
+        return [], []
+    return [], [{
+        'type': 'brew_locked',
+        'severity': 'warning',
+        'message': f'Homebrew is locked: {message}',
+        'suggestion': 'Wait for the running brew command, or run: just doctor-fix-brew-lock'
+    }]
+
+
+@register_check('pacman-lock', 'Pacman database is not locked', platforms=('Windows', 'Linux'))
+def check_pacman_lock() -> Tuple[List[Dict], List[Dict]]:
+    return PacmanDoctor().check_all()
+
+
+@register_check('status-files', 'No tracked operation was left running by a closed terminal')
+def check_status_files(log_dir: Optional[Path] = None) -> Tuple[List[Dict], List[Dict]]:
+    log_dir = log_dir or Path.home() / '.dotfiles' / 'logs'
+    now = time.time()
+    orphaned = []
+    for status_file in sorted(log_dir.glob('*.status')):
+        try:
+            status = json.loads(status_file.read_text())
+            started = status.get('timestamp') or status_file.stat().st_mtime
+        except (OSError, ValueError, AttributeError):
+            continue
+        if status.get('status') == 'running' and now - started > ORPHANED_STATUS_AGE:
+            orphaned.append(str(status_file))
+
+    if not orphaned:
+        return [], []
+    return [], [{
+        'type': 'orphaned_status_files',
+        'severity': 'warning',
+        'paths': orphaned,
+        'message': f'{len(orphaned)} operation(s) never finished (terminal closed mid-run?): '
+                   + ', '.join(Path(p).name for p in orphaned[:5]),
+        'suggestion': f'Check the matching .log files in {log_dir}, then delete the .status files'
+    }]
+
+
+def _terminal_entry_stale(entry: Dict) -> bool:
+    """A registry entry is stale once its operation finished or its process is gone"""
+    status_file = entry.get('status_file')
+    if status_file:
+        try:
+            if json.loads(Path(status_file).read_text()).get('status') != 'running':
+                return True
+        except (OSError, ValueError, AttributeError):
+            return True
+    pid = entry.get('pid')
+    if pid:
+        from pm_utils import pid_alive
+        return not pid_alive(pid)
+    return False
+
+
+@register_check('terminal-registry', 'Terminal registry only lists live terminals')
+def check_terminal_registry() -> Tuple[List[Dict], List[Dict]]:
+    from terminal_executor import _get_registry_file, _load_terminal_registry
+
+    stale = [entry for entry in _load_terminal_registry() if _terminal_entry_stale(entry)]
+    if not stale:
+        return [], []
+    return [], [{
+        'type': 'stale_terminal_registry',
+        'severity': 'warning',
+        'path': str(_get_registry_file()),
+        'message': f'Terminal registry lists {len(stale)} finished or dead terminal(s): '
+                   + ', '.join(entry.get('operation', '?') for entry in stale[:5]),
+        'suggestion': 'It is reset by the next just check/upgrade; or delete the registry file'
+    }]
+
+
+@register_check('symlinks', 'Dotfiles symlinks are valid and point into this repo', timeout=30.0)
+def check_symlinks() -> Tuple[List[Dict], List[Dict]]:
+    return SymlinkDoctor().check_all()
+
+
+def run_checks(checks: List[DoctorCheck], timeout: Optional[float] = None) -> List[CheckResult]:
+    """
+    Run checks concurrently.
+
+    Each check gets its own daemon thread, so one that hangs (a stuck
+    filesystem, a slow subprocess) is reported as timed out without holding
+    up the others or the interpreter's exit.
+
+    Args:
+        checks: Checks to run
+        timeout: Override for every check's own timeout
+
+    Returns:
+        One CheckResult per check, in the given order
+    """
+    outcomes: Dict[str, Tuple] = {}
+
+    def run(check: DoctorCheck):
+        start = time.monotonic()
+        try:
+            issues, warnings = check.func()
+        except Exception as e:
+            issues, warnings = [{
+                'type': 'check_failed',
+                'severity': 'error',
+                'message': f'Check {check.name} crashed: {e}',
+            }], []
+        outcomes[check.name] = (list(issues), list(warnings), time.monotonic() - start)
+
+    start = time.monotonic()
+    threads = []
+    for check in checks:
+        thread = threading.Thread(target=run, args=(check,), name=f"doctor-{check.name}", daemon=True)
+        thread.start()
+        threads.append((check, thread))
+
+    results = []
+    for check, thread in threads:
+        limit = timeout if timeout is not None else check.timeout
+        thread.join(max(0.0, start + limit - time.monotonic()))
+        if check.name not in outcomes:
+            results.append(CheckResult(check.name, 'timeout', time.monotonic() - start, warnings=[{
+                'type': 'check_timeout',
+                'severity': 'warning',
+                'message': f'Check {check.name} did not finish within {limit:g}s',
+            }]))
+            continue
+
+        issues, warnings, duration = outcomes[check.name]
+        status = 'error' if issues else 'warning' if warnings else 'ok'
+        results.append(CheckResult(check.name, status, duration, issues, warnings))
+    return results
+
+
+def select_checks(only: Optional[List[str]] = None, skip: Optional[List[str]] = None) -> List[DoctorCheck]:
+    """Pick registered checks for this platform, honouring --check/--skip"""
+    unknown = [name for name in (only or []) + (skip or []) if name not in DOCTOR_CHECKS]
+    if unknown:
+        raise KeyError(f"Unknown check(s): {', '.join(unknown)}")
+    return [
+        check for check in DOCTOR_CHECKS.values()
+        if check.applies() and (not only or check.name in only) and check.name not in (skip or [])
+    ]
+
+
 def print_results(issues: List[Dict], warnings: List[Dict]):
     """Pretty-print doctor results"""
 
@@ -218,37 +780,133 @@ def print_results(issues: List[Dict], warnings: List[Dict]):
             print()
 
 
-def main():
+def cmd_path(args) -> int:
+    """Show the PATH index: per-entry cost and where binaries are found"""
+    index = PathDoctor().index
+
+    if args.binary:
+        for name in args.binary:
+            locations = index.binaries.get(name, [])
+            print(f"{name}:" if locations else f"{name}: not found")
+            for i, location in enumerate(locations):
+                marker = '→' if i == 0 else ' '
+                resolved = os.path.realpath(location)
+                print(f"  {marker} {location}" + (f" -> {resolved}" if resolved != location else ''))
+        return 0
+
+    print(f"📂 {len(index.entries)} PATH entries, {len(index.binaries)} commands")
+    for entry in index.entries:
+        flags = []
+        if not entry.exists:
+            flags.append('missing')
+        if entry.network:
+            flags.append('network')
+        if entry.probe_seconds > SLOW_PATH_ENTRY_SECONDS:
+            flags.append('slow')
+        suffix = f"  [{', '.join(flags)}]" if flags else ''
+        print(f"  {entry.position + 1:>3}. {entry.probe_seconds * 1000:6.2f}ms {len(entry.binaries):>5}  {entry.path}{suffix}")
+    print(f"⏱️  Estimated cost of a missed lookup: {index.miss_cost() * 1000:.2f}ms")
+
+    shadowed = index.shadowed(PM_BINARIES)
+    if shadowed:
+        print()
+        print("⚠️  Shadowed package manager binaries:")
+        for name, locations in shadowed.items():
+            print(f"  {name}: {' > '.join(locations)}")
+    return 0
+
+
+def cmd_symlinks(args) -> int:
+    """Check (and optionally clean up) dotfiles symlinks"""
+    doctor = SymlinkDoctor(home=args.home, dotfiles_dir=args.dotfiles_dir)
+
+    if args.list:
+        # Machine-readable form used by scripts/health/dotfiles-health.sh
+        for record in doctor.scan():
+            print(f"{record.status}\t{record.path}\t{record.target}")
+        return 0
+
+    print(f"🔍 Checking symlinks under {doctor.home}...")
+    issues, warnings = doctor.check_all()
+
+    if args.remove_broken:
+        removed, failed = doctor.remove_broken()
+        for path in removed:
+            print(f"  ✓ Removed: {path}")
+        for path in failed:
+            print(f"  ✗ Failed to remove: {path}")
+        print(f"🧹 Removed {len(removed)} broken symlinks")
+        return 1 if failed else 0
+
+    status, message = doctor.health_status()
+    print(f"📊 Status: {status} - {message}")
+    print(f"  • Current system links: {len(doctor.by_status('current'))}")
+    print(f"  • Legacy system links: {len(doctor.by_status('legacy'))}")
+    print(f"  • Outside-repo links: {len(doctor.by_status('outside'))}")
+    print(f"  • Broken links: {len(doctor.by_status('broken'))}")
+    if args.verbose:
+        print_results(issues, warnings)
+    return 1 if status in ('CRITICAL', 'MIXED', 'LEGACY') else 0
+
+
+STATUS_ICONS = {'ok': '✅', 'warning': '⚠️ ', 'error': '❌', 'timeout': '⏱️ '}
+
+
+def main(argv: Optional[List[str]] = None):
     """Run all doctor checks"""
-    print(f"🩺 Running system health checks on {platform.system()}...\n")
-
-    all_issues = []
-    all_warnings = []
-
-    # PATH checks
-    print("Checking PATH...")
-    path_doctor = PathDoctor()
-    issues, warnings = path_doctor.check_all()
-    all_issues.extend(issues)
-    all_warnings.extend(warnings)
-
-    # Tool availability checks
-    print("Checking tool availability...")
-    tool_doctor = ToolDoctor()
-    issues, warnings = tool_doctor.check_all()
-    all_issues.extend(issues)
-    all_warnings.extend(warnings)
-
-    # Pacman checks (if applicable)
-    if platform.system() in ('Windows', 'Linux'):
-        print("Checking package manager health...")
-        pacman_doctor = PacmanDoctor()
-        issues, warnings = pacman_doctor.check_all()
-        all_issues.extend(issues)
-        all_warnings.extend(warnings)
-
-    # Print results
-    print_results(all_issues, all_warnings)
+    parser = argparse.ArgumentParser(description='Cross-platform system health checks')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    parser.add_argument('--check', action='append', metavar='NAME', help='Only run this check (repeatable)')
+    parser.add_argument('--skip', action='append', metavar='NAME', help='Skip this check (repeatable)')
+    parser.add_argument('--timeout', type=float, help="Override every check's timeout (seconds)")
+    parser.add_argument('--list-checks', action='store_true', help='List registered checks')
+    subparsers = parser.add_subparsers(dest='action')
+    symlinks = subparsers.add_parser('symlinks', help='Check dotfiles symlinks')
+    symlinks.add_argument('--list', action='store_true', help='Print status, link and target per line (tab-separated)')
+    symlinks.add_argument('--remove-broken', action='store_true', help='Delete broken dotfiles symlinks')
+    symlinks.add_argument('--verbose', '-v', action='store_true', help='Show every finding')
+    symlinks.add_argument('--home', type=Path, help='Directory to scan (default: ~)')
+    symlinks.add_argument('--dotfiles-dir', type=Path, help='Dotfiles repo (default: this checkout)')
+    path = subparsers.add_parser('path', help='Show PATH lookup cost and binary locations')
+    path.add_argument('binary', nargs='*', help='Show every location of these commands')
+    args = parser.parse_args(argv)
+
+    if args.action == 'symlinks':
+        sys.exit(cmd_symlinks(args))
+    if args.action == 'path':
+        sys.exit(cmd_path(args))
+
+    if args.list_checks:
+        for check in DOCTOR_CHECKS.values():
+            suffix = '' if check.applies() else f" (only on {', '.join(check.platforms)})"
+            print(f"  {check.name:<18} {check.description}{suffix}")
+        sys.exit(0)
+
+    try:
+        checks = select_checks(args.check, args.skip)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}. See --list-checks")
+        sys.exit(1)
+
+    if not args.json:
+        print(f"🩺 Running system health checks on {platform.system()}...\n")
+    results = run_checks(checks, args.timeout)
+
+    all_issues = [issue for result in results for issue in result.issues]
+    all_warnings = [warning for result in results for warning in result.warnings]
+
+    if args.json:
+        print(json.dumps({
+            'platform': platform.system(),
+            'checks': [asdict(result) for result in results],
+            'issues': len(all_issues),
+            'warnings': len(all_warnings),
+        }, indent=2))
+    else:
+        for result in results:
+            print(f"{STATUS_ICONS[result.status]} {result.name} ({result.duration:.2f}s)")
+        print()
+        print_results(all_issues, all_warnings)
 
     # Exit code: 0 if no issues, 1 if issues found, 2 if warnings only
     if all_issues:
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Login Environment Capture
+
+Tracked commands need the PATH and toolchain variables set up by the user's
+login profile (Homebrew, pipx, gem paths...). Rather than every wrapper
+starting a login shell to source the profile, the orchestrator captures the
+environment once and writes it as a small script that run_tracked.sh
+sources (DOTFILES_LOGIN_ENV).
+
+The profile is sourced by a login shell started with a clean environment
+(HOME, USER, SHELL, TERM and a default PATH), so whatever the orchestrator
+was started from (an activated venv, a nix shell) never leaks into the
+cache. The capture is cached in ~/.dotfiles/cache and reused until one of
+the profile files changes (by mtime) or the login shell changes. Files sourced
+indirectly by the profile are not tracked; use --refresh after editing
+them. Set DOTFILES_LOGIN_ENV_CACHE=false to always source the profile in
+the wrapper instead.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from pm_utils import atomic_write
+
+CACHE_VERSION = 2
+
+# Variables copied from the login environment
+LOGIN_ENV_VARS = {
+    'PATH', 'GEM_HOME', 'LANG', 'LD_LIBRARY_PATH', 'PKG_CONFIG_PATH',
+    'CPATH', 'COMPILER_PATH', 'LIBRARY_PATH',
+}
+LOGIN_ENV_PREFIXES = ('HOMEBREW', 'PIPX', 'LC_')
+
+# Passed through to the capturing shell; nothing else is inherited
+CAPTURE_BASE_VARS = ('HOME', 'USER', 'LOGNAME', 'SHELL', 'TERM', 'TMPDIR')
+
+# Seconds to wait for the profile to load
+CAPTURE_TIMEOUT = 30
+
+_lock = threading.Lock()
+_session_script: Optional[Path] = None
+_session_checked = False
+
+
+def get_cache_dir() -> Path:
+    return Path.home() / '.dotfiles' / 'cache'
+
+
+def cache_enabled() -> bool:
+    return os.environ.get('DOTFILES_LOGIN_ENV_CACHE', 'true').lower() not in ('false', '0', 'no')
+
+
+def get_login_shell() -> Optional[str]:
+    """zsh if available, else bash (the order run_tracked.sh uses)"""
+    return shutil.which('zsh') or shutil.which('bash')
+
+
+def get_profile_files(shell: str) -> List[Path]:
+    """Profile files whose changes invalidate the cached environment"""
+    home = Path.home()
+    if Path(shell).name == 'zsh':
+        return [Path('/etc/zshenv'), Path('/etc/zprofile'), home / '.zshenv', home / '.zprofile']
+    return ([Path('/etc/profile'), home / '.bash_profile', home / '.bash_login', home / '.profile']
+            + sorted(home.glob('.profile_*')))
+
+
+def _cache_key(shell: str) -> Dict[str, object]:
+    mtimes = {}
+    for path in get_profile_files(shell):
+        try:
+            mtimes[str(path)] = os.stat(path).st_mtime_ns
+        except OSError:
+            mtimes[str(path)] = None
+    return {'version': CACHE_VERSION, 'shell': shell, 'profiles': mtimes}
+
+
+def _wanted(name: str) -> bool:
+    return name in LOGIN_ENV_VARS or name.startswith(LOGIN_ENV_PREFIXES)
+
+
+def _capture_base_env() -> Dict[str, str]:
+    """The only environment the capturing shell starts with"""
+    env = {name: os.environ[name] for name in CAPTURE_BASE_VARS if os.environ.get(name)}
+    env['HOME'] = str(Path.home())
+    try:
+        env['PATH'] = os.confstr('CS_PATH') or os.defpath
+    except (AttributeError, ValueError, OSError):
+        env['PATH'] = os.defpath
+    return env
+
+
+def capture_login_env(shell: str) -> Dict[str, str]:
+    """
+    Source the login profile in a clean login shell and return its environment.
+
+    Args:
+        shell: Path to zsh or bash
+
+    Returns:
+        The variables matching LOGIN_ENV_VARS / LOGIN_ENV_PREFIXES
+
+    Raises:
+        RuntimeError: If the shell fails or prints no environment
+    """
+    dump = f"{shlex.quote(sys.executable)} -c 'import json, os; print(json.dumps(dict(os.environ)))'"
+    # -l sources the system and user profiles the way a new terminal does
+    result = subprocess.run([shell, '-l', '-c', dump], capture_output=True, text=True,
+                            env=_capture_base_env(), stdin=subprocess.DEVNULL, timeout=CAPTURE_TIMEOUT)
+    # Profiles may print banners; the dump is the last line
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"{shell} exited {result.returncode}: {result.stderr.strip()[:200]}")
+    environ = json.loads(lines[-1])
+    return {name: value for name, value in environ.items() if _wanted(name)}
+
+
+def render_env_script(env: Dict[str, str]) -> str:
+    return ''.join(f"export {name}={shlex.quote(value)}\n" for name, value in sorted(env.items()))
+
+
+def load_login_env(refresh: bool = False) -> Optional[Path]:
+    """
+    Get the cached login environment script, capturing it if needed.
+
+    Args:
+        refresh: Recapture even if the cache is current
+
+    Returns:
+        Path of a script exporting the login environment, or None if no
+        shell is available or the capture failed
+    """
+    shell = get_login_shell()
+    if not shell:
+        return None
+
+    cache_dir = get_cache_dir()
+    meta_file, script_file = cache_dir / 'login-env.json', cache_dir / 'login-env.sh'
+    key = _cache_key(shell)
+
+    if not refresh and script_file.exists():
+        try:
+            if json.loads(meta_file.read_text()).get('key') == key:
+                return script_file
+        except (OSError, ValueError):
+            pass
+
+    try:
+        env = capture_login_env(shell)
+    except (OSError, subprocess.SubprocessError, RuntimeError, ValueError) as e:
+        print(f"⚠️  Could not capture login environment: {e}", file=sys.stderr)
+        return None
+
+    atomic_write(script_file, render_env_script(env))
+    atomic_write(meta_file, json.dumps({'key': key, 'env': env}, indent=2))
+    return script_file
+
+
+def get_login_env_script() -> Optional[Path]:
+    """The login environment script for this session, checked once per process"""
+    global _session_script, _session_checked
+    if not cache_enabled():
+        return None
+    with _lock:
+        if not _session_checked or (_session_script and not _session_script.exists()):
+            _session_script = load_login_env()
+            _session_checked = True
+        return _session_script
+
+
+def login_env_prefix() -> str:
+    """
+    Environment assignment that points run_tracked.sh at the captured login
+    environment.
+
+    Returns:
+        A prefix like 'DOTFILES_LOGIN_ENV=/path ' (empty to let the wrapper
+        source the profile itself)
+    """
+    script = get_login_env_script()
+    return f"DOTFILES_LOGIN_ENV={shlex.quote(str(script))} " if script else ''
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Capture the login environment used by tracked commands')
+    parser.add_argument('--refresh', action='store_true', help='Recapture even if the profile is unchanged')
+    parser.add_argument('--print', action='store_true', dest='show', help='Print the captured variables')
+    args = parser.parse_args(argv)
+
+    script = load_login_env(refresh=args.refresh)
+    if script is None:
+        return 1
+    print(f"✅ Login environment: {script}")
+    if args.show:
+        print(script.read_text(), end='')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,7 @@ Replaces the various shell scripts with a consistent Python interface.
 """
 
 import argparse
+import os
 import sys
 import time
 from datetime import datetime
@@ -20,6 +21,14 @@ from .pm_upgrade import upgrade_all_pms
 from .pm_configure import configure_pms, save_pm_config
 from .terminal_executor import _save_terminal_registry, spawn_tracked
 
+# pm_executor and the PMs import pm_process by bare name; use the same module
+# so propagate_interrupt() sees the commands they start
+sys.path.insert(0, str(Path(__file__).parent))
+from pm_process import propagate_interrupt
+from pm_summary import update_summary
+from pm_output import OUTPUT_FORMATS, open_output
+from pm_prefetch import build_prefetch_plan, prefetch_enabled, start_prefetch, print_status as print_prefetch_status
+
 
 def _log_duration(operation: str, selected_pms: List[str], duration_secs: float, successful: int, total: int):
     """Append a duration record to the upgrade history log."""
@@ -108,7 +117,7 @@ def cmd_check(args):
 
     # Check all selected package managers (parallel by default)
     start_time = time.time()
-    results = check_all_pms(selected_pms, parallel=True)
+    results = check_all_pms(selected_pms, parallel=True, on_result=args.out.result)
     duration = time.time() - start_time
 
     # Summary with raw output
@@ -152,6 +161,13 @@ def cmd_check(args):
     print(f"⏱️  Duration: {duration_str}")
 
     _log_duration('check', selected_pms, duration, successful_checks, len(selected_pms))
+    # For shell prompts (see pm_summary)
+    update_summary(results)
+
+    # Download what the upgrade will need while the user decides
+    if has_outdated and prefetch_enabled():
+        print()
+        start_prefetch(build_prefetch_plan(results))
 
     # Offer to close spawned terminals
     from .terminal_executor import prompt_close_terminals
@@ -160,6 +176,81 @@ def cmd_check(args):
     return 0
 
 
+def cmd_daemon(args):
+    """Run or control the resident pm daemon."""
+    from pm_daemon import run_daemon, start_daemon, stop_daemon
+    from pm_client import main as client_main
+
+    if args.action == 'run':
+        return run_daemon()
+    if args.action == 'start':
+        return start_daemon()
+    if args.action == 'stop':
+        return stop_daemon()
+    return client_main(['status'])
+
+
+def cmd_fleet(args):
+    """Run pm check/upgrade on containers and chroots."""
+    from pm_fleet import discover_targets, parse_target, read_targets_file, run_fleet
+
+    print(f"🚢 Package Manager Fleet {args.operation.capitalize()}")
+    print("=" * 30)
+
+    try:
+        targets = [parse_target(spec) for spec in args.targets]
+        if args.targets_file:
+            targets += read_targets_file(args.targets_file)
+    except (ValueError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+    if args.machine_class:
+        targets += discover_targets(args.runtime, args.machine_class)
+
+    if not targets:
+        print("❌ No fleet targets (name containers, use --targets-file, or --class for running machine class containers)")
+        return 1
+
+    print(f"\n📋 {len(targets)} target(s): {', '.join(target.label for target in targets)}")
+    print()
+
+    start_time = time.time()
+    results = run_fleet(targets, args.operation, args.pm, jobs=args.jobs, on_result=args.out.result,
+                        dotfiles_dir=args.dotfiles_dir, user=args.user, timeout=args.target_timeout)
+    duration = time.time() - start_time
+
+    successful = sum(1 for result in results if result['success'])
+    print(f"\n🎯 Successful targets: {successful}/{len(results)}")
+    if args.operation == 'check':
+        print(f"📦 Outdated packages across the fleet: {sum(r.get('outdated_count', 0) for r in results)}")
+    print(f"⏱️  Duration: {duration:.0f}s")
+
+    return 0 if successful == len(results) else 1
+
+
+def cmd_cache_serve(args):
+    """Run the shared package download cache."""
+    from pm_cache import client_config, parse_size, serve
+
+    if args.print_config:
+        import socket
+        print(client_config(f"http://{socket.gethostname()}:{args.port}"))
+        return 0
+
+    bad_mirrors = [mirror for mirror in args.mirror if '=' not in mirror]
+    if bad_mirrors:
+        print(f"❌ Mirrors are given as NAME=URL: {', '.join(bad_mirrors)}")
+        return 1
+    mirrors = dict(mirror.split('=', 1) for mirror in args.mirror)
+    try:
+        max_bytes = parse_size(args.max_size) if args.max_size else None
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    return serve(args.host, args.port, max_bytes=max_bytes, root=args.cache_dir, mirrors=mirrors,
+                 allowed_hosts=args.allow_host)
+
+
 def cmd_upgrade(args):
     """Upgrade packages."""
     # Clear terminal registry at start of new session
@@ -192,11 +283,12 @@ def cmd_upgrade(args):
         return 0
 
     print(f"\n🎯 Upgrading {len(selected_pms)} package managers...")
+    print_prefetch_status(selected_pms)
     print()
 
     # Upgrade all selected package managers (sequential by default for safety)
     start_time = time.time()
-    results = upgrade_all_pms(selected_pms, parallel=False)
+    results = upgrade_all_pms(selected_pms, parallel=False, on_result=args.out.result)
     duration = time.time() - start_time
 
     # Summary
@@ -264,7 +356,7 @@ def cmd_audit(args):
     print()
 
     # Perform audit
-    audit_results = audit_package_managers()
+    audit_results = audit_package_managers(on_result=args.out.result)
     recommendations = recommend_actions(audit_results)
 
     # Print report
@@ -433,7 +525,7 @@ def cmd_install(args):
     # Install packages for all selected package managers
     level = getattr(args, 'level', 'all')
     start_time = time.time()
-    results = install_all_pms(selected_pms, level)
+    results = install_all_pms(selected_pms, level, on_result=args.out.result)
     duration = time.time() - start_time
 
     # Summary
@@ -490,7 +582,15 @@ Examples:
   pm check brew npm          # Check specific package managers
   pm upgrade                 # Upgrade packages (interactive)
   pm upgrade --all           # Upgrade all available PMs
+  pm upgrade --yes           # No selection countdown or terminal-close wait
   pm configure               # Configure enabled/disabled PMs
+  pm check --timeout 300     # Stop any PM check still running after 5 minutes
+  pm check --refresh         # Run brew update/apt-get update even if recent
+  pm check --prefetch        # Then download upgrades in the background
+  pm daemon start            # Keep checks warm; query with pm_client.py
+  pm check --output ndjson   # One JSON event per PM as it finishes (report on stderr)
+  pm fleet check --class docker_developer_ubuntu   # Check every running container of a class
+  pm cache-serve             # Share bottle/tarball/.deb downloads (DOTFILES_PM_CACHE_URL)
         """
     )
 
@@ -502,17 +602,81 @@ Examples:
     # Check command
     parser_check = subparsers.add_parser('check', help='Check for outdated packages')
     parser_check.add_argument('pms', nargs='*', help='Specific PMs to check (optional)')
+    parser_check.add_argument('--timeout', type=float, metavar='SECONDS',
+                              help='Stop each PM after this long (0 for no limit; default: per-PM policy)')
+    parser_check.add_argument('--refresh', action='store_true',
+                              help='Refresh package indexes even if they were refreshed recently')
+    parser_check.add_argument('--prefetch', action='store_true',
+                              help='Download outdated packages in the background for the next upgrade')
+    parser_check.add_argument('-y', '--yes', '--batch', dest='batch', action='store_true',
+                              help='Skip prompts and countdowns: select all PMs, close terminals right away')
+    parser_check.add_argument('--output', choices=OUTPUT_FORMATS, default='text',
+                              help='text (default), json (one document) or ndjson (one event per PM as it completes)')
 
     # Upgrade command
     parser_upgrade = subparsers.add_parser('upgrade', help='Upgrade packages')
     parser_upgrade.add_argument('pms', nargs='*', help='Specific PMs to upgrade (optional)')
     parser_upgrade.add_argument('--all', action='store_true', help='Upgrade all available PMs')
+    parser_upgrade.add_argument('--timeout', type=float, metavar='SECONDS',
+                                help='Stop each PM after this long (0 for no limit; default: per-PM policy)')
+    parser_upgrade.add_argument('-y', '--yes', '--batch', dest='batch', action='store_true',
+                                help='Skip prompts and countdowns: select all PMs, close terminals right away')
+    parser_upgrade.add_argument('--output', choices=OUTPUT_FORMATS, default='text',
+                                help='text (default), json (one document) or ndjson (one event per PM as it completes)')
 
     # Configure command
     parser_configure = subparsers.add_parser('configure', help='Configure package managers')
+    parser_configure.add_argument('-y', '--yes', '--batch', dest='batch', action='store_true',
+                                  help='Skip the selection countdown and enable every detected PM')
 
     # Audit command
     parser_audit = subparsers.add_parser('audit', help='Audit package managers for consistency')
+    parser_audit.add_argument('--output', choices=OUTPUT_FORMATS, default='text',
+                              help='text (default), json (one document) or ndjson (one event per PM as it completes)')
+
+    # Daemon command
+    parser_daemon = subparsers.add_parser('daemon', help='Run or control the resident pm daemon')
+    parser_daemon.add_argument('action', nargs='?', default='status', choices=['run', 'start', 'stop', 'status'],
+                               help='run (foreground), start (background), stop or status (default)')
+
+    # Fleet command (check/upgrade are subcommands so targets can follow options)
+    parser_fleet = subparsers.add_parser('fleet', help='Run check/upgrade on many containers or chroots at once')
+    fleet_options = argparse.ArgumentParser(add_help=False)
+    fleet_options.add_argument('targets', nargs='*',
+                               help='docker:<container>, podman:<container>, chroot:<dir> (a bare name is a docker container)')
+    fleet_options.add_argument('--targets-file', type=Path, metavar='FILE', help='File with one target per line')
+    fleet_options.add_argument('--class', dest='machine_class', metavar='MACHINE_CLASS',
+                               help='Add the running containers of this machine class image (dotfiles-test-<class>)')
+    fleet_options.add_argument('--runtime', choices=['docker', 'podman'], default='docker',
+                               help='Container runtime for --class (default: docker)')
+    fleet_options.add_argument('--pm', action='append', default=[], metavar='NAME',
+                               help='Only this PM (repeatable; default: every PM each target detects)')
+    fleet_options.add_argument('-j', '--jobs', type=int, default=4, help='Targets to run at the same time (default: 4)')
+    fleet_options.add_argument('--dotfiles-dir', default='$HOME/dotfiles',
+                               help='Dotfiles checkout inside the targets (default: $HOME/dotfiles)')
+    fleet_options.add_argument('--user', help="User to run as in the targets (default: the target's default user)")
+    fleet_options.add_argument('--target-timeout', type=float, metavar='SECONDS',
+                               help='Stop a target still running after this long (default: no limit)')
+    fleet_options.add_argument('--output', choices=OUTPUT_FORMATS, default='text',
+                               help='text (default), json (one document) or ndjson (one event per target as it completes)')
+    fleet_operations = parser_fleet.add_subparsers(dest='operation', required=True, metavar='{check,upgrade}')
+    fleet_operations.add_parser('check', parents=[fleet_options], help='Check every target for outdated packages')
+    fleet_operations.add_parser('upgrade', parents=[fleet_options], help='Upgrade every target')
+
+    # Cache server command
+    parser_cache = subparsers.add_parser('cache-serve', help='Serve a shared download cache for provisioning machines')
+    parser_cache.add_argument('--host', default='127.0.0.1',
+                              help='Address to listen on (default: 127.0.0.1; 0.0.0.0 serves other machines)')
+    parser_cache.add_argument('--port', type=int, default=3142, help='Port to listen on (default: 3142)')
+    parser_cache.add_argument('--max-size', metavar='SIZE',
+                              help='Cache size limit, e.g. 20G (default: DOTFILES_PM_CACHE_MAX_SIZE or 20G)')
+    parser_cache.add_argument('--cache-dir', type=Path, help='Cache directory (default: ~/.dotfiles/cache/pm-cache)')
+    parser_cache.add_argument('--mirror', action='append', default=[], metavar='NAME=URL',
+                              help='Also serve URL under /NAME/ (repeatable; npm and v2 for ghcr.io are built in)')
+    parser_cache.add_argument('--allow-host', action='append', default=[], metavar='HOST',
+                              help='Also fetch from HOST and its subdomains (repeatable; see pm_cache.ALLOWED_HOSTS)')
+    parser_cache.add_argument('--print-config', action='store_true',
+                              help='Print the client settings for this host and exit')
 
     # Version command
     parser_version = subparsers.add_parser('version', help='Check versions of all package managers')
@@ -524,6 +688,12 @@ Examples:
                                 help='Package category to install')
     parser_install.add_argument('--level', choices=['user', 'admin', 'all'],
                                 default='all', help='Installation level for system packages')
+    parser_install.add_argument('--timeout', type=float, metavar='SECONDS',
+                                help='Stop each PM after this long (0 for no limit; default: per-PM policy)')
+    parser_install.add_argument('-y', '--yes', '--batch', dest='batch', action='store_true',
+                                help='Skip prompts and countdowns: select all PMs, close terminals right away')
+    parser_install.add_argument('--output', choices=OUTPUT_FORMATS, default='text',
+                                help='text (default), json (one document) or ndjson (one event per PM as it completes)')
 
     args = parser.parse_args()
 
@@ -531,6 +701,21 @@ Examples:
         parser.print_help()
         return 1
 
+    # Overrides every PM's timeout policy (see pm_base.DEFAULT_TIMEOUTS)
+    if getattr(args, 'timeout', None) is not None:
+        os.environ['DOTFILES_PM_TIMEOUT'] = f"{args.timeout:g}"
+
+    # Ignore the refresh freshness window (see pm_refresh)
+    if getattr(args, 'refresh', False):
+        os.environ['DOTFILES_PM_REFRESH_MAX_AGE'] = '0'
+
+    if getattr(args, 'prefetch', False):
+        os.environ['DOTFILES_PM_PREFETCH'] = 'true'
+
+    # No interactive waits (see pm_select.batch_mode)
+    if getattr(args, 'batch', False):
+        os.environ['DOTFILES_PM_BATCH'] = 'true'
+
     # Dispatch to command handlers
     commands = {
         'list': cmd_list,
@@ -540,11 +725,17 @@ Examples:
         'audit': cmd_audit,
         'version': cmd_version,
         'install': cmd_install,
+        'daemon': cmd_daemon,
+        'fleet': cmd_fleet,
+        'cache-serve': cmd_cache_serve,
     }
 
     handler = commands.get(args.command)
     if handler:
-        return handler(args)
+        # Machine-readable results on stdout, the report on stderr (see pm_output)
+        with propagate_interrupt(), open_output(args.command, getattr(args, 'output', 'text')) as out:
+            args.out = out
+            return out.finish(handler(args))
     else:
         print(f"❌ Unknown command: {args.command}")
         return 1
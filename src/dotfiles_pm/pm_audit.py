@@ -9,7 +9,7 @@ Identifies orphaned package managers and suggests remediation.
 import os
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Callable, Dict, List, Tuple, Optional
 
 from .pm_detect import detect_all_pms
 
@@ -89,8 +89,16 @@ def get_installed_packages(pm: str) -> Tuple[bool, List[str]]:
         return False, []
 
 
-def audit_package_managers() -> Dict[str, Dict]:
-    """Audit all package managers for consistency."""
+def audit_package_managers(on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Dict]:
+    """
+    Audit all package managers for consistency.
+
+    Args:
+        on_result: Called with each PM's result (plus its 'pm' name) as soon as it is audited
+
+    Returns:
+        Dict mapping pm_name -> audit result
+    """
     detected_pms = detect_all_pms()
     manifests = find_manifests()
 
@@ -111,6 +119,8 @@ def audit_package_managers() -> Dict[str, Dict]:
             'packages': packages if success else [],
             'check_success': success
         }
+        if on_result:
+            on_result({'pm': pm, **audit_results[pm]})
 
     return audit_results
 
@@ -5,10 +5,38 @@ Package Manager Base Classes
 Defines the base architecture for package manager operations.
 """
 
+import os
 from abc import ABC, abstractmethod
-from typing import List
+from pathlib import Path
+from typing import Dict, List, Optional
 from dataclasses import dataclass
 
+# Seconds each operation may run before it is stopped (None for no limit).
+# PMs adjust these through the `timeouts` property; users override them with
+# `pm --timeout`, DOTFILES_PM_TIMEOUT_<PM>_<OPERATION> or
+# DOTFILES_PM_TIMEOUT_<OPERATION> (environment or ~/.dotfiles.env, 0 = no limit)
+DEFAULT_TIMEOUTS: Dict[str, Optional[float]] = {
+    'refresh': 300,
+    'check': 120,
+    'prefetch': 1800,
+    'upgrade': 7200,
+    'install': 7200,
+}
+
+
+def get_config_value(name: str) -> Optional[str]:
+    """Read a setting from the environment, falling back to ~/.dotfiles.env"""
+    if name in os.environ:
+        return os.environ[name]
+    env_file = Path.home() / '.dotfiles.env'
+    try:
+        for line in env_file.read_text().splitlines():
+            if line.startswith(f'export {name}='):
+                return line.split('=', 1)[1].strip().strip('"')
+    except OSError:
+        pass
+    return None
+
 
 @dataclass
 class PMResult:
@@ -67,6 +95,51 @@ class PackageManager(ABC):
         """Command to check for outdated packages"""
         pass
 
+    @property
+    def refresh_command(self) -> Optional[List[str]]:
+        """Command that refreshes the package index before a check (None if the
+        check needs no refresh); run once per session, see pm_refresh"""
+        return None
+
+    @property
+    def refresh_group(self) -> Optional[str]:
+        """PMs reading the same package index share a group and one refresh"""
+        return self.name if self.refresh_command else None
+
+    def index_refreshed_at(self) -> Optional[float]:
+        """When the package index was last refreshed (epoch seconds), judged from
+        the PM's own files; None if it can't tell"""
+        return None
+
+    def prefetch_command(self, check_output: str) -> Optional[List[str]]:
+        """
+        Download-only command that fetches what the upgrade will install, so
+        the upgrade installs from the PM's cache; see pm_prefetch.
+
+        Args:
+            check_output: Output of this PM's check
+
+        Returns:
+            Command list, or None if there is nothing to fetch or the PM can't
+            download without installing
+        """
+        return None
+
+    def outdated_packages(self, check_output: str) -> Optional[List[Dict[str, Optional[str]]]]:
+        """
+        Outdated packages listed in check output, for machine-readable output
+        (see pm_output).
+
+        Args:
+            check_output: Output of this PM's check
+
+        Returns:
+            List of {'name', 'current', 'latest'} dicts (versions None where the
+            output doesn't show them), or None if the output can't be parsed
+            into packages
+        """
+        return None
+
     @property
     @abstractmethod
     def upgrade_command(self) -> List[str]:
@@ -91,6 +164,61 @@ class PackageManager(ABC):
         """Execution priority (0=system, 10=user)"""
         pass
 
+    @property
+    def check_mutates_state(self) -> bool:
+        """Whether the check command itself changes PM state (fetches plugin
+        remotes, updates a registry index), so it can't share the PM's lock"""
+        return False
+
+    @property
+    def lock_resource(self) -> str:
+        """Cross-process lock name; PMs that share on-disk state share a lock"""
+        return self.name
+
+    @property
+    def stall_timeout(self) -> Optional[float]:
+        """Seconds a terminal run may go without output before it is killed as
+        hung; None for the DOTFILES_PM_STALL_TIMEOUT default. Upgrades only use
+        it when DOTFILES_PM_STALL_TIMEOUT is set (see tracked_status.stall_limit)"""
+        return None
+
+    @property
+    def timeouts(self) -> Dict[str, Optional[float]]:
+        """Seconds each operation may run before it is stopped (None for no limit)"""
+        return DEFAULT_TIMEOUTS
+
+    def get_timeout(self, operation: str) -> Optional[float]:
+        """
+        Timeout for an operation after user overrides.
+
+        DOTFILES_PM_TIMEOUT (set by `pm --timeout`) wins, then the PM and
+        operation specific setting, then the operation-wide one, then the
+        PM's own policy.
+
+        Args:
+            operation: 'refresh', 'check', 'prefetch', 'upgrade' or 'install'
+
+        Returns:
+            Seconds, or None for no limit
+        """
+        pm_key = self.name.upper().replace('-', '_')
+        op_key = operation.upper()
+        for name in ('DOTFILES_PM_TIMEOUT', f'DOTFILES_PM_TIMEOUT_{pm_key}_{op_key}', f'DOTFILES_PM_TIMEOUT_{op_key}'):
+            value = get_config_value(name)
+            if not value:
+                continue
+            try:
+                return float(value) or None
+            except ValueError:
+                continue
+        return self.timeouts.get(operation, DEFAULT_TIMEOUTS.get(operation))
+
+    @property
+    def retry_patterns(self) -> Dict[str, List[str]]:
+        """Failure reason -> regexes for this PM's transient failures (usually
+        its lock messages); checked before pm_retry's generic network/server ones"""
+        return {}
+
     @property
     def parser(self) -> PMParser:
         """Output parser for this PM"""
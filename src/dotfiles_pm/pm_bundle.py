@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Machine Class Bundle
+
+Compiles machine-classes/<class>/ into one validated, versioned JSON bundle
+that pm_detect, pm_install, the stow engine and scripts/stow/stow.sh load
+in a single read instead of each listing the class directory and parsing
+its files again:
+
+    ~/.dotfiles/cache/machine-class/<class>.json
+
+    {
+      "version": 1,
+      "machine_class": "docker_developer_ubuntu",
+      "class_dir": "/home/user/dotfiles/machine-classes/docker_developer_ubuntu",
+      "pms": ["apt", "brew", "npm"],
+      "packages": {"apt": ["build-essential", ...], "npm": [...]},
+      "stow": ["shell_common", ...],
+      "files": {"apt/packages.txt": {"sha256": "...", "size": 812, "mtime_ns": ...}},
+      "dirs": {".": <mtime_ns>, "apt": <mtime_ns>, ...},
+      "warnings": []
+    }
+
+`packages` holds each PM's parsed packages.txt; files that the PM reads
+itself (Brewfile, requirements.txt) are only hashed. A PM without a
+packages.txt has no `packages` entry. `stow` is null when the class has no
+stow.txt.
+
+Loading stats the recorded files and directories. When nothing moved the
+bundle is used as is; otherwise the sources are hashed again and the bundle
+is recompiled only if a hash or the set of files or directories changed (a
+touched but unchanged file just refreshes the recorded stats). Bundles from
+another checkout, an older version or failing validation are recompiled.
+
+JSON rather than msgpack keeps this module standard-library only; it also
+works on its own for shell scripts:
+
+    python3 -m src.dotfiles_pm.pm_bundle            # compile, show summary
+    python3 -m src.dotfiles_pm.pm_bundle --stow     # stow packages, one per line
+    python3 -m src.dotfiles_pm.pm_bundle --json     # the bundle
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pm_detect import get_machine_class_name
+from pm_utils import atomic_write
+
+BUNDLE_VERSION = 1
+
+DOTFILES_ROOT = Path(__file__).parent.parent.parent
+
+# Class subdirectories that are not package managers
+SPECIAL_DIRS = ('stow', 'win-reg')
+
+# Per-PM package list parsed into the bundle; other files are only hashed
+PACKAGE_LIST_FILE = 'packages.txt'
+
+STOW_LIST_FILE = 'stow/stow.txt'
+
+# Bundles loaded by this process; still stat-checked on every load
+_loaded: Dict[Path, Dict[str, Any]] = {}
+
+BUNDLE_KEYS = {'version': int, 'machine_class': str, 'class_dir': str, 'pms': list,
+               'packages': dict, 'files': dict, 'dirs': dict, 'warnings': list}
+
+
+def get_bundle_path(machine_class: str) -> Path:
+    return Path.home() / '.dotfiles' / 'cache' / 'machine-class' / f"{machine_class}.json"
+
+
+def parse_list(text: str) -> List[str]:
+    """Entries of a package or stow list, skipping blanks and comments"""
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            entries.append(line)
+    return entries
+
+
+def _scan(class_dir: Path) -> Tuple[Dict[str, int], Dict[str, os.stat_result]]:
+    """Directory mtimes and file stats under a class directory, keyed by relative path"""
+    dirs: Dict[str, int] = {}
+    files: Dict[str, os.stat_result] = {}
+    for current, dir_names, file_names in os.walk(class_dir):
+        dir_names.sort()
+        rel_dir = Path(current).relative_to(class_dir).as_posix()
+        dirs[rel_dir] = os.stat(current).st_mtime_ns
+        for name in sorted(file_names):
+            path = Path(current) / name
+            st = path.stat()
+            files[path.relative_to(class_dir).as_posix()] = st
+    return dirs, files
+
+
+def _stats_match(bundle: Dict[str, Any], class_dir: Path) -> bool:
+    """Whether every recorded directory and file is exactly as it was at compile time"""
+    try:
+        for rel_dir, mtime_ns in bundle['dirs'].items():
+            if os.stat(class_dir / rel_dir).st_mtime_ns != mtime_ns:
+                return False
+        for rel_path, record in bundle['files'].items():
+            st = os.stat(class_dir / rel_path)
+            if (st.st_size, st.st_mtime_ns) != (record.get('size'), record.get('mtime_ns')):
+                return False
+    except OSError:
+        return False
+    return True
+
+
+def _read_sources(class_dir: Path) -> Tuple[Dict[str, int], Dict[str, Dict[str, Any]], Dict[str, bytes]]:
+    """Scan and hash a class directory; returns dirs, file records and file contents"""
+    dirs, stats = _scan(class_dir)
+    files: Dict[str, Dict[str, Any]] = {}
+    contents: Dict[str, bytes] = {}
+    for rel_path, st in stats.items():
+        data = (class_dir / rel_path).read_bytes()
+        contents[rel_path] = data
+        files[rel_path] = {'sha256': hashlib.sha256(data).hexdigest(),
+                           'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    return dirs, files, contents
+
+
+def _duplicates(entries: List[str]) -> List[str]:
+    seen = set()
+    return sorted({entry for entry in entries if entry in seen or seen.add(entry)})
+
+
+def compile_bundle(machine_class: str, dotfiles_root: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Compile a machine class directory into a bundle.
+
+    Args:
+        machine_class: Machine class name
+        dotfiles_root: Dotfiles checkout holding machine-classes/ and configs/ (default: this one)
+
+    Returns:
+        The bundle (see module docstring)
+
+    Raises:
+        FileNotFoundError: If the machine class directory does not exist
+    """
+    dotfiles_root = dotfiles_root or DOTFILES_ROOT
+    class_dir = (dotfiles_root / 'machine-classes' / machine_class).absolute()
+    if not class_dir.is_dir():
+        raise FileNotFoundError(f"Machine class directory not found: {class_dir}")
+
+    dirs, files, contents = _read_sources(class_dir)
+    pms = sorted(name for name in dirs if '/' not in name and name != '.' and name not in SPECIAL_DIRS)
+    warnings = []
+
+    packages = {}
+    for pm in pms:
+        data = contents.get(f"{pm}/{PACKAGE_LIST_FILE}")
+        if data is not None:
+            packages[pm] = parse_list(data.decode('utf-8', errors='replace'))
+            for entry in _duplicates(packages[pm]):
+                warnings.append(f"{pm}/{PACKAGE_LIST_FILE}: '{entry}' listed more than once")
+
+    stow = None
+    if STOW_LIST_FILE in contents:
+        stow = parse_list(contents[STOW_LIST_FILE].decode('utf-8', errors='replace'))
+        for entry in _duplicates(stow):
+            warnings.append(f"{STOW_LIST_FILE}: '{entry}' listed more than once")
+        configs_dir = dotfiles_root / 'configs'
+        for entry in stow:
+            if not (configs_dir / entry).is_dir():
+                warnings.append(f"{STOW_LIST_FILE}: no configs/{entry} package")
+
+    return {
+        'version': BUNDLE_VERSION,
+        'machine_class': machine_class,
+        'class_dir': str(class_dir),
+        'pms': pms,
+        'packages': packages,
+        'stow': stow,
+        'files': files,
+        'dirs': dirs,
+        'warnings': warnings,
+    }
+
+
+def validate_bundle(bundle: Any, machine_class: str, class_dir: Path) -> bool:
+    """Whether a loaded bundle is well formed and was compiled from class_dir"""
+    if not isinstance(bundle, dict):
+        return False
+    if any(not isinstance(bundle.get(key), kind) for key, kind in BUNDLE_KEYS.items()):
+        return False
+    if bundle['version'] != BUNDLE_VERSION or bundle['machine_class'] != machine_class:
+        return False
+    if bundle['class_dir'] != str(class_dir.absolute()):
+        return False
+    if not isinstance(bundle.get('stow'), (list, type(None))):
+        return False
+    if not all(isinstance(pm, str) for pm in bundle['pms']):
+        return False
+    if not all(isinstance(entries, list) for entries in bundle['packages'].values()):
+        return False
+    return all(isinstance(record, dict) and isinstance(record.get('sha256'), str)
+               for record in bundle['files'].values())
+
+
+def _read_bundle(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def save_bundle(bundle: Dict[str, Any], path: Path) -> None:
+    """Write a bundle atomically"""
+    atomic_write(path, json.dumps(bundle, indent=1, sort_keys=True))
+
+
+def load_bundle(machine_class: Optional[str] = None, dotfiles_root: Optional[Path] = None,
+                force: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Load the bundle for a machine class, compiling it if its sources changed.
+
+    Args:
+        machine_class: Machine class (default: the configured DOTFILES_MACHINE_CLASS)
+        dotfiles_root: Dotfiles checkout holding machine-classes/ (default: this one)
+        force: Recompile even if the bundle is up to date
+
+    Returns:
+        The bundle, or None if no machine class is configured or its directory doesn't exist
+    """
+    machine_class = machine_class or get_machine_class_name()
+    if not machine_class:
+        return None
+    dotfiles_root = dotfiles_root or DOTFILES_ROOT
+    class_dir = (dotfiles_root / 'machine-classes' / machine_class).absolute()
+    path = get_bundle_path(machine_class)
+
+    bundle = None if force else (_loaded.get(path) or _read_bundle(path))
+    if bundle is not None and not validate_bundle(bundle, machine_class, class_dir):
+        bundle = None
+    if bundle is not None and _stats_match(bundle, class_dir):
+        _loaded[path] = bundle
+        return bundle
+    _loaded.pop(path, None)
+    if not class_dir.is_dir():
+        return None
+
+    if bundle is not None:
+        dirs, files, _ = _read_sources(class_dir)
+        hashes = {rel_path: record['sha256'] for rel_path, record in files.items()}
+        if (hashes == {rel_path: record['sha256'] for rel_path, record in bundle['files'].items()}
+                and dirs.keys() == bundle['dirs'].keys()):
+            # Touched but unchanged (checkout, copy): keep the compiled content, refresh the stats
+            bundle['dirs'], bundle['files'] = dirs, files
+            _save_quietly(bundle, path)
+            return bundle
+
+    bundle = compile_bundle(machine_class, dotfiles_root)
+    for warning in bundle['warnings']:
+        print(f"⚠️  machine-classes/{machine_class}/{warning}", file=sys.stderr)
+    _save_quietly(bundle, path)
+    return bundle
+
+
+def _save_quietly(bundle: Dict[str, Any], path: Path) -> None:
+    # An unwritable cache only costs a recompile next run
+    _loaded[path] = bundle
+    try:
+        save_bundle(bundle, path)
+    except OSError as e:
+        print(f"⚠️  Could not save machine class bundle {path}: {e}", file=sys.stderr)
+
+
+def bundle_pm_dir(bundle: Dict[str, Any], pm_name: str) -> Optional[Path]:
+    """The class directory of a PM listed in the bundle, or None"""
+    if pm_name not in bundle['pms']:
+        return None
+    return Path(bundle['class_dir']) / pm_name
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point for compiling and reading machine class bundles."""
+    parser = argparse.ArgumentParser(description='Compile a machine class into a bundle')
+    parser.add_argument('--machine-class', help='Machine class (default: DOTFILES_MACHINE_CLASS)')
+    parser.add_argument('--force', action='store_true', help='Recompile even if the sources are unchanged')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--stow', action='store_true', help='Print the stow packages, one per line')
+    output.add_argument('--json', action='store_true', help='Print the bundle')
+    args = parser.parse_args(argv)
+
+    machine_class = args.machine_class or get_machine_class_name()
+    if not machine_class:
+        print("❌ Machine class not configured. Run: just configure", file=sys.stderr)
+        return 1
+    bundle = load_bundle(machine_class, force=args.force)
+    if bundle is None:
+        print(f"❌ Machine class directory not found: machine-classes/{machine_class}", file=sys.stderr)
+        return 1
+
+    if args.stow:
+        if bundle['stow'] is None:
+            print(f"❌ Stow configuration file not found: machine-classes/{machine_class}/{STOW_LIST_FILE}",
+                  file=sys.stderr)
+            return 1
+        print('\n'.join(bundle['stow']))
+    elif args.json:
+        print(json.dumps(bundle, indent=2, sort_keys=True))
+    else:
+        print(f"📦 {machine_class}: {len(bundle['pms'])} PMs ({', '.join(bundle['pms'])}), "
+              f"{sum(len(p) for p in bundle['packages'].values())} packages, "
+              f"{len(bundle['stow'] or [])} stow packages, {len(bundle['files'])} files")
+        print(f"📄 {get_bundle_path(machine_class)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Shared Package Download Cache
+
+`pm cache-serve` runs a caching HTTP proxy so that machines being
+provisioned download each apt .deb, brew bottle and npm tarball from the
+internet only once:
+
+    pm cache-serve --host 0.0.0.0 --port 3142 --max-size 20G
+    pm cache-serve --print-config        # client settings for this host
+
+Installs use it when DOTFILES_PM_CACHE_URL is set (environment or
+~/.dotfiles.env), e.g. DOTFILES_PM_CACHE_URL=http://192.168.1.10:3142;
+pm install then points apt, brew and npm at it. By hand:
+
+    apt     Acquire::http::Proxy "http://<host>:3142";  (http:// sources only)
+    brew    HOMEBREW_ARTIFACT_DOMAIN=http://<host>:3142
+    npm     npm config set registry http://<host>:3142/npm/
+
+A request names its origin in one of three ways: an absolute URI (apt's
+proxy requests), a path that is itself a URL (/https://...) or a mirror
+prefix: /v2/... for ghcr.io/v2 (HOMEBREW_ARTIFACT_DOMAIN requests) and
+/npm/... for registry.npmjs.org; add more with --mirror NAME=URL.
+
+Only package files (ARTIFACT_PATTERN) are cached; indexes and metadata
+always go to the origin so they stay current. Files are stored by SHA-256
+under ~/.dotfiles/cache/pm-cache/objects, so identical files at different
+URLs are kept once, and an index maps URLs to hashes. Past the size limit
+the least recently used URLs are evicted.
+
+The cache only listens on localhost unless given --host, and only fetches
+from the mirrors and the package hosts in ALLOWED_HOSTS (add more with
+--allow-host), so it is not an open proxy into the network it runs on.
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import re
+import shutil
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pm_base import get_config_value
+from pm_utils import atomic_write
+
+DEFAULT_PORT = 3142
+DEFAULT_MAX_SIZE = '20G'
+
+# Mirror prefix -> origin, for clients that take a registry URL
+DEFAULT_MIRRORS = {
+    'npm': 'https://registry.npmjs.org',
+    'v2': 'https://ghcr.io/v2',
+}
+
+# Origins reachable through absolute-URI and /<url> requests besides the
+# mirrors; a host also allows its subdomains (us.archive.ubuntu.com)
+ALLOWED_HOSTS = (
+    'archive.ubuntu.com',
+    'security.ubuntu.com',
+    'ports.ubuntu.com',
+    'ppa.launchpadcontent.net',
+    'deb.debian.org',
+    'security.debian.org',
+    'ghcr.io',
+    'registry.npmjs.org',
+)
+
+# Immutable package files; everything else is passed through uncached
+ARTIFACT_PATTERN = re.compile(
+    r'(\.u?deb|\.tgz|\.tar\.(gz|xz|bz2|zst)|\.pkg\.tar\.\w+|\.bottle\.[\w.]+|\.whl|\.gem|\.crate|\.zip'
+    r'|/blobs/sha256:[0-9a-f]{64})$'
+)
+
+# Request headers passed on to the origin (brew's ghcr downloads need Authorization)
+FORWARDED_HEADERS = ('Accept', 'Authorization', 'User-Agent')
+
+UPSTREAM_TIMEOUT = 60
+CHUNK_SIZE = 1 << 16
+
+# Seconds between index saves for access-order changes alone
+INDEX_SAVE_INTERVAL = 30
+
+
+def get_cache_dir() -> Path:
+    return Path.home() / '.dotfiles' / 'cache' / 'pm-cache'
+
+
+def parse_size(size: str) -> int:
+    """Bytes in a size such as '20G', '512M' or '1048576'"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*', size, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {size}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** ' KMGT'.index(unit.upper() or ' '))
+
+
+def is_artifact(url: str) -> bool:
+    """Whether a URL names an immutable package file worth caching"""
+    return bool(ARTIFACT_PATTERN.search(url.split('?', 1)[0]))
+
+
+def host_allowed(url: str, hosts) -> bool:
+    """Whether a URL's host is one of hosts or a subdomain of one"""
+    host = (urllib.parse.urlsplit(url).hostname or '').lower()
+    return any(host == allowed or host.endswith('.' + allowed) for allowed in hosts)
+
+
+def resolve_upstream(path: str, mirrors: Dict[str, str]) -> Optional[str]:
+    """
+    Origin URL for a request path.
+
+    Args:
+        path: Request target: an absolute URI, '/<url>' or '/<mirror>/<path>'
+        mirrors: Mirror prefix -> origin base URL
+
+    Returns:
+        The origin URL, or None if the path names no origin
+    """
+    if path.startswith(('http://', 'https://')):
+        return path
+    if path.startswith(('/http://', '/https://')):
+        return path[1:]
+    prefix, _, rest = path.lstrip('/').partition('/')
+    if prefix in mirrors:
+        return f"{mirrors[prefix].rstrip('/')}/{rest}"
+    return None
+
+
+class ContentStore:
+    """
+    Content-addressed file store with an LRU index of URL -> SHA-256.
+
+    Thread-safe; one lock per URL lets concurrent requests for the same
+    missing file wait for a single download.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._saved_at = 0.0
+        self.index: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        for entry in self._read_index():
+            if self.object_path(entry['sha256']).exists():
+                self.index[entry['url']] = entry
+
+    @property
+    def index_file(self) -> Path:
+        return self.root / 'index.json'
+
+    def object_path(self, sha256: str) -> Path:
+        return self.root / 'objects' / sha256[:2] / sha256
+
+    def _read_index(self) -> list:
+        try:
+            entries = json.loads(self.index_file.read_text())
+        except (OSError, ValueError):
+            return []
+        if not isinstance(entries, list):
+            return []
+        return [e for e in entries if isinstance(e, dict) and {'url', 'sha256', 'size'} <= e.keys()]
+
+    def save(self) -> None:
+        """Write the index, least recently used first"""
+        with self._lock:
+            entries = list(self.index.values())
+            self._saved_at = time.time()
+        atomic_write(self.index_file, json.dumps(entries))
+
+    def total_size(self) -> int:
+        with self._lock:
+            return self._total_size()
+
+    def _total_size(self) -> int:
+        return sum({e['sha256']: e['size'] for e in self.index.values()}.values())
+
+    def fetch_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._fetch_locks.setdefault(url, threading.Lock())
+
+    def lookup(self, url: str) -> Optional[Tuple[Path, Dict[str, Any]]]:
+        """Cached file and index entry for a URL (marks it recently used)"""
+        with self._lock:
+            entry = self.index.get(url)
+            if entry is None:
+                return None
+            path = self.object_path(entry['sha256'])
+            if not path.exists():
+                del self.index[url]
+                return None
+            self.index.move_to_end(url)
+            save_due = time.time() - self._saved_at > INDEX_SAVE_INTERVAL
+        if save_due:
+            self.save()
+        return path, entry
+
+    def new_temp_file(self) -> Path:
+        tmp_dir = self.root / 'tmp'
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tmp_dir / f"{os.getpid()}.{threading.get_ident()}.{time.monotonic_ns()}"
+
+    def store(self, url: str, tmp_path: Path, sha256: str, size: int,
+              content_type: Optional[str] = None) -> None:
+        """
+        Add a downloaded file, then evict least recently used URLs over the limit.
+
+        Args:
+            url: URL the file was downloaded from
+            tmp_path: Downloaded file (moved into the store)
+            sha256: Hex digest of the file
+            size: File size in bytes
+            content_type: Content-Type to serve it with
+        """
+        path = self.object_path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            tmp_path.unlink()
+        else:
+            os.replace(tmp_path, path)
+        with self._lock:
+            self.index[url] = {'url': url, 'sha256': sha256, 'size': size,
+                               'content_type': content_type or 'application/octet-stream'}
+            self.index.move_to_end(url)
+            self._evict()
+        self.save()
+
+    def _evict(self) -> None:
+        total = self._total_size()
+        while total > self.max_bytes and len(self.index) > 1:
+            _, entry = self.index.popitem(last=False)
+            if any(e['sha256'] == entry['sha256'] for e in self.index.values()):
+                continue
+            total -= entry['size']
+            try:
+                self.object_path(entry['sha256']).unlink()
+            except OSError:
+                pass
+
+
+class CacheServer(ThreadingHTTPServer):
+    """HTTP server holding the store, the mirrors, the allowed hosts and hit/miss counters"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], store: ContentStore, mirrors: Optional[Dict[str, str]] = None,
+                 allowed_hosts: Iterable[str] = ()):
+        super().__init__(address, CacheHandler)
+        self.store = store
+        self.mirrors = {**DEFAULT_MIRRORS, **(mirrors or {})}
+        self.allowed_hosts = {*ALLOWED_HOSTS, *(host.lower() for host in allowed_hosts),
+                              *(urllib.parse.urlsplit(url).hostname for url in self.mirrors.values())}
+        self.stats = {'hits': 0, 'misses': 0, 'passed': 0, 'bytes_served_from_cache': 0}
+        self.stats_lock = threading.Lock()
+
+    def count(self, key: str, amount: int = 1) -> None:
+        with self.stats_lock:
+            self.stats[key] += amount
+
+
+class CacheHandler(BaseHTTPRequestHandler):
+    """Serves package files from the store, downloading them on a miss"""
+
+    server: CacheServer
+    server_version = 'pm-cache/1'
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._serve(head=False)
+
+    def do_HEAD(self) -> None:
+        self._serve(head=True)
+
+    def _serve(self, head: bool) -> None:
+        url = resolve_upstream(self.path, self.server.mirrors)
+        if url is None:
+            self.send_error(404, "Not a proxied URL (use an absolute URL, /<url> or a mirror prefix)")
+            return
+        if not host_allowed(url, self.server.allowed_hosts):
+            host = urllib.parse.urlsplit(url).hostname
+            self.send_error(403, f"{host} is not a package host (start the cache with --allow-host {host})")
+            return
+        if head or not is_artifact(url):
+            self.server.count('passed')
+            self._pass_through(url, head)
+            return
+
+        store = self.server.store
+        hit = store.lookup(url)
+        if hit is None:
+            with store.fetch_lock(url):
+                # Another request may have downloaded it while we waited
+                hit = store.lookup(url)
+                if hit is None:
+                    self.server.count('misses')
+                    self._download(url)
+                    return
+        self.server.count('hits')
+        self._send_file(*hit)
+
+    def _upstream(self, url: str, method: str = 'GET'):
+        headers = {name: self.headers[name] for name in FORWARDED_HEADERS if self.headers.get(name)}
+        return urllib.request.urlopen(urllib.request.Request(url, headers=headers, method=method),
+                                      timeout=UPSTREAM_TIMEOUT)
+
+    def _relay_error(self, url: str, error: Exception) -> None:
+        if isinstance(error, urllib.error.HTTPError):
+            body = error.read()
+            self.send_response(error.code)
+            self.send_header('Content-Type', error.headers.get('Content-Type', 'text/plain'))
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(502, f"Could not reach {url}: {error}")
+
+    def _pass_through(self, url: str, head: bool) -> None:
+        try:
+            upstream = self._upstream(url, 'HEAD' if head else 'GET')
+        except (urllib.error.URLError, OSError, http.client.HTTPException) as e:
+            self._relay_error(url, e)
+            return
+        with upstream:
+            self.send_response(upstream.status)
+            for name in ('Content-Type', 'Content-Length', 'Last-Modified', 'ETag'):
+                if upstream.headers.get(name):
+                    self.send_header(name, upstream.headers[name])
+            self.end_headers()
+            if not head:
+                try:
+                    shutil.copyfileobj(upstream, self.wfile, CHUNK_SIZE)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+    def _send_file(self, path: Path, entry: Dict[str, Any]) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', entry.get('content_type', 'application/octet-stream'))
+        self.send_header('Content-Length', str(entry['size']))
+        self.send_header('X-Cache', 'HIT')
+        self.end_headers()
+        try:
+            with open(path, 'rb') as f:
+                shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+            self.server.count('bytes_served_from_cache', entry['size'])
+        except OSError:
+            # Client went away, or the file was evicted after the lookup
+            pass
+
+    def _download(self, url: str) -> None:
+        """Stream a file to the client while storing it"""
+        try:
+            upstream = self._upstream(url)
+        except (urllib.error.URLError, OSError, http.client.HTTPException) as e:
+            self._relay_error(url, e)
+            return
+
+        store = self.server.store
+        tmp_path = store.new_temp_file()
+        digest = hashlib.sha256()
+        size = 0
+        client_gone = False
+        with upstream:
+            length = upstream.headers.get('Content-Length')
+            content_type = upstream.headers.get('Content-Type')
+            self.send_response(200)
+            if content_type:
+                self.send_header('Content-Type', content_type)
+            if length:
+                self.send_header('Content-Length', length)
+            self.send_header('X-Cache', 'MISS')
+            self.end_headers()
+            try:
+                with open(tmp_path, 'wb') as f:
+                    while True:
+                        chunk = upstream.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                        if not client_gone:
+                            try:
+                                self.wfile.write(chunk)
+                            except (BrokenPipeError, ConnectionResetError):
+                                # Finish the download anyway: the next machine wants it
+                                client_gone = True
+            except (OSError, http.client.HTTPException):
+                tmp_path.unlink(missing_ok=True)
+                return
+
+        if length and int(length) != size:
+            tmp_path.unlink(missing_ok=True)
+            return
+        store.store(url, tmp_path, digest.hexdigest(), size, content_type)
+
+
+def get_cache_url() -> Optional[str]:
+    """URL of the shared cache installs should use (DOTFILES_PM_CACHE_URL), if any"""
+    url = (get_config_value('DOTFILES_PM_CACHE_URL') or '').strip().rstrip('/')
+    return url or None
+
+
+def cache_env_prefix(pm_name: str) -> str:
+    """Shell environment assignments pointing a PM at the cache ('' if none)"""
+    url = get_cache_url()
+    if not url:
+        return ''
+    if pm_name == 'brew':
+        return f"HOMEBREW_ARTIFACT_DOMAIN={url} "
+    if pm_name == 'npm':
+        return f"npm_config_registry={url}/npm/ "
+    return ''
+
+
+def apt_proxy_option() -> str:
+    """apt-get option sending http:// downloads through the cache ('' if none)"""
+    url = get_cache_url()
+    return f"-o Acquire::http::Proxy={url} " if url else ''
+
+
+def client_config(url: str) -> str:
+    """Client settings for a cache at url"""
+    return "\n".join([
+        "# ~/.dotfiles.env (used by pm install)",
+        f"export DOTFILES_PM_CACHE_URL=\"{url}\"",
+        "",
+        "# apt: /etc/apt/apt.conf.d/01pm-cache (http:// sources only)",
+        f"Acquire::http::Proxy \"{url}\";",
+        "",
+        "# brew",
+        f"export HOMEBREW_ARTIFACT_DOMAIN={url}",
+        "",
+        "# npm",
+        f"npm config set registry {url}/npm/",
+    ])
+
+
+def serve(host: str = '127.0.0.1', port: int = DEFAULT_PORT, max_bytes: Optional[int] = None,
+          root: Optional[Path] = None, mirrors: Optional[Dict[str, str]] = None,
+          allowed_hosts: Iterable[str] = ()) -> int:
+    """
+    Run the cache until interrupted.
+
+    Args:
+        host: Address to listen on (0.0.0.0 for all interfaces)
+        port: Port to listen on
+        max_bytes: Cache size limit (default: DOTFILES_PM_CACHE_MAX_SIZE or 20G)
+        root: Cache directory (default: ~/.dotfiles/cache/pm-cache)
+        mirrors: Extra mirror prefix -> origin URLs
+        allowed_hosts: Extra hosts to fetch from besides ALLOWED_HOSTS
+
+    Returns:
+        Exit code
+    """
+    if max_bytes is None:
+        max_bytes = parse_size(get_config_value('DOTFILES_PM_CACHE_MAX_SIZE') or DEFAULT_MAX_SIZE)
+    store = ContentStore(root or get_cache_dir(), max_bytes)
+    try:
+        server = CacheServer((host, port), store, mirrors, allowed_hosts)
+    except OSError as e:
+        print(f"❌ Could not listen on {host}:{port}: {e}")
+        return 1
+
+    url = f"http://{socket.gethostname() if host in ('0.0.0.0', '') else host}:{port}"
+    print(f"📦 pm cache serving on {url}")
+    print(f"   📁 {store.root} ({store.total_size() / 1024 ** 2:.0f} MB of {max_bytes / 1024 ** 3:.1f} GB used)")
+    print(f"   💡 Clients: export DOTFILES_PM_CACHE_URL=\"{url}\" (see pm cache-serve --print-config)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        store.save()
+        stats = server.stats
+        print(f"\n🛑 pm cache stopped: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['bytes_served_from_cache'] / 1024 ** 2:.0f} MB served from cache")
+    return 0
@@ -8,7 +8,7 @@ Check for outdated packages across multiple package managers.
 import subprocess
 import sys
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
 
 # Add current directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
@@ -16,6 +16,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 from pm_detect import detect_all_pms
 from pm_select import select_pms
 from pm_registry import get_pm
+from pm_refresh import check_command_for, run_refresh_phase
 from terminal_executor import spawn_tracked, _save_terminal_registry
 from command_executor import run_command
 
@@ -70,6 +71,7 @@ def check_pm_outdated_parallel(pm_name: str) -> Dict[str, Any]:
             'status': 'spawned',
             'log_file': result.get('log_file'),
             'status_file': result.get('status_file'),
+            'channel': result.get('channel'),
             'command': result.get('command'),
             'error': ''
         }
@@ -83,16 +85,60 @@ def check_pm_outdated_parallel(pm_name: str) -> Dict[str, Any]:
         }
 
 
-def check_all_pms(selected_pms: List[str], parallel: bool = True) -> List[Dict[str, Any]]:
+def _collect_inline_sudo_results(pty_executor,
+                                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+                                 ) -> Dict[str, Dict[str, Any]]:
+    """
+    Wait for sudo PMs running inline in PTYs and convert to check results.
+
+    Args:
+        pty_executor: Started PtyExecutor
+        on_result: Called with each result as it is collected
+
+    Returns:
+        Dict mapping pm_name -> check result
+    """
+    from .pm_executor import is_success_exit_code
+
+    results = {}
+    for pm, pty_result in pty_executor.wait().items():
+        exit_code = pty_result['exit_code']
+        output = pty_result['output']
+        is_success = is_success_exit_code(pm, 'check', exit_code, bool(output))
+
+        results[pm] = {
+            'pm': pm,
+            'success': is_success,
+            'output': output if is_success else '',
+            'error': f"Check failed with exit code {exit_code}" if not is_success else '',
+            'outdated_count': get_pm(pm).parse_check_output(output) if is_success and output else 0,
+            'log_file': pty_result['log_file']
+        }
+
+        if is_success:
+            print(f"  ✅ {pm}: {results[pm]['outdated_count']} outdated packages (inline)")
+        else:
+            print(f"  ❌ {pm}: Check failed (inline, exit code {exit_code})")
+        if on_result:
+            on_result(results[pm])
+
+    return results
+
+
+def check_all_pms(selected_pms: List[str], parallel: bool = True,
+                  on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
     """
     Check all selected package managers for outdated packages.
 
-    Package managers requiring sudo are run sequentially first, then
-    non-sudo PMs are run in parallel to avoid conflicts.
+    Package managers requiring sudo run inline in PTYs alongside everything
+    else when possible (one password prompt for all of them). Otherwise they
+    are run sequentially first in terminals, then non-sudo PMs are run in
+    parallel to avoid conflicts.
 
     Args:
         selected_pms: List of selected package manager names
         parallel: Whether to run checks in parallel (True) or sequentially (False)
+        on_result: Called with each PM's result as soon as it completes
 
     Returns:
         List of check results for each PM
@@ -100,27 +146,55 @@ def check_all_pms(selected_pms: List[str], parallel: bool = True) -> List[Dict[s
     if not selected_pms:
         return []
 
-    import time
     from terminal_executor import create_terminal_executor
-    from .pm_executor import requires_sudo
+    from .pm_executor import requires_sudo, format_command_string
+    from .pty_executor import PtyExecutor, pty_available
+    from .pm_lock import wrap_command as wrap_with_lock
 
     # Separate sudo-requiring PMs from non-sudo PMs
     # Selected PMs are already sorted by priority from pm_select
     sudo_pms = [pm for pm in selected_pms if requires_sudo(pm, 'check')]
     non_sudo_pms = [pm for pm in selected_pms if not requires_sudo(pm, 'check')]
 
+    # Run sudo PMs inline when we own a tty to forward the password prompt to
+    inline_sudo = bool(sudo_pms) and pty_available()
+
     print(f"🚀 Checking {len(selected_pms)} package managers...")
-    if sudo_pms:
+    if sudo_pms and inline_sudo:
+        print(f"   🔐 {len(sudo_pms)} require sudo (will run inline, one password prompt): {', '.join(sudo_pms)}")
+    elif sudo_pms:
         print(f"   ⚠️  {len(sudo_pms)} require sudo (will run sequentially by priority): {', '.join(sudo_pms)}")
     if non_sudo_pms and parallel:
         print(f"   ⚡ {len(non_sudo_pms)} will run in parallel: {', '.join(non_sudo_pms)}")
     print()
 
+    # Phase 0: Refresh shared package indexes once (brew update for brew and brew-cask)
+    run_refresh_phase(selected_pms)
+
+    def finish(results: Dict[str, Dict[str, Any]], result: Dict[str, Any]) -> None:
+        results[result['pm']] = result
+        if on_result:
+            on_result(result)
+
     all_results = {}
     executor = create_terminal_executor()
 
+    # Phase 1 (inline): Start sudo PMs in PTYs; results are collected after Phase 2
+    pty_executor = None
+    if inline_sudo:
+        print(f"🔐 Starting {len(sudo_pms)} sudo-requiring PM(s) inline...")
+        pty_executor = PtyExecutor()
+        # Ask now: a prompt from the pump thread would interleave with Phase 2's output
+        pty_executor.collect_sudo_password(sudo_pms[0])
+        pty_executor.start(
+            {pm: wrap_with_lock(pm, 'check', format_command_string(check_command_for(get_pm(pm))), quiet=True)
+             for pm in sudo_pms},
+            operation='check'
+        )
+        print()
+
     # Phase 1: Run sudo PMs sequentially (they need user interaction for password)
-    if sudo_pms:
+    if sudo_pms and not inline_sudo:
         print(f"📋 Running {len(sudo_pms)} sudo-requiring PM(s) sequentially...")
         for pm in sudo_pms:
             print(f"\n🔍 Checking {pm} (requires sudo)...")
@@ -164,7 +238,7 @@ def check_all_pms(selected_pms: List[str], parallel: bool = True) -> List[Dict[s
                                 pm_instance = get_pm(pm)
                                 final_result['outdated_count'] = pm_instance.parse_check_output(log_content)
 
-                            all_results[pm] = final_result
+                            finish(all_results, final_result)
 
                             if final_result['success']:
                                 if final_result['outdated_count'] > 0:
@@ -176,26 +250,26 @@ def check_all_pms(selected_pms: List[str], parallel: bool = True) -> List[Dict[s
                             break
 
                         elif status_info.get('status') == 'error':
-                            all_results[pm] = {
+                            finish(all_results, {
                                 'pm': pm,
                                 'success': False,
                                 'output': '',
                                 'error': status_info.get('error', 'Unknown error'),
                                 'outdated_count': 0
-                            }
+                            })
                             print(f"  ❌ {pm}: Check failed")
                             break
                         else:
-                            time.sleep(1)
+                            executor.wait_for_change([result])
             else:
                 print(f"  ❌ Failed to spawn: {result.get('error', 'Unknown error')}")
-                all_results[pm] = {
+                finish(all_results, {
                     'pm': pm,
                     'success': False,
                     'output': '',
                     'error': result.get('error', 'Failed to spawn terminal'),
                     'outdated_count': 0
-                }
+                })
 
         print(f"\n✅ Sudo PM(s) completed\n")
 
@@ -277,7 +351,7 @@ def check_all_pms(selected_pms: List[str], parallel: bool = True) -> List[Dict[s
                             else:
                                 final_result['error'] = f"Check failed with exit code {exit_code}"
 
-                            completed_results[pm] = final_result
+                            finish(completed_results, final_result)
 
                             # Print completion status
                             if final_result['success']:
@@ -297,25 +371,27 @@ def check_all_pms(selected_pms: List[str], parallel: bool = True) -> List[Dict[s
                                 'error': status_info.get('error', 'Unknown error'),
                                 'outdated_count': 0
                             }
-                            completed_results[pm] = final_result
+                            finish(completed_results, final_result)
                             print(f"  ❌ {pm}: Check failed")
                             break
                         else:
                             # Still running, wait a bit
-                            time.sleep(1)
+                            executor.wait_for_change([result])
             else:
                 print(f"  ❌ Failed to spawn: {result.get('error', 'Unknown error')}")
-                completed_results[pm] = {
+                finish(completed_results, {
                     'pm': pm,
                     'success': False,
                     'output': '',
                     'error': result.get('error', 'Failed to spawn terminal'),
                     'outdated_count': 0
-                }
+                })
 
             print()  # Add spacing between sequential operations
 
         # For sequential mode, merge sudo and non-sudo results and return
+        if pty_executor:
+            all_results.update(_collect_inline_sudo_results(pty_executor, on_result))
         all_completed_results = {**all_results, **completed_results}
         return [all_completed_results.get(pm, {
             'pm': pm,
@@ -344,7 +420,7 @@ def check_all_pms(selected_pms: List[str], parallel: bool = True) -> List[Dict[s
                     'error': operation.get('error', 'Failed to spawn terminal'),
                     'outdated_count': 0
                 }
-                completed_results[pm] = final_result
+                finish(completed_results, final_result)
                 completed_this_round.append(operation)
                 print(f"  ❌ {pm}: Failed to spawn")
                 continue
@@ -391,7 +467,7 @@ def check_all_pms(selected_pms: List[str], parallel: bool = True) -> List[Dict[s
                 else:
                     final_result['error'] = f"Check failed with exit code {exit_code}"
 
-                completed_results[pm] = final_result
+                finish(completed_results, final_result)
                 completed_this_round.append(operation)
 
                 # Print completion status
@@ -411,7 +487,7 @@ def check_all_pms(selected_pms: List[str], parallel: bool = True) -> List[Dict[s
                     'error': status_info.get('error', 'Unknown error'),
                     'outdated_count': 0
                 }
-                completed_results[pm] = final_result
+                finish(completed_results, final_result)
                 completed_this_round.append(operation)
                 print(f"  ❌ {pm}: Check failed")
 
@@ -419,11 +495,14 @@ def check_all_pms(selected_pms: List[str], parallel: bool = True) -> List[Dict[s
         for completed_op in completed_this_round:
             pending_operations.remove(completed_op)
 
-        # Brief pause before next poll cycle (only if there are still pending)
+        # Pause before the next poll cycle (only if there are still pending)
         if pending_operations:
-            time.sleep(1)
+            executor.wait_for_change(pending_operations)
 
     # Phase 3: Merge all results (sudo + non-sudo) and return in original order
+    if pty_executor:
+        all_results.update(_collect_inline_sudo_results(pty_executor, on_result))
+
     # Merge completed_results from non-sudo PMs with all_results from sudo PMs
     all_completed_results = {**all_results, **completed_results}
 
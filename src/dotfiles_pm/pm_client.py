@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Package Manager Daemon Client
+
+Thin client for the `pm daemon` socket API (see pm_daemon). It imports
+nothing but the standard library, so a shell prompt can ask for the
+outdated count in a few milliseconds:
+
+    python3 src/dotfiles_pm/pm_client.py outdated       # prints e.g. 12
+    python3 src/dotfiles_pm/pm_client.py status
+    python3 src/dotfiles_pm/pm_client.py check brew npm
+    python3 src/dotfiles_pm/pm_client.py upgrade npm
+
+Requests and responses are single JSON lines. Exit code 3 means the
+daemon isn't running.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SOCKET_NAME = 'pm-daemon.sock'
+
+# Exit code when no daemon answers
+EXIT_NO_DAEMON = 3
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on the socket"""
+    pass
+
+
+def get_socket_path() -> Path:
+    """Daemon socket: DOTFILES_PM_DAEMON_SOCKET, else in XDG_RUNTIME_DIR or ~/.dotfiles/run"""
+    if os.environ.get('DOTFILES_PM_DAEMON_SOCKET'):
+        return Path(os.environ['DOTFILES_PM_DAEMON_SOCKET'])
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return Path(os.environ['XDG_RUNTIME_DIR']) / SOCKET_NAME
+    return Path.home() / '.dotfiles' / 'run' / SOCKET_NAME
+
+
+def request(op: str, timeout: Optional[float] = 5.0, socket_path: Optional[Path] = None,
+            **params) -> Dict[str, Any]:
+    """
+    Send one request to the daemon and wait for its response.
+
+    Args:
+        op: Operation (ping, status, outdated, check, upgrade, shutdown)
+        timeout: Seconds to wait for the response (None to wait as long as it takes)
+        socket_path: Daemon socket (default: get_socket_path())
+        **params: Operation parameters
+
+    Returns:
+        Response dict; 'ok' is False and 'error' set if the daemon refused
+
+    Raises:
+        DaemonUnavailable: If no daemon is listening
+    """
+    path = socket_path or get_socket_path()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(path))
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise DaemonUnavailable(f"pm daemon is not running ({path})") from e
+        sock.sendall(json.dumps({'op': op, **params}).encode() + b'\n')
+
+        data = bytearray()
+        while not data.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    if not data:
+        raise DaemonUnavailable("pm daemon closed the connection")
+    return json.loads(data)
+
+
+def _print_checks(checks: Dict[str, Dict[str, Any]]) -> None:
+    for pm_name, check in sorted(checks.items()):
+        if not check.get('success'):
+            print(f"❌ {pm_name}: {check.get('error') or 'check failed'}")
+            continue
+        minutes = (time.time() - check.get('checked_at', 0)) / 60
+        count = check.get('outdated_count', 0)
+        state = f"{count} outdated" if count else "up to date"
+        print(f"{'📦' if count else '✅'} {pm_name}: {state} (checked {minutes:.0f} min ago)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Query the pm daemon')
+    parser.add_argument('--json', action='store_true', help='Print the raw JSON response')
+    subparsers = parser.add_subparsers(dest='op', required=True)
+
+    subparsers.add_parser('ping', help='Check that the daemon is running')
+    subparsers.add_parser('status', help='Detected PMs and their last checks')
+    subparsers.add_parser('outdated', help='Print the number of outdated packages (for prompts)')
+    check_parser = subparsers.add_parser('check', help='Check PMs now')
+    check_parser.add_argument('pms', nargs='*', help='PMs to check (default: all detected)')
+    check_parser.add_argument('--max-age', type=float, default=0,
+                              help='Reuse checks younger than this many seconds')
+    upgrade_parser = subparsers.add_parser('upgrade', help='Upgrade PMs that need no sudo')
+    upgrade_parser.add_argument('pms', nargs='*', help='PMs to upgrade (default: all with outdated packages)')
+    subparsers.add_parser('stop', help='Stop the daemon')
+
+    args = parser.parse_args(argv)
+    params: Dict[str, Any] = {}
+    timeout: Optional[float] = 5.0
+    op = 'shutdown' if args.op == 'stop' else args.op
+    if args.op in ('check', 'upgrade'):
+        params['pms'] = args.pms
+        timeout = None
+    if args.op == 'check':
+        params['max_age'] = args.max_age
+
+    try:
+        response = request(op, timeout=timeout, **params)
+    except DaemonUnavailable as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return EXIT_NO_DAEMON
+    except (OSError, ValueError) as e:
+        print(f"❌ pm daemon request failed: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(response, indent=2))
+    elif not response.get('ok'):
+        print(f"❌ {response.get('error', 'request failed')}", file=sys.stderr)
+    elif args.op == 'outdated':
+        print(response['total'])
+    elif args.op == 'ping':
+        print(f"✅ pm daemon running (pid {response['pid']}, up {response['uptime'] / 60:.0f} min)")
+    elif args.op == 'status':
+        print(f"📋 PMs: {', '.join(response['pms']) or 'none detected'}")
+        _print_checks(response['checks'])
+        if response.get('sudo_pms'):
+            print(f"🔐 Not checked by the daemon (need sudo): {', '.join(response['sudo_pms'])}")
+        for name, locations in response.get('shadowed', {}).items():
+            print(f"⚠️  {name} is shadowed: {' before '.join(locations)}")
+        if response.get('next_check'):
+            print(f"🕐 Next background check in {max(0, response['next_check'] - time.time()) / 60:.0f} min")
+    elif args.op == 'check':
+        _print_checks(response['checks'])
+    elif args.op == 'upgrade':
+        for pm_name, result in response['results'].items():
+            print(f"{'✅' if result.get('success') else '❌'} {pm_name}: "
+                  f"{'upgraded' if result.get('success') else result.get('error') or 'upgrade failed'}")
+    elif args.op == 'stop':
+        print("🛑 pm daemon stopping")
+    return 0 if response.get('ok') else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -34,6 +34,7 @@ def configure_pms() -> Tuple[List[str], List[str]]:
     print(f"\n🔍 Detected {len(all_pms)} package managers on this system")
 
     # Use the selection interface with a longer timeout for configuration
+    # (batch mode enables everything detected, like the timeout would)
     print("\n📋 Select which package managers to enable:")
     enabled_pms = select_pms(all_pms, timeout=30)
 
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Package Manager Daemon
+
+An optional resident process that keeps the PM registry, detection
+results, the PATH index, config and the latest check results warm, checks
+in the background every DOTFILES_PM_DAEMON_INTERVAL seconds (default an
+hour) and answers requests on a local Unix socket. Clients (pm_client)
+get answers in milliseconds instead of paying for Python startup,
+registry construction and detection on every call.
+
+Requests are single JSON lines with an 'op':
+    ping                   pid and uptime
+    status                 detected PMs, last checks, next background check
+    outdated               outdated package counts from the last checks
+    check [pms, max_age]   check now, reusing results younger than max_age
+    upgrade [pms]          upgrade (all PMs with outdated packages by default)
+    shutdown               stop the daemon
+
+The daemon can't answer a password prompt, so PMs that need sudo are left
+to `pm check` / `pm upgrade`. Check results are saved to
+~/.dotfiles/cache/check-results.json so a restarted daemon starts warm, and
+folded into the prompt summary (pm_summary).
+
+Usage:
+    python3 src/dotfiles_pm/pm_daemon.py run|start|stop
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add current directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pm_base import get_config_value
+from pm_client import DaemonUnavailable, get_socket_path, request
+from pm_detect import detect_all_pms
+from pm_executor import execute_pm_command, get_pm_priority
+from pm_refresh import new_session, run_refresh_phase
+from pm_registry import get_pm
+from pm_summary import update_summary
+from pm_utils import atomic_write
+
+DEFAULT_CHECK_INTERVAL = 3600
+
+# Detection is redone at least this often, and whenever the config changes
+DETECTION_TTL = 600
+
+# Largest request accepted
+MAX_REQUEST_BYTES = 1024 * 1024
+
+
+def get_results_file() -> Path:
+    return Path.home() / '.dotfiles' / 'cache' / 'check-results.json'
+
+
+def get_daemon_log() -> Path:
+    return Path.home() / '.dotfiles' / 'logs' / 'pm-daemon.log'
+
+
+def get_check_interval() -> float:
+    """Seconds between background checks (0 disables them)"""
+    try:
+        return float(get_config_value('DOTFILES_PM_DAEMON_INTERVAL') or DEFAULT_CHECK_INTERVAL)
+    except ValueError:
+        return DEFAULT_CHECK_INTERVAL
+
+
+def _config_mtime() -> Optional[float]:
+    try:
+        return (Path.home() / '.dotfiles.env').stat().st_mtime
+    except OSError:
+        return None
+
+
+def reload_config() -> None:
+    """Apply the DOTFILES_* settings in ~/.dotfiles.env, as the justfile does by sourcing it"""
+    try:
+        lines = (Path.home() / '.dotfiles.env').read_text().splitlines()
+    except OSError:
+        return
+    for line in lines:
+        if line.startswith('export DOTFILES_') and '=' in line:
+            name, value = line[len('export '):].split('=', 1)
+            os.environ[name.strip()] = value.strip().strip('"')
+
+
+class DaemonState:
+    """Everything the daemon keeps warm between requests"""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.started = time.time()
+        self.interval = get_check_interval() if interval is None else interval
+        self.next_check: Optional[float] = None
+        self._lock = threading.Lock()
+        # One check or upgrade round at a time
+        self._run_lock = threading.Lock()
+        self._pms: Optional[List[str]] = None
+        self._detected_at = 0.0
+        self._config_mtime: Optional[float] = None
+        self.path_index = None
+        self.checks: Dict[str, Dict[str, Any]] = self._load_checks()
+
+    def _load_checks(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            checks = json.loads(get_results_file().read_text())
+        except (OSError, ValueError):
+            return {}
+        return checks if isinstance(checks, dict) else {}
+
+    def _save_checks(self) -> None:
+        try:
+            atomic_write(get_results_file(), json.dumps(self.checks, indent=2))
+        except OSError as e:
+            print(f"⚠️  Could not save check results: {e}", flush=True)
+
+    def pms(self) -> List[str]:
+        """Detected PMs, redetected when stale or ~/.dotfiles.env changed"""
+        with self._lock:
+            mtime = _config_mtime()
+            if mtime != self._config_mtime:
+                reload_config()
+            if (self._pms is None or mtime != self._config_mtime
+                    or time.time() - self._detected_at > DETECTION_TTL):
+                self._pms = detect_all_pms(operation='check')
+                self._detected_at, self._config_mtime = time.time(), mtime
+                self.path_index = None
+            return list(self._pms)
+
+    def shadowed_binaries(self) -> Dict[str, List[str]]:
+        """PM binaries found more than once on PATH (index built once per detection)"""
+        from doctor import PM_BINARIES, build_path_index
+
+        self.pms()
+        with self._lock:
+            if self.path_index is None:
+                self.path_index = build_path_index(os.environ.get('PATH', '').split(os.pathsep))
+            return self.path_index.shadowed(PM_BINARIES)
+
+    def _check_one(self, pm_name: str) -> Dict[str, Any]:
+        result = execute_pm_command(pm_name, 'check', interactive=False)
+        output = result.get('output', '')
+        return {
+            'success': result.get('success', False),
+            'output': output,
+            'error': result.get('error', ''),
+            'outdated_count': get_pm(pm_name).parse_check_output(output) if result.get('success') and output else 0,
+            'checked_at': time.time(),
+        }
+
+    def run_checks(self, pm_names: Optional[List[str]] = None, max_age: float = 0) -> Dict[str, Dict[str, Any]]:
+        """
+        Check PMs, reusing results younger than max_age seconds.
+
+        Args:
+            pm_names: PMs to check (default: all detected); undetected and
+                sudo PMs are skipped
+            max_age: Seconds a previous check stays good enough
+
+        Returns:
+            Dict mapping pm_name -> check result, for the requested PMs
+        """
+        detected = self.pms()
+        wanted = [pm for pm in (pm_names or detected) if pm in detected and not get_pm(pm).requires_sudo]
+        with self._run_lock:
+            now = time.time()
+            stale = [pm for pm in wanted
+                     if max_age <= 0 or now - self.checks.get(pm, {}).get('checked_at', 0) > max_age]
+            if stale:
+                print(f"🔍 {time.strftime('%H:%M:%S')} checking {', '.join(stale)}", flush=True)
+                # Each round is a session: the freshness window decides what to refresh
+                new_session()
+                run_refresh_phase(stale)
+                with ThreadPoolExecutor(max_workers=len(stale)) as pool:
+                    results = dict(zip(stale, pool.map(self._check_one, stale)))
+                with self._lock:
+                    self.checks.update(results)
+                    self._save_checks()
+                update_summary([{'pm': pm, **result} for pm, result in results.items()])
+            with self._lock:
+                return {pm: self.checks[pm] for pm in wanted if pm in self.checks}
+
+    def run_upgrades(self, pm_names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Upgrade PMs one at a time by priority, then check them again.
+
+        Args:
+            pm_names: PMs to upgrade (default: those the last checks found outdated)
+
+        Returns:
+            Dict mapping pm_name -> upgrade result
+        """
+        detected = self.pms()
+        if not pm_names:
+            with self._lock:
+                pm_names = [pm for pm, check in self.checks.items() if check.get('outdated_count')]
+        results = {}
+        for pm_name in pm_names:
+            if pm_name not in detected:
+                results[pm_name] = {'success': False, 'error': 'not detected'}
+            elif get_pm(pm_name).requires_sudo:
+                results[pm_name] = {'success': False, 'error': 'requires sudo; run pm upgrade'}
+        upgradable = sorted((pm for pm in pm_names if pm not in results), key=get_pm_priority)
+
+        with self._run_lock:
+            for pm_name in upgradable:
+                print(f"⬆️  {time.strftime('%H:%M:%S')} upgrading {pm_name}", flush=True)
+                result = execute_pm_command(pm_name, 'upgrade', interactive=False)
+                results[pm_name] = {key: result.get(key) for key in ('success', 'output', 'error')}
+        if upgradable:
+            self.run_checks(upgradable)
+        return results
+
+    def outdated(self) -> Dict[str, Any]:
+        """Outdated counts from the last checks"""
+        with self._lock:
+            counts = {pm: check.get('outdated_count', 0) for pm, check in self.checks.items()
+                      if check.get('success')}
+            oldest = min((check.get('checked_at', 0) for check in self.checks.values()), default=None)
+        return {'total': sum(counts.values()), 'pms': counts, 'oldest_check': oldest}
+
+    def status(self) -> Dict[str, Any]:
+        pms = self.pms()
+        with self._lock:
+            checks = {pm: {key: value for key, value in check.items() if key != 'output'}
+                      for pm, check in self.checks.items() if pm in pms}
+        return {'pms': pms, 'checks': checks, 'next_check': self.next_check,
+                'sudo_pms': [pm for pm in pms if get_pm(pm).requires_sudo]}
+
+
+def handle_request(state: DaemonState, message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Answer one request.
+
+    Args:
+        state: Daemon state
+        message: Decoded request ({'op': ..., params...})
+
+    Returns:
+        Response dict with 'ok'
+    """
+    op = message.get('op')
+    pms = message.get('pms') or None
+    if op == 'ping':
+        return {'ok': True, 'pid': os.getpid(), 'uptime': time.time() - state.started}
+    if op == 'status':
+        return {'ok': True, **state.status(), 'shadowed': state.shadowed_binaries()}
+    if op == 'outdated':
+        return {'ok': True, **state.outdated()}
+    if op == 'check':
+        return {'ok': True, 'checks': state.run_checks(pms, float(message.get('max_age') or 0))}
+    if op == 'upgrade':
+        return {'ok': True, 'results': state.run_upgrades(pms)}
+    if op == 'shutdown':
+        return {'ok': True, 'shutdown': True}
+    return {'ok': False, 'error': f"unknown op: {op}"}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline(MAX_REQUEST_BYTES)
+        try:
+            message = json.loads(line)
+            if not isinstance(message, dict):
+                raise ValueError("request must be a JSON object")
+            response = handle_request(self.server.state, message)
+        except ValueError as e:
+            response = {'ok': False, 'error': f"bad request: {e}"}
+        except Exception as e:
+            response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        try:
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+        except OSError:
+            pass  # client gave up
+        if response.get('shutdown'):
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves requests on the daemon socket, one thread per connection"""
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, state: DaemonState):
+        socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        try:
+            request('ping', timeout=1, socket_path=socket_path)
+        except (DaemonUnavailable, OSError, ValueError):
+            # Nobody answers: a leftover from a daemon that didn't exit cleanly
+            socket_path.unlink(missing_ok=True)
+        else:
+            raise RuntimeError(f"pm daemon already running on {socket_path}")
+
+        self.state = state
+        self.socket_path = socket_path
+        super().__init__(str(socket_path), _RequestHandler)
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+def _schedule_checks(state: DaemonState, stop: threading.Event) -> None:
+    """Check everything now, then every interval"""
+    while not stop.is_set():
+        try:
+            state.run_checks(max_age=state.interval / 2)
+        except Exception as e:
+            print(f"⚠️  Background check failed: {e}", flush=True)
+        state.next_check = time.time() + state.interval
+        stop.wait(state.interval)
+
+
+def run_daemon(socket_path: Optional[Path] = None, interval: Optional[float] = None) -> int:
+    """Serve requests until shut down"""
+    state = DaemonState(interval)
+    try:
+        server = DaemonServer(socket_path or get_socket_path(), state)
+    except (RuntimeError, OSError) as e:
+        print(f"❌ {e}", flush=True)
+        return 1
+
+    stop = threading.Event()
+    if state.interval > 0:
+        threading.Thread(target=_schedule_checks, args=(state, stop), daemon=True).start()
+    print(f"🚀 pm daemon {os.getpid()} listening on {server.socket_path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+    print("🛑 pm daemon stopped", flush=True)
+    return 0
+
+
+def start_daemon(wait: float = 5.0) -> int:
+    """Start the daemon in the background unless it is already running"""
+    try:
+        response = request('ping')
+        print(f"✅ pm daemon already running (pid {response['pid']})")
+        return 0
+    except DaemonUnavailable:
+        pass
+
+    log_file = get_daemon_log()
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_file, 'a') as log:
+        subprocess.Popen([sys.executable, str(Path(__file__).resolve()), 'run'],
+                         stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                         start_new_session=True)
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        try:
+            response = request('ping')
+        except (DaemonUnavailable, OSError):
+            time.sleep(0.1)
+            continue
+        print(f"✅ pm daemon started (pid {response['pid']}, log: {log_file})")
+        return 0
+    print(f"❌ pm daemon did not start; see {log_file}")
+    return 1
+
+
+def stop_daemon() -> int:
+    try:
+        request('shutdown')
+    except DaemonUnavailable:
+        print("ℹ️  pm daemon is not running")
+        return 0
+    print("🛑 pm daemon stopped")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Resident package manager daemon')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+    run_parser = subparsers.add_parser('run', help='Run in the foreground')
+    run_parser.add_argument('--interval', type=float,
+                            help='Seconds between background checks (0 disables them)')
+    subparsers.add_parser('start', help='Start in the background')
+    subparsers.add_parser('stop', help='Stop the running daemon')
+
+    args = parser.parse_args(argv)
+    if args.action == 'run':
+        return run_daemon(interval=args.interval)
+    if args.action == 'start':
+        return start_daemon()
+    return stop_daemon()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
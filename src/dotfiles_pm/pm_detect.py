@@ -8,9 +8,12 @@ No categories, no metadata - just aggregation.
 
 import os
 import shutil
+import sys
 from pathlib import Path
 from typing import List, Optional, Set
 
+sys.path.insert(0, str(Path(__file__).parent))
+
 
 def get_machine_class_pms() -> Optional[Set[str]]:
     """
@@ -19,35 +22,14 @@ def get_machine_class_pms() -> Optional[Set[str]]:
     Returns:
         Set of PM names configured for the machine class, or None if no machine class is set
     """
-    machine_class = os.environ.get('DOTFILES_MACHINE_CLASS')
-    if not machine_class:
-        # Try to load from .dotfiles.env
-        env_file = Path.home() / '.dotfiles.env'
-        if env_file.exists():
-            with open(env_file) as f:
-                for line in f:
-                    if line.startswith('export DOTFILES_MACHINE_CLASS='):
-                        machine_class = line.split('=')[1].strip().strip('"')
-                        break
-    
-    if not machine_class:
-        return None
-    
-    # Find dotfiles root (go up from src/dotfiles_pm to root)
-    dotfiles_root = Path(__file__).parent.parent.parent
-    machine_class_dir = dotfiles_root / 'machine-classes' / machine_class
-    
-    if not machine_class_dir.exists():
+    # Imported here: pm_bundle imports this module for the machine class name
+    from pm_bundle import load_bundle
+
+    # One read of the compiled machine class (see pm_bundle)
+    bundle = load_bundle()
+    if bundle is None:
         return None
-    
-    # Get all directories in machine class (each is a PM name)
-    configured_pms = set()
-    for item in machine_class_dir.iterdir():
-        if item.is_dir() and item.name not in ('stow', 'win-reg'):
-            # These are special directories, not PM names
-            configured_pms.add(item.name)
-    
-    return configured_pms if configured_pms else None
+    return set(bundle['pms']) or None
 
 
 def get_machine_class_name() -> Optional[str]:
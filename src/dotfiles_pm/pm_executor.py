@@ -14,7 +14,13 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from terminal_executor import spawn_tracked
+from tracked_status import stall_limit
 from pm_registry import PM_REGISTRY, get_pm
+from pm_base import DEFAULT_TIMEOUTS
+from pm_lock import lock_pm, wrap_command as wrap_with_lock
+from pm_process import run_command
+from pm_refresh import check_command_for
+from pm_retry import retry_call, wrap_command as wrap_with_retry
 
 
 def get_pm_commands() -> Dict[str, Dict[str, Any]]:
@@ -33,7 +39,7 @@ def get_pm_commands() -> Dict[str, Dict[str, Any]]:
     result = {}
     for pm_name, pm_instance in PM_REGISTRY.items():
         result[pm_name] = {
-            'check': pm_instance.check_command,
+            'check': check_command_for(pm_instance),
             'upgrade': pm_instance.upgrade_command,
             'install': pm_instance.install_command,
             'sudo_required': pm_instance.requires_sudo,
@@ -122,35 +128,19 @@ def is_success_exit_code(pm_name: str, operation: str, exit_code: int, has_outpu
     return False
 
 
-def execute_pm_command(pm_name: str, operation: str, interactive: bool = True) -> Dict[str, Any]:
+def format_command_string(cmd_list: List[str]) -> str:
     """
-    Execute a package manager command in a unified way.
+    Join a PM command list into a shell command string.
+
+    Shell operators (&&, ||, |, ...) are kept unquoted so the shell interprets
+    them; everything else is quoted for the current platform.
 
     Args:
-        pm_name: Name of package manager (brew, npm, pip, etc.)
-        operation: Operation to perform (check, upgrade, install)
-        interactive: Whether to run in terminal (True) or capture output (False)
+        cmd_list: Command as returned by a PackageManager property
 
     Returns:
-        Dict with execution results
+        Command string suitable for a shell or tracked terminal
     """
-    commands = get_pm_commands()
-
-    if pm_name not in commands:
-        return {
-            'success': False,
-            'error': f"Package manager '{pm_name}' not supported",
-            'output': ''
-        }
-
-    if operation not in commands[pm_name]:
-        return {
-            'success': False,
-            'error': f"Operation '{operation}' not supported for {pm_name}",
-            'output': ''
-        }
-
-    cmd_list = commands[pm_name][operation]
     # Check if command contains shell operators (needs special handling)
     shell_operators = ['&&', '||', '|', ';', '>', '<']
     has_shell_ops = any(op in cmd_list for op in shell_operators)
@@ -180,11 +170,49 @@ def execute_pm_command(pm_name: str, operation: str, interactive: bool = True) -
             import shlex
             cmd_str = shlex.join(cmd_list)
 
+    return cmd_str
+
+
+def execute_pm_command(pm_name: str, operation: str, interactive: bool = True,
+                       sudo_session=None) -> Dict[str, Any]:
+    """
+    Execute a package manager command in a unified way.
+
+    Args:
+        pm_name: Name of package manager (brew, npm, pip, etc.)
+        operation: Operation to perform (check, upgrade, install)
+        interactive: Whether to run in terminal (True) or capture output (False)
+        sudo_session: Active SudoSession; sudo PMs spawned in a terminal get
+            its password through askpass instead of prompting
+
+    Returns:
+        Dict with execution results
+    """
+    commands = get_pm_commands()
+
+    if pm_name not in commands:
+        return {
+            'success': False,
+            'error': f"Package manager '{pm_name}' not supported",
+            'output': ''
+        }
+
+    if operation not in commands[pm_name]:
+        return {
+            'success': False,
+            'error': f"Operation '{operation}' not supported for {pm_name}",
+            'output': ''
+        }
+
+    cmd_list = commands[pm_name][operation]
+    cmd_str = format_command_string(cmd_list)
+
     # Check if the PM has a custom execute_command method (like BrewPM for lock recovery)
     pm_instance = get_pm(pm_name)
     if pm_instance and hasattr(pm_instance, 'execute_command') and not interactive:
         # Use the PM's custom execution logic for non-interactive runs
         try:
+            # execute_command takes the PM's lock for each attempt itself
             pm_result = pm_instance.execute_command(cmd_list, operation)
             return {
                 'success': pm_result.get('success', False),
@@ -204,10 +232,18 @@ def execute_pm_command(pm_name: str, operation: str, interactive: bool = True) -
         # Run in terminal with tracking
         # Use simple operation name for terminal title (not the full command)
         operation_label = f"{pm_name}-{operation}"
+        # Wait for other dotfiles-pm sessions using the same PM
+        cmd_str = wrap_with_lock(pm_name, operation, cmd_str)
+        # Retry transient failures in the terminal, releasing the lock while backing off
+        cmd_str = wrap_with_retry(pm_name, operation, cmd_str)
+        if sudo_session and requires_sudo(pm_name, operation):
+            cmd_str = sudo_session.wrap_command(cmd_str)
         terminal_result = spawn_tracked(
             cmd_str,
             operation=operation_label,  # Simple name for terminal title
-            auto_close=False
+            auto_close=False,
+            timeout=pm_instance.get_timeout(operation) if pm_instance else None,
+            stall_timeout=stall_limit(operation, pm_instance.stall_timeout if pm_instance else None)
         )
 
         if terminal_result.status in ['spawned', 'completed']:
@@ -215,6 +251,7 @@ def execute_pm_command(pm_name: str, operation: str, interactive: bool = True) -
                 'success': True,
                 'log_file': terminal_result.log_file,
                 'status_file': terminal_result.status_file,
+                'channel': terminal_result.channel,
                 'command': cmd_str
             }
         else:
@@ -226,31 +263,37 @@ def execute_pm_command(pm_name: str, operation: str, interactive: bool = True) -
 
     else:
         # Run directly and capture output
-        try:
-            result = subprocess.run(
-                cmd_list,
-                capture_output=True,
-                text=True,
-                timeout=60,
-                shell=True if '&&' in cmd_list else False
-            )
-
-            return {
-                'success': result.returncode == 0,
-                'output': result.stdout.strip(),
-                'error': result.stderr.strip() if result.returncode != 0 else '',
-                'exit_code': result.returncode
-            }
-
-        except subprocess.TimeoutExpired:
-            return {
-                'success': False,
-                'error': 'Command timed out after 60 seconds',
-                'output': ''
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f"Execution failed: {str(e)}",
-                'output': ''
-            }
+        timeout = pm_instance.get_timeout(operation) if pm_instance else DEFAULT_TIMEOUTS.get(operation)
+
+        def run_once() -> Dict[str, Any]:
+            try:
+                with lock_pm(pm_name, operation):
+                    # A list with shell=True would run only its first element
+                    if '&&' in cmd_list:
+                        result = run_command(cmd_str, timeout=timeout, shell=True)
+                    else:
+                        result = run_command(cmd_list, timeout=timeout)
+
+                return {
+                    'success': result.returncode == 0,
+                    'output': result.stdout.strip(),
+                    'error': result.stderr.strip() if result.returncode != 0 else '',
+                    'exit_code': result.returncode
+                }
+
+            except subprocess.TimeoutExpired:
+                return {
+                    'success': False,
+                    'error': f'Command timed out after {timeout:g} seconds',
+                    'output': '',
+                    'timed_out': True
+                }
+            except Exception as e:
+                return {
+                    'success': False,
+                    'error': f"Execution failed: {str(e)}",
+                    'output': ''
+                }
+
+        # Retries wait outside the lock so other sessions can use the PM meanwhile
+        return retry_call(run_once, pm_name)
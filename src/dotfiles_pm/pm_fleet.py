@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Package Manager Fleet Runner
+
+Runs `pm check` or `pm upgrade` on many machines at once and aggregates
+their JSON results (see pm_output). Local containers and chroots stand in
+for hosts:
+
+    pm fleet check docker:dev-1 docker:dev-2 podman:arch-1 chroot:/srv/jammy
+    pm fleet check --class docker_developer_ubuntu --jobs 8
+    pm fleet upgrade --targets-file fleet.txt --pm npm --pm pip --output ndjson
+
+Targets are `docker:<container>`, `podman:<container>` or `chroot:<dir>`;
+a bare name is a docker container. `--class` picks the running containers
+of a machine class image (dotfiles-test-<class>, built from
+tests/e2e/dockerfiles/Dockerfile.multi; see `just fleet-up` in
+tests/e2e/justfile).
+
+Each target runs `python3 -m src.dotfiles_pm.pm <operation> --yes --output
+json` from its own dotfiles checkout (default $HOME/dotfiles), so it needs
+python3 and the dotfiles repo. At most --jobs targets run at the same time.
+"""
+
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pm_process import run_command
+
+CONTAINER_RUNTIMES = ('docker', 'podman')
+TARGET_KINDS = CONTAINER_RUNTIMES + ('chroot',)
+
+# Checkout location inside each target (expanded by the target's shell)
+DEFAULT_DOTFILES_DIR = '$HOME/dotfiles'
+
+# Image tag used by tests/e2e for a machine class
+IMAGE_PREFIX = 'dotfiles-test-'
+
+
+@dataclass(frozen=True)
+class FleetTarget:
+    """A machine to run pm in: a container or a chroot directory"""
+    kind: str
+    name: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind}:{self.name}"
+
+    def command(self, script: str, user: Optional[str] = None) -> List[str]:
+        """Command that runs a shell script inside the target"""
+        if self.kind in CONTAINER_RUNTIMES:
+            return [self.kind, 'exec', *(['--user', user] if user else []), self.name, 'sh', '-c', script]
+        cmd = ['chroot', *([f'--userspec={user}'] if user else []), self.name, 'sh', '-c', script]
+        # chroot needs root; fail rather than prompt when sudo wants a password
+        return cmd if os.geteuid() == 0 else ['sudo', '-n', *cmd]
+
+
+def parse_target(spec: str) -> FleetTarget:
+    """
+    Parse a target spec: docker:<name>, podman:<name>, chroot:<dir> or <name>.
+
+    Raises:
+        ValueError: For an unknown target kind or an empty name
+    """
+    kind, sep, name = spec.partition(':')
+    if not sep:
+        kind, name = 'docker', spec
+    if kind not in TARGET_KINDS:
+        raise ValueError(f"Unknown fleet target kind '{kind}' in '{spec}' (use {', '.join(TARGET_KINDS)})")
+    if not name:
+        raise ValueError(f"Fleet target '{spec}' has no name")
+    return FleetTarget(kind, name)
+
+
+def read_targets_file(path: Path) -> List[FleetTarget]:
+    """Targets from a file: one spec per line, '#' starts a comment"""
+    targets = []
+    for line in Path(path).read_text().splitlines():
+        spec = line.split('#', 1)[0].strip()
+        if spec:
+            targets.append(parse_target(spec))
+    return targets
+
+
+def discover_targets(runtime: str, machine_class: str) -> List[FleetTarget]:
+    """
+    Running containers started from a machine class image.
+
+    Args:
+        runtime: docker or podman
+        machine_class: Machine class, e.g. docker_developer_ubuntu
+
+    Returns:
+        One target per running container (none if the runtime isn't available)
+    """
+    try:
+        result = run_command([runtime, 'ps', '--filter', f'ancestor={IMAGE_PREFIX}{machine_class}',
+                              '--format', '{{.Names}}'], timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"⚠️  Could not list {runtime} containers: {e}")
+        return []
+    if result.returncode != 0:
+        print(f"⚠️  Could not list {runtime} containers: {result.stderr.strip()[:200]}")
+        return []
+    return [FleetTarget(runtime, name) for name in result.stdout.split()]
+
+
+def remote_script(operation: str, pm_names: List[str], dotfiles_dir: str = DEFAULT_DOTFILES_DIR) -> str:
+    """Shell script that runs one pm operation with JSON output inside a target"""
+    args = ' '.join(shlex.quote(arg) for arg in [operation, '--yes', '--output', 'json', *pm_names])
+    return (f'cd "{dotfiles_dir}" && '
+            f'if [ -f "$HOME/.dotfiles.env" ]; then . "$HOME/.dotfiles.env"; fi; '
+            f'exec python3 -m src.dotfiles_pm.pm {args}')
+
+
+def _parse_document(stdout: str) -> Optional[Dict[str, Any]]:
+    try:
+        document = json.loads(stdout)
+    except ValueError:
+        return None
+    return document if isinstance(document, dict) else None
+
+
+def run_target(target: FleetTarget, operation: str, pm_names: List[str],
+               dotfiles_dir: str = DEFAULT_DOTFILES_DIR, user: Optional[str] = None,
+               timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run a pm operation in one target.
+
+    Args:
+        target: Where to run
+        operation: check or upgrade
+        pm_names: PMs to run (empty for every PM the target detects)
+        dotfiles_dir: Dotfiles checkout inside the target
+        user: User to run as (default: the container's or chroot's default)
+        timeout: Seconds before the target's run is stopped (None for no limit)
+
+    Returns:
+        Target result: 'target', 'success', 'exit_code', 'duration', 'error',
+        'outdated_count' (checks) and the target's own JSON document as 'result'
+    """
+    start = time.time()
+    entry: Dict[str, Any] = {'target': target.label, 'success': False, 'exit_code': None,
+                             'duration': 0.0, 'error': None, 'result': None}
+    try:
+        proc = run_command(target.command(remote_script(operation, pm_names, dotfiles_dir), user),
+                           timeout=timeout)
+    except subprocess.TimeoutExpired:
+        entry['error'] = f"timed out after {timeout:g}s"
+    except OSError as e:
+        entry['error'] = f"could not run {target.kind}: {e}"
+    else:
+        document = _parse_document(proc.stdout)
+        entry['exit_code'] = proc.returncode
+        entry['result'] = document
+        if document is None:
+            stderr = proc.stderr.strip().splitlines()
+            entry['error'] = (f"no JSON result (exit code {proc.returncode})"
+                              + (f": {stderr[-1][:200]}" if stderr else ''))
+        elif proc.returncode != 0 or document.get('failed'):
+            failed = ', '.join(document.get('failed') or [])
+            entry['error'] = f"{operation} failed" + (f" for {failed}" if failed else f" (exit code {proc.returncode})")
+        else:
+            entry['success'] = True
+    entry['duration'] = round(time.time() - start, 3)
+    if operation == 'check':
+        entry['outdated_count'] = int((entry['result'] or {}).get('outdated_count') or 0)
+    return entry
+
+
+def run_fleet(targets: List[FleetTarget], operation: str, pm_names: Optional[List[str]] = None,
+              jobs: int = 4, on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+              **options) -> List[Dict[str, Any]]:
+    """
+    Run a pm operation on every target, at most `jobs` at a time.
+
+    Args:
+        targets: Targets to run on
+        operation: check or upgrade
+        pm_names: PMs to run (default: every PM each target detects)
+        jobs: Targets running at the same time
+        on_result: Called with each target's result as soon as it finishes
+        **options: dotfiles_dir, user and timeout for run_target
+
+    Returns:
+        Target results in the order of targets
+    """
+    targets = list(dict.fromkeys(targets))
+    results = {}
+    print(f"🚀 Running pm {operation} on {len(targets)} target(s), {max(1, jobs)} at a time...")
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(run_target, target, operation, pm_names or [], **options): target
+                   for target in targets}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if result['success']:
+                outdated = f", {result['outdated_count']} outdated" if operation == 'check' else ''
+                print(f"  ✅ {result['target']}: {operation} ok{outdated} ({result['duration']:.0f}s)")
+            else:
+                print(f"  ❌ {result['target']}: {result['error']}")
+            if on_result:
+                on_result(result)
+    return [results[target] for target in targets]
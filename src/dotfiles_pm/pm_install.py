@@ -5,17 +5,20 @@ Package Manager Install Module
 Install packages across multiple package managers using native package files.
 """
 
-import os
 import subprocess
 import sys
 import shlex
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from .pm_detect import detect_all_pms
 from .pm_select import select_pms
 from .terminal_executor import spawn_tracked, create_terminal_executor
 
+sys.path.insert(0, str(Path(__file__).parent))
+from pm_bundle import bundle_pm_dir, load_bundle
+from pm_cache import apt_proxy_option, cache_env_prefix
+
 
 def get_machine_config_dir(pm_name: str) -> Optional[Path]:
     """
@@ -27,27 +30,26 @@ def get_machine_config_dir(pm_name: str) -> Optional[Path]:
     Returns:
         Path to the PM's config directory or None if not found
     """
-    machine_class = os.environ.get('DOTFILES_MACHINE_CLASS')
-    if not machine_class:
-        # Try to load from .dotfiles.env
-        env_file = Path.home() / '.dotfiles.env'
-        if env_file.exists():
-            with open(env_file) as f:
-                for line in f:
-                    if line.startswith('export DOTFILES_MACHINE_CLASS='):
-                        machine_class = line.split('=')[1].strip().strip('"')
-                        break
-
-    if not machine_class:
+    bundle = load_bundle()
+    if bundle is None:
         return None
+    return bundle_pm_dir(bundle, pm_name)
+
+
+def get_machine_packages(pm_name: str) -> Optional[List[str]]:
+    """
+    Get the packages listed in a package manager's machine class packages.txt.
 
-    # Find dotfiles root (go up from src/dotfiles_pm to root)
-    dotfiles_root = Path(__file__).parent.parent.parent
-    config_dir = dotfiles_root / 'machine-classes' / machine_class / pm_name
+    Args:
+        pm_name: Name of the package manager
 
-    if config_dir.exists():
-        return config_dir
-    return None
+    Returns:
+        Package names, or None if the PM has no packages.txt
+    """
+    bundle = load_bundle()
+    if bundle is None:
+        return None
+    return bundle['packages'].get(pm_name)
 
 
 def install_brew_packages(package_type: str = 'all') -> Dict[str, Any]:
@@ -102,7 +104,8 @@ def install_brew_packages(package_type: str = 'all') -> Dict[str, Any]:
     else:
         print(f"  📦 Installing all packages...")
 
-    cmd_str = f"{env_prefix}brew bundle install --file={brewfile} --no-upgrade"
+    # Bottles through the shared download cache, if one is configured (see pm_cache)
+    cmd_str = f"{cache_env_prefix('brew')}{env_prefix}brew bundle install --file={brewfile} --no-upgrade"
 
     # Spawn terminal for interactive execution
     terminal_result = spawn_tracked(
@@ -145,16 +148,12 @@ def install_apt_packages() -> Dict[str, Any]:
         result['error'] = 'No configuration found for apt'
         return result
 
-    package_file = config_dir / 'packages.txt'
-    if not package_file.exists():
+    packages = get_machine_packages('apt')
+    if packages is None:
         result['success'] = True
         result['output'] = '⚠️  No packages.txt file found - consider creating one or removing config directory'
         return result
 
-    # Read packages
-    with open(package_file) as f:
-        packages = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-
     if not packages:
         result['output'] = 'No packages to install'
         result['success'] = True
@@ -164,7 +163,7 @@ def install_apt_packages() -> Dict[str, Any]:
 
     # Build install command (user should run 'just update' first)
     packages_str = ' '.join(packages)
-    cmd_str = f"sudo apt-get install -y {packages_str}"
+    cmd_str = f"sudo apt-get {apt_proxy_option()}install -y {packages_str}"
 
     # Spawn terminal for interactive execution
     terminal_result = spawn_tracked(
@@ -208,16 +207,12 @@ def install_npm_packages() -> Dict[str, Any]:
         result['output'] = '⚠️  No configuration directory found - consider creating one or uninstalling npm'
         return result
 
-    package_file = config_dir / 'packages.txt'
-    if not package_file.exists():
+    packages = get_machine_packages('npm')
+    if packages is None:
         result['success'] = True
         result['output'] = '⚠️  No packages.txt file found - consider creating one or removing config directory'
         return result
 
-    # Read packages
-    with open(package_file) as f:
-        packages = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-
     if not packages:
         result['output'] = 'No packages to install'
         result['success'] = True
@@ -227,7 +222,7 @@ def install_npm_packages() -> Dict[str, Any]:
 
     # Build command to install all packages
     packages_str = ' '.join(packages)
-    cmd_str = f"npm install -g {packages_str}"
+    cmd_str = f"{cache_env_prefix('npm')}npm install -g {packages_str}"
 
     # Spawn terminal for interactive execution
     terminal_result = spawn_tracked(
@@ -325,17 +320,13 @@ def install_pipx_packages() -> Dict[str, Any]:
         result['output'] = '⚠️  No configuration directory found - consider creating one or uninstalling pipx'
         return result
 
-    package_file = config_dir / 'packages.txt'
-    if not package_file.exists():
+    packages = get_machine_packages('pipx')
+    if packages is None:
         # Warn user - config dir exists but no package file
         result['success'] = True
         result['output'] = '⚠️  No packages.txt file found - consider creating one or removing config directory'
         return result
 
-    # Read packages
-    with open(package_file) as f:
-        packages = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-
     if not packages:
         result['output'] = 'No packages to install'
         result['success'] = True
@@ -389,16 +380,12 @@ def install_cargo_packages() -> Dict[str, Any]:
         result['output'] = '⚠️  No configuration directory found - consider creating one or uninstalling cargo'
         return result
 
-    package_file = config_dir / 'packages.txt'
-    if not package_file.exists():
+    packages = get_machine_packages('cargo')
+    if packages is None:
         result['success'] = True
         result['output'] = '⚠️  No packages.txt file found - consider creating one or removing config directory'
         return result
 
-    # Read packages
-    with open(package_file) as f:
-        packages = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-
     if not packages:
         result['output'] = 'No packages to install'
         result['success'] = True
@@ -452,16 +439,12 @@ def install_gem_packages() -> Dict[str, Any]:
         result['output'] = '⚠️  No configuration directory found - consider creating one or uninstalling gem'
         return result
 
-    package_file = config_dir / 'packages.txt'
-    if not package_file.exists():
+    packages = get_machine_packages('gem')
+    if packages is None:
         result['success'] = True
         result['output'] = '⚠️  No packages.txt file found - consider creating one or removing config directory'
         return result
 
-    # Read packages
-    with open(package_file) as f:
-        packages = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-
     if not packages:
         result['output'] = 'No packages to install'
         result['success'] = True
@@ -521,16 +504,12 @@ def install_generic_packages(pm_name: str, install_cmd: str) -> Dict[str, Any]:
         result['output'] = f'⚠️  No configuration directory found for {pm_name}'
         return result
 
-    package_file = config_dir / 'packages.txt'
-    if not package_file.exists():
+    packages = get_machine_packages(pm_name)
+    if packages is None:
         result['success'] = True
         result['output'] = f'⚠️  No packages.txt file found in {config_dir}'
         return result
 
-    # Read packages
-    with open(package_file) as f:
-        packages = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-
     if not packages:
         result['output'] = 'No packages to install'
         result['success'] = True
@@ -602,13 +581,10 @@ def install_pacman_packages() -> Dict[str, Any]:
     if not config_dir:
         return {'pm': 'pacman', 'success': True, 'output': '⚠️  No configuration directory found for pacman'}
 
-    package_file = config_dir / 'packages.txt'
-    if not package_file.exists():
+    packages = get_machine_packages('pacman')
+    if packages is None:
         return {'pm': 'pacman', 'success': True, 'output': f'⚠️  No packages.txt file found in {config_dir}'}
 
-    with open(package_file) as f:
-        packages = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-
     if not packages:
         return {'pm': 'pacman', 'success': True, 'output': 'No packages to install'}
 
@@ -680,7 +656,8 @@ def install_packages_for_pm(pm_name: str, level: str = 'all') -> Dict[str, Any]:
     return installers[pm_name]()
 
 
-def install_all_pms(selected_pms: List[str], level: str = 'all') -> List[Dict[str, Any]]:
+def install_all_pms(selected_pms: List[str], level: str = 'all',
+                    on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
     """
     Install packages for all selected package managers.
 
@@ -689,6 +666,7 @@ def install_all_pms(selected_pms: List[str], level: str = 'all') -> List[Dict[st
     Args:
         selected_pms: List of selected package manager names
         level: Installation level ('user', 'admin', 'all' for system packages)
+        on_result: Called with each PM's result as soon as it completes
 
     Returns:
         List of installation results for each PM
@@ -698,6 +676,11 @@ def install_all_pms(selected_pms: List[str], level: str = 'all') -> List[Dict[st
     print(f"🚀 Installing packages for {len(selected_pms)} package manager(s) sequentially...")
     print()
 
+    def finish(results: Dict[str, Dict[str, Any]], result: Dict[str, Any]) -> None:
+        results[result['pm']] = result
+        if on_result:
+            on_result(result)
+
     executor = create_terminal_executor()
     completed_results = {}
 
@@ -721,7 +704,7 @@ def install_all_pms(selected_pms: List[str], level: str = 'all') -> List[Dict[st
                         'error': '' if exit_code == 0 else f"Installation failed with exit code {exit_code}",
                         'installed_count': result.get('installed_count', 0)
                     }
-                    completed_results[pm] = final_result
+                    finish(completed_results, final_result)
 
                     if final_result['success']:
                         print(f"  ✅ {pm}: Installation completed successfully")
@@ -737,7 +720,7 @@ def install_all_pms(selected_pms: List[str], level: str = 'all') -> List[Dict[st
                         'error': status_info.get('error', 'Unknown error'),
                         'installed_count': 0
                     }
-                    completed_results[pm] = final_result
+                    finish(completed_results, final_result)
                     print(f"  ❌ {pm}: Installation failed")
                     break
                 else:
@@ -752,7 +735,7 @@ def install_all_pms(selected_pms: List[str], level: str = 'all') -> List[Dict[st
                     print(f"  ✅ Installation completed")
             else:
                 print(f"  ❌ Installation failed: {result['error']}")
-            completed_results[pm] = result
+            finish(completed_results, result)
 
         print()  # Add spacing between sequential operations
 
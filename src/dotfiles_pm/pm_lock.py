@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Cross-Process PM Resource Locks
+
+Serializes package manager operations across concurrent dotfiles-pm sessions
+(two `just upgrade` runs, an upgrade plus a background check, ...). Each PM
+maps to a named resource (PackageManager.lock_resource) guarded by an flock
+on ~/.dotfiles/locks/<resource>.lock.
+
+- Waiters queue FIFO through ticket files in <resource>.queue/
+- Tickets left by dead processes are dropped (PID liveness check)
+- The kernel releases the flock when the holder exits, so a crashed holder
+  never leaves the lock stuck
+
+Commands spawned in terminals are wrapped with `pm_lock.py run`, which takes
+the lock, runs the command and releases the lock when it exits. The lock fd
+is not inherited, so processes the PM leaves behind never keep it held.
+
+Disable with DOTFILES_PM_LOCKS=false.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shlex
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pm_utils import pid_alive
+
+DEFAULT_POLL_INTERVAL = 0.2
+
+
+def locks_enabled() -> bool:
+    """Check whether cross-process PM locks are enabled"""
+    if os.name != 'posix':
+        return False
+    return os.environ.get('DOTFILES_PM_LOCKS', 'true').lower() not in ('false', '0', 'no', 'off')
+
+
+def get_lock_dir() -> Path:
+    """Get the directory holding resource lock files"""
+    return Path.home() / '.dotfiles' / 'locks'
+
+
+def get_lock_mode(pm_name: str, operation: str) -> str:
+    """
+    Decide how an operation locks its PM's resource.
+
+    Checks of non-sudo PMs that only read state can share the lock, as can
+    prefetches (downloads into the PM's cache). Upgrades, installs,
+    refreshes, sudo operations and any check that changes PM state need it
+    exclusively: checks that still have to refresh their index (see
+    pm_refresh) and PMs whose check command writes (check_mutates_state).
+
+    Returns:
+        'shared' or 'exclusive'
+    """
+    from pm_registry import get_pm
+    from pm_refresh import needs_refresh
+
+    pm = get_pm(pm_name)
+    if pm.requires_sudo:
+        return 'exclusive'
+    if operation == 'prefetch':
+        return 'shared'
+    if operation == 'check' and not pm.check_mutates_state and not needs_refresh(pm):
+        return 'shared'
+    return 'exclusive'
+
+
+def get_lock_resource(pm_name: str) -> str:
+    """Get the lock resource name for a PM"""
+    from pm_registry import get_pm
+
+    return get_pm(pm_name).lock_resource
+
+
+class ResourceLock:
+    """
+    Fair, cross-process lock on a named PM resource.
+
+    Usage:
+        with ResourceLock('brew', operation='brew-upgrade'):
+            ...  # run brew
+    """
+
+    def __init__(self, resource: str, operation: str = '', shared: bool = False,
+                 lock_dir: Optional[Path] = None, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.resource = resource
+        self.operation = operation or resource
+        self.shared = shared
+        self.lock_dir = lock_dir or get_lock_dir()
+        self.poll_interval = poll_interval
+        self.lock_file = self.lock_dir / f"{resource}.lock"
+        self.queue_dir = self.lock_dir / f"{resource}.queue"
+        self.fd: Optional[int] = None
+
+    def _enqueue(self) -> Path:
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        ticket = self.queue_dir / f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        ticket.touch()
+        return ticket
+
+    def _queue_head(self) -> Optional[str]:
+        """Oldest live ticket in the queue; tickets of dead processes are removed"""
+        try:
+            tickets = sorted(os.listdir(self.queue_dir))
+        except FileNotFoundError:
+            return None
+
+        for name in tickets:
+            try:
+                pid = int(name.split('-')[1])
+            except (IndexError, ValueError):
+                pid = None
+            if pid is not None and not pid_alive(pid):
+                try:
+                    (self.queue_dir / name).unlink()
+                except FileNotFoundError:
+                    pass
+                continue
+            return name
+        return None
+
+    def _try_flock(self) -> bool:
+        import fcntl
+
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        mode = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(fd, mode | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
+
+    def _write_holder(self) -> None:
+        if self.shared:
+            # Several shared holders at once - there is no single owner to record
+            return
+        info = json.dumps({
+            'pid': os.getpid(),
+            'operation': self.operation,
+            'since': datetime.now().isoformat(timespec='seconds')
+        })
+        os.ftruncate(self.fd, 0)
+        os.pwrite(self.fd, info.encode() + b'\n', 0)
+
+    def acquire(self, timeout: Optional[float] = None, on_wait=None) -> bool:
+        """
+        Wait for the lock in FIFO order.
+
+        Args:
+            timeout: Seconds to wait before giving up (None waits forever)
+            on_wait: Called once with the current holder info when we have to wait
+
+        Returns:
+            True if the lock was acquired
+        """
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        ticket = self._enqueue()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        notified = False
+
+        try:
+            while True:
+                if self._queue_head() == ticket.name and self._try_flock():
+                    self._write_holder()
+                    return True
+
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+
+                if not notified and on_wait:
+                    on_wait(read_holder(self.resource, self.lock_dir))
+                    notified = True
+                time.sleep(self.poll_interval)
+        finally:
+            try:
+                ticket.unlink()
+            except FileNotFoundError:
+                pass
+
+    def release(self) -> None:
+        """Release the lock"""
+        if self.fd is not None:
+            if not self.shared:
+                os.ftruncate(self.fd, 0)
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self) -> 'ResourceLock':
+        self.acquire(on_wait=_print_waiting)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+
+def read_holder(resource: str, lock_dir: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get the current holder of a resource lock.
+
+    Returns:
+        Holder info {'pid', 'operation', 'since'} ({} if held without a record),
+        or None if the lock is free
+    """
+    import fcntl
+
+    lock_file = (lock_dir or get_lock_dir()) / f"{resource}.lock"
+    try:
+        fd = os.open(lock_file, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            pass
+        else:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            return None
+
+        try:
+            info = json.loads(os.pread(fd, 4096, 0).decode() or '{}')
+        except ValueError:
+            return {}
+        # A record from a dead PID belongs to an earlier holder, not the current one
+        if info.get('pid') and not pid_alive(info['pid']):
+            return {}
+        return info
+    finally:
+        os.close(fd)
+
+
+def lock_status(lock_dir: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    List all known resource locks with holder and queue length.
+
+    Returns:
+        List of {'resource', 'holder', 'waiting'}
+    """
+    lock_dir = lock_dir or get_lock_dir()
+    if not lock_dir.exists():
+        return []
+
+    status = []
+    for lock_file in sorted(lock_dir.glob('*.lock')):
+        resource = lock_file.stem
+        queue = ResourceLock(resource, lock_dir=lock_dir)
+        # Drops tickets of dead waiters before counting
+        waiting = len(os.listdir(queue.queue_dir)) if queue._queue_head() else 0
+        status.append({
+            'resource': resource,
+            'holder': read_holder(resource, lock_dir),
+            'waiting': waiting
+        })
+    return status
+
+
+def _print_waiting(holder: Optional[Dict[str, Any]], stream=None) -> None:
+    stream = stream or sys.stdout
+    if holder and holder.get('pid'):
+        print(f"⏳ Waiting for lock held by PID {holder['pid']} "
+              f"({holder.get('operation', 'unknown')}, since {holder.get('since', '?')})...",
+              file=stream, flush=True)
+    else:
+        print("⏳ Waiting for another dotfiles-pm session to release the lock...", file=stream, flush=True)
+
+
+def _print_waiting_tty(holder: Optional[Dict[str, Any]]) -> None:
+    """Report waiting on the terminal only, so the message never lands in PM output logs"""
+    try:
+        with open('/dev/tty', 'w') as tty:
+            _print_waiting(holder, tty)
+    except OSError:
+        _print_waiting(holder, sys.stderr)
+
+
+def wrap_command(pm_name: str, operation: str, command: str, quiet: bool = False) -> str:
+    """
+    Wrap a shell command so it runs under its PM's resource lock.
+
+    Args:
+        pm_name: Package manager name
+        operation: Operation (check, upgrade, install)
+        command: Shell command string
+        quiet: Don't report waiting (for commands whose tty output is parsed)
+
+    Returns:
+        Shell command string that waits for the lock, then runs command
+    """
+    if not locks_enabled():
+        return command
+
+    args = [sys.executable, str(Path(__file__).resolve()), 'run', get_lock_resource(pm_name),
+            '--operation', f"{pm_name}-{operation}"]
+    if get_lock_mode(pm_name, operation) == 'shared':
+        args.append('--shared')
+    if quiet:
+        args.append('--quiet')
+    return shlex.join(args + ['--', 'sh', '-c', command])
+
+
+def lock_pm(pm_name: str, operation: str):
+    """
+    Get a context manager holding a PM's resource lock in this process.
+
+    Returns:
+        ResourceLock, or a no-op context when locks are disabled
+    """
+    if not locks_enabled():
+        return contextlib.nullcontext()
+    return ResourceLock(
+        get_lock_resource(pm_name),
+        operation=f"{pm_name}-{operation}",
+        shared=get_lock_mode(pm_name, operation) == 'shared'
+    )
+
+
+def cmd_run(args) -> int:
+    """Take the lock, then run the command while holding it"""
+    import signal
+    import subprocess
+
+    lock = ResourceLock(args.resource, operation=args.operation, shared=args.shared)
+    if not lock.acquire(timeout=args.timeout, on_wait=None if args.quiet else _print_waiting_tty):
+        print(f"❌ Timed out waiting for {args.resource} lock", file=sys.stderr)
+        return 75  # EX_TEMPFAIL
+
+    try:
+        proc = subprocess.Popen(args.command)
+    except OSError as e:
+        lock.release()
+        print(f"❌ Failed to run {args.command[0]}: {e}", file=sys.stderr)
+        return 127
+
+    # Ctrl-C reaches the command through the terminal's process group; pass on
+    # termination requests aimed at us and keep the lock until it has exited
+    signal.signal(signal.SIGINT, lambda signum, frame: None)
+    for sig in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(sig, lambda signum, frame: proc.send_signal(signum))
+
+    try:
+        exit_code = proc.wait()
+    finally:
+        lock.release()
+    return 128 - exit_code if exit_code < 0 else exit_code
+
+
+def cmd_status(args) -> int:
+    """Show lock holders and queue lengths"""
+    status = lock_status()
+    if not status:
+        print("No PM locks")
+        return 0
+
+    for entry in status:
+        holder = entry['holder']
+        if holder is None:
+            state = "free"
+        elif holder.get('pid'):
+            state = f"held by PID {holder['pid']} ({holder.get('operation')}, since {holder.get('since')})"
+        else:
+            state = "held"
+        waiting = f", {entry['waiting']} waiting" if entry['waiting'] else ""
+        print(f"🔒 {entry['resource']}: {state}{waiting}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='PM resource locks')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run a command holding a resource lock',
+                                       usage='%(prog)s resource [options] -- command [args...]')
+    run_parser.add_argument('resource')
+    run_parser.add_argument('--operation', default='')
+    run_parser.add_argument('--shared', action='store_true')
+    run_parser.add_argument('--timeout', type=float, default=None)
+    run_parser.add_argument('--quiet', action='store_true')
+    run_parser.set_defaults(func=cmd_run)
+
+    status_parser = subparsers.add_parser('status', help='Show lock holders')
+    status_parser.set_defaults(func=cmd_status)
+
+    argv = sys.argv[1:] if argv is None else argv
+    # Everything after -- is the command, options included
+    command = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, command = argv[:split], argv[split + 1:]
+
+    args = parser.parse_args(argv)
+    if args.action == 'run':
+        if not command:
+            parser.error('run: no command given after --')
+        args.command = command
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Machine-Readable Output
+
+`pm check|upgrade|install|audit|fleet --output json|ndjson` writes results
+for scripts and dashboards instead of the emoji report:
+
+    json     one document when the command finishes
+    ndjson   one event per line, each flushed as soon as it happens:
+             a "start" event, a "result" event as each PM completes,
+             then a "summary" event
+
+Every document and event carries "schema" (SCHEMA_VERSION) and "command".
+Per-PM results:
+
+    {"pm": "npm", "success": true, "error": null, "elapsed": 3.2,
+     "outdated_count": 2,                                 # check
+     "packages": [{"name": "typescript", "current": "5.2.2", "latest": "5.4.5"}],
+     "installed_count": 4,                                # install
+     "package_count": 17, "installed_packages": [...],     # audit
+     "has_manifest": true, "manifest_files": [...]}
+
+`pm fleet` reports one object per target instead (see pm_fleet.run_target),
+keyed by "target" rather than "pm", with the target's own json document
+as "result".
+
+"elapsed" is seconds from the start of the command until the PM finished.
+"packages" is null when the PM's output can't be parsed into packages.
+The summary has "exit_code", "started_at"/"finished_at" (epoch seconds),
+"duration", "total", "succeeded" and "failed" (PM names), plus
+"outdated_count" for checks. The json document is the summary with
+"results" added.
+
+In both modes the human-readable text (and anything PM commands write to
+the terminal) goes to stderr, so stdout carries nothing but JSON.
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+SCHEMA_VERSION = 1
+
+OUTPUT_FORMATS = ('text', 'json', 'ndjson')
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def format_result(command: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Stable per-PM result object for a check/upgrade/install/audit result.
+
+    Args:
+        command: pm command that produced the result
+        result: Result dict from pm_check, pm_upgrade, pm_install or pm_audit
+
+    Returns:
+        JSON-ready result (without 'elapsed')
+    """
+    if command == 'fleet':
+        return _jsonable(dict(result))
+
+    if command == 'audit':
+        entry = {'pm': result['pm'], 'success': bool(result.get('check_success')),
+                 'error': None if result.get('check_success') else 'could not list installed packages'}
+        for key in ('has_manifest', 'manifest_files', 'has_packages', 'package_count'):
+            entry[key] = _jsonable(result.get(key))
+        entry['installed_packages'] = _jsonable(result.get('packages') or [])
+        return entry
+
+    success = bool(result.get('success'))
+    entry = {'pm': result['pm'], 'success': success,
+             'error': None if success else (result.get('error') or f"{command} failed")}
+    if result.get('log_file'):
+        entry['log_file'] = str(result['log_file'])
+    if command == 'check':
+        entry['outdated_count'] = int(result.get('outdated_count') or 0) if success else 0
+        entry['packages'] = None
+        if success:
+            from pm_registry import get_pm
+            try:
+                entry['packages'] = get_pm(result['pm']).outdated_packages(result.get('output') or '')
+            except KeyError:
+                pass
+    elif command == 'install':
+        entry['installed_count'] = int(result.get('installed_count') or 0)
+    return entry
+
+
+def _key(entry: Dict[str, Any]) -> str:
+    return entry['pm'] if 'pm' in entry else entry['target']
+
+
+class OutputEmitter:
+    """
+    Collects per-PM results for one pm command and writes them as json or
+    ndjson; does nothing for 'text'.
+    """
+
+    def __init__(self, command: str, output_format: str = 'text', stream: Optional[TextIO] = None):
+        self.command = command
+        self.format = output_format
+        self.stream = stream
+        self.started_at = time.time()
+        self.results: List[Dict[str, Any]] = []
+
+    @property
+    def machine(self) -> bool:
+        return self.format in ('json', 'ndjson')
+
+    def _write(self, document: Dict[str, Any]) -> None:
+        indent = 2 if self.format == 'json' else None
+        self.stream.write(json.dumps({'schema': SCHEMA_VERSION, 'command': self.command, **document},
+                                     indent=indent) + '\n')
+        self.stream.flush()
+
+    def start(self) -> None:
+        if self.format == 'ndjson':
+            self._write({'event': 'start', 'started_at': self.started_at})
+
+    def result(self, result: Dict[str, Any]) -> None:
+        """Record one PM's result; streamed right away for ndjson"""
+        if not self.machine:
+            return
+        entry = format_result(self.command, result)
+        entry['elapsed'] = round(time.time() - self.started_at, 3)
+        # A PM reported twice (e.g. a retry) keeps its last result
+        self.results = [r for r in self.results if _key(r) != _key(entry)] + [entry]
+        if self.format == 'ndjson':
+            self._write({'event': 'result', **entry})
+
+    def finish(self, exit_code: int) -> int:
+        """
+        Write the summary (ndjson) or the whole document (json).
+
+        Args:
+            exit_code: The command's exit code
+
+        Returns:
+            exit_code, unchanged
+        """
+        if not self.machine:
+            return exit_code
+        finished_at = time.time()
+        summary = {
+            'exit_code': exit_code,
+            'started_at': self.started_at,
+            'finished_at': finished_at,
+            'duration': round(finished_at - self.started_at, 3),
+            'total': len(self.results),
+            'succeeded': sum(1 for r in self.results if r['success']),
+            'failed': [_key(r) for r in self.results if not r['success']],
+        }
+        if self.command == 'check' or any('outdated_count' in r for r in self.results):
+            summary['outdated_count'] = sum(r.get('outdated_count', 0) for r in self.results)
+        if self.format == 'ndjson':
+            self._write({'event': 'summary', **summary})
+        else:
+            self._write({**summary, 'results': self.results})
+        return exit_code
+
+
+@contextmanager
+def _human_output_to_stderr() -> Iterator[TextIO]:
+    """
+    Point stdout (and file descriptor 1, which PM commands inherit) at stderr.
+
+    Yields:
+        A stream on the original stdout
+    """
+    sys.stdout.flush()
+    try:
+        fd, stderr_fd = sys.stdout.fileno(), sys.stderr.fileno()
+    except (AttributeError, OSError, ValueError):
+        # Not backed by a file descriptor (e.g. captured); redirect prints only
+        stream = sys.stdout
+        with redirect_stdout(sys.stderr):
+            yield stream
+        return
+
+    saved_fd = os.dup(fd)
+    stream = os.fdopen(saved_fd, 'w', encoding='utf-8')
+    os.dup2(stderr_fd, fd)
+    try:
+        yield stream
+    finally:
+        sys.stdout.flush()
+        stream.flush()
+        os.dup2(saved_fd, fd)
+        stream.close()
+
+
+@contextmanager
+def open_output(command: str, output_format: str = 'text') -> Iterator[OutputEmitter]:
+    """
+    Emitter for a pm command; in json/ndjson mode, human-readable text goes
+    to stderr while the command runs.
+
+    Args:
+        command: pm command name
+        output_format: 'text', 'json' or 'ndjson'
+
+    Yields:
+        OutputEmitter for the command's results
+    """
+    if output_format not in ('json', 'ndjson'):
+        yield OutputEmitter(command, 'text')
+        return
+    with _human_output_to_stderr() as stream:
+        emitter = OutputEmitter(command, output_format, stream)
+        emitter.start()
+        yield emitter
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Package Manager Download Prefetch
+
+Right after a check, downloads what the upgrades will install (apt-get
+upgrade --download-only, brew fetch of the outdated formulae and casks,
+npm cache add), so the upgrade itself mostly installs from local caches.
+
+The downloads run in a detached background process (`pm_prefetch.py run`),
+one thread per PM, and outlive `pm check`. Each PM's prefetch holds its
+lock: shared for user PMs, so checks in other sessions still run, and
+exclusive for sudo PMs. An upgrade started meanwhile waits for its PM's
+downloads to finish and then uses them. The background process has no tty
+and so no sudo ticket: sudo PMs are only prefetched with passwordless sudo.
+
+Enable with `pm check --prefetch` or DOTFILES_PM_PREFETCH=true (environment
+or ~/.dotfiles.env). Progress goes to ~/.dotfiles/logs/prefetch.log;
+`pm_prefetch.py status` shows each PM's state.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add current directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pm_base import get_config_value
+from pm_lock import lock_pm
+from pm_process import run_command
+from pm_registry import get_pm
+from pm_retry import retry_call
+from pm_utils import atomic_write, file_lock, pid_alive
+
+
+def get_prefetch_dir() -> Path:
+    return Path.home() / '.dotfiles' / 'cache' / 'prefetch'
+
+
+def get_prefetch_log() -> Path:
+    return Path.home() / '.dotfiles' / 'logs' / 'prefetch.log'
+
+
+def prefetch_enabled() -> bool:
+    """Whether checks should start a prefetch (DOTFILES_PM_PREFETCH, default off)"""
+    return (get_config_value('DOTFILES_PM_PREFETCH') or 'false').lower() in ('true', '1', 'yes')
+
+
+def sudo_unattended() -> bool:
+    """Whether sudo works without any password, as the detached prefetch needs"""
+    try:
+        # -k with a command ignores this tty's ticket, which the prefetch won't have
+        result = subprocess.run(['sudo', '-n', '-k', 'true'], stdin=subprocess.DEVNULL,
+                                capture_output=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return result.returncode == 0
+
+
+def build_prefetch_plan(results: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Work out what to download from check results.
+
+    Args:
+        results: Results from check_all_pms()
+
+    Returns:
+        Dict mapping pm_name -> download-only command, for PMs with
+        outdated packages that can prefetch. Commands that need sudo are
+        left out unless sudo needs no password.
+    """
+    plan = {}
+    can_sudo = None
+    for result in results:
+        if not result.get('success') or not result.get('output', '').strip():
+            continue
+        pm = get_pm(result['pm'])
+        command = pm.prefetch_command(result['output']) if pm else None
+        if command and command[0] == 'sudo':
+            if can_sudo is None:
+                can_sudo = sudo_unattended()
+            if not can_sudo:
+                continue
+        if command:
+            plan[result['pm']] = command
+    return plan
+
+
+def start_prefetch(plan: Dict[str, List[str]]) -> Optional[int]:
+    """
+    Start downloading in a detached background process.
+
+    Args:
+        plan: From build_prefetch_plan()
+
+    Returns:
+        PID of the background process, or None if there was nothing to do or
+        it couldn't be started
+    """
+    if not plan:
+        return None
+
+    plan_file = get_prefetch_dir() / 'plan.json'
+    log_file = get_prefetch_log()
+    try:
+        atomic_write(plan_file, json.dumps(plan, indent=2))
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(log_file, 'a') as log:
+            # Own session: survives the check finishing, ignores its Ctrl-C
+            proc = subprocess.Popen(
+                [sys.executable, str(Path(__file__).resolve()), 'run', str(plan_file)],
+                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+    except OSError as e:
+        print(f"⚠️  Could not start prefetch: {e}")
+        return None
+
+    print(f"📥 Prefetching downloads in the background: {', '.join(plan)}")
+    print(f"   📄 Log: {log_file}")
+    return proc.pid
+
+
+def read_status() -> Dict[str, Dict[str, Any]]:
+    """Each PM's last prefetch: status ('running', 'done', 'failed'), started, ended, error"""
+    try:
+        status = json.loads((get_prefetch_dir() / 'status.json').read_text())
+    except (OSError, ValueError):
+        return {}
+    return status if isinstance(status, dict) else {}
+
+
+def prefetch_pm(pm_name: str, command: List[str]) -> Dict[str, Any]:
+    """
+    Run one PM's download-only command under its lock, retrying transient failures.
+
+    Returns:
+        Result dict like execute_pm_command's
+    """
+    pm = get_pm(pm_name)
+    timeout = pm.get_timeout('prefetch') if pm else None
+
+    def run_once() -> Dict[str, Any]:
+        try:
+            with lock_pm(pm_name, 'prefetch'):
+                result = run_command(command, timeout=timeout)
+            return {
+                'success': result.returncode == 0,
+                'output': result.stdout.strip(),
+                'error': result.stderr.strip() if result.returncode != 0 else '',
+                'exit_code': result.returncode
+            }
+        except subprocess.TimeoutExpired:
+            return {'success': False, 'output': '', 'error': f'Timed out after {timeout:g} seconds',
+                    'timed_out': True}
+        except OSError as e:
+            return {'success': False, 'output': '', 'error': str(e)}
+
+    return retry_call(run_once, pm_name)
+
+
+def run_plan(plan: Dict[str, List[str]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Run every PM's prefetch at once, recording progress in the status file.
+
+    Returns:
+        Dict mapping pm_name -> result
+    """
+    status_file = get_prefetch_dir() / 'status.json'
+
+    def update(pm_name: str, **fields) -> None:
+        # Re-read under the lock: another prefetch may be updating its own PMs
+        with file_lock(status_file):
+            status = read_status()
+            status[pm_name] = {**status.get(pm_name, {}), **fields}
+            atomic_write(status_file, json.dumps(status, indent=2))
+
+    def run(pm_name: str) -> Dict[str, Any]:
+        update(pm_name, status='running', started=time.time(), ended=None, error='', pid=os.getpid())
+        print(f"📥 {pm_name}: {' '.join(plan[pm_name])}", flush=True)
+        result = prefetch_pm(pm_name, plan[pm_name])
+        update(pm_name, status='done' if result['success'] else 'failed', ended=time.time(),
+               error=result.get('error', '')[-500:])
+        if result['success']:
+            print(f"✅ {pm_name} prefetch finished", flush=True)
+        else:
+            print(f"❌ {pm_name} prefetch failed: {result.get('error', '')[-500:]}", flush=True)
+        return result
+
+    if not plan:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+        return dict(zip(plan, pool.map(run, plan)))
+
+
+def print_status(pm_names: List[str]) -> None:
+    """Tell the user how the prefetch for the given PMs is doing"""
+    status = read_status()
+    for pm_name in pm_names:
+        entry = status.get(pm_name)
+        if not entry:
+            continue
+        # A prefetch process that died never marks its PMs finished
+        if entry.get('status') == 'running' and isinstance(entry.get('pid'), int) and pid_alive(entry['pid']):
+            print(f"⏳ {pm_name}: still prefetching downloads; its upgrade waits for them")
+        elif entry.get('status') == 'done' and entry.get('ended'):
+            minutes = (time.time() - entry['ended']) / 60
+            print(f"📥 {pm_name}: downloads prefetched {minutes:.0f} min ago")
+
+
+def cmd_run(args) -> int:
+    """Run a prefetch plan (started by start_prefetch())"""
+    try:
+        plan = json.loads(Path(args.plan).read_text())
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read prefetch plan: {e}", file=sys.stderr)
+        return 1
+    print(f"\n🕐 {time.strftime('%Y-%m-%d %H:%M:%S')} prefetch for {', '.join(plan)}", flush=True)
+    results = run_plan(plan)
+    return 0 if all(result['success'] for result in results.values()) else 1
+
+
+def cmd_status(args) -> int:
+    """Show each PM's last prefetch"""
+    status = read_status()
+    if not status:
+        print("No prefetch has run")
+        return 0
+    for pm_name, entry in sorted(status.items()):
+        when = entry.get('ended') or entry.get('started')
+        stamp = time.strftime('%Y-%m-%d %H:%M', time.localtime(when)) if when else '?'
+        line = f"{pm_name:<12} {entry.get('status', '?'):<8} {stamp}"
+        error_lines = (entry.get('error') or '').splitlines()
+        if entry.get('status') == 'failed' and error_lines:
+            line += f"  {error_lines[-1]}"
+        print(line)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Download PM upgrades ahead of time')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run a prefetch plan')
+    run_parser.add_argument('plan', help='Plan file (JSON: pm -> command)')
+    run_parser.set_defaults(func=cmd_run)
+
+    status_parser = subparsers.add_parser('status', help='Show the last prefetch of each PM')
+    status_parser.set_defaults(func=cmd_status)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Package Manager Process Control
+
+Runs captured (non-terminal) PM commands in their own process group so a
+timeout or Ctrl-C can stop the command together with everything it
+started (apt's http workers, brew's curl, npm's node children...):
+SIGTERM to the group, then SIGKILL after a grace period.
+
+The commands stay in the terminal's session so sudo's tty ticket still
+applies, but their group is not the foreground one, so Ctrl-C reaches
+only the orchestrator. propagate_interrupt() forwards it to every running
+command, including the ones running in spawned terminals.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+# Add current directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from tracked_status import KILL_GRACE_SECONDS, cancel_tracked
+
+# Commands currently running, keyed by PID (== process group ID)
+_running: Dict[int, subprocess.Popen] = {}
+_running_lock = threading.Lock()
+
+
+def _signal_group(proc: subprocess.Popen, sig: int) -> None:
+    try:
+        if sys.platform == 'win32':
+            proc.kill() if sig == getattr(signal, 'SIGKILL', None) else proc.terminate()
+        else:
+            os.killpg(proc.pid, sig)
+    except OSError:
+        pass
+
+
+def terminate_processes(procs: List[subprocess.Popen], grace: float = KILL_GRACE_SECONDS) -> None:
+    """
+    Stop process groups: SIGTERM to all, then SIGKILL whatever is left after grace.
+
+    Args:
+        procs: Processes started by run_command()
+        grace: Seconds to wait between SIGTERM and SIGKILL
+    """
+    for proc in procs:
+        _signal_group(proc, signal.SIGTERM)
+
+    deadline = time.monotonic() + grace
+    for proc in procs:
+        try:
+            proc.wait(timeout=max(0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            pass
+
+    # The leader may have exited while children in its group live on
+    for proc in procs:
+        _signal_group(proc, getattr(signal, 'SIGKILL', signal.SIGTERM))
+
+
+def run_command(command: Union[str, List[str]], timeout: Optional[float] = None,
+                shell: bool = False) -> subprocess.CompletedProcess:
+    """
+    Run a command with captured text output, like subprocess.run().
+
+    Args:
+        command: Command list or shell string
+        timeout: Seconds before the command's process group is stopped (None for no limit)
+        shell: Run through the shell
+
+    Returns:
+        The completed process
+
+    Raises:
+        subprocess.TimeoutExpired: After the timed-out command has been stopped
+    """
+    group = {} if sys.platform == 'win32' else {'process_group': 0}
+    # A background group reading the terminal would be stopped (SIGTTIN) until
+    # the timeout; with no stdin a prompt fails straight away instead
+    proc = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, text=True, shell=shell, **group)
+    with _running_lock:
+        _running[proc.pid] = proc
+    try:
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            terminate_processes([proc])
+            stdout, stderr = proc.communicate()
+            raise subprocess.TimeoutExpired(command, timeout, output=stdout, stderr=stderr)
+    finally:
+        with _running_lock:
+            _running.pop(proc.pid, None)
+    return subprocess.CompletedProcess(command, proc.returncode, stdout, stderr)
+
+
+def cancel_all(grace: float = KILL_GRACE_SECONDS) -> int:
+    """
+    Stop every running PM command, captured or in a spawned terminal.
+
+    Returns:
+        Number of commands stopped
+    """
+    with _running_lock:
+        procs = [p for p in _running.values() if p.poll() is None]
+    terminate_processes(procs, grace)
+    return len(procs) + cancel_tracked(grace)
+
+
+@contextmanager
+def propagate_interrupt() -> Iterator[None]:
+    """Cancel all running PM commands when Ctrl-C interrupts the block"""
+    try:
+        yield
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted - stopping running package manager commands...")
+        stopped = cancel_all()
+        if stopped:
+            print(f"✅ Stopped {stopped} command(s)")
+        raise
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Package Manager Index Refresh
+
+Some PMs must refresh their package index before a check means anything
+(brew update, apt-get update). PMs declare that as a separate
+`refresh_command`, and PMs that read the same index share a
+`refresh_group`. brew and brew-cask, for example, both read the taps that
+`brew update` fetches.
+
+The check orchestrator calls run_refresh_phase() before checks fan out.
+Each group's refresh runs once per session, with groups refreshing in
+parallel, so brew-cask no longer checks against a tap that brew is
+halfway through updating.
+
+A PM whose group has not been refreshed this session gets the refresh in
+front of its check command (check_command_for()). That covers refreshes
+needing sudo, which the phase leaves to the check's password handling,
+and callers that skip the phase.
+
+Refreshes are skipped altogether while the index is fresh: refreshed
+within DOTFILES_PM_REFRESH_MAX_AGE seconds (default an hour, 0 always
+refreshes; `pm check --refresh` forces a refresh). The last refresh time
+comes from the PM's own files (index_refreshed_at(): apt's update stamp,
+brew's FETCH_HEAD) and from the journal of refreshes this module ran.
+"""
+
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add current directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pm_base import PackageManager, get_config_value
+from pm_lock import lock_pm
+from pm_process import run_command
+from pm_registry import get_pm
+from pm_retry import retry_call
+from pm_utils import atomic_write
+
+DEFAULT_REFRESH_MAX_AGE = 3600
+
+# Refresh results for this session, keyed by refresh group
+_refreshed: Dict[str, Dict[str, Any]] = {}
+_refreshed_lock = threading.Lock()
+
+
+def get_journal_file() -> Path:
+    return Path.home() / '.dotfiles' / 'cache' / 'refresh-journal.json'
+
+
+def read_journal() -> Dict[str, float]:
+    """Refresh group -> when this module last refreshed it successfully"""
+    try:
+        journal = json.loads(get_journal_file().read_text())
+    except (OSError, ValueError):
+        return {}
+    return journal if isinstance(journal, dict) else {}
+
+
+def record_refresh(group: str, when: Optional[float] = None) -> None:
+    """Add a successful refresh to the journal"""
+    journal = read_journal()
+    journal[group] = time.time() if when is None else when
+    try:
+        atomic_write(get_journal_file(), json.dumps(journal, indent=2))
+    except OSError:
+        pass
+
+
+def get_refresh_max_age() -> float:
+    """Seconds a refreshed index stays fresh (0: always refresh)"""
+    try:
+        return float(get_config_value('DOTFILES_PM_REFRESH_MAX_AGE') or DEFAULT_REFRESH_MAX_AGE)
+    except ValueError:
+        return DEFAULT_REFRESH_MAX_AGE
+
+
+def last_refreshed(pm: PackageManager) -> Optional[float]:
+    """When the PM's index was last refreshed, by us or anyone else (epoch seconds)"""
+    times = [pm.index_refreshed_at(), read_journal().get(pm.refresh_group)]
+    return max((t for t in times if isinstance(t, (int, float))), default=None)
+
+
+def index_age(pm: PackageManager) -> Optional[float]:
+    """Seconds since the PM's index was last refreshed; None if unknown"""
+    refreshed = last_refreshed(pm)
+    return None if refreshed is None else max(0.0, time.time() - refreshed)
+
+
+def new_session() -> None:
+    """Forget this session's refreshes (long-running processes, each check round)"""
+    with _refreshed_lock:
+        _refreshed.clear()
+
+
+def is_refreshed(group: str) -> bool:
+    """Whether a refresh group was refreshed (or tried, or found fresh) this session"""
+    with _refreshed_lock:
+        return group in _refreshed
+
+
+def needs_refresh(pm: PackageManager) -> bool:
+    """Whether the PM's check must refresh its index first"""
+    if not pm.refresh_command or is_refreshed(pm.refresh_group):
+        return False
+    max_age = get_refresh_max_age()
+    age = index_age(pm) if max_age > 0 else None
+    if age is None or age >= max_age:
+        return True
+    # Fresh for the rest of the session
+    with _refreshed_lock:
+        _refreshed.setdefault(pm.refresh_group, {'success': True, 'skipped': True, 'age': age})
+    return False
+
+
+def check_command_for(pm: PackageManager) -> List[str]:
+    """
+    The command that checks a PM, refreshing its index first if that hasn't
+    happened this session.
+
+    Args:
+        pm: Package manager
+
+    Returns:
+        Command list (with '&&' between refresh and check if both are needed)
+    """
+    if needs_refresh(pm):
+        return pm.refresh_command + ['&&'] + pm.check_command
+    return pm.check_command
+
+
+def refresh_groups(pm_names: List[str]) -> Dict[str, List[str]]:
+    """
+    Group PMs by the index they refresh.
+
+    Returns:
+        Dict mapping refresh group -> member PMs (PMs without a refresh are left out)
+    """
+    groups: Dict[str, List[str]] = {}
+    for pm_name in pm_names:
+        pm = get_pm(pm_name)
+        if pm and pm.refresh_command:
+            groups.setdefault(pm.refresh_group, []).append(pm_name)
+    return groups
+
+
+def refresh_group(group: str, pm_name: str) -> Dict[str, Any]:
+    """
+    Run a refresh group's refresh once, under the PM's exclusive lock.
+
+    Args:
+        group: Refresh group
+        pm_name: Member PM whose refresh command and policies are used
+
+    Returns:
+        Result dict like execute_pm_command's
+    """
+    pm = get_pm(pm_name)
+    timeout = pm.get_timeout('refresh')
+
+    def run_once() -> Dict[str, Any]:
+        try:
+            with lock_pm(pm_name, 'refresh'):
+                result = run_command(pm.refresh_command, timeout=timeout)
+            return {
+                'success': result.returncode == 0,
+                'output': result.stdout.strip(),
+                'error': result.stderr.strip() if result.returncode != 0 else '',
+                'exit_code': result.returncode
+            }
+        except subprocess.TimeoutExpired:
+            return {'success': False, 'output': '', 'error': f'Timed out after {timeout:g} seconds',
+                    'timed_out': True}
+        except OSError as e:
+            return {'success': False, 'output': '', 'error': str(e)}
+
+    result = retry_call(run_once, pm_name)
+    result['group'] = group
+    return result
+
+
+def run_refresh_phase(pm_names: List[str], max_workers: int = 4) -> Dict[str, Dict[str, Any]]:
+    """
+    Refresh the indexes the given PMs check against, once per group.
+
+    Fresh indexes are not refreshed again. Refreshes needing sudo are
+    skipped here and run with their PM's check. A failed refresh is not
+    repeated by the checks: they run against the index as it is.
+
+    Args:
+        pm_names: PMs about to be checked
+        max_workers: Groups refreshed at the same time
+
+    Returns:
+        Dict mapping refresh group -> result, for groups refreshed by this call
+    """
+    groups = {}
+    for group, members in refresh_groups(pm_names).items():
+        if is_refreshed(group):
+            continue
+        pm = get_pm(members[0])
+        if not needs_refresh(pm):
+            age = _refreshed[group].get('age', 0)
+            print(f"⏭️  {group} index refreshed {age / 60:.0f} min ago, not refreshing")
+        elif not pm.requires_sudo:
+            groups[group] = members
+    if not groups:
+        return {}
+
+    print(f"🔄 Refreshing package indexes: {', '.join(groups)}...")
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(refresh_group, group, members[0]): group for group, members in groups.items()}
+        for future in as_completed(futures):
+            group = futures[future]
+            result = future.result()
+            results[group] = result
+            with _refreshed_lock:
+                _refreshed[group] = result
+            members = ', '.join(groups[group])
+            if result['success']:
+                record_refresh(group)
+                print(f"  ✅ {group} refreshed (for {members})")
+            else:
+                print(f"  ⚠️  {group} refresh failed, checking against the current index: "
+                      f"{result.get('error', '')[:200]}")
+    print()
+    return results
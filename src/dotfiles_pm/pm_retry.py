@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Package Manager Retries
+
+Retries PM commands that failed for reasons that usually clear up on their
+own: another process holding the PM's lock, network timeouts, and mirrors
+answering with 5xx errors. The failed command's output is matched against
+each PM's own `retry_patterns` (lock messages differ per PM) and the generic
+TRANSIENT_PATTERNS. Waits grow exponentially with jitter, so PMs hitting
+the same mirror don't retry in lockstep.
+
+Terminal operations are wrapped with `pm_retry.py run`, so each PM retries
+in its own terminal without holding up the others. Captured commands use
+retry_call().
+
+Configure with DOTFILES_PM_RETRIES (retries after the first attempt,
+default 2, 0 disables) and DOTFILES_PM_RETRY_DELAY (first wait in seconds,
+default 5), in the environment or ~/.dotfiles.env.
+"""
+
+import argparse
+import os
+import random
+import re
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Add current directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pm_base import get_config_value
+
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_DELAY = 5.0
+MAX_RETRY_DELAY = 120.0
+
+# Fraction of each wait that is randomised
+RETRY_JITTER = 0.5
+
+# Output kept from a wrapped command for classification
+OUTPUT_TAIL_BYTES = 64 * 1024
+
+# Failure reason -> regexes (case-insensitive) that identify it in any PM's output
+TRANSIENT_PATTERNS: Dict[str, Sequence[str]] = {
+    'network': (
+        r'could not resolve host',
+        r'temporary failure (in name resolution|resolving)',
+        r'connection (timed out|reset|refused)',
+        r'operation timed out',
+        r'network is unreachable',
+        r'tls handshake timeout',
+        r'\b(ETIMEDOUT|ECONNRESET|ECONNREFUSED|EAI_AGAIN|ENETUNREACH)\b',
+        r'read timed out',
+    ),
+    'server': (
+        r'\b(HTTP|error|status|returned)\D{0,20}5(0[0234]|2[0-9])\b',
+        r'\bHTTP/[\d.]+ 5(0[0234]|2[0-9])\b',
+        r'(service unavailable|bad gateway|gateway time-?out|internal server error)',
+    ),
+}
+
+REASON_LABELS = {
+    'lock': 'package manager is locked by another process',
+    'network': 'network error',
+    'server': 'mirror/server error',
+}
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how long to wait before retrying a failed command"""
+    retries: int = DEFAULT_RETRIES
+    base_delay: float = DEFAULT_RETRY_DELAY
+    max_delay: float = MAX_RETRY_DELAY
+    jitter: float = RETRY_JITTER
+
+    def delay(self, retry: int, rng: random.Random = random) -> float:
+        """Seconds to wait before retry number `retry` (1-based)"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        return delay * (1 - self.jitter * rng.random())
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Retry policy with user overrides applied"""
+    policy = RetryPolicy()
+    try:
+        policy.retries = int(get_config_value('DOTFILES_PM_RETRIES') or DEFAULT_RETRIES)
+        policy.base_delay = float(get_config_value('DOTFILES_PM_RETRY_DELAY') or DEFAULT_RETRY_DELAY)
+    except ValueError:
+        pass
+    return policy
+
+
+def get_retry_patterns(pm_name: str) -> Dict[str, Sequence[str]]:
+    """A PM's own failure patterns (checked first), then the generic ones"""
+    from pm_registry import get_pm
+
+    pm = get_pm(pm_name)
+    patterns = {reason: list(regexes) for reason, regexes in (pm.retry_patterns if pm else {}).items()}
+    for reason, regexes in TRANSIENT_PATTERNS.items():
+        patterns.setdefault(reason, []).extend(regexes)
+    return patterns
+
+
+def classify_failure(output: str, patterns: Dict[str, Sequence[str]]) -> Optional[str]:
+    """
+    Decide whether a failure is worth retrying.
+
+    Args:
+        output: The failed command's output (stdout and stderr)
+        patterns: Failure reason -> regexes, from get_retry_patterns()
+
+    Returns:
+        The failure reason ('lock', 'network', 'server'...), or None if the
+        failure doesn't look transient
+    """
+    for reason, regexes in patterns.items():
+        for regex in regexes:
+            if re.search(regex, output, re.IGNORECASE):
+                return reason
+    return None
+
+
+def _announce(pm_name: str, reason: str, retry: int, policy: RetryPolicy, delay: float) -> None:
+    label = REASON_LABELS.get(reason, reason)
+    print(f"🔁 {pm_name}: {label}; retrying in {delay:.0f}s ({retry}/{policy.retries})",
+          file=sys.stderr, flush=True)
+
+
+def retry_call(attempt: Callable[[], Dict[str, Any]], pm_name: str,
+               policy: Optional[RetryPolicy] = None,
+               sleep: Callable[[float], None] = time.sleep) -> Dict[str, Any]:
+    """
+    Run an attempt until it succeeds, fails permanently or runs out of retries.
+
+    Args:
+        attempt: Runs the command once; returns a result dict with 'success',
+            'output' and 'error' (like execute_pm_command). Results marked
+            'timed_out' are never retried.
+        pm_name: Package manager, for its failure patterns
+        policy: Retry policy (default: get_retry_policy())
+        sleep: Called with each wait
+
+    Returns:
+        The last attempt's result, with 'attempts' and, if it was retried,
+        'retry_reason' added
+    """
+    policy = policy or get_retry_policy()
+    patterns = None
+    retry, last_reason = 0, None
+    while True:
+        result = attempt()
+        if result.get('success') or result.get('timed_out') or retry >= policy.retries:
+            break
+        patterns = patterns or get_retry_patterns(pm_name)
+        reason = classify_failure(f"{result.get('output', '')}\n{result.get('error', '')}", patterns)
+        if reason is None:
+            break
+        retry += 1
+        delay = policy.delay(retry)
+        _announce(pm_name, reason, retry, policy, delay)
+        last_reason = reason
+        sleep(delay)
+
+    result['attempts'] = retry + 1
+    if last_reason:
+        result['retry_reason'] = last_reason
+    return result
+
+
+def wrap_command(pm_name: str, operation: str, command: str) -> str:
+    """
+    Wrap a shell command so it is retried on transient failures.
+
+    Args:
+        pm_name: Package manager name
+        operation: Operation (check, upgrade, install)
+        command: Shell command string
+
+    Returns:
+        Shell command string that runs command through `pm_retry.py run`
+    """
+    if get_retry_policy().retries <= 0:
+        return command
+    args = [sys.executable, str(Path(__file__).resolve()), 'run', pm_name, '--operation', operation]
+    return shlex.join(args + ['--', 'sh', '-c', command])
+
+
+def _run_streaming(command: List[str]) -> Tuple[int, str]:
+    """Run command, passing its output through; returns (exit code, output tail)"""
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    # Ctrl-C reaches the command through the terminal's process group; pass on
+    # termination requests aimed at us. (A handler rather than SIG_IGN, which
+    # the next attempt's command would inherit.)
+    signal.signal(signal.SIGINT, lambda signum, frame: None)
+    for sig in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(sig, lambda signum, frame: proc.send_signal(signum))
+
+    tail = bytearray()
+    out = sys.stdout.buffer
+    while True:
+        chunk = os.read(proc.stdout.fileno(), 65536)
+        if not chunk:
+            break
+        out.write(chunk)
+        out.flush()
+        tail += chunk
+        del tail[:-OUTPUT_TAIL_BYTES]
+    return proc.wait(), tail.decode(errors='replace')
+
+
+def cmd_run(args) -> int:
+    """Run the command, retrying transient failures"""
+    policy = get_retry_policy()
+    patterns = get_retry_patterns(args.pm)
+    retry = 0
+    while True:
+        try:
+            exit_code, output = _run_streaming(args.command)
+        except OSError as e:
+            print(f"❌ Failed to run {args.command[0]}: {e}", file=sys.stderr)
+            return 127
+
+        # Killed by a signal: cancelled, not failed
+        if exit_code < 0:
+            return 128 - exit_code
+        if exit_code == 0 or retry >= policy.retries:
+            return exit_code
+        reason = classify_failure(output, patterns)
+        if reason is None:
+            return exit_code
+
+        retry += 1
+        delay = policy.delay(retry)
+        print()
+        _announce(args.pm, reason, retry, policy, delay)
+        time.sleep(delay)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Retry PM commands on transient failures',
+                                     usage='%(prog)s run pm [--operation OP] -- command [args...]')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run a command, retrying transient failures')
+    run_parser.add_argument('pm')
+    run_parser.add_argument('--operation', default='')
+    run_parser.set_defaults(func=cmd_run)
+
+    argv = sys.argv[1:] if argv is None else argv
+    # Everything after -- is the command, options included
+    command = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, command = argv[:split], argv[split + 1:]
+
+    args = parser.parse_args(argv)
+    if not command:
+        parser.error('run: no command given after --')
+    args.command = command
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,10 @@
 Package Manager Selection Module
 
 Interactive selection of package managers with timeout for unattended operation.
+
+Batch mode (`pm --yes`/`--batch` or DOTFILES_PM_BATCH=true) skips every
+interactive wait, here and in terminal_executor, and takes the default the
+countdown would have taken - even from a tty (tmux panes, `ssh -t`).
 """
 
 import sys
@@ -20,6 +24,13 @@ else:
 # Add current directory to path for imports (when run as module)
 sys.path.insert(0, str(Path(__file__).parent))
 
+from pm_base import get_config_value
+
+
+def batch_mode() -> bool:
+    """Whether to skip interactive prompts and countdowns (DOTFILES_PM_BATCH, default off)"""
+    return (get_config_value('DOTFILES_PM_BATCH') or 'false').lower() in ('true', '1', 'yes')
+
 
 def _input_with_timeout(prompt: str, timeout: int) -> Optional[str]:
     """
@@ -108,6 +119,10 @@ def select_pms(available_pms: List[str], timeout: int = 10) -> List[str]:
         print(f"Non-interactive mode - selecting all PMs: {', '.join(available_pms)}")
         return available_pms
 
+    if not test_selection and batch_mode():
+        print(f"Batch mode - selecting all PMs: {', '.join(available_pms)}")
+        return available_pms
+
     print("\n📋 Select package managers to process (sorted by priority):\n")
 
     # Display numbered list
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Outdated Package Summary
+
+Every check (`pm check`, the pm daemon) leaves a compact summary behind
+so shell prompts can show update status without running anything:
+
+    ~/.dotfiles/cache/outdated-summary.json   per-PM counts, failures, times
+    ~/.dotfiles/cache/outdated-summary.txt    one line: "<total> <failed> <checked_at>"
+
+Both files are replaced atomically, and concurrent updates (the daemon
+and `pm check` at once) are serialized with a lock file so neither drops
+the other's PMs. The one-line file is meant for
+prompts: a shell reads it with `read` alone, without forking (see
+prompt_pm_outdated in configs/shell_common/dot-p10k.zsh). Checking some
+PMs keeps the other PMs' last counts.
+
+This module imports only the standard library and pm_utils, so `pm_summary.py` also
+works as a lightweight reader:
+
+    python3 src/dotfiles_pm/pm_summary.py           # prompt segment, e.g. "⬆12 ✗1"
+    python3 src/dotfiles_pm/pm_summary.py --json    # the full summary
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from pm_utils import atomic_write, file_lock
+
+SUMMARY_VERSION = 1
+
+# A summary older than this is shown as possibly out of date
+STALE_AFTER_SECONDS = 24 * 3600
+
+
+def get_summary_file() -> Path:
+    return Path.home() / '.dotfiles' / 'cache' / 'outdated-summary.json'
+
+
+def get_prompt_file() -> Path:
+    return Path.home() / '.dotfiles' / 'cache' / 'outdated-summary.txt'
+
+
+def read_summary() -> Dict[str, Any]:
+    """The last summary written, or an empty one"""
+    try:
+        summary = json.loads(get_summary_file().read_text())
+    except (OSError, ValueError):
+        summary = None
+    if not isinstance(summary, dict) or summary.get('version') != SUMMARY_VERSION:
+        return {'version': SUMMARY_VERSION, 'checked_at': None, 'total': 0, 'failed': [], 'pms': {}}
+    return summary
+
+
+def update_summary(results: List[Dict[str, Any]], checked_at: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Fold check results into the summary files.
+
+    Args:
+        results: Check results with 'pm', 'success', 'outdated_count' and 'error'
+        checked_at: When the checks ran (default: now)
+
+    Returns:
+        The new summary
+    """
+    checked_at = time.time() if checked_at is None else checked_at
+    try:
+        with file_lock(get_summary_file()):
+            return _update_summary(results, checked_at)
+    except OSError as e:
+        print(f"⚠️  Could not write outdated summary: {e}", file=sys.stderr)
+        return read_summary()
+
+
+def _update_summary(results: List[Dict[str, Any]], checked_at: float) -> Dict[str, Any]:
+    summary = read_summary()
+    for result in results:
+        entry = {'outdated': int(result.get('outdated_count') or 0) if result.get('success') else 0,
+                 'ok': bool(result.get('success')),
+                 'checked_at': result.get('checked_at', checked_at)}
+        if not result.get('success'):
+            entry['error'] = (result.get('error') or 'check failed')[:200]
+        summary['pms'][result['pm']] = entry
+
+    summary['checked_at'] = checked_at
+    summary['total'] = sum(entry['outdated'] for entry in summary['pms'].values())
+    summary['failed'] = sorted(pm for pm, entry in summary['pms'].items() if not entry['ok'])
+
+    atomic_write(get_summary_file(), json.dumps(summary, indent=2))
+    atomic_write(get_prompt_file(), f"{summary['total']} {len(summary['failed'])} {int(checked_at)}\n")
+    return summary
+
+
+def format_segment(total: int, failed: int, checked_at: Optional[float], now: Optional[float] = None) -> str:
+    """
+    Prompt segment for a summary: '⬆12', '⬆12 ✗1', '⬆12?' when stale; '' when
+    everything is up to date.
+    """
+    if not total and not failed:
+        return ''
+    segment = f"⬆{total}"
+    if failed:
+        segment += f" ✗{failed}"
+    now = time.time() if now is None else now
+    if checked_at and now - checked_at > STALE_AFTER_SECONDS:
+        segment += '?'
+    return segment
+
+
+def read_prompt_segment() -> str:
+    """Prompt segment from the one-line summary file ('' if there is none)"""
+    try:
+        total, failed, checked_at = get_prompt_file().read_text().split()
+        return format_segment(int(total), int(failed), float(checked_at))
+    except (OSError, ValueError):
+        return ''
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Show the outdated package summary')
+    parser.add_argument('--json', action='store_true', help='Print the full summary as JSON')
+    args = parser.parse_args(argv)
+
+    if args.json:
+        print(json.dumps(read_summary(), indent=2))
+    else:
+        segment = read_prompt_segment()
+        if segment:
+            print(segment)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
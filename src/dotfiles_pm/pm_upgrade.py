@@ -8,7 +8,7 @@ Upgrade packages across multiple package managers.
 import subprocess
 import sys
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
 
 from .pm_detect import detect_all_pms
 from .pm_select import select_pms
@@ -16,12 +16,13 @@ from .terminal_executor import spawn_tracked
 from .command_executor import run_command
 
 
-def upgrade_pm_packages(pm_name: str) -> Dict[str, Any]:
+def upgrade_pm_packages(pm_name: str, sudo_session=None) -> Dict[str, Any]:
     """
     Upgrade packages using a specific package manager.
 
     Args:
         pm_name: Name of the package manager
+        sudo_session: Active SudoSession the spawned terminal's sudo authenticates through
 
     Returns:
         Dict with status, output, and error information
@@ -34,7 +35,7 @@ def upgrade_pm_packages(pm_name: str) -> Dict[str, Any]:
     if pm_name == 'brew' and os.getenv('DOTFILES_TEST_MODE'):
         interactive = False
 
-    result = execute_pm_command(pm_name, 'upgrade', interactive=interactive)
+    result = execute_pm_command(pm_name, 'upgrade', interactive=interactive, sudo_session=sudo_session)
 
     # Convert to expected format for compatibility
     if result['success']:
@@ -44,7 +45,8 @@ def upgrade_pm_packages(pm_name: str) -> Dict[str, Any]:
             'output': 'Upgrade completed',
             'error': '',
             'log_file': result.get('log_file'),
-            'status_file': result.get('status_file')
+            'status_file': result.get('status_file'),
+            'channel': result.get('channel')
         }
     else:
         return {
@@ -57,16 +59,20 @@ def upgrade_pm_packages(pm_name: str) -> Dict[str, Any]:
         }
 
 
-def upgrade_all_pms(selected_pms: List[str], parallel: bool = False) -> List[Dict[str, Any]]:
+def upgrade_all_pms(selected_pms: List[str], parallel: bool = False,
+                    on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
     """
     Upgrade packages for all selected package managers.
 
     Package managers are sorted by priority (system PMs like apt first),
     then run sequentially to ensure sudo prompts are handled properly.
+    When any selected PM needs sudo, the password is asked for once up front
+    and every upgrade terminal authenticates with it without prompting.
 
     Args:
         selected_pms: List of selected package manager names
         parallel: Whether to run upgrades in parallel (False by default for safety)
+        on_result: Called with each PM's result as soon as it completes
 
     Returns:
         List of upgrade results for each PM
@@ -74,7 +80,22 @@ def upgrade_all_pms(selected_pms: List[str], parallel: bool = False) -> List[Dic
     if not selected_pms:
         return []
 
-    import time
+    from .pm_executor import requires_sudo
+    from .sudo_helper import SudoSession
+
+    if not any(requires_sudo(pm, 'upgrade') for pm in selected_pms):
+        return _run_upgrades(selected_pms, parallel, None, on_result)
+
+    with SudoSession() as sudo_session:
+        if sudo_session.authenticated:
+            print("🔐 sudo authenticated - keeping it alive until all upgrades finish")
+            print()
+        return _run_upgrades(selected_pms, parallel, sudo_session, on_result)
+
+
+def _run_upgrades(selected_pms: List[str], parallel: bool, sudo_session,
+                  on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """Spawn and wait for upgrades; see upgrade_all_pms."""
     from .terminal_executor import create_terminal_executor
 
     # Selected PMs are already sorted by priority from pm_select
@@ -85,6 +106,11 @@ def upgrade_all_pms(selected_pms: List[str], parallel: bool = False) -> List[Dic
         print(f"🚀 Running {len(selected_pms)} package manager upgrades sequentially by priority...")
     print()
 
+    def finish(results: Dict[str, Dict[str, Any]], result: Dict[str, Any]) -> None:
+        results[result['pm']] = result
+        if on_result:
+            on_result(result)
+
     spawned_operations = []
     executor = create_terminal_executor()
 
@@ -92,7 +118,7 @@ def upgrade_all_pms(selected_pms: List[str], parallel: bool = False) -> List[Dic
         # Launch all at once
         for pm in selected_pms:
             print(f"⬆️ Launching {pm} upgrade...")
-            result = upgrade_pm_packages(pm)
+            result = upgrade_pm_packages(pm, sudo_session)
 
             if result.get('status_file'):
                 # Successfully spawned
@@ -111,7 +137,7 @@ def upgrade_all_pms(selected_pms: List[str], parallel: bool = False) -> List[Dic
         completed_results = {}
         for i, pm in enumerate(selected_pms):
             print(f"⬆️ Upgrading {pm} ({i+1}/{len(selected_pms)})...")
-            result = upgrade_pm_packages(pm)
+            result = upgrade_pm_packages(pm, sudo_session)
 
             if result.get('status_file'):
                 print(f"  🖥️  Executing in new terminal window...")
@@ -130,7 +156,7 @@ def upgrade_all_pms(selected_pms: List[str], parallel: bool = False) -> List[Dic
                             'output': 'Upgrade completed' if exit_code == 0 else '',
                             'error': '' if exit_code == 0 else f"Upgrade failed with exit code {exit_code}"
                         }
-                        completed_results[pm] = final_result
+                        finish(completed_results, final_result)
 
                         # Print completion status
                         if final_result['success']:
@@ -146,20 +172,20 @@ def upgrade_all_pms(selected_pms: List[str], parallel: bool = False) -> List[Dic
                             'output': '',
                             'error': status_info.get('error', 'Unknown error')
                         }
-                        completed_results[pm] = final_result
+                        finish(completed_results, final_result)
                         print(f"  ❌ {pm}: Upgrade failed")
                         break
                     else:
                         # Still running, wait a bit
-                        time.sleep(1)
+                        executor.wait_for_change([result])
             else:
                 print(f"  ❌ Failed: {result.get('error', 'Unknown error')}")
-                completed_results[pm] = {
+                finish(completed_results, {
                     'pm': pm,
                     'success': False,
                     'output': '',
                     'error': result.get('error', 'Failed to spawn terminal')
-                }
+                })
 
             print()  # Add spacing between sequential operations
 
@@ -189,7 +215,7 @@ def upgrade_all_pms(selected_pms: List[str], parallel: bool = False) -> List[Dic
                     'output': '',
                     'error': operation.get('error', 'Failed to spawn terminal')
                 }
-                completed_results[pm] = final_result
+                finish(completed_results, final_result)
                 completed_this_round.append(operation)
                 print(f"  ❌ {pm}: Failed to spawn")
                 continue
@@ -205,7 +231,7 @@ def upgrade_all_pms(selected_pms: List[str], parallel: bool = False) -> List[Dic
                     'output': 'Upgrade completed' if exit_code == 0 else '',
                     'error': '' if exit_code == 0 else f"Upgrade failed with exit code {exit_code}"
                 }
-                completed_results[pm] = final_result
+                finish(completed_results, final_result)
                 completed_this_round.append(operation)
 
                 # Print completion status
@@ -221,7 +247,7 @@ def upgrade_all_pms(selected_pms: List[str], parallel: bool = False) -> List[Dic
                     'output': '',
                     'error': status_info.get('error', 'Unknown error')
                 }
-                completed_results[pm] = final_result
+                finish(completed_results, final_result)
                 completed_this_round.append(operation)
                 print(f"  ❌ {pm}: Upgrade failed")
 
@@ -229,9 +255,9 @@ def upgrade_all_pms(selected_pms: List[str], parallel: bool = False) -> List[Dic
         for completed_op in completed_this_round:
             pending_operations.remove(completed_op)
 
-        # Brief pause before next poll cycle (only if there are still pending)
+        # Pause before the next poll cycle (only if there are still pending)
         if pending_operations:
-            time.sleep(1)
+            executor.wait_for_change(pending_operations)
 
     # Phase 3: Return results in original order
     ordered_results = []
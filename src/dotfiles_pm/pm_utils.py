@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Shared Helpers
+
+Small process and file helpers shared across modules.
+"""
+
+import contextlib
+import os
+import threading
+from pathlib import Path
+from typing import Iterator
+
+
+def pid_alive(pid: int) -> bool:
+    """
+    Check whether a process exists.
+
+    A process owned by another user (EPERM) still counts as alive. POSIX
+    only: on Windows os.kill() terminates the process.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextlib.contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive flock on <path>.lock, e.g. around a read-modify-write
+    of a file several processes update. No-op without fcntl (Windows).
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    lock_path = path.with_name(f"{path.name}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a') as f:
+        # Released when the file is closed
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def atomic_write(path: Path, text: str) -> None:
+    """
+    Replace a file's contents atomically: readers see the old file or the
+    new one, never a partial write. Creates the parent directory.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per writer thread, so concurrent writers never share a temp file
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(text)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
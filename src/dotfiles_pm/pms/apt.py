@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
 """APT Package Manager (Debian/Ubuntu)"""
 
-from typing import List
+from typing import Dict, List, Optional
+import re
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from pm_base import PackageManager
+from pm_base import PackageManager, DEFAULT_TIMEOUTS
+
+APT_INDEX_MARKERS = (
+    Path('/var/lib/apt/periodic/update-success-stamp'),
+    Path('/var/lib/apt/lists'),
+)
 
 
 class AptPM(PackageManager):
@@ -18,7 +24,36 @@ class AptPM(PackageManager):
 
     @property
     def check_command(self) -> List[str]:
-        return ["sudo", "apt-get", "update", "&&", "sudo", "apt-get", "upgrade", "--dry-run"]
+        return ["sudo", "apt-get", "upgrade", "--dry-run"]
+
+    @property
+    def refresh_command(self) -> Optional[List[str]]:
+        return ["sudo", "apt-get", "update"]
+
+    def index_refreshed_at(self) -> Optional[float]:
+        # Downloaded lists keep the mirror's Last-Modified time, so use the
+        # stamp Debian/Ubuntu touch after each successful update and the
+        # lists directory, which changes whenever a list is replaced. Not
+        # lists/partial: failed downloads touch it too
+        times = []
+        for marker in APT_INDEX_MARKERS:
+            try:
+                times.append(marker.stat().st_mtime)
+            except OSError:
+                pass
+        return max(times, default=None)
+
+    def prefetch_command(self, check_output: str) -> Optional[List[str]]:
+        if not re.search(r'^Inst ', check_output, re.MULTILINE):
+            return None
+        # Runs in the background: fail rather than prompt if sudo needs a password
+        return ["sudo", "-n", "apt-get", "upgrade", "--download-only", "--yes", "--quiet"]
+
+    def outdated_packages(self, check_output: str) -> Optional[List[Dict[str, Optional[str]]]]:
+        # "Inst libssl3 [3.0.2-0ubuntu1.14] (3.0.2-0ubuntu1.15 Ubuntu:22.04/jammy-updates [amd64])"
+        return [{'name': name, 'current': current or None, 'latest': latest}
+                for name, current, latest in re.findall(
+                    r'^Inst (\S+)(?: \[([^\]]*)\])? \((\S+)', check_output, re.MULTILINE)]
 
     @property
     def upgrade_command(self) -> List[str]:
@@ -35,3 +70,16 @@ class AptPM(PackageManager):
     @property
     def priority(self) -> int:
         return 0
+
+    @property
+    def timeouts(self) -> Dict[str, Optional[float]]:
+        # The check runs apt-get update first (sudo), which waits on every mirror
+        return {**DEFAULT_TIMEOUTS, 'check': 300}
+
+    @property
+    def retry_patterns(self) -> Dict[str, List[str]]:
+        return {
+            'lock': [r'Could not get lock', r'Unable to acquire the dpkg frontend lock'],
+            # A mirror mid-sync serves indexes that don't match their Release file
+            'server': [r'Hash Sum mismatch', r'Failed to fetch .*\b5\d\d\b'],
+        }
@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 """Homebrew Package Manager with Lock Recovery"""
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import re
 import sys
 import subprocess
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from pm_base import PackageManager
+from pm_base import PackageManager, DEFAULT_TIMEOUTS
+from pm_process import run_command
+from pm_lock import lock_pm
+from pm_retry import retry_call
 
 
 class BrewPM(PackageManager):
@@ -25,7 +29,26 @@ class BrewPM(PackageManager):
 
     @property
     def check_command(self) -> List[str]:
-        return ["brew", "update", "&&", "brew", "outdated", "--verbose"]
+        return ["brew", "outdated", "--verbose"]
+
+    @property
+    def refresh_command(self) -> Optional[List[str]]:
+        return ["brew", "update"]
+
+    def index_refreshed_at(self) -> Optional[float]:
+        from .brew_utils import get_brew_index_time
+        return get_brew_index_time()
+
+    def prefetch_command(self, check_output: str) -> Optional[List[str]]:
+        # `brew outdated --verbose`: "wget (1.21.3) < 1.21.4"
+        names = re.findall(r'^([a-z0-9][\w@.+-]*) \(', check_output, re.MULTILINE)
+        return ["brew", "fetch", *names] if names else None
+
+    def outdated_packages(self, check_output: str) -> Optional[List[Dict[str, Optional[str]]]]:
+        # "wget (1.21.3) < 1.21.4"; pinned formulae use "!="
+        return [{'name': name, 'current': current, 'latest': latest}
+                for name, current, latest in re.findall(
+                    r'^([a-z0-9][\w@.+-]*) \(([^)]*)\) (?:<|!=) (\S+)', check_output, re.MULTILINE)]
 
     @property
     def upgrade_command(self) -> List[str]:
@@ -48,9 +71,21 @@ class BrewPM(PackageManager):
     def priority(self) -> int:
         return 10
 
+    @property
+    def timeouts(self) -> Dict[str, Optional[float]]:
+        return {**DEFAULT_TIMEOUTS, 'check': 300}  # may still include brew update, see pm_refresh
+
+    @property
+    def retry_patterns(self) -> Dict[str, List[str]]:
+        from .brew_utils import BREW_LOCK_INDICATORS
+        return {'lock': [re.escape(indicator) for indicator in BREW_LOCK_INDICATORS]}
+
     def execute_command(self, command: List[str], operation: str = "unknown") -> Dict[str, Any]:
         """
-        Execute brew command with lock recovery
+        Execute brew command with lock recovery, retrying transient failures
+
+        Exits with code 41 (for `just doctor-fix-brew-lock`) only if brew is
+        still locked after the retries.
 
         Args:
             command: Command to execute
@@ -59,13 +94,25 @@ class BrewPM(PackageManager):
         Returns:
             Dict with execution results and recovery info
         """
+        def attempt() -> Dict[str, Any]:
+            # Each attempt takes the resource lock, so retries back off without holding it
+            with lock_pm(self.name, operation):
+                return self._execute_once(command, operation)
+
+        result = retry_call(attempt, self.name)
+        if result.get('lock_error'):
+            raise SystemExit(41)  # Specific exit code for brew lock
+        return result
+
+    def _execute_once(self, command: List[str], operation: str) -> Dict[str, Any]:
+        """Run the command once; a brew lock is reported as a 'lock_error' result"""
         if not self.lock_manager:
             # Fallback to standard execution
-            return self._execute_standard(command)
+            return self._execute_standard(command, self.get_timeout(operation))
 
         try:
             # Use lock detection (no retry - just detect and raise)
-            result = self.lock_manager.execute_with_lock_detection(command)
+            result = self.lock_manager.execute_with_lock_detection(command, timeout=self.get_timeout(operation))
 
             return {
                 'success': result.returncode == 0,
@@ -80,8 +127,15 @@ class BrewPM(PackageManager):
             from .brew_utils import BrewLockError
 
             if isinstance(e, BrewLockError):
-                # Brew lock detected - let justfile handle with doctor command
-                raise SystemExit(41)  # Specific exit code for brew lock
+                # Brew lock detected - retried, then left to the justfile's doctor command
+                return {
+                    'success': False,
+                    'output': '',
+                    'error': str(e),
+                    'exit_code': 41,
+                    'recovery_used': False,
+                    'lock_error': True
+                }
 
             # Re-raise other exceptions
             raise
@@ -96,7 +150,7 @@ class BrewPM(PackageManager):
                 'recovery_used': False
             }
 
-    def _execute_standard(self, command: List[str]) -> Dict[str, Any]:
+    def _execute_standard(self, command: List[str], timeout: Optional[float] = None) -> Dict[str, Any]:
         """Fallback standard execution without lock recovery"""
         try:
             # Check if command contains shell operators
@@ -105,21 +159,10 @@ class BrewPM(PackageManager):
             if needs_shell:
                 # Convert to shell string and use shell=True
                 cmd_str = ' '.join(command)
-                result = subprocess.run(
-                    cmd_str,
-                    capture_output=True,
-                    text=True,
-                    shell=True,
-                    timeout=300
-                )
+                result = run_command(cmd_str, timeout=timeout, shell=True)
             else:
                 # Use list form without shell
-                result = subprocess.run(
-                    command,
-                    capture_output=True,
-                    text=True,
-                    timeout=300
-                )
+                result = run_command(command, timeout=timeout)
 
             return {
                 'success': result.returncode == 0,
@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 """Homebrew Cask Package Manager (macOS GUI Apps)"""
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import re
 import sys
-import subprocess
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from pm_base import PackageManager, PMParser
+from pm_base import PackageManager, PMParser, DEFAULT_TIMEOUTS
+from pm_process import run_command
+from pm_lock import lock_pm
+from pm_retry import retry_call
 
 
 class BrewCaskParser(PMParser):
@@ -36,6 +39,29 @@ class BrewCaskPM(PackageManager):
     def check_command(self) -> List[str]:
         return ["brew", "outdated", "--cask", "--greedy"]
 
+    @property
+    def refresh_command(self) -> Optional[List[str]]:
+        return ["brew", "update"]
+
+    @property
+    def refresh_group(self) -> Optional[str]:
+        # Casks come from the taps `brew update` fetches for formulae
+        return 'brew'
+
+    def index_refreshed_at(self) -> Optional[float]:
+        from .brew_utils import get_brew_index_time
+        return get_brew_index_time()
+
+    def prefetch_command(self, check_output: str) -> Optional[List[str]]:
+        # One cask token per line (lowercase, unlike `brew update` messages)
+        names = re.findall(r'^([a-z0-9][a-z0-9@._+-]*)$', check_output, re.MULTILINE)
+        return ["brew", "fetch", "--cask", *names] if names else None
+
+    def outdated_packages(self, check_output: str) -> Optional[List[Dict[str, Optional[str]]]]:
+        # Without --verbose brew lists cask tokens only
+        return [{'name': name, 'current': None, 'latest': None}
+                for name in re.findall(r'^([a-z0-9][a-z0-9@._+-]*)$', check_output, re.MULTILINE)]
+
     @property
     def upgrade_command(self) -> List[str]:
         from sudo_helper import wrap_command_with_askpass, get_sudo_mode
@@ -57,10 +83,35 @@ class BrewCaskPM(PackageManager):
     def priority(self) -> int:
         return 12
 
+    @property
+    def timeouts(self) -> Dict[str, Optional[float]]:
+        return {**DEFAULT_TIMEOUTS, 'check': 600}  # --greedy checks every cask's appcast
+
+    @property
+    def retry_patterns(self) -> Dict[str, List[str]]:
+        from .brew_utils import BREW_LOCK_INDICATORS
+        return {'lock': [re.escape(indicator) for indicator in BREW_LOCK_INDICATORS]}
+
+    @property
+    def lock_resource(self) -> str:
+        # Casks live in the same Homebrew prefix as formulae
+        return 'brew'
+
     def execute_command(self, command: List[str], operation: str = "unknown") -> Dict[str, Any]:
+        def attempt() -> Dict[str, Any]:
+            # Each attempt takes the resource lock, so retries back off without holding it
+            with lock_pm(self.name, operation):
+                return self._execute_once(command, operation)
+
+        result = retry_call(attempt, self.name)
+        if result.get('lock_error'):
+            raise SystemExit(41)
+        return result
+
+    def _execute_once(self, command: List[str], operation: str) -> Dict[str, Any]:
         if self.lock_manager:
             try:
-                result = self.lock_manager.execute_with_lock_detection(command)
+                result = self.lock_manager.execute_with_lock_detection(command, timeout=self.get_timeout(operation))
                 return {
                     'success': result.returncode == 0,
                     'output': result.stdout.strip(),
@@ -71,15 +122,17 @@ class BrewCaskPM(PackageManager):
             except Exception as e:
                 from .brew_utils import BrewLockError
                 if isinstance(e, BrewLockError):
-                    raise SystemExit(41)
+                    return {
+                        'success': False,
+                        'output': '',
+                        'error': str(e),
+                        'exit_code': 41,
+                        'recovery_used': False,
+                        'lock_error': True
+                    }
                 raise
 
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            timeout=600
-        )
+        result = run_command(command, timeout=self.get_timeout(operation))
         return {
             'success': result.returncode == 0,
             'output': result.stdout.strip(),
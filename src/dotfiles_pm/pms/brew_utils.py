@@ -4,15 +4,45 @@ Brew Lock Detection and Recovery Utilities
 
 Handles Homebrew's file locking issues by providing detection,
 waiting, and cleanup mechanisms for stuck processes.
+
+Lock state is read straight from the flock()ed files in
+<prefix>/var/homebrew/locks: on Linux holders come from /proc/locks and
+unlocks are noticed through inotify on the lock directory; elsewhere each
+lock file is probed with a non-blocking flock. No brew process is spawned.
 """
 
 import subprocess
 import time
 import re
 import os
+import sys
+import select
+import shutil
+from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pm_process import run_command
+
+# stderr fragments that mean another brew process holds the lock
+BREW_LOCK_INDICATORS = ('already locked', 'lockf:', 'another brew')
+
+# inotify(7) event masks
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_CLOSE_NOWRITE = 0x010
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_LOCK_DIR_EVENTS = (_IN_ATTRIB | _IN_CLOSE_WRITE | _IN_CLOSE_NOWRITE | _IN_MOVED_FROM |
+                    _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+
+_BREW_SUBCOMMANDS = ('update', 'upgrade', 'install', 'bundle')
+_BREW_EXECUTABLES = {'brew', 'brew.sh', 'brew.rb'}
+
 
 class BrewLockError(Exception):
     """Raised when brew is locked and needs manual intervention"""
@@ -28,15 +58,273 @@ class BrewProcess:
     user: str
 
 
+def get_brew_lock_dir() -> Optional[Path]:
+    """
+    Find Homebrew's lock directory (<prefix>/var/homebrew/locks).
+
+    Returns:
+        Path to the lock directory, or None if brew is not installed
+    """
+    candidates = []
+    if os.environ.get('HOMEBREW_PREFIX'):
+        candidates.append(Path(os.environ['HOMEBREW_PREFIX']))
+
+    brew = shutil.which('brew')
+    if brew:
+        # <prefix>/bin/brew
+        candidates.append(Path(brew).resolve().parent.parent)
+        candidates.append(Path(brew).parent.parent)
+
+    candidates += [
+        Path('/opt/homebrew'),
+        Path('/usr/local'),
+        Path('/home/linuxbrew/.linuxbrew'),
+        Path.home() / '.linuxbrew',
+    ]
+
+    for prefix in candidates:
+        lock_dir = prefix / 'var' / 'homebrew' / 'locks'
+        if lock_dir.is_dir():
+            return lock_dir
+    return None
+
+
+def get_brew_index_time() -> Optional[float]:
+    """
+    Find when `brew update` last fetched, without running brew.
+
+    Looks at FETCH_HEAD in the brew repository and its taps (written by every
+    fetch) and at the formula/cask API files brew downloads instead of taps.
+
+    Returns:
+        Newest of those mtimes (epoch seconds), or None if none exist
+    """
+    repositories = []
+    if os.environ.get('HOMEBREW_REPOSITORY'):
+        repositories.append(Path(os.environ['HOMEBREW_REPOSITORY']))
+    brew = shutil.which('brew')
+    if brew:
+        # <repository>/bin/brew, symlinked from <prefix>/bin/brew
+        repositories.append(Path(brew).resolve().parent.parent)
+
+    markers = []
+    for repository in repositories:
+        markers.append(repository / '.git' / 'FETCH_HEAD')
+        markers += (repository / 'Library' / 'Taps').glob('*/*/.git/FETCH_HEAD')
+
+    if os.environ.get('HOMEBREW_CACHE'):
+        cache = Path(os.environ['HOMEBREW_CACHE'])
+    elif sys.platform == 'darwin':
+        cache = Path.home() / 'Library' / 'Caches' / 'Homebrew'
+    else:
+        cache = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'Homebrew'
+    markers += [cache / 'api' / 'formula.jws.json', cache / 'api' / 'cask.jws.json']
+
+    times = []
+    for marker in markers:
+        try:
+            times.append(marker.stat().st_mtime)
+        except OSError:
+            pass
+    return max(times, default=None)
+
+
+def read_proc_locks() -> Optional[Dict[Tuple[int, int, int], int]]:
+    """
+    Read held file locks from /proc/locks (Linux).
+
+    Returns:
+        Dict mapping (major, minor, inode) -> holder PID, or None without /proc/locks
+    """
+    try:
+        with open('/proc/locks') as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    held = {}
+    for line in lines:
+        parts = line.split()
+        # "1: FLOCK  ADVISORY  WRITE 1234 08:01:5678 0 EOF"; waiters are "1: -> FLOCK ..."
+        if len(parts) < 6 or parts[1] == '->':
+            continue
+        try:
+            major, minor, inode = parts[5].split(':')
+            held[(int(major, 16), int(minor, 16), int(inode))] = int(parts[4])
+        except ValueError:
+            continue
+    return held
+
+
+def _probe_flock(path: Path) -> bool:
+    """
+    Check whether a file is flock()ed by trying a shared non-blocking lock.
+
+    The probe lock is held for microseconds; it is only used where
+    /proc/locks is unavailable.
+    """
+    import fcntl
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return False
+    finally:
+        os.close(fd)
+
+
+def find_lock_holders(lock_dir: Path) -> Dict[str, Optional[int]]:
+    """
+    Find which brew lock files are currently held.
+
+    Args:
+        lock_dir: Homebrew lock directory
+
+    Returns:
+        Dict mapping lock filename -> holder PID (None when the PID is unknown)
+    """
+    try:
+        entries = list(os.scandir(lock_dir))
+    except OSError:
+        return {}
+
+    proc_locks = read_proc_locks()
+    holders = {}
+    for entry in entries:
+        if not entry.is_file():
+            continue
+        if proc_locks is not None:
+            st = entry.stat()
+            pid = proc_locks.get((os.major(st.st_dev), os.minor(st.st_dev), st.st_ino))
+            if pid is not None:
+                holders[entry.name] = pid
+        elif _probe_flock(Path(entry.path)):
+            holders[entry.name] = None
+    return holders
+
+
+class _LockDirWatcher:
+    """inotify watch on the lock directory (Linux only)"""
+
+    def __init__(self, lock_dir: Path):
+        self.fd: Optional[int] = None
+        if not sys.platform.startswith('linux'):
+            return
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return
+            if libc.inotify_add_watch(fd, os.fsencode(str(lock_dir)), _LOCK_DIR_EVENTS) < 0:
+                os.close(fd)
+                return
+            self.fd = fd
+        except (OSError, AttributeError):
+            self.fd = None
+
+    def wait(self, timeout: float) -> None:
+        """Block until something happens in the lock directory or timeout"""
+        if self.fd is None:
+            time.sleep(timeout)
+            return
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def _read_proc_process(pid: int, clock_ticks: int, uptime: float) -> Optional[BrewProcess]:
+    """Build a BrewProcess from /proc/<pid>, or None if it isn't a brew operation"""
+    import pwd
+
+    proc = Path('/proc') / str(pid)
+    try:
+        argv = [arg.decode('utf-8', errors='replace')
+                for arg in (proc / 'cmdline').read_bytes().split(b'\0') if arg]
+        # Match real brew invocations by argv, not substrings of arbitrary commands
+        if not {os.path.basename(arg) for arg in argv} & _BREW_EXECUTABLES:
+            return None
+        if not set(argv) & set(_BREW_SUBCOMMANDS):
+            return None
+        command = ' '.join(argv)
+        # Fields after the parenthesised comm; starttime is field 22
+        stat_fields = (proc / 'stat').read_text().rsplit(')', 1)[1].split()
+        start_seconds = int(stat_fields[19]) / clock_ticks
+        uid = proc.stat().st_uid
+    except (OSError, IndexError, ValueError):
+        return None
+
+    elapsed = max(int(uptime - start_seconds), 0)
+    try:
+        user = pwd.getpwuid(uid).pw_name
+    except KeyError:
+        user = str(uid)
+
+    return BrewProcess(
+        pid=pid,
+        command=command,
+        duration=f"{elapsed // 60}:{elapsed % 60:02d}",
+        user=user
+    )
+
+
 class BrewLockManager:
     """Manages Homebrew lock detection and recovery"""
 
-    def __init__(self):
+    def __init__(self, lock_dir: Optional[Path] = None):
         self.max_wait_time = 300  # 5 minutes max wait
-        self.check_interval = 5   # Check every 5 seconds
+        self.check_interval = 5   # Fallback recheck interval when no lock dir is found
+        self.lock_dir = lock_dir
+
+    def get_lock_dir(self) -> Optional[Path]:
+        """Get the brew lock directory, locating it on first use"""
+        if self.lock_dir is None:
+            self.lock_dir = get_brew_lock_dir()
+        return self.lock_dir
+
+    def _find_brew_processes_proc(self) -> List[BrewProcess]:
+        """Enumerate brew processes from /proc without spawning ps"""
+        try:
+            with open('/proc/uptime') as f:
+                uptime = float(f.read().split()[0])
+        except (OSError, ValueError, IndexError):
+            return []
+
+        clock_ticks = os.sysconf('SC_CLK_TCK')
+        own_pid = os.getpid()
+        processes = []
+        for name in os.listdir('/proc'):
+            if not name.isdigit() or int(name) == own_pid:
+                continue
+            process = _read_proc_process(int(name), clock_ticks, uptime)
+            if process:
+                processes.append(process)
+        return processes
 
     def find_brew_processes(self) -> List[BrewProcess]:
         """Find all running brew processes"""
+        if os.path.isdir('/proc/self'):
+            return self._find_brew_processes_proc()
+
         try:
             # Look for brew update, brew upgrade, brew install processes
             result = subprocess.run(
@@ -71,11 +359,30 @@ class BrewLockManager:
 
     def is_brew_locked(self) -> Tuple[bool, Optional[str]]:
         """
-        Check if brew is currently locked by testing a harmless command
+        Check if brew is currently locked by inspecting its lock files
+
+        Falls back to running a harmless brew command when the lock
+        directory can't be found.
 
         Returns:
             (is_locked, error_message)
         """
+        lock_dir = self.get_lock_dir()
+        if lock_dir is None:
+            return self._is_brew_locked_via_command()
+
+        holders = find_lock_holders(lock_dir)
+        if not holders:
+            return False, None
+
+        held = ', '.join(
+            f"{name} (PID {pid})" if pid else name
+            for name, pid in sorted(holders.items())
+        )
+        return True, f"Brew lock held: {held}"
+
+    def _is_brew_locked_via_command(self) -> Tuple[bool, Optional[str]]:
+        """Check the lock by running `brew --version` (slow, needs Ruby startup)"""
         try:
             # Try a quick, harmless brew command
             result = subprocess.run(
@@ -108,30 +415,53 @@ class BrewLockManager:
             True if unlocked, False if timeout
         """
         max_wait = max_wait or self.max_wait_time
-        start_time = time.time()
+        start_time = time.monotonic()
+        next_progress = 15
 
         print(f"⏳ Waiting for brew to become available (max {max_wait}s)...")
 
-        while time.time() - start_time < max_wait:
-            is_locked, error = self.is_brew_locked()
-
-            if not is_locked:
-                elapsed = int(time.time() - start_time)
-                print(f"✅ Brew became available after {elapsed}s")
-                return True
-
-            # Show progress every 15 seconds
-            elapsed = int(time.time() - start_time)
-            if elapsed > 0 and elapsed % 15 == 0:
-                processes = self.find_brew_processes()
-                if processes:
-                    print(f"⏳ Still waiting ({elapsed}s) - Found {len(processes)} brew processes")
-                    for proc in processes[:3]:  # Show first 3
-                        print(f"   PID {proc.pid}: {proc.command[:60]}...")
-                else:
-                    print(f"⏳ Still waiting ({elapsed}s) - No visible brew processes")
+        lock_dir = self.get_lock_dir()
+        watcher = _LockDirWatcher(lock_dir) if lock_dir and read_proc_locks() is not None else None
+        if watcher and watcher.fd is not None:
+            # Lock releases close the lock file, which inotify reports at once
+            recheck = 1.0
+        elif lock_dir:
+            # Flock probing is cheap enough to poll quickly
+            recheck = 0.2
+        else:
+            recheck = self.check_interval
 
-            time.sleep(self.check_interval)
+        try:
+            while True:
+                elapsed = time.monotonic() - start_time
+                is_locked, error = self.is_brew_locked()
+
+                if not is_locked:
+                    print(f"✅ Brew became available after {int(elapsed)}s")
+                    return True
+
+                if elapsed >= max_wait:
+                    break
+
+                # Show progress every 15 seconds
+                if elapsed >= next_progress:
+                    next_progress += 15
+                    processes = self.find_brew_processes()
+                    if processes:
+                        print(f"⏳ Still waiting ({int(elapsed)}s) - Found {len(processes)} brew processes")
+                        for proc in processes[:3]:  # Show first 3
+                            print(f"   PID {proc.pid}: {proc.command[:60]}...")
+                    else:
+                        print(f"⏳ Still waiting ({int(elapsed)}s) - {error}")
+
+                timeout = min(recheck, max_wait - elapsed)
+                if watcher:
+                    watcher.wait(timeout)
+                else:
+                    time.sleep(timeout)
+        finally:
+            if watcher:
+                watcher.close()
 
         print(f"⏰ Timeout after {max_wait}s - brew still locked")
         return False
@@ -177,25 +507,29 @@ class BrewLockManager:
         Exception handler: Clean up stale lock files when we encounter lock errors.
         Only called when lock issues actually occur (EAFP pattern).
         """
-        lock_file = '/opt/homebrew/var/homebrew/locks/update'
-        if os.path.exists(lock_file):
+        lock_dir = self.get_lock_dir()
+        if lock_dir is None:
+            return
+
+        lock_file = lock_dir / 'update'
+        if lock_file.exists():
             try:
-                # Check if any actual brew update processes are running
-                result = subprocess.run(['pgrep', '-f', 'brew.*update'],
-                                     capture_output=True, text=True)
-                if result.returncode != 0:  # No brew update processes found
+                # Only remove it if no process holds the lock
+                if 'update' not in find_lock_holders(lock_dir):
                     print(f"🔧 Exception handler: Removing stale lock file")
                     os.remove(lock_file)
                     print("✅ Stale lock cleaned up")
             except Exception as e:
                 print(f"⚠️ Failed to cleanup stale lock: {e}")
 
-    def execute_with_lock_detection(self, command: List[str]) -> subprocess.CompletedProcess:
+    def execute_with_lock_detection(self, command: List[str],
+                                    timeout: Optional[float] = 300) -> subprocess.CompletedProcess:
         """
         Execute brew command with lock error detection (no retry - just detect and raise)
 
         Args:
             command: Command to execute
+            timeout: Seconds before the command's process group is stopped
 
         Returns:
             subprocess.CompletedProcess result
@@ -211,26 +545,14 @@ class BrewLockManager:
             if needs_shell:
                 # Convert to shell string and use shell=True
                 cmd_str = ' '.join(command)
-                result = subprocess.run(
-                    cmd_str,
-                    capture_output=True,
-                    text=True,
-                    shell=True,
-                    timeout=300  # 5 minute timeout
-                )
+                result = run_command(cmd_str, timeout=timeout, shell=True)
             else:
                 # Use list form without shell
-                result = subprocess.run(
-                    command,
-                    capture_output=True,
-                    text=True,
-                    timeout=300  # 5 minute timeout
-                )
+                result = run_command(command, timeout=timeout)
 
             # Check for lock errors in stderr regardless of exit code
             error_output = result.stderr.strip()
-            if any(indicator in error_output.lower() for indicator in
-                   ['already locked', 'lockf:', 'another brew']):
+            if any(indicator in error_output.lower() for indicator in BREW_LOCK_INDICATORS):
                 # Raise specific error with exit code for justfile to handle
                 error_msg = f"Brew locked: {error_output}\n"
                 error_msg += "💡 Fix with: just doctor-fix-brew-lock"
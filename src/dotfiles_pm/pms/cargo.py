@@ -28,6 +28,11 @@ class CargoPM(PackageManager):
     def install_command(self) -> List[str]:
         return ["cargo", "install"]
 
+    @property
+    def check_mutates_state(self) -> bool:
+        # install-update refreshes the crates.io index
+        return True
+
     @property
     def requires_sudo(self) -> bool:
         return False
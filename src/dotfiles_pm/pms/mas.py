@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """Mac App Store Package Manager"""
 
-from typing import List
+from typing import List, Optional
 import sys
 from pathlib import Path
 
@@ -35,3 +35,7 @@ class MasPM(PackageManager):
     @property
     def priority(self) -> int:
         return 15  # Higher priority than npm/pip (system apps are important for security)
+
+    @property
+    def stall_timeout(self) -> Optional[float]:
+        return 1800  # App downloads report no progress to the log while they run
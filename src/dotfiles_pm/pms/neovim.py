@@ -28,6 +28,11 @@ class NeovimPM(PackageManager):
     def install_command(self) -> List[str]:
         return ["nvim", "--headless", "-c", "Lazy install", "-c", "qa"]
 
+    @property
+    def check_mutates_state(self) -> bool:
+        # Lazy check fetches every plugin remote
+        return True
+
     @property
     def requires_sudo(self) -> bool:
         return False
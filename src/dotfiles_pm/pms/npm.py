@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """NPM Package Manager (Node.js)"""
 
-from typing import List
+from typing import Dict, List, Optional
 import sys
 from pathlib import Path
 
@@ -35,3 +35,22 @@ class NpmPM(PackageManager):
     @property
     def priority(self) -> int:
         return 10
+
+    def prefetch_command(self, check_output: str) -> Optional[List[str]]:
+        # `npm outdated -g` table: Package Current Wanted Latest Location ...
+        specs = []
+        for line in check_output.splitlines():
+            columns = line.split()
+            if len(columns) >= 3 and columns[0] != 'Package' and columns[2][:1].isdigit():
+                specs.append(f"{columns[0]}@{columns[2]}")
+        return ["npm", "cache", "add", *specs] if specs else None
+
+    def outdated_packages(self, check_output: str) -> Optional[List[Dict[str, Optional[str]]]]:
+        packages = []
+        for line in check_output.splitlines():
+            columns = line.split()
+            if len(columns) >= 4 and columns[0] != 'Package':
+                packages.append({'name': columns[0],
+                                 'current': None if columns[1] == 'MISSING' else columns[1],
+                                 'latest': columns[3]})
+        return packages
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """Pacman Package Manager (MSYS2/Arch Linux)"""
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 import sys
 import os
 import platform
@@ -103,3 +103,7 @@ class PacmanPM(PackageManager):
     @property
     def priority(self) -> int:
         return 0
+
+    @property
+    def retry_patterns(self) -> Dict[str, List[str]]:
+        return {'lock': [r'unable to lock database']}
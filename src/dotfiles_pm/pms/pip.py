@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """Pip Package Manager (Python)"""
 
-from typing import List
+from typing import Dict, List, Optional
 import sys
 from pathlib import Path
 
@@ -20,6 +20,15 @@ class PipPM(PackageManager):
     def check_command(self) -> List[str]:
         return ["pip3", "list", "--outdated"]
 
+    def outdated_packages(self, check_output: str) -> Optional[List[Dict[str, Optional[str]]]]:
+        # Table: "Package Version Latest Type", a dashed rule, then one row per package
+        packages = []
+        for line in check_output.splitlines():
+            columns = line.split()
+            if len(columns) >= 3 and columns[0] != 'Package' and not columns[0].startswith('-'):
+                packages.append({'name': columns[0], 'current': columns[1], 'latest': columns[2]})
+        return packages
+
     @property
     def upgrade_command(self) -> List[str]:
         return ["pip3", "install", "--upgrade"]
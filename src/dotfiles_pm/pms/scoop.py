@@ -28,6 +28,11 @@ class ScoopPM(PackageManager):
     def install_command(self) -> List[str]:
         return ["scoop", "install"]
 
+    @property
+    def check_mutates_state(self) -> bool:
+        # scoop status updates the buckets
+        return True
+
     @property
     def requires_sudo(self) -> bool:
         return False
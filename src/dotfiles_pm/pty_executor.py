@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Inline PTY Executor
+
+Runs sudo-requiring package manager commands inside pseudo-terminals owned by
+the orchestrator instead of spawning a terminal window per PM. sudo password
+prompts from every PTY are answered from a single prompt on the controlling
+tty, so sudo PMs run concurrently after one authentication.
+
+Override with DOTFILES_SUDO_INLINE=true|false (default: auto, inline when
+stdin is a tty).
+"""
+
+import os
+import sys
+import re
+import select
+import signal
+import getpass
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Any, Optional
+
+# Unique prompt so we can tell sudo's password request apart from PM output
+SUDO_PROMPT_MARKER = '[dotfiles-pm] sudo password: '
+SUDO_RETRY_MARKER = 'Sorry, try again'
+
+# Enough trailing output to match a prompt split across reads
+_SCAN_WINDOW = 256
+
+
+def pty_available() -> bool:
+    """
+    Check whether sudo PMs should run inline in PTYs.
+
+    Returns:
+        True on POSIX when inline mode is forced or stdin is an interactive tty
+    """
+    if os.name != 'posix':
+        return False
+
+    mode = os.environ.get('DOTFILES_SUDO_INLINE', 'auto').lower()
+    if mode in ('false', '0', 'no', 'off'):
+        return False
+    if mode in ('true', '1', 'yes', 'on'):
+        return True
+    return sys.stdin.isatty()
+
+
+def prompt_tty_password(pm_name: str) -> Optional[str]:
+    """Ask for the sudo password on the controlling tty"""
+    try:
+        return getpass.getpass(f"\n🔐 sudo password required (first asked by {pm_name}): ")
+    except (EOFError, KeyboardInterrupt):
+        return None
+
+
+def sudo_needs_password() -> bool:
+    """Check whether sudo would ask for a password (-k ignores any cached ticket)"""
+    try:
+        return subprocess.run(['sudo', '-n', '-k', 'true'], stdin=subprocess.DEVNULL,
+                              capture_output=True, timeout=30).returncode != 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def _sudo_accepts(password: str) -> bool:
+    """Check a password against sudo without touching the PTYs"""
+    try:
+        return subprocess.run(['sudo', '-S', '-k', '-p', '', 'true'], input=password + '\n',
+                              capture_output=True, text=True, timeout=30).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+class SudoPasswordCache:
+    """
+    Holds the sudo password for the duration of one orchestration.
+
+    The provider is only called again if sudo rejects the cached password.
+    """
+
+    def __init__(self, provider: Callable[[str], Optional[str]]):
+        self._provider = provider
+        self._password: Optional[str] = None
+        self._declined = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def get(self, pm_name: str) -> Optional[str]:
+        """Get the cached password, prompting once if needed"""
+        with self._lock:
+            if self._password is None and not self._declined and not self._closed:
+                self._password = self._provider(pm_name)
+                self._declined = self._password is None
+            return self._password
+
+    def invalidate(self) -> None:
+        """Forget a password sudo rejected so the next prompt asks again"""
+        with self._lock:
+            self._password = None
+
+    def close(self) -> None:
+        """Stop prompting; later gets only return the password already held"""
+        with self._lock:
+            self._closed = True
+
+    def clear(self) -> None:
+        """Drop the password once all PTYs are done"""
+        with self._lock:
+            self._password = None
+            self._declined = False
+            self._closed = False
+
+
+@dataclass
+class PtyTask:
+    """A command running in a pseudo-terminal"""
+    pm: str
+    command: str
+    proc: subprocess.Popen
+    master_fd: int
+    log_file: str
+    output: bytearray = field(default_factory=bytearray)
+    scan: str = ''
+    password_attempts: int = 0
+    exit_code: Optional[int] = None
+
+
+def _make_controlling_tty() -> None:
+    """Child side: make the PTY slave (stdin) our controlling terminal so sudo can open /dev/tty"""
+    import fcntl
+    import termios
+    fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+
+
+class PtyExecutor:
+    """Run commands concurrently in PTYs and answer sudo prompts inline"""
+
+    MAX_PASSWORD_ATTEMPTS = 3
+
+    def __init__(self, password_provider: Callable[[str], Optional[str]] = prompt_tty_password,
+                 log_dir: Optional[Path] = None):
+        self.passwords = SudoPasswordCache(password_provider)
+        self.log_dir = log_dir or (Path.home() / '.dotfiles' / 'logs')
+        self._tasks: Dict[int, PtyTask] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def _spawn(self, pm: str, command: str, operation: str) -> PtyTask:
+        import pty
+
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+        safe_operation = re.sub(r'[^a-zA-Z0-9_-]+', '-', f"{pm}-{operation}").strip('-')
+        log_file = str(self.log_dir / f"{safe_operation}-{timestamp}.log")
+
+        env = os.environ.copy()
+        env['SUDO_PROMPT'] = SUDO_PROMPT_MARKER
+        env.setdefault('TERM', 'xterm-256color')
+
+        master_fd, slave_fd = pty.openpty()
+        try:
+            proc = subprocess.Popen(
+                ['sh', '-c', command],
+                stdin=slave_fd,
+                stdout=slave_fd,
+                stderr=slave_fd,
+                env=env,
+                start_new_session=True,
+                preexec_fn=_make_controlling_tty,
+                close_fds=True
+            )
+        finally:
+            os.close(slave_fd)
+
+        return PtyTask(pm=pm, command=command, proc=proc, master_fd=master_fd, log_file=log_file)
+
+    def collect_sudo_password(self, pm_name: str) -> bool:
+        """
+        Ask for the sudo password up front, before anything else prints.
+
+        The pump thread answers PTY prompts from the cache afterwards and
+        never prompts itself, so the password prompt can't interleave with
+        the orchestrator's progress output.
+
+        Returns:
+            True if sudo needs no password or an accepted one was entered
+        """
+        try:
+            if not sudo_needs_password():
+                return True
+            for _ in range(self.MAX_PASSWORD_ATTEMPTS):
+                password = self.passwords.get(pm_name)
+                if password is None:
+                    return False
+                if _sudo_accepts(password):
+                    return True
+                print("Sorry, try again.")
+                self.passwords.invalidate()
+            return False
+        finally:
+            self.passwords.close()
+
+    def start(self, commands: Dict[str, str], operation: str = 'check') -> None:
+        """
+        Launch all commands in PTYs and pump their output in the background.
+
+        Args:
+            commands: Mapping of pm_name -> shell command string
+            operation: Operation name used for log file naming
+        """
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+
+        # Spawn from the calling thread; only I/O happens in the background
+        for pm, command in commands.items():
+            task = self._spawn(pm, command, operation)
+            self._tasks[task.master_fd] = task
+
+        self._thread = threading.Thread(target=self._pump, name='pty-executor', daemon=True)
+        self._thread.start()
+
+    def _handle_output(self, task: PtyTask, data: bytes) -> None:
+        task.output.extend(data)
+        task.scan = (task.scan + data.decode('utf-8', errors='replace'))[-_SCAN_WINDOW:]
+
+        if SUDO_RETRY_MARKER in task.scan:
+            self.passwords.invalidate()
+            task.scan = task.scan.split(SUDO_RETRY_MARKER, 1)[1]
+
+        if SUDO_PROMPT_MARKER in task.scan:
+            task.scan = task.scan.split(SUDO_PROMPT_MARKER, 1)[1]
+            task.password_attempts += 1
+
+            password = None
+            if task.password_attempts <= self.MAX_PASSWORD_ATTEMPTS:
+                password = self.passwords.get(task.pm)
+
+            if password is None:
+                # No password available - don't leave sudo waiting forever
+                try:
+                    os.killpg(task.proc.pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+                return
+            os.write(task.master_fd, (password + '\n').encode())
+
+    def _pump(self) -> None:
+        """Single select loop over every PTY master"""
+        open_fds = set(self._tasks)
+
+        while open_fds:
+            ready, _, _ = select.select(list(open_fds), [], [], 0.5)
+            for fd in ready:
+                try:
+                    data = os.read(fd, 4096)
+                except OSError:
+                    # EIO once the child side of the PTY is closed (Linux)
+                    data = b''
+
+                if data:
+                    self._handle_output(self._tasks[fd], data)
+                else:
+                    open_fds.discard(fd)
+                    os.close(fd)
+
+        for task in self._tasks.values():
+            task.exit_code = task.proc.wait()
+
+    def _clean_output(self, task: PtyTask) -> str:
+        text = task.output.decode('utf-8', errors='replace')
+        text = text.replace('\r\n', '\n').replace(SUDO_PROMPT_MARKER, '')
+        return text.strip()
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Wait for all PTY commands to finish.
+
+        Returns:
+            Dict mapping pm_name -> {'exit_code', 'output', 'log_file', 'command'}
+        """
+        if self._thread:
+            self._thread.join(timeout)
+
+        results = {}
+        for task in self._tasks.values():
+            output = self._clean_output(task)
+            try:
+                Path(task.log_file).write_text(output + '\n')
+            except OSError:
+                pass
+
+            results[task.pm] = {
+                'exit_code': task.exit_code if task.exit_code is not None else -1,
+                'output': output,
+                'log_file': task.log_file,
+                'command': task.command
+            }
+
+        self.passwords.clear()
+        return results
+
+    def run(self, commands: Dict[str, str], operation: str = 'check') -> Dict[str, Dict[str, Any]]:
+        """Start all commands and wait for them to finish"""
+        self.start(commands, operation)
+        return self.wait()
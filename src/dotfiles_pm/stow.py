@@ -0,0 +1,815 @@
+#!/usr/bin/env python3
+"""
+Stow Engine
+
+Python replacement for running GNU Stow once per package. Reads the machine
+class stow.txt from the compiled machine class bundle (see pm_bundle), walks
+every configs/<package> tree in parallel, merges them into one global link
+plan and applies it in a single pass.
+
+Follows GNU Stow's conventions as used by scripts/stow/stow.sh:
+- `dot-` path segments become `.` (--dotfiles)
+- Directories are folded into one symlink unless the package's .stowrc has
+  --no-folding or another package contributes to the same directory
+- .stow-local-ignore replaces the default ignore list; --ignore entries in
+  configs/.stowrc always apply
+- Links are relative, so the repo can be reached through any path
+- Real files in the way are reported as conflicts, except shell_common's
+  shell startup files, which are moved to <name>.backup-<timestamp> like
+  stow.sh does (--backup moves every conflicting file aside, --no-backup
+  none)
+
+Restows are incremental: ~/.dotfiles/stow-manifest.json records each
+package's directory mtimes, entries and created links. Packages whose
+directories and links are unchanged are reused from the manifest instead of
+being walked and planned again, and links from packages that were removed
+or changed are cleaned up.
+
+Usage:
+    python3 -m src.dotfiles_pm.stow [--dry-run] [--backup | --no-backup] [--full] [packages...]
+"""
+
+import argparse
+import bisect
+import json
+import os
+import re
+import shlex
+import stat
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Pattern, Set, Tuple
+
+# Add current directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pm_bundle import load_bundle
+from pm_detect import get_machine_class_name
+from pm_utils import atomic_write
+
+DOTFILES_ROOT = Path(__file__).parent.parent.parent
+
+# GNU Stow's built-in ignore list, used when a package has no .stow-local-ignore
+DEFAULT_IGNORE = [
+    r'RCS', r'.+,v', r'CVS', r'\.\#.+', r'\.cvsignore', r'\.svn', r'_darcs', r'\.hg',
+    r'\.git', r'\.gitignore', r'\.gitmodules', r'.+~', r'\#.*\#',
+    r'^/README.*', r'^/LICENSE.*', r'^/COPYING',
+]
+
+# What happens to real files in the way: 'shell' moves aside only
+# SHELL_STARTUP_FILES for SHELL_PACKAGE (what stow.sh does), 'all' every
+# conflicting file, 'none' nothing; anything not moved is a conflict
+BACKUP_MODES = ('shell', 'all', 'none')
+SHELL_PACKAGE = 'shell_common'
+SHELL_STARTUP_FILES = ['.bashrc', '.bash_profile', '.profile', '.zshenv', '.zprofile', '.zlogin', '.zshrc']
+
+# Files whose post-stow permissions matter to the programs reading them
+PRIVATE_FILES = ['.ssh/config']
+
+# Per-package files that change how a package is stowed without touching its tree
+PACKAGE_RC_FILES = ['.stowrc', '.stow-local-ignore']
+
+MANIFEST_VERSION = 1
+MANIFEST_RECORD_KEYS = ('folding', 'dirs', 'rc_mtimes', 'entries', 'links', 'conflicted')
+
+
+@dataclass
+class IgnoreRules:
+    """Compiled ignore patterns for one package"""
+    suffixes: List[Pattern]
+    path_regexp: Optional[Pattern]
+    segment_regexp: Optional[Pattern]
+
+    def ignored(self, rel_path: str) -> bool:
+        """Check a package-relative path (untranslated, '/'-separated)"""
+        if rel_path.endswith('.stow-local-ignore'):
+            return True
+        if any(suffix.search(rel_path) for suffix in self.suffixes):
+            return True
+        if self.path_regexp and self.path_regexp.search('/' + rel_path):
+            return True
+        basename = rel_path.rsplit('/', 1)[-1]
+        return bool(self.segment_regexp and self.segment_regexp.search(basename))
+
+
+@dataclass
+class PackageTree:
+    """Result of walking one package"""
+    name: str
+    root: Path
+    folding: bool
+    # package-relative target path (translated) -> (source path, is_dir)
+    entries: Dict[str, Tuple[str, bool]] = field(default_factory=dict)
+    # package-relative source directory -> st_mtime_ns when it was scanned
+    dirs: Dict[str, int] = field(default_factory=dict)
+    rc_mtimes: Dict[str, Optional[int]] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class PlanNode:
+    """Merged view of one target path across all packages"""
+    is_dir: bool
+    sources: List[Tuple[str, str]] = field(default_factory=list)  # (package, source path)
+    foldable: bool = True
+    children: Dict[str, 'PlanNode'] = field(default_factory=dict)
+
+
+@dataclass
+class StowAction:
+    """One filesystem change"""
+    kind: str  # 'link', 'relink', 'unfold', 'mkdir', 'backup', 'unlink', 'rmdir'
+    target: str
+    source: Optional[str] = None
+    package: Optional[str] = None
+
+    def describe(self, home: str) -> str:
+        target = '~' + self.target[len(home):] if self.target.startswith(home) else self.target
+        if self.kind in ('link', 'relink'):
+            marker = '+' if self.kind == 'link' else '~'
+            return f"{marker} {target} -> {self.source}  [{self.package}]"
+        if self.kind == 'mkdir':
+            return f"+ {target}/"
+        if self.kind == 'unfold':
+            return f"~ {target}/ (unfold shared directory)"
+        if self.kind == 'unlink':
+            return f"- {target}  [{self.package}]"
+        if self.kind == 'rmdir':
+            return f"- {target}/ (if empty)"
+        return f"! {target} (backup existing)"
+
+
+@dataclass
+class StowPlan:
+    """Global link plan for all packages"""
+    target: str
+    actions: List[StowAction] = field(default_factory=list)
+    conflicts: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    packages: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    # target path -> (package, source path) for every link in place after applying
+    links: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    # packages with a path they could not link
+    conflicted: Set[str] = field(default_factory=set)
+    # packages taken from the manifest without rescanning
+    reused: List[str] = field(default_factory=list)
+    manifest: Optional['StowManifest'] = None
+
+
+@dataclass
+class StowManifest:
+    """What the last stow created, used to restow incrementally"""
+    target: str
+    configs: str
+    global_rc_mtime: Optional[int]
+    packages: Dict[str, dict] = field(default_factory=dict)
+
+
+def _parse_ignore_file(path: Path) -> List[str]:
+    """Read regexes from an ignore file, GNU Stow style"""
+    patterns = []
+    for line in path.read_text().splitlines():
+        line = re.sub(r'^#.*', '', line)
+        line = re.sub(r'\s+#.*', '', line).strip()
+        if line:
+            patterns.append(line)
+    return patterns
+
+
+def load_global_ignores(configs_dir: Path) -> List[str]:
+    """Read --ignore='...' entries from configs/.stowrc"""
+    stowrc = configs_dir / '.stowrc'
+    if not stowrc.exists():
+        return []
+
+    ignores = []
+    for line in stowrc.read_text().splitlines():
+        line = line.strip()
+        if line.startswith('--ignore='):
+            value = shlex.split(line[len('--ignore='):])
+            if value:
+                ignores.append(value[0])
+    return ignores
+
+
+def build_ignore_rules(package_dir: Path, global_ignores: List[str]) -> IgnoreRules:
+    """Compile ignore rules the way GNU Stow does"""
+    local = package_dir / '.stow-local-ignore'
+    patterns = _parse_ignore_file(local) if local.exists() else DEFAULT_IGNORE
+
+    path_patterns = [p for p in patterns if '/' in p]
+    segment_patterns = [p for p in patterns if '/' not in p]
+
+    return IgnoreRules(
+        suffixes=[re.compile(f"(?:{p})\\Z") for p in global_ignores],
+        path_regexp=re.compile(f"(^|/)({'|'.join(path_patterns)})(/|$)") if path_patterns else None,
+        segment_regexp=re.compile(f"^({'|'.join(segment_patterns)})$") if segment_patterns else None,
+    )
+
+
+def package_folds(package_dir: Path) -> bool:
+    """Packages opt out of directory folding with --no-folding in their .stowrc"""
+    stowrc = package_dir / '.stowrc'
+    try:
+        return 'no-folding' not in stowrc.read_text()
+    except OSError:
+        return True
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def translate_dotfile(name: str) -> str:
+    """Apply the --dotfiles convention to one path segment"""
+    if name.startswith('dot-') and len(name) > 4:
+        return '.' + name[4:]
+    return name
+
+
+def walk_package(configs_dir: Path, name: str, global_ignores: List[str]) -> PackageTree:
+    """
+    Walk one package tree.
+
+    Args:
+        configs_dir: Directory holding all packages
+        name: Package name
+        global_ignores: Suffix regexes from configs/.stowrc
+
+    Returns:
+        PackageTree with every non-ignored file and directory
+    """
+    root = configs_dir / name
+    tree = PackageTree(name=name, root=root, folding=package_folds(root))
+    if not root.is_dir():
+        tree.error = f"Package not found: {name}"
+        return tree
+
+    tree.rc_mtimes = {rc: _mtime_ns(root / rc) for rc in PACKAGE_RC_FILES}
+    rules = build_ignore_rules(root, global_ignores)
+    stack = [(str(root), '', '')]
+    while stack:
+        directory, rel, target_rel = stack.pop()
+        try:
+            # Before scanning, so a change made mid-scan shows up as a newer mtime
+            tree.dirs[rel] = os.stat(directory).st_mtime_ns
+            entries = list(os.scandir(directory))
+        except OSError as e:
+            tree.error = f"Cannot read {directory}: {e}"
+            continue
+
+        for entry in entries:
+            entry_rel = f"{rel}/{entry.name}" if rel else entry.name
+            if rules.ignored(entry_rel):
+                continue
+            entry_target = translate_dotfile(entry.name)
+            entry_target_rel = f"{target_rel}/{entry_target}" if target_rel else entry_target
+
+            is_dir = entry.is_dir(follow_symlinks=False)
+            tree.entries[entry_target_rel] = (entry.path, is_dir)
+            if is_dir:
+                stack.append((entry.path, entry_rel, entry_target_rel))
+
+    return tree
+
+
+def walk_packages(configs_dir: Path, packages: List[str], max_workers: int = 8) -> List[PackageTree]:
+    """Walk all packages concurrently, preserving stow.txt order"""
+    global_ignores = load_global_ignores(configs_dir)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda name: walk_package(configs_dir, name, global_ignores), packages))
+
+
+def merge_trees(trees: List[PackageTree], conflicts: List[str],
+                conflicted: Optional[Set[str]] = None) -> PlanNode:
+    """
+    Merge package trees into one target tree.
+
+    Two packages providing the same file, or a file where another package
+    has a directory, are conflicts; the first package in stow.txt wins and
+    the losing package is added to `conflicted`.
+    """
+    root = PlanNode(is_dir=True, foldable=False)
+
+    for tree in trees:
+        # Parents sort before children, so each node's parent exists when it is added
+        for target_rel in sorted(tree.entries, key=lambda p: p.count('/')):
+            source, is_dir = tree.entries[target_rel]
+            parts = target_rel.split('/')
+            parent = root
+            for part in parts[:-1]:
+                parent = parent.children.get(part)
+                if parent is None or not parent.is_dir:
+                    break
+            if parent is None or not parent.is_dir:
+                continue  # under a conflicting entry
+
+            existing = parent.children.get(parts[-1])
+            if existing is None:
+                parent.children[parts[-1]] = PlanNode(
+                    is_dir=is_dir, sources=[(tree.name, source)], foldable=tree.folding
+                )
+            elif is_dir and existing.is_dir:
+                # Shared directory: must be a real directory holding both packages' entries
+                existing.sources.append((tree.name, source))
+                existing.foldable = False
+            else:
+                conflicts.append(
+                    f"{target_rel}: {tree.name} conflicts with {existing.sources[0][0]}"
+                )
+                if conflicted is not None:
+                    conflicted.add(tree.name)
+
+    return root
+
+
+def _link_destination(path: str) -> Optional[str]:
+    """Absolute, normalized destination of a symlink (without resolving further links)"""
+    try:
+        dest = os.readlink(path)
+    except OSError:
+        return None
+    return os.path.normpath(os.path.join(os.path.dirname(path), dest))
+
+
+def _same_file(link_path: str, dest: str, source: str) -> bool:
+    if dest == source:
+        return True
+    return os.path.realpath(link_path) == os.path.realpath(source)
+
+
+class StowPlanner:
+    """
+    Turns a merged tree into filesystem actions against the target.
+
+    Paths provided only by `reused` packages are not inspected: their links
+    were verified against the manifest and are taken from `previous`, a
+    sorted list of (target path, package, source path).
+    """
+
+    def __init__(self, target: Path, configs_dir: Path, backup: str,
+                 reused: Optional[Set[str]] = None,
+                 previous: Optional[List[Tuple[str, str, str]]] = None):
+        self.target = str(target)
+        self.configs_real = os.path.realpath(configs_dir)
+        self.backup = backup
+        self.reused = reused or set()
+        self.previous = previous or []
+
+    def _owned(self, link_path: str, dest: str) -> bool:
+        """A symlink is ours if it points into the configs directory"""
+        prefix = self.configs_real + os.sep
+        if dest.startswith(prefix):
+            return True
+        return os.path.realpath(dest).startswith(prefix)
+
+    def plan(self, root: PlanNode, plan: StowPlan) -> None:
+        self._plan_children(root, self.target, plan, exists=True)
+
+    def _plan_children(self, node: PlanNode, target_dir: str, plan: StowPlan, exists: bool) -> None:
+        for name in sorted(node.children):
+            self._plan_node(node.children[name], os.path.join(target_dir, name), plan, exists)
+
+    def _replace_or_conflict(self, path: str, package: str, plan: StowPlan) -> bool:
+        """Handle a foreign file in the way; returns True if it will be moved aside"""
+        if self.backup == 'all' or (self.backup == 'shell' and package == SHELL_PACKAGE
+                                    and os.path.relpath(path, self.target) in SHELL_STARTUP_FILES):
+            plan.actions.append(StowAction('backup', path, package=package))
+            return True
+        plan.conflicts.append(f"{path}: existing target is not owned by stow [{package}]")
+        plan.conflicted.add(package)
+        return False
+
+    def _reuse(self, path: str, plan: StowPlan) -> None:
+        """Carry over the manifest's links at or below path"""
+        # Siblings like "<path>-old" sort between path and "<path>/", so look up both
+        for prefix, exact in ((path, True), (path + os.sep, False)):
+            i = bisect.bisect_left(self.previous, (prefix,))
+            while i < len(self.previous):
+                link_path, package, source = self.previous[i]
+                matches = link_path == prefix if exact else link_path.startswith(prefix)
+                if not matches:
+                    break
+                plan.links[link_path] = (package, source)
+                plan.unchanged += 1
+                i += 1
+
+    def _plan_node(self, node: PlanNode, path: str, plan: StowPlan, exists: bool) -> None:
+        package, source = node.sources[0]
+        if exists and self.reused and all(p in self.reused for p, _ in node.sources):
+            self._reuse(path, plan)
+            return
+
+        st = None
+        if exists:
+            try:
+                st = os.lstat(path)
+            except OSError:
+                st = None
+        fold = node.is_dir and node.foldable and len(node.sources) == 1
+        links_whole = not node.is_dir or fold
+
+        if st is None:
+            self._plan_new(node, path, plan, fold)
+            return
+
+        if stat.S_ISLNK(st.st_mode):
+            dest = _link_destination(path)
+            if links_whole and dest and _same_file(path, dest, source):
+                plan.unchanged += 1
+                plan.links[path] = (package, source)
+                return
+            if dest and self._owned(path, dest):
+                if links_whole:
+                    plan.actions.append(StowAction('relink', path, source, package))
+                    plan.links[path] = (package, source)
+                else:
+                    # Folded by an earlier stow but now shared or no-folding: split it up
+                    plan.actions.append(StowAction('unfold', path, package=package))
+                    self._plan_children(node, path, plan, exists=False)
+                return
+            if self._replace_or_conflict(path, package, plan):
+                self._plan_new(node, path, plan, fold)
+            return
+
+        if node.is_dir and stat.S_ISDIR(st.st_mode):
+            # Existing real directory: stow into it
+            self._plan_children(node, path, plan, exists=True)
+            return
+
+        if self._replace_or_conflict(path, package, plan):
+            self._plan_new(node, path, plan, fold)
+
+    def _plan_new(self, node: PlanNode, path: str, plan: StowPlan, fold: bool) -> None:
+        package, source = node.sources[0]
+        if not node.is_dir or fold:
+            plan.actions.append(StowAction('link', path, source, package))
+            plan.links[path] = (package, source)
+        else:
+            plan.actions.append(StowAction('mkdir', path, package=package))
+            self._plan_children(node, path, plan, exists=False)
+
+
+def read_stow_list(stow_file: Path) -> List[str]:
+    """Read package names from stow.txt, skipping blanks and comments"""
+    packages = []
+    for line in stow_file.read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            packages.append(line)
+    return packages
+
+
+def get_stow_file(machine_class: Optional[str] = None, dotfiles_root: Path = DOTFILES_ROOT) -> Optional[Path]:
+    """Get machine-classes/<class>/stow/stow.txt for the configured machine class"""
+    machine_class = machine_class or get_machine_class_name()
+    if not machine_class:
+        return None
+    return dotfiles_root / 'machine-classes' / machine_class / 'stow' / 'stow.txt'
+
+
+def get_manifest_path() -> Path:
+    """Get the path of the incremental stow manifest"""
+    return Path.home() / '.dotfiles' / 'stow-manifest.json'
+
+
+def load_manifest(path: Path, configs_dir: Path, target: Path) -> Optional[StowManifest]:
+    """
+    Load the manifest written by the last stow.
+
+    Returns None when there is none, it is unreadable, or it was written for
+    another configs/target pair or a different configs/.stowrc.
+    """
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != MANIFEST_VERSION:
+        return None
+
+    configs_dir = configs_dir.absolute()
+    target = target.absolute()
+    if data.get('configs') != str(configs_dir) or data.get('target') != str(target):
+        return None
+    global_rc_mtime = _mtime_ns(configs_dir / '.stowrc')
+    if data.get('global_rc_mtime') != global_rc_mtime:
+        return None
+
+    packages = data.get('packages')
+    if not isinstance(packages, dict):
+        return None
+    return StowManifest(
+        target=str(target),
+        configs=str(configs_dir),
+        global_rc_mtime=global_rc_mtime,
+        packages={name: record for name, record in packages.items()
+                  if isinstance(record, dict) and all(key in record for key in MANIFEST_RECORD_KEYS)},
+    )
+
+
+def save_manifest(manifest: StowManifest, path: Path) -> None:
+    """Write the manifest atomically"""
+    atomic_write(path, json.dumps({
+        'version': MANIFEST_VERSION,
+        'target': manifest.target,
+        'configs': manifest.configs,
+        'global_rc_mtime': manifest.global_rc_mtime,
+        'packages': manifest.packages,
+    }))
+
+
+def package_unchanged(record: dict, configs_dir: Path, target: Path, name: str) -> bool:
+    """
+    Check a manifest record against the package tree and the target.
+
+    A package is unchanged when none of its directories or rc files have a
+    new mtime (adding, removing or renaming an entry updates the directory),
+    every link it created still points at its source, and it had no
+    conflicts last time.
+    """
+    if record.get('conflicted'):
+        return False
+
+    root = configs_dir / name
+    for rel, mtime in record['dirs'].items():
+        if _mtime_ns(root / rel if rel else root) != mtime:
+            return False
+    for rc, mtime in record['rc_mtimes'].items():
+        if _mtime_ns(root / rc) != mtime:
+            return False
+
+    for rel, source in record['links'].items():
+        path = os.path.join(target, rel)
+        dest = _link_destination(path)
+        if dest is None or not _same_file(path, dest, os.path.join(configs_dir, source)):
+            return False
+    return True
+
+
+def tree_from_record(record: dict, configs_dir: Path, name: str) -> PackageTree:
+    """Rebuild a package's walk result from its manifest record"""
+    root = configs_dir / name
+    return PackageTree(
+        name=name,
+        root=root,
+        folding=record['folding'],
+        entries={rel: (os.path.join(root, source), is_dir)
+                 for rel, (source, is_dir) in record['entries'].items()},
+        dirs=record['dirs'],
+        rc_mtimes=record['rc_mtimes'],
+    )
+
+
+def _package_record(tree: PackageTree, plan: StowPlan, configs_dir: Path) -> dict:
+    root = str(tree.root) + os.sep
+    configs = str(configs_dir) + os.sep
+    target = plan.target + os.sep
+    return {
+        'folding': tree.folding,
+        'dirs': tree.dirs,
+        'rc_mtimes': tree.rc_mtimes,
+        'entries': {rel: [source[len(root):], is_dir] for rel, (source, is_dir) in tree.entries.items()},
+        'links': {path[len(target):]: source[len(configs):]
+                  for path, (package, source) in plan.links.items() if package == tree.name},
+        'conflicted': tree.name in plan.conflicted,
+    }
+
+
+def _plan_cleanup(manifest: StowManifest, stale: List[str], plan: StowPlan, configs_dir: Path) -> List[StowAction]:
+    """
+    Unlink what stale packages created that the new plan no longer links.
+
+    Directories those packages provided are removed afterwards if the new
+    plan doesn't need them and they end up empty.
+    """
+    target = plan.target
+    action_targets = {action.target for action in plan.actions}
+    needed = {action.target for action in plan.actions if action.kind in ('mkdir', 'unfold')}
+    for path in plan.links:
+        parent = os.path.dirname(path)
+        while parent.startswith(target + os.sep) and parent not in needed:
+            needed.add(parent)
+            parent = os.path.dirname(parent)
+
+    unlinks = []
+    rmdirs = set()
+    configs_real = os.path.realpath(configs_dir) + os.sep
+    for name in stale:
+        record = manifest.packages[name]
+        for rel, source in record['links'].items():
+            path = os.path.join(target, rel)
+            if path in plan.links or path in action_targets:
+                continue
+            dest = _link_destination(path)
+            if dest and _same_file(path, dest, os.path.join(configs_dir, source)):
+                unlinks.append(StowAction('unlink', path, package=name))
+
+        for rel, (_, is_dir) in record['entries'].items():
+            path = os.path.join(target, rel)
+            if (is_dir and path not in needed and os.path.isdir(path)
+                    and not os.path.realpath(path).startswith(configs_real)):
+                rmdirs.add(path)
+
+    # Deepest first, so parents are empty by the time they are reached
+    return unlinks + [StowAction('rmdir', path)
+                      for path in sorted(rmdirs, key=lambda p: p.count(os.sep), reverse=True)]
+
+
+def build_plan(packages: List[str], configs_dir: Path, target: Path, backup: str = 'shell',
+               manifest: Optional[StowManifest] = None) -> StowPlan:
+    """
+    Compute the global link plan for a list of packages.
+
+    Args:
+        packages: Package names in stow.txt order
+        configs_dir: Directory holding the packages
+        target: Directory links are created in (normally $HOME)
+        backup: Which conflicting files to move aside instead of reporting (see BACKUP_MODES)
+        manifest: Manifest from the last stow; unchanged packages are reused
+            from it instead of being rescanned
+
+    Returns:
+        StowPlan with ordered actions, any conflicts and the manifest to save
+    """
+    configs_dir = configs_dir.absolute()
+    target = target.absolute()
+    plan = StowPlan(target=str(target))
+
+    previous_packages = manifest.packages if manifest else {}
+    reused = {
+        name for name in packages
+        if name in previous_packages
+        and package_unchanged(previous_packages[name], configs_dir, target, name)
+    }
+    walked = iter(walk_packages(configs_dir, [name for name in packages if name not in reused]))
+    trees = [tree_from_record(previous_packages[name], configs_dir, name) if name in reused else next(walked)
+             for name in packages]
+
+    for tree in trees:
+        if tree.error:
+            plan.errors.append(tree.error)
+        else:
+            plan.packages.append(tree.name)
+    plan.reused = [name for name in packages if name in reused]
+
+    previous = sorted(
+        (os.path.join(target, rel), name, os.path.join(configs_dir, source))
+        for name in reused
+        for rel, source in previous_packages[name]['links'].items()
+    )
+    root = merge_trees([t for t in trees if not t.error], plan.conflicts, plan.conflicted)
+    StowPlanner(target, configs_dir, backup, reused, previous).plan(root, plan)
+
+    stale = [name for name in previous_packages if name not in reused]
+    if stale:
+        plan.actions[:0] = _plan_cleanup(manifest, stale, plan, configs_dir)
+
+    plan.manifest = StowManifest(
+        target=str(target),
+        configs=str(configs_dir),
+        global_rc_mtime=_mtime_ns(configs_dir / '.stowrc'),
+        packages={tree.name: _package_record(tree, plan, configs_dir) for tree in trees if not tree.error},
+    )
+    return plan
+
+
+def apply_plan(plan: StowPlan) -> List[str]:
+    """
+    Apply planned actions in order.
+
+    Returns:
+        List of error messages for actions that failed
+    """
+    errors = []
+    timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    for action in plan.actions:
+        try:
+            if action.kind == 'backup':
+                os.rename(action.target, f"{action.target}.backup-{timestamp}")
+            elif action.kind == 'mkdir':
+                os.mkdir(action.target)
+            elif action.kind == 'unfold':
+                os.unlink(action.target)
+                os.mkdir(action.target)
+            elif action.kind == 'relink':
+                os.unlink(action.target)
+                os.symlink(os.path.relpath(action.source, os.path.dirname(action.target)), action.target)
+            elif action.kind == 'link':
+                os.symlink(os.path.relpath(action.source, os.path.dirname(action.target)), action.target)
+            elif action.kind == 'unlink':
+                os.unlink(action.target)
+            elif action.kind == 'rmdir':
+                try:
+                    os.rmdir(action.target)
+                except OSError:
+                    pass  # still holds files stow doesn't manage
+        except OSError as e:
+            errors.append(f"{action.kind} {action.target}: {e}")
+
+    # SSH refuses configs other users can write
+    for rel in PRIVATE_FILES:
+        private = os.path.join(plan.target, rel)
+        if os.path.exists(private):
+            try:
+                os.chmod(os.path.realpath(private), 0o600)
+            except OSError as e:
+                errors.append(f"chmod {private}: {e}")
+
+    return errors
+
+
+def _write_log(lines: List[str]) -> Path:
+    log_dir = Path.home() / '.dotfiles' / 'logs'
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_file = log_dir / f"stow-{datetime.now().strftime('%Y%m%d-%H%M%S')}.log"
+    log_file.write_text('\n'.join(lines) + '\n')
+    return log_file
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI entry point for stowing configs."""
+    import time
+
+    parser = argparse.ArgumentParser(description='Stow dotfiles configs into the home directory')
+    parser.add_argument('packages', nargs='*', help='Packages to stow (default: machine class stow.txt)')
+    parser.add_argument('--dry-run', '-n', action='store_true', help='Show planned changes without applying them')
+    backup = parser.add_mutually_exclusive_group()
+    backup.add_argument('--backup', dest='backup', action='store_const', const='all', default='shell',
+                        help='Back up every conflicting file (default: only shell_common startup files)')
+    backup.add_argument('--no-backup', dest='backup', action='store_const', const='none',
+                        help='Report every conflict, including shell startup files')
+    parser.add_argument('--full', action='store_true', help='Ignore the manifest and rescan every package')
+    parser.add_argument('--machine-class', help='Machine class to read stow.txt from')
+    parser.add_argument('--target', type=Path, default=Path.home(), help='Target directory (default: ~)')
+    parser.add_argument('--configs', type=Path, default=DOTFILES_ROOT / 'configs', help='Configs directory')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    packages = args.packages
+    if not packages:
+        stow_file = get_stow_file(args.machine_class)
+        if stow_file is None:
+            print("❌ Machine class not configured. Run: just configure")
+            return 1
+        bundle = load_bundle(args.machine_class)
+        if bundle is None or bundle['stow'] is None:
+            print(f"❌ Stow configuration file not found: {stow_file}")
+            return 1
+        packages = bundle['stow']
+
+    print(f"🔗 Stowing {len(packages)} packages into {args.target}...")
+    manifest_path = get_manifest_path()
+    manifest = None if args.full else load_manifest(manifest_path, args.configs, args.target)
+    plan = build_plan(packages, args.configs, args.target, backup=args.backup, manifest=manifest)
+    if plan.reused:
+        print(f"♻️  {len(plan.reused)} packages unchanged since last stow, "
+              f"{len(plan.packages) - len(plan.reused)} rescanned")
+
+    home = str(args.target)
+    lines = [action.describe(home) for action in plan.actions]
+    lines += [f"⚠️  conflict: {conflict}" for conflict in plan.conflicts]
+    lines += [f"⚠️  {error}" for error in plan.errors]
+
+    if args.dry_run:
+        for line in lines:
+            print(f"   {line}")
+        print()
+        print(f"📋 Dry run: {len(plan.actions)} changes, {plan.unchanged} links already in place, "
+              f"{len(plan.conflicts)} conflicts")
+        return 1 if plan.conflicts else 0
+
+    errors = apply_plan(plan)
+    lines += [f"❌ {error}" for error in errors]
+    # Links that failed to apply fail verification next time, so the manifest is saved regardless
+    save_manifest(plan.manifest, manifest_path)
+    log_file = _write_log(lines)
+    elapsed = time.perf_counter() - start
+
+    print()
+    print("📊 Stow summary")
+    print(f"   • Packages:  {len(plan.packages)}")
+    print(f"   • Changes:   {len(plan.actions)}")
+    print(f"   • Unchanged: {plan.unchanged}")
+    if plan.conflicts or errors:
+        print(f"   • Problems:  {len(plan.conflicts) + len(errors)}")
+        for problem in (plan.conflicts + errors)[:10]:
+            print(f"     - {problem}")
+        print()
+        print("💡 For diagnostics and fixes:")
+        print("   just doctor-check-health")
+    print()
+    print(f"✅ Stow completed in {elapsed:.2f}s")
+    print(f"📝 Stow session logged to: {log_file}")
+
+    return 1 if plan.conflicts or errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
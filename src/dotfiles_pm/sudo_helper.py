@@ -10,13 +10,34 @@ dialog and piped directly to sudo — same security model as pkexec/polkit.
 - Linux: ssh-askpass or similar installed helper
 
 Override with DOTFILES_SUDO_MODE=gui|tty|skip
+
+SudoSession asks for the password once before a multi-PM run and keeps the
+sudo timestamp fresh until the run finishes. sudo tickets are per tty, so
+commands spawned in their own terminals get the password through a
+session askpass helper instead of prompting again. Refresh interval can be
+set with DOTFILES_SUDO_KEEPALIVE=<seconds> (default: 60).
 """
 
+import getpass
+import hmac
 import os
 import platform
+import secrets
+import shlex
 import shutil
+import socket
 import stat
+import subprocess
+import sys
+import tempfile
+import threading
 from pathlib import Path
+from typing import Optional
+
+# sudo's default timestamp_timeout is 5 minutes; refresh well inside that
+DEFAULT_KEEPALIVE_INTERVAL = 60
+
+MAX_PASSWORD_ATTEMPTS = 3
 
 
 def _has_display() -> bool:
@@ -118,5 +139,262 @@ def wrap_command_with_askpass(command: str) -> str:
     if not env_vars:
         return command
 
-    exports = ' '.join(f'export {k}="{v}";' for k, v in env_vars.items())
+    # A SudoSession's askpass, already in the environment, answers without a dialog
+    exports = ' '.join(f'export {k}="${{{k}:-{v}}}";' for k, v in env_vars.items())
     return f'{exports} {command}'
+
+
+def get_keepalive_interval() -> int:
+    """Get the sudo keepalive refresh interval in seconds."""
+    try:
+        interval = int(os.environ.get('DOTFILES_SUDO_KEEPALIVE', DEFAULT_KEEPALIVE_INTERVAL))
+    except ValueError:
+        return DEFAULT_KEEPALIVE_INTERVAL
+    return max(interval, 1)
+
+
+class SudoSession:
+    """
+    Authenticate sudo once and keep the credential alive for a whole run.
+
+    The password is asked for once (askpass dialog in gui mode, the tty
+    otherwise), checked with `sudo -S -v` and held in memory until stop().
+    The orchestrator process refreshes its own timestamp on a background
+    thread. Commands spawned in other terminals get their own timestamp
+    (sudo tickets are per tty), so wrap_command() points them at a session
+    askpass helper, which fetches the password over a private Unix socket,
+    and at a sudo shim that passes -A. They never prompt again.
+
+    With passwordless sudo nothing is held and spawned commands are only
+    given the refresh loop.
+
+    Usage:
+        with SudoSession() as session:
+            ...  # run PM upgrades
+    """
+
+    def __init__(self, mode: Optional[str] = None, interval: Optional[int] = None):
+        self.mode = mode or get_sudo_mode()
+        self.interval = interval or get_keepalive_interval()
+        self.authenticated = False
+        self.expired = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._password: Optional[str] = None
+        self._askpass_dir: Optional[Path] = None
+        self._askpass_server: Optional[socket.socket] = None
+        self._token = ''
+
+    def _run_sudo(self, *args: str, password: Optional[str] = None) -> bool:
+        try:
+            result = subprocess.run(['sudo', *args], capture_output=True, timeout=120,
+                                    input=None if password is None else (password + '\n').encode())
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return result.returncode == 0
+
+    def is_valid(self) -> bool:
+        """Check for a cached sudo credential without prompting."""
+        return self._run_sudo('-n', 'true')
+
+    def _read_password(self) -> Optional[str]:
+        """Ask for the password through the askpass dialog (gui) or on the tty."""
+        askpass = get_sudo_askpass_env().get('SUDO_ASKPASS') if self.mode == 'gui' else None
+        if askpass:
+            try:
+                result = subprocess.run([askpass], capture_output=True, text=True, timeout=300)
+            except (OSError, subprocess.TimeoutExpired):
+                return None
+            return result.stdout.rstrip('\n') if result.returncode == 0 else None
+        if not sys.stdin.isatty():
+            # No way to ask for a password - leave prompting to the PMs
+            return None
+        try:
+            return getpass.getpass("🔐 sudo password for this run: ")
+        except (EOFError, KeyboardInterrupt):
+            return None
+
+    def _validate(self, password: str) -> bool:
+        """Check a password with sudo, refreshing this process's timestamp."""
+        return self._run_sudo('-S', '-p', '', '-v', password=password)
+
+    def authenticate(self) -> bool:
+        """
+        Validate sudo up front, prompting via askpass (gui) or the tty.
+
+        A ticket this process already has is not enough: spawned terminals
+        can't use it, so the password is asked for unless sudo needs none.
+
+        Returns:
+            True if sudo credentials are cached afterwards
+        """
+        if self.mode == 'skip' or not shutil.which('sudo'):
+            return False
+
+        # -k with a command ignores cached tickets: only succeeds for NOPASSWD
+        if self._run_sudo('-n', '-k', 'true'):
+            self.authenticated = True
+            return True
+
+        # Drop any ticket so the password is really checked
+        self._run_sudo('-k')
+        for _ in range(MAX_PASSWORD_ATTEMPTS):
+            password = self._read_password()
+            if password is None:
+                break
+            if self._validate(password):
+                self._password = password
+                self.authenticated = True
+                break
+            print("❌ Sorry, try again.")
+
+        return self.authenticated
+
+    def _keepalive(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self._run_sudo('-n', '-v'):
+                continue
+            if self._password is not None and self._validate(self._password):
+                continue
+            # Credential revoked or the password changed - a refresh can't bring it back
+            self.expired = True
+            return
+
+    def _start_askpass(self) -> None:
+        """Serve the password to spawned commands' sudo through a private socket."""
+        self._askpass_dir = Path(tempfile.mkdtemp(prefix='dotfiles-sudo-'))
+        self._token = secrets.token_hex(16)
+        sock_path = self._askpass_dir / 'askpass.sock'
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(sock_path))
+        server.listen(8)
+        self._askpass_server = server
+
+        helper = self._askpass_dir / 'askpass'
+        helper.write_text(
+            '#!/bin/sh\n'
+            f'DOTFILES_SUDO_SOCKET={shlex.quote(str(sock_path))} DOTFILES_SUDO_TOKEN={self._token} '
+            f'exec {shlex.quote(sys.executable)} {shlex.quote(str(Path(__file__).resolve()))} askpass\n'
+        )
+        # PMs call plain sudo, which only uses askpass when given -A; leave -n alone
+        sudo = shlex.quote(shutil.which('sudo') or 'sudo')
+        shim = self._askpass_dir / 'bin' / 'sudo'
+        shim.parent.mkdir()
+        shim.write_text(f'#!/bin/sh\n[ "$1" = -n ] && exec {sudo} "$@"\nexec {sudo} -A "$@"\n')
+        for path in (helper, shim):
+            path.chmod(stat.S_IRWXU)
+
+        threading.Thread(target=self._serve_askpass, args=(server,), name='sudo-askpass', daemon=True).start()
+
+    def _serve_askpass(self, server: socket.socket) -> None:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                # Closed by stop()
+                return
+            with conn:
+                try:
+                    conn.settimeout(5)
+                    request = b''
+                    while b'\n' not in request and len(request) < 256:
+                        chunk = conn.recv(256)
+                        if not chunk:
+                            break
+                        request += chunk
+                    password = self._password
+                    if password is not None and hmac.compare_digest(request.strip(), self._token.encode()):
+                        conn.sendall((password + '\n').encode())
+                except OSError:
+                    pass
+
+    def start(self) -> bool:
+        """
+        Authenticate and start the background keepalive.
+
+        Returns:
+            True if the session is authenticated and being kept alive
+        """
+        if not self.authenticate():
+            return False
+
+        if self._password is not None:
+            self._start_askpass()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._keepalive, name='sudo-keepalive', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        """Stop the keepalive and forget the password; the cached credential then expires normally."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._askpass_server:
+            self._askpass_server.close()
+            self._askpass_server = None
+        if self._askpass_dir:
+            shutil.rmtree(self._askpass_dir, ignore_errors=True)
+            self._askpass_dir = None
+        self._password = None
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and not self.expired
+
+    def wrap_command(self, command: str) -> str:
+        """
+        Prepare a shell command spawned in its own terminal to use this session.
+
+        Its sudo calls get the password from the session askpass helper, so
+        the terminal never prompts, and a refresh loop tied to its lifetime
+        keeps the ticket sudo then creates fresh between askpass calls.
+        Output is discarded so the loop never holds the log pipe open.
+        """
+        if not self.active:
+            return command
+
+        askpass = ''
+        if self._askpass_dir:
+            askpass = (f"export SUDO_ASKPASS={shlex.quote(str(self._askpass_dir / 'askpass'))} "
+                       f"PATH={shlex.quote(str(self._askpass_dir / 'bin'))}:\"$PATH\"; ")
+        keepalive = (
+            f"( while sleep {self.interval}; do kill -0 $$ || exit; sudo -n -v; done ) >/dev/null 2>&1 & "
+            "_dotfiles_sudo_keepalive=$!; "
+            "trap 'kill $_dotfiles_sudo_keepalive 2>/dev/null' EXIT; "
+        )
+        return askpass + keepalive + command
+
+    def __enter__(self) -> 'SudoSession':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+def askpass_main() -> int:
+    """SUDO_ASKPASS helper run by a session's spawned commands: print the session password."""
+    path = os.environ.get('DOTFILES_SUDO_SOCKET')
+    token = os.environ.get('DOTFILES_SUDO_TOKEN')
+    if not path or not token:
+        return 1
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(10)
+            client.connect(path)
+            client.sendall(token.encode() + b'\n')
+            reply = b''
+            while chunk := client.recv(4096):
+                reply += chunk
+    except OSError:
+        return 1
+    if not reply:
+        return 1
+    sys.stdout.write(reply.decode())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(askpass_main() if sys.argv[1:] == ['askpass'] else 2)
@@ -3,13 +3,17 @@
 Terminal Executor Module
 
 Handles spawning commands in terminal windows for interactive operations.
-Designed to be extensible for future tmux integration.
+Inside tmux, commands run as panes of a single window driven over one
+tmux control-mode connection.
 """
 
 import os
 import sys
 import subprocess
 import shutil
+import shlex
+import threading
+import atexit
 import time
 import json
 from datetime import datetime
@@ -18,6 +22,12 @@ from dataclasses import dataclass, asdict
 from typing import Dict, Any, Optional, Tuple, List, Literal
 from pathlib import Path
 
+# Add current directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from tracked_status import check_tracked, stall_limit, tracked_env
+from login_env import login_env_prefix
+
 
 @dataclass
 class TerminalSpawnResult:
@@ -49,6 +59,7 @@ class TerminalSpawnResult:
     status_file: Optional[str] = None # Tracked execution
     operation: Optional[str] = None  # Tracked execution
     exit_code: Optional[int] = None  # Test mode
+    channel: Optional[str] = None    # Tmux: wait-for channel signalled on exit
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dict for legacy compatibility"""
@@ -106,7 +117,8 @@ class TerminalExecutor(ABC):
         """
         pass
 
-    def spawn_tracked(self, command: str, operation: str, auto_close: bool = False) -> TerminalSpawnResult:
+    def spawn_tracked(self, command: str, operation: str, auto_close: bool = False,
+                      timeout: Optional[float] = None, stall_timeout: Optional[float] = None) -> TerminalSpawnResult:
         """
         Spawn command with logging and status tracking.
 
@@ -114,11 +126,15 @@ class TerminalExecutor(ABC):
             command: Command to execute
             operation: Name of operation (e.g., 'brew-upgrade')
             auto_close: Auto-close terminal on success
+            timeout: Seconds before check_status() kills the command (None for no limit)
+            stall_timeout: Seconds without output before check_status() kills the
+                command (None for DOTFILES_PM_STALL_TIMEOUT, 0 to disable)
 
         Returns:
             Dict with status, log_file, and status_file paths
         """
-        tracked_cmd, log_file, status_file = self.create_tracked_command(command, operation, auto_close)
+        tracked_cmd, log_file, status_file = self.create_tracked_command(
+            command, operation, auto_close, timeout=timeout, stall_timeout=stall_timeout)
         result = self.spawn(tracked_cmd, title=operation)
 
         # Enhance result with tracking info
@@ -145,7 +161,9 @@ class TerminalExecutor(ABC):
 
         return tracked_result
 
-    def create_tracked_command(self, base_cmd: str, operation: str, auto_close: bool = False) -> Tuple[str, str, str]:
+    def create_tracked_command(self, base_cmd: str, operation: str, auto_close: bool = False,
+                               timeout: Optional[float] = None,
+                               stall_timeout: Optional[float] = None) -> Tuple[str, str, str]:
         """
         Create command with logging and status tracking using wrapper script.
 
@@ -153,6 +171,8 @@ class TerminalExecutor(ABC):
             base_cmd: Base command to execute
             operation: Operation name for file naming
             auto_close: Auto-close terminal on success
+            timeout: Overall limit recorded in the status file
+            stall_timeout: No-output limit recorded in the status file
 
         Returns:
             Tuple of (tracked_command, log_file_path, status_file_path)
@@ -187,7 +207,12 @@ class TerminalExecutor(ABC):
         wrapper_script = str(wrapper_script)
 
         auto_close_arg = 'true' if auto_close else 'false'
-        tracked_cmd = f'{wrapper_script} "{operation}" "{base_cmd}" "{log_file}" "{status_file}" {auto_close_arg}; exit'
+        # Captured once per session so wrappers don't each start a login shell
+        env = login_env_prefix() + tracked_env(timeout, stall_timeout)
+        # Every argument quoted: base_cmd is often itself a shlex-quoted wrapper
+        # (pm_lock, pm_retry, sudo keepalive) that must reach run_tracked.sh intact
+        args = ' '.join(shlex.quote(arg) for arg in (wrapper_script, operation, base_cmd, log_file, status_file))
+        tracked_cmd = f'{env}{args} {auto_close_arg}; exit'
 
         return tracked_cmd, log_file, status_file
 
@@ -195,19 +220,30 @@ class TerminalExecutor(ABC):
         """
         Check the status of a tracked operation.
 
+        Running operations are also checked against their timeout and stall
+        limits; a command that exceeded one is killed and reported as an
+        error with a 'reason' of 'timeout', 'stalled' or 'wrapper_lost'.
+
         Args:
             status_file: Path to status file
 
         Returns:
             Dict with status information or None if not found
         """
-        try:
-            status_path = Path(status_file)
-            if status_path.exists():
-                return json.loads(status_path.read_text())
-            return {'status': 'running'}
-        except Exception as e:
-            return {'status': 'error', 'error': str(e)}
+        return check_tracked(status_file)
+
+    def wait_for_change(self, operations: List[Dict[str, Any]], timeout: float = 1.0) -> None:
+        """
+        Pause a polling loop until one of the operations may have finished.
+
+        Executors that can't tell when a command exits just sleep for the
+        timeout; check_status() remains the source of truth either way.
+
+        Args:
+            operations: Spawn results still being polled
+            timeout: Longest pause in seconds
+        """
+        time.sleep(timeout)
 
     def close_terminal(self, terminal_info: Dict[str, Any]) -> bool:
         """
@@ -641,11 +677,15 @@ class WindowsTerminalExecutor(TerminalExecutor):
         """Cannot close terminals on Windows yet"""
         return 0
 
-    def create_tracked_command(self, base_cmd: str, operation: str, auto_close: bool = False) -> Tuple[str, str, str]:
+    def create_tracked_command(self, base_cmd: str, operation: str, auto_close: bool = False,
+                               timeout: Optional[float] = None,
+                               stall_timeout: Optional[float] = None) -> Tuple[str, str, str]:
         """
         Create command for Windows using PowerShell wrapper script.
 
-        Overrides base class to use run_tracked.ps1 instead of run_tracked.sh
+        Overrides base class to use run_tracked.ps1 instead of run_tracked.sh.
+        Neither wrapper reports heartbeats on Windows, so the limits are not
+        passed on and only the orchestrator's own timeout applies.
         """
         timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
         log_dir = Path.home() / '.dotfiles' / 'logs'
@@ -911,31 +951,291 @@ class WindowsTerminalExecutor(TerminalExecutor):
             )
 
 
+class TmuxControlClient:
+    """
+    Single tmux control-mode connection (tmux -C).
+
+    Every tmux command for a session is written to one long-lived client
+    instead of forking a tmux process per command. If control mode cannot be
+    started, commands fall back to one-shot tmux invocations.
+    """
+
+    def __init__(self, socket_name: Optional[str] = None, session: Optional[str] = None):
+        self.socket_name = socket_name
+        self.session = session
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def base_command(self) -> List[str]:
+        """tmux invocation prefix, including the server socket if set"""
+        cmd = ['tmux']
+        if self.socket_name:
+            cmd.extend(['-L', self.socket_name])
+        return cmd
+
+    def _resolve_session(self) -> Optional[str]:
+        """Default to the session owning the pane we're running in"""
+        if self.session:
+            return self.session
+        target = ['-t', os.environ['TMUX_PANE']] if os.environ.get('TMUX_PANE') else []
+        try:
+            result = subprocess.run(
+                self.base_command() + ['display-message', '-p'] + target + ['#{session_id}'],
+                capture_output=True, text=True, timeout=5
+            )
+            if result.returncode == 0 and result.stdout.strip():
+                self.session = result.stdout.strip()
+        except Exception:
+            pass
+        return self.session
+
+    def start(self) -> bool:
+        """Attach the control-mode client. Returns False if unavailable."""
+        if self._proc and self._proc.poll() is None:
+            return True
+
+        session = self._resolve_session()
+        if not session:
+            return False
+
+        try:
+            self._proc = subprocess.Popen(
+                self.base_command() + ['-C', 'attach-session', '-t', session],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1
+            )
+            # Attaching produces an initial empty command block
+            ok, _ = self._read_block()
+            if not ok:
+                self.close()
+                return False
+            # Pane output is read from log files, not streamed over the connection
+            self._send(['refresh-client', '-f', 'no-output'])
+            return True
+        except Exception:
+            self._proc = None
+            return False
+
+    def _read_block(self) -> Tuple[bool, List[str]]:
+        """Read one %begin/%end reply, skipping asynchronous notifications"""
+        lines: List[str] = []
+        in_block = False
+        while True:
+            line = self._proc.stdout.readline()
+            if not line:
+                return False, lines
+            line = line.rstrip('\n')
+            if line.startswith('%begin'):
+                in_block = True
+                lines = []
+            elif in_block and line.startswith('%end'):
+                return True, lines
+            elif in_block and line.startswith('%error'):
+                return False, lines
+            elif in_block:
+                lines.append(line)
+
+    def _send(self, args: List[str]) -> Tuple[bool, List[str]]:
+        self._proc.stdin.write(' '.join(shlex.quote(arg) for arg in args) + '\n')
+        self._proc.stdin.flush()
+        return self._read_block()
+
+    def command(self, *args: str) -> Tuple[bool, List[str]]:
+        """
+        Run a tmux command.
+
+        Returns:
+            Tuple of (success, output_lines)
+        """
+        with self._lock:
+            if self.start():
+                try:
+                    return self._send(list(args))
+                except (BrokenPipeError, OSError):
+                    self.close()
+
+            try:
+                result = subprocess.run(
+                    self.base_command() + list(args),
+                    capture_output=True, text=True, timeout=10
+                )
+                return result.returncode == 0, result.stdout.splitlines()
+            except Exception as e:
+                return False, [str(e)]
+
+    def close(self) -> None:
+        """Detach the control-mode client"""
+        if not self._proc:
+            return
+        try:
+            self._proc.stdin.close()
+            self._proc.wait(timeout=2)
+        except Exception:
+            self._proc.kill()
+        self._proc = None
+
+
+# One control-mode connection per (socket, session), shared by executor instances
+_tmux_clients: Dict[Tuple[Optional[str], Optional[str]], TmuxControlClient] = {}
+
+
+# Running `tmux wait-for` processes by channel; left over if a pane dies without signalling
+_tmux_waiters: Dict[str, subprocess.Popen] = {}
+
+
+def _close_tmux_clients() -> None:
+    for client in _tmux_clients.values():
+        client.close()
+    _tmux_clients.clear()
+    for waiter in _tmux_waiters.values():
+        waiter.kill()
+    _tmux_waiters.clear()
+
+
+atexit.register(_close_tmux_clients)
+
+
 class TmuxTerminalExecutor(TerminalExecutor):
-    """Tmux-based terminal executor (future enhancement)"""
+    """
+    Tmux executor: one 'dotfiles-pm' window with a pane per spawned command.
+
+    Completion is signalled on a per-command `tmux wait-for` channel, and
+    panes remain on exit so output can be reviewed before they are closed.
+    Set DOTFILES_TMUX_LAYOUT=windows for a window per command instead.
+    """
+
+    WINDOW_NAME = 'dotfiles-pm'
+
+    def __init__(self, socket_name: Optional[str] = None, session: Optional[str] = None,
+                 layout: Optional[str] = None):
+        self.socket_name = socket_name
+        self.session = session
+        self.layout = layout or os.environ.get('DOTFILES_TMUX_LAYOUT', 'panes')
+
+    @property
+    def client(self) -> TmuxControlClient:
+        key = (self.socket_name, self.session)
+        if key not in _tmux_clients:
+            _tmux_clients[key] = TmuxControlClient(self.socket_name, self.session)
+        return _tmux_clients[key]
 
     def can_close_terminals(self) -> bool:
-        """Delegate to system executor for now"""
-        executor = create_terminal_executor(force_system=True)
-        return executor.can_close_terminals()
+        """Can close panes via kill-pane"""
+        return True
 
-    def close_all_terminals(self) -> int:
-        """Delegate to system executor for now"""
-        executor = create_terminal_executor(force_system=True)
-        return executor.close_all_terminals()
+    def _find_window(self) -> Optional[str]:
+        """Find the existing dotfiles-pm window in our session"""
+        target = ['-t', self.client.session] if self.client.session else []
+        ok, lines = self.client.command('list-windows', *target, '-F', '#{window_id} #{window_name}')
+        if not ok:
+            return None
+        for line in lines:
+            window_id, _, name = line.partition(' ')
+            if name == self.WINDOW_NAME:
+                return window_id
+        return None
 
     def spawn(self, command: str, title: Optional[str] = None) -> TerminalSpawnResult:
+        """Spawn command in a new pane (or window) and signal a channel on exit"""
+        display_cmd = command[:50] + '...' if len(command) > 50 else command
+        unique_title = f"DOTFILES-PM-{title or 'command'}-{os.getpid()}-{int(time.time())}"
+        channel = f"dotfiles-pm-{os.getpid()}-{time.time_ns()}"
+
+        # Signal the channel however the command exits
+        signal_cmd = f"tmux wait-for -S {channel}"
+        pane_cmd = f"sh -c {shlex.quote(f'trap {shlex.quote(signal_cmd)} EXIT; {command}')}"
+
+        self.client.start()
+        window_id = self._find_window() if self.layout == 'panes' else None
+
+        pane_id = None
+        method = 'tmux pane'
+        if window_id:
+            ok, lines = self.client.command(
+                'split-window', '-d', '-t', window_id, '-c', os.getcwd(),
+                '-P', '-F', '#{pane_id}', pane_cmd
+            )
+            if ok and lines:
+                pane_id = lines[0].strip()
+                self.client.command('select-layout', '-t', window_id, 'tiled')
+
+        if not pane_id:
+            # First command, window layout, or no room left for another pane
+            method = 'tmux window'
+            target = ['-t', f'{self.client.session}:'] if self.client.session else []
+            ok, lines = self.client.command(
+                'new-window', '-d', *target, '-n', self.WINDOW_NAME, '-c', os.getcwd(),
+                '-P', '-F', '#{pane_id} #{window_id}', pane_cmd
+            )
+            if not ok or not lines:
+                return TerminalSpawnResult(
+                    status='failed',
+                    platform='tmux',
+                    method='none',
+                    command=display_cmd,
+                    error=' '.join(lines) or 'tmux new-window failed'
+                )
+            pane_id, _, window_id = lines[0].strip().partition(' ')
+            self.client.command('set-option', '-w', '-t', window_id, 'remain-on-exit', 'on')
+
+        self.client.command('select-pane', '-t', pane_id, '-T', unique_title)
+
+        return TerminalSpawnResult(
+            status='spawned',
+            platform='tmux',
+            method=method,
+            command=display_cmd,
+            window_id=pane_id,
+            title=unique_title,
+            channel=channel
+        )
+
+    def wait_for_change(self, operations: List[Dict[str, Any]], timeout: float = 1.0) -> None:
         """
-        Spawn command in tmux window or pane
+        Return as soon as any operation's wait-for channel is signalled.
 
-        TODO: Implement in Phase 2
-        - New window vs split-pane decision
-        - Session management
-        - Status tracking
+        One `tmux wait-for` waiter runs per pending channel and is kept across
+        calls; a signal sent before its waiter starts is not lost, as tmux
+        wakes the next waiter on that channel immediately.
         """
-        # For now, delegate to platform executor
-        executor = create_terminal_executor(force_system=True)
-        return executor.spawn(command, title)
+        channels = {op['channel'] for op in operations if op.get('channel')}
+        if not channels:
+            time.sleep(timeout)
+            return
+
+        for channel in channels - set(_tmux_waiters):
+            _tmux_waiters[channel] = subprocess.Popen(
+                self.client.base_command() + ['wait-for', channel],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            done = [channel for channel in channels if _tmux_waiters[channel].poll() is not None]
+            if done:
+                for channel in done:
+                    del _tmux_waiters[channel]
+                return
+            time.sleep(0.05)
+
+    def close_terminal(self, terminal_info: Dict[str, Any]) -> bool:
+        """Kill the pane a command was spawned in"""
+        pane_id = terminal_info.get('window_id')
+        if not pane_id:
+            return False
+        ok, _ = self.client.command('kill-pane', '-t', pane_id)
+        return ok
+
+    def close_all_terminals(self) -> int:
+        """Kill all registered tmux panes"""
+        closed_count = 0
+        for terminal_info in _load_terminal_registry():
+            if terminal_info.get('platform') == 'tmux' and self.close_terminal(terminal_info):
+                closed_count += 1
+        return closed_count
 
 
 def detect_platform() -> str:
@@ -1030,22 +1330,37 @@ def prompt_close_terminals() -> None:
     Prompt user to close spawned terminals with auto-close timeout.
 
     By default, terminals will auto-close after a timeout (configurable via
-    DOTFILES_TERMINAL_CLOSE_TIMEOUT env var, default 10 seconds).
+    DOTFILES_TERMINAL_CLOSE_TIMEOUT env var, default 60 seconds).
     User can press ESC to cancel auto-close and keep terminals open.
+    In batch mode (see pm_select.batch_mode) they are closed right away.
     """
+    from pm_select import batch_mode
+
+    # Batch mode: no countdown and no window probing - only this session's
+    # registered terminals are closed, as the countdown would have
+    if batch_mode():
+        if _load_terminal_registry():
+            closed = close_all_terminals()
+            print(f"\n🗑️  Closed {closed} terminal(s) (batch mode)")
+        return
+
     # Check if current executor can close terminals
     executor = create_terminal_executor()
     can_close = executor.can_close_terminals()
 
-    # Count actual DOTFILES-PM windows instead of using registry
-    try:
-        result = subprocess.run(['wmctrl', '-l'], capture_output=True, text=True, check=False)
-        dotfiles_windows = [l for l in result.stdout.split('\n') if 'DOTFILES-PM' in l and l.strip()]
-        num_terminals = len(dotfiles_windows)
-    except Exception:
-        # Fallback to registry count
-        spawned_terminals = _load_terminal_registry()
-        num_terminals = len(spawned_terminals)
+    if isinstance(executor, TmuxTerminalExecutor):
+        # tmux panes are not X windows - count them from the registry
+        num_terminals = len(_load_terminal_registry())
+    else:
+        # Count actual DOTFILES-PM windows instead of using registry
+        try:
+            result = subprocess.run(['wmctrl', '-l'], capture_output=True, text=True, check=False)
+            dotfiles_windows = [l for l in result.stdout.split('\n') if 'DOTFILES-PM' in l and l.strip()]
+            num_terminals = len(dotfiles_windows)
+        except Exception:
+            # Fallback to registry count
+            spawned_terminals = _load_terminal_registry()
+            num_terminals = len(spawned_terminals)
 
     if num_terminals == 0:
         return
@@ -1131,7 +1446,8 @@ def prompt_close_terminals() -> None:
                 pass
 
 
-def spawn_tracked(command: str, operation: str, auto_close: bool = False, test_mode: bool = False) -> TerminalSpawnResult:
+def spawn_tracked(command: str, operation: str, auto_close: bool = False, test_mode: bool = False,
+                  timeout: Optional[float] = None, stall_timeout: Optional[float] = None) -> TerminalSpawnResult:
     """
     Spawn command with logging and status tracking.
 
@@ -1140,10 +1456,17 @@ def spawn_tracked(command: str, operation: str, auto_close: bool = False, test_m
         operation: Name of operation (e.g., 'brew-upgrade')
         auto_close: Auto-close terminal on success
         test_mode: Run locally for testing instead of spawning terminal
+        timeout: Seconds before the command is killed (None for no limit)
+        stall_timeout: Seconds without output before the command is killed
+            (default: stall_limit() for the last part of the operation name,
+            e.g. 'install' in 'apt-install'; 0 for never)
 
     Returns:
         TerminalSpawnResult with status, log_file, and status_file paths
     """
+    if stall_timeout is None:
+        stall_timeout = stall_limit(operation.rsplit('-', 1)[-1])
+
     if test_mode or os.environ.get('DOTFILES_TEST_MODE') == 'true':
         # Run locally for testing
         import tempfile
@@ -1187,4 +1510,4 @@ def spawn_tracked(command: str, operation: str, auto_close: bool = False, test_m
             )
 
     executor = create_terminal_executor()
-    return executor.spawn_tracked(command, operation, auto_close)
+    return executor.spawn_tracked(command, operation, auto_close, timeout=timeout, stall_timeout=stall_timeout)
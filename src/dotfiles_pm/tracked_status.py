@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Tracked Operation Status
+
+Reads the status files written by scripts/run_tracked.sh and watches
+running operations. Protocol 2 wrappers rewrite the status every few
+seconds with a heartbeat counter, the log size and the command's PID,
+which lets the orchestrator:
+- fail an operation whose wrapper stopped reporting (terminal closed)
+- kill a command that has produced no output for its stall timeout
+  (checks only, unless DOTFILES_PM_STALL_TIMEOUT is set: upgrades and
+  installs may be waiting at a prompt)
+- kill a command that has run longer than its overall timeout
+
+The limits travel in the status file itself (the wrapper copies them from
+DOTFILES_TRACKED_TIMEOUT / DOTFILES_TRACKED_STALL_TIMEOUT), so whichever
+process polls an operation enforces the limits it was spawned with. Stalls
+are measured on the orchestrator's monotonic clock from when it last saw
+progress, so wall-clock jumps in the terminal don't matter.
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pm_utils import pid_alive
+
+# Seconds between heartbeats (run_tracked.sh reads DOTFILES_TRACKED_HEARTBEAT)
+DEFAULT_HEARTBEAT_INTERVAL = 5
+
+# Heartbeats missed before the wrapper is considered gone
+MISSED_HEARTBEATS = 4
+
+# Seconds without new output before a command is considered hung
+DEFAULT_STALL_TIMEOUT = 600
+
+# Operations that can sit silently at a prompt (apt's [Y/n], pacman
+# confirmations, a sudo password) for as long as the user takes
+INTERACTIVE_OPERATIONS = ('upgrade', 'install')
+
+# Seconds between SIGTERM and SIGKILL when stopping a hung command
+KILL_GRACE_SECONDS = 5
+
+
+# Watchdogs for operations being polled, keyed by status file
+_watchdogs: Dict[str, 'OperationWatchdog'] = {}
+_watchdogs_lock = threading.Lock()
+
+
+def get_heartbeat_interval() -> float:
+    try:
+        return float(os.environ.get('DOTFILES_TRACKED_HEARTBEAT', DEFAULT_HEARTBEAT_INTERVAL))
+    except ValueError:
+        return DEFAULT_HEARTBEAT_INTERVAL
+
+
+def get_stall_timeout() -> Optional[float]:
+    """Stall timeout from DOTFILES_PM_STALL_TIMEOUT; 0 disables stall detection"""
+    value = os.environ.get('DOTFILES_PM_STALL_TIMEOUT')
+    if value is None:
+        return DEFAULT_STALL_TIMEOUT
+    try:
+        return float(value) or None
+    except ValueError:
+        return DEFAULT_STALL_TIMEOUT
+
+
+def stall_limit(operation: str, pm_stall_timeout: Optional[float] = None) -> float:
+    """
+    Stall timeout to record for a spawned operation.
+
+    Waiting at a prompt looks the same as hanging, so upgrades and installs
+    are only watched when DOTFILES_PM_STALL_TIMEOUT is set.
+
+    Args:
+        operation: Operation (check, upgrade, install)
+        pm_stall_timeout: The PM's own stall timeout (None for the default)
+
+    Returns:
+        Seconds, or 0 for no stall detection
+    """
+    if operation in INTERACTIVE_OPERATIONS and os.environ.get('DOTFILES_PM_STALL_TIMEOUT') is None:
+        return 0
+    limit = pm_stall_timeout if pm_stall_timeout is not None else get_stall_timeout()
+    return limit or 0
+
+
+def tracked_env(timeout: Optional[float] = None, stall_timeout: Optional[float] = None) -> str:
+    """
+    Environment assignments that pass limits to run_tracked.sh.
+
+    Returns:
+        A prefix like 'DOTFILES_TRACKED_TIMEOUT=60 ' (empty if no limits)
+    """
+    assignments = []
+    if timeout is not None:
+        assignments.append(f"DOTFILES_TRACKED_TIMEOUT={timeout:g}")
+    if stall_timeout is not None:
+        assignments.append(f"DOTFILES_TRACKED_STALL_TIMEOUT={stall_timeout:g}")
+    return ''.join(f"{a} " for a in assignments)
+
+
+def read_status(status_file: str) -> Dict[str, Any]:
+    """
+    Read a status file.
+
+    Returns:
+        The status dict; {'status': 'running'} if the wrapper hasn't written
+        one yet, or {'status': 'error', ...} if it can't be read
+    """
+    try:
+        path = Path(status_file)
+        if path.exists():
+            return json.loads(path.read_text())
+        return {'status': 'running'}
+    except Exception as e:
+        return {'status': 'error', 'error': str(e)}
+
+
+def _descendants(pid: int) -> List[int]:
+    """All descendant PIDs of pid, children before grandchildren"""
+    try:
+        output = subprocess.run(['ps', '-A', '-o', 'pid=,ppid='], capture_output=True,
+                                text=True, timeout=5).stdout
+    except (OSError, subprocess.SubprocessError):
+        return []
+
+    children: Dict[int, List[int]] = {}
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) == 2 and fields[0].isdigit() and fields[1].isdigit():
+            children.setdefault(int(fields[1]), []).append(int(fields[0]))
+
+    result, queue = [], [pid]
+    while queue:
+        for child in children.get(queue.pop(0), []):
+            result.append(child)
+            queue.append(child)
+    return result
+
+
+def kill_process_tree(pid: int, grace: float = KILL_GRACE_SECONDS) -> None:
+    """
+    Stop a process and everything it started: SIGTERM, then SIGKILL after grace.
+
+    The tracked command shares its process group with the wrapper and the
+    terminal's shell, so the tree is found by parent PID instead.
+    """
+    kill_process_trees([pid], grace)
+
+
+def kill_process_trees(roots: List[int], grace: float = KILL_GRACE_SECONDS) -> None:
+    """Stop several process trees, sharing one grace period"""
+    if sys.platform == 'win32' or not roots:
+        return
+    pids = []
+    for root in roots:
+        pids += [root] + _descendants(root)
+    for target in pids:
+        try:
+            os.kill(target, signal.SIGTERM)
+        except OSError:
+            pass
+
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline and any(pid_alive(p) for p in pids):
+        time.sleep(0.1)
+    for target in pids:
+        try:
+            os.kill(target, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+class OperationWatchdog:
+    """
+    Watches one tracked operation's status file for stalls and timeouts.
+
+    Limits recorded in the status file take precedence over the ones given
+    here; a limit of 0 in the status file disables that check.
+
+    Args:
+        timeout: Seconds the whole operation may take (None for no limit)
+        stall_timeout: Seconds without new output before the command is
+            considered hung (None for DOTFILES_PM_STALL_TIMEOUT)
+        heartbeat_interval: Interval the wrapper was started with
+    """
+
+    def __init__(self, timeout: Optional[float] = None, stall_timeout: Optional[float] = None,
+                 heartbeat_interval: Optional[float] = None):
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout if stall_timeout is not None else get_stall_timeout()
+        self.heartbeat_interval = heartbeat_interval or get_heartbeat_interval()
+        self.started = time.monotonic()
+        self.last_heartbeat = self.started
+        self.last_output = self.started
+        self._heartbeat: Optional[int] = None
+        self._bytes: Optional[int] = None
+
+    def _observe(self, status: Dict[str, Any], now: float) -> None:
+        heartbeat, size = status.get('heartbeat'), status.get('bytes')
+        if heartbeat is not None and heartbeat != self._heartbeat:
+            self._heartbeat = heartbeat
+            self.last_heartbeat = now
+        if size is not None and size != self._bytes:
+            self._bytes = size
+            self.last_output = now
+
+    @staticmethod
+    def _limit(status: Dict[str, Any], key: str, default: Optional[float]) -> Optional[float]:
+        value = status.get(key)
+        if not isinstance(value, (int, float)):
+            return default
+        return value if value > 0 else None
+
+    def _fail(self, status: Dict[str, Any], reason: str, error: str) -> Dict[str, Any]:
+        child_pid = status.get('child_pid')
+        if reason != 'wrapper_lost' and isinstance(child_pid, int):
+            kill_process_tree(child_pid)
+        return {**status, 'status': 'error', 'reason': reason, 'error': error}
+
+    def check(self, status: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Update the watchdog with a freshly read status.
+
+        Returns:
+            The status unchanged, or an 'error' status with a 'reason' of
+            'timeout', 'stalled' or 'wrapper_lost' once the command has been
+            stopped (or found dead)
+        """
+        if status.get('status') != 'running':
+            return status
+
+        now = time.monotonic()
+        self._observe(status, now)
+        # The wrapper's own count covers time before this process started polling
+        elapsed = max(now - self.started, status.get('elapsed') or 0)
+
+        timeout = self._limit(status, 'timeout', self.timeout)
+        if timeout is not None and elapsed > timeout:
+            return self._fail(status, 'timeout', f"Timed out after {timeout:g}s")
+
+        # Only protocol 2 wrappers send heartbeats; older ones get the overall timeout only
+        if status.get('protocol', 1) < 2:
+            return status
+
+        silent = now - self.last_heartbeat
+        if silent > self.heartbeat_interval * MISSED_HEARTBEATS:
+            pid = status.get('pid')
+            if not isinstance(pid, int) or sys.platform == 'win32' or not pid_alive(pid):
+                return self._fail(status, 'wrapper_lost',
+                                  f"Wrapper stopped reporting {silent:.0f}s ago (terminal closed?)")
+
+        stall_timeout = self._limit(status, 'stall_timeout', self.stall_timeout)
+        if stall_timeout is not None and now - self.last_output > stall_timeout:
+            return self._fail(status, 'stalled',
+                              f"No output for {now - self.last_output:.0f}s; assumed hung and stopped")
+        return status
+
+
+def check_tracked(status_file: str) -> Dict[str, Any]:
+    """
+    Read an operation's status and apply its watchdog.
+
+    Returns:
+        The status, or an 'error' status if the watchdog stopped the command
+    """
+    status = read_status(status_file)
+    with _watchdogs_lock:
+        watchdog = _watchdogs.setdefault(status_file, OperationWatchdog())
+    status = watchdog.check(status)
+    if status.get('status') != 'running':
+        with _watchdogs_lock:
+            _watchdogs.pop(status_file, None)
+    return status
+
+
+def cancel_tracked(grace: float = KILL_GRACE_SECONDS) -> int:
+    """
+    Stop the commands of all operations still being polled (e.g. on Ctrl-C).
+
+    Returns:
+        Number of commands stopped
+    """
+    with _watchdogs_lock:
+        status_files = list(_watchdogs)
+        _watchdogs.clear()
+    child_pids = []
+    for status_file in status_files:
+        status = read_status(status_file)
+        if status.get('status') == 'running' and isinstance(status.get('child_pid'), int):
+            child_pids.append(status['child_pid'])
+    kill_process_trees(child_pids, grace)
+    return len(child_pids)
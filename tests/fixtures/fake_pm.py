@@ -4,12 +4,19 @@ Python-based fake package manager implementation.
 
 Provides realistic package manager behavior for testing without shell scripts.
 Supports state tracking to validate upgrade behavior.
+
+SyntheticFakePM generates large, deterministic package sets that mimic real
+brew/apt/npm check output, for load-testing parsers, caching and diffing at
+real-world scales (e.g. a 3,000-package apt system).
 """
 
 import json
+import os
+import random
 import sys
+import time
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 
 class FakePM:
@@ -18,7 +25,8 @@ class FakePM:
     def __init__(self, name: str, version: str):
         self.name = name
         self.version = version
-        self.state_file = Path(f"/tmp/fake-{name}-state.json")
+        state_dir = Path(os.environ.get('FAKE_PM_STATE_DIR', '/tmp'))
+        self.state_file = state_dir / f"fake-{name}-state.json"
         self.initial_packages = {}
         self.latest_versions = {}
 
@@ -155,10 +163,192 @@ class FakePM2(FakePM):
         }
 
 
+# Check output formats mirroring each real PM's check command
+OUTPUT_FORMATS = ('default', 'brew', 'apt', 'npm')
+
+_NAME_PREFIXES = ['lib', 'py', 'node-', 'go-', 'rust-', 'x11-', 'gnome-', 'qt', 'perl-', 'ruby-']
+_NAME_STEMS = [
+    'ssl', 'zlib', 'curl', 'json', 'yaml', 'xml', 'png', 'jpeg', 'ffi', 'gtk',
+    'sqlite', 'readline', 'ncurses', 'pcre', 'uuid', 'icu', 'event', 'git', 'fmt', 'glib'
+]
+
+
+def _random_version(rng: random.Random) -> Tuple[int, int, int]:
+    return (rng.randint(0, 12), rng.randint(0, 30), rng.randint(0, 99))
+
+
+def _bump_version(rng: random.Random, version: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    major, minor, patch = version
+    kind = rng.random()
+    if kind < 0.7:
+        return (major, minor, patch + rng.randint(1, 5))
+    if kind < 0.95:
+        return (major, minor + 1, 0)
+    return (major + 1, 0, 0)
+
+
+def generate_packages(count: int, seed: int = 0,
+                      outdated_ratio: float = 0.3) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Generate a deterministic synthetic package set.
+
+    Args:
+        count: Number of installed packages
+        seed: Random seed (same seed always yields the same set)
+        outdated_ratio: Fraction of packages with a newer version available
+
+    Returns:
+        Tuple of (installed_versions, latest_versions)
+    """
+    rng = random.Random(seed)
+    installed = {}
+    latest = {}
+
+    for i in range(count):
+        name = f"{rng.choice(_NAME_PREFIXES)}{rng.choice(_NAME_STEMS)}{i}"
+        current = _random_version(rng)
+        newest = _bump_version(rng, current) if rng.random() < outdated_ratio else current
+        installed[name] = '.'.join(map(str, current))
+        latest[name] = '.'.join(map(str, newest))
+
+    return installed, latest
+
+
+class SyntheticFakePM(FakePM):
+    """
+    Fake package manager with a large generated package set.
+
+    Emits check output in the format of a real PM (brew, apt, npm) so parsers
+    can be measured against realistic input at scale. Supports a per-line
+    delay to emulate slow PMs and a failure rate to emulate partial failures.
+    """
+
+    def __init__(self, count: int = 1000, output_format: str = 'default', seed: int = 0,
+                 outdated_ratio: float = 0.3, line_delay: float = 0.0, fail_rate: float = 0.0):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format} (expected one of {OUTPUT_FORMATS})")
+
+        super().__init__(f"Synthetic-{output_format}-{count}-{seed}", "0.0.1")
+        self.output_format = output_format
+        self.line_delay = line_delay
+        self.initial_packages, self.latest_versions = generate_packages(count, seed, outdated_ratio)
+
+        # Failures are seeded separately so changing fail_rate keeps the package set stable
+        fail_rng = random.Random(seed + 1)
+        self.failing_packages = {pkg for pkg in self.initial_packages if fail_rng.random() < fail_rate}
+        self.failed: List[str] = []
+
+    def load_state(self) -> Dict[str, str]:
+        """Load state without writing (or announcing) the generated initial set."""
+        if not self.state_file.exists():
+            return self.initial_packages.copy()
+        return super().load_state()
+
+    def outdated_packages(self, packages: Optional[Dict[str, str]] = None) -> List[Tuple[str, str, str]]:
+        """Return (package, current, latest) for every outdated package."""
+        packages = packages if packages is not None else self.load_state()
+        return [
+            (pkg, current, self.latest_versions.get(pkg, current))
+            for pkg, current in packages.items()
+            if self.latest_versions.get(pkg, current) != current
+        ]
+
+    def iter_outdated_lines(self, outdated: List[Tuple[str, str, str]]) -> Iterator[str]:
+        """Yield check output lines in the configured PM format."""
+        if self.output_format == 'brew':
+            # brew outdated --verbose
+            for pkg, current, latest in outdated:
+                yield f"{pkg} ({current}) < {latest}"
+
+        elif self.output_format == 'apt':
+            # apt-get upgrade --dry-run
+            yield "Reading package lists..."
+            yield "Building dependency tree..."
+            yield "Reading state information..."
+            yield "Calculating upgrade..."
+            yield f"{len(outdated)} upgraded, 0 newly installed, 0 to remove and 0 not upgraded."
+            for pkg, current, latest in outdated:
+                yield f"Inst {pkg} [{current}] ({latest} Ubuntu:22.04/jammy-updates [amd64])"
+            for pkg, _, latest in outdated:
+                yield f"Conf {pkg} ({latest} Ubuntu:22.04/jammy-updates [amd64])"
+
+        elif self.output_format == 'npm':
+            # npm outdated -g
+            if outdated:
+                yield f"{'Package':<24}{'Current':<10}{'Wanted':<10}{'Latest':<10}Location"
+            for pkg, current, latest in outdated:
+                yield f"{pkg:<24}{current:<10}{latest:<10}{latest:<10}node_modules/{pkg}"
+
+        else:
+            for pkg, current, latest in outdated:
+                yield f"{pkg} {current} < {latest}"
+
+    def _emit(self, line: str, stream=None):
+        stream = stream or sys.stdout
+        stream.write(line + '\n')
+        if self.line_delay:
+            stream.flush()
+            time.sleep(self.line_delay)
+
+    def cmd_outdated(self):
+        """Stream outdated packages in the configured format."""
+        outdated = self.outdated_packages()
+        self.failed = [pkg for pkg, _, _ in outdated if pkg in self.failing_packages]
+        healthy = [entry for entry in outdated if entry[0] not in self.failing_packages]
+
+        for line in self.iter_outdated_lines(healthy):
+            self._emit(line)
+        for pkg in self.failed:
+            self._emit(f"Error: {pkg}: failed to fetch package metadata", sys.stderr)
+
+        sys.stdout.flush()
+        return len(healthy)
+
+    def cmd_upgrade(self):
+        """Upgrade packages, leaving failing packages at their current version."""
+        packages = self.load_state()
+        upgraded = []
+        self.failed = []
+
+        print(f"🔄 {self.name} upgrading packages...")
+
+        for pkg, current, latest in self.outdated_packages(packages):
+            if pkg in self.failing_packages:
+                self.failed.append(pkg)
+                self._emit(f"Error: {pkg}: upgrade from {current} to {latest} failed", sys.stderr)
+                continue
+            self._emit(f"  📦 Upgrading {pkg} from {current} to {latest}...")
+            packages[pkg] = latest
+            upgraded.append(pkg)
+
+        if upgraded:
+            self.save_state(packages)
+        print(f"✅ {self.name}: Upgraded {len(upgraded)} packages ({len(self.failed)} failed)")
+
+        return len(upgraded)
+
+
+def parse_synthetic_args(argv: List[str]):
+    """Parse options for the synthetic fake PM."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='fake_pm.py synthetic',
+                                     description='Fake PM with a large generated package set')
+    parser.add_argument('command', nargs='?', default='help')
+    parser.add_argument('--count', type=int, default=1000, help='Number of installed packages')
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default='default',
+                        help='Check output format')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the package set')
+    parser.add_argument('--outdated-ratio', type=float, default=0.3, help='Fraction of outdated packages')
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds to sleep after each output line')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of packages that fail')
+    return parser.parse_args(argv)
+
+
 def main():
     """Main entry point."""
     if len(sys.argv) < 2:
-        print("Usage: fake_pm.py <pm1|pm2> <command>")
+        print("Usage: fake_pm.py <pm1|pm2|synthetic> <command> [options]")
         sys.exit(1)
 
     pm_name = sys.argv[1]
@@ -168,12 +358,27 @@ def main():
         pm = FakePM1()
     elif pm_name == "pm2":
         pm = FakePM2()
+    elif pm_name == "synthetic":
+        options = parse_synthetic_args(sys.argv[2:])
+        command = options.command
+        pm = SyntheticFakePM(
+            count=options.count,
+            output_format=options.output_format,
+            seed=options.seed,
+            outdated_ratio=options.outdated_ratio,
+            line_delay=options.delay,
+            fail_rate=options.fail_rate
+        )
     else:
         print(f"Unknown PM: {pm_name}")
         sys.exit(1)
 
     result = pm.run(command)
 
+    # Partial failures exit non-zero, like a real PM
+    if getattr(pm, 'failed', None):
+        sys.exit(1)
+
     # Return count for outdated/upgrade commands
     if isinstance(result, int):
         sys.exit(0 if result >= 0 else 1)
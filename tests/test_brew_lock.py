@@ -0,0 +1,132 @@
+"""
+Tests for brew lock detection from lock files
+
+Uses a temporary lock directory and real flock()s instead of a Homebrew
+install, so detection and waiting are exercised without brew.
+"""
+import fcntl
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+from pms.brew_utils import BrewLockManager, find_lock_holders
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="flock is POSIX-only")
+
+HOLD_LOCK = """
+import fcntl, sys, time
+f = open(sys.argv[1], 'w')
+fcntl.flock(f, fcntl.LOCK_EX)
+print('locked', flush=True)
+time.sleep(float(sys.argv[2]))
+"""
+
+
+@pytest.fixture
+def lock_dir(tmp_path):
+    """Homebrew-style lock directory with an unheld lock file"""
+    locks = tmp_path / 'var' / 'homebrew' / 'locks'
+    locks.mkdir(parents=True)
+    (locks / 'update').touch()
+    return locks
+
+
+def hold_lock(path, seconds):
+    """Hold an exclusive flock in a child process; returns once it is held"""
+    proc = subprocess.Popen([sys.executable, '-c', HOLD_LOCK, str(path), str(seconds)],
+                            stdout=subprocess.PIPE, text=True)
+    assert proc.stdout.readline().strip() == 'locked'
+    return proc
+
+
+class TestLockHolders:
+    """Tests for lock file inspection"""
+
+    def test_unheld_lock_file_not_reported(self, lock_dir):
+        """Test that a lock file nobody holds is not a lock"""
+        assert find_lock_holders(lock_dir) == {}
+        assert BrewLockManager(lock_dir=lock_dir).is_brew_locked() == (False, None)
+
+    def test_held_lock_reported(self, lock_dir):
+        """Test that a held flock is detected"""
+        proc = hold_lock(lock_dir / 'update', 10)
+        try:
+            holders = find_lock_holders(lock_dir)
+            assert list(holders) == ['update']
+            if Path('/proc/locks').exists():
+                assert holders['update'] == proc.pid
+
+            is_locked, message = BrewLockManager(lock_dir=lock_dir).is_brew_locked()
+            assert is_locked
+            assert 'update' in message
+        finally:
+            proc.kill()
+            proc.wait()
+
+    def test_probe_fallback(self, lock_dir, monkeypatch):
+        """Test flock probing when /proc/locks is unavailable"""
+        monkeypatch.setattr('pms.brew_utils.read_proc_locks', lambda: None)
+        proc = hold_lock(lock_dir / 'update', 10)
+        try:
+            assert find_lock_holders(lock_dir) == {'update': None}
+        finally:
+            proc.kill()
+            proc.wait()
+
+        # The probe must not leave the file locked
+        with open(lock_dir / 'update') as f:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+class TestWaitForUnlock:
+    """Tests for event-driven waiting"""
+
+    def test_unlock_noticed_immediately(self, lock_dir):
+        """Test that the wait returns as soon as the holder releases"""
+        proc = hold_lock(lock_dir / 'update', 0.5)
+        try:
+            start = time.monotonic()
+            assert BrewLockManager(lock_dir=lock_dir).wait_for_brew_unlock(max_wait=10)
+            assert time.monotonic() - start < 1.5
+        finally:
+            proc.wait()
+
+    def test_timeout(self, lock_dir):
+        """Test that a held lock times out"""
+        proc = hold_lock(lock_dir / 'update', 10)
+        try:
+            assert not BrewLockManager(lock_dir=lock_dir).wait_for_brew_unlock(max_wait=1)
+        finally:
+            proc.kill()
+            proc.wait()
+
+
+@pytest.mark.skipif(not Path('/proc/self').exists(), reason="needs /proc")
+def test_find_brew_processes_from_proc(tmp_path):
+    """Test that brew processes are found by argv, not by substring"""
+    brew = tmp_path / 'brew'
+    brew.write_text('#!/bin/sh\nsleep 10\n')
+    brew.chmod(0o755)
+    lookalike = subprocess.Popen(['sh', '-c', 'sleep 10 # brew upgrade'])
+    proc = subprocess.Popen([str(brew), 'upgrade'])
+    try:
+        time.sleep(0.2)
+        pids = {p.pid for p in BrewLockManager().find_brew_processes()}
+        assert proc.pid in pids
+        assert lookalike.pid not in pids
+    finally:
+        for p in (proc, lookalike):
+            p.kill()
+            p.wait()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
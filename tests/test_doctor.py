@@ -0,0 +1,289 @@
+"""
+Tests for doctor checks
+
+Builds a fake dotfiles repo and home directory in a temp directory and
+checks how links are found and classified, and how registered checks are
+run.
+"""
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+from doctor import (
+    SymlinkDoctor, find_symlinks, get_symlink_search_dirs,
+    DoctorCheck, run_checks, select_checks, check_status_files, check_terminal_registry, main,
+    PathDoctor, build_path_index,
+)
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="symlinks need POSIX")
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = tmp_path / 'dotfiles'
+    (repo / 'configs' / 'shell_common').mkdir(parents=True)
+    (repo / 'configs' / 'shell_common' / 'dot-zshrc').write_text('zshrc')
+    (repo / 'configs' / 'nvim_common' / 'dot-config' / 'nvim').mkdir(parents=True)
+    (repo / 'emacs').mkdir()
+    (repo / 'emacs' / 'init.el').write_text('')
+    return repo
+
+
+@pytest.fixture
+def target(tmp_path):
+    target = tmp_path / 'target'
+    (target / '.config').mkdir(parents=True)
+    return target
+
+
+def scan(target, repo):
+    doctor = SymlinkDoctor(home=target, dotfiles_dir=repo)
+    doctor.scan()
+    return {Path(r.path).name: r.status for r in doctor.records}, doctor
+
+
+class TestClassification:
+    """Tests for symlink statuses"""
+
+    def test_current_link(self, repo, target):
+        """Test that links into configs/ are current, relative or not"""
+        os.symlink(repo / 'configs' / 'shell_common' / 'dot-zshrc', target / '.zshrc')
+        os.symlink(os.path.relpath(repo / 'configs' / 'nvim_common' / 'dot-config' / 'nvim', target / '.config'),
+                   target / '.config' / 'nvim')
+
+        statuses, _ = scan(target, repo)
+
+        assert statuses == {'.zshrc': 'current', 'nvim': 'current'}
+
+    def test_broken_link(self, repo, target):
+        """Test that a dangling link into the repo is broken"""
+        os.symlink(repo / 'configs' / 'gone', target / '.gone')
+
+        statuses, doctor = scan(target, repo)
+
+        assert statuses == {'.gone': 'broken'}
+        assert doctor.health_status()[0] == 'CRITICAL'
+
+    def test_legacy_link(self, repo, target):
+        """Test that links into old top-level packages are legacy"""
+        os.symlink(repo / 'emacs', target / '.emacs.d')
+
+        statuses, doctor = scan(target, repo)
+
+        assert statuses == {'.emacs.d': 'legacy'}
+        assert doctor.health_status()[0] == 'LEGACY'
+
+    def test_outside_repo_link(self, repo, target, tmp_path):
+        """Test that links into another dotfiles checkout are flagged"""
+        other = tmp_path / 'old' / 'dotfiles' / 'configs'
+        other.mkdir(parents=True)
+        (other / 'vimrc').write_text('')
+        os.symlink(other / 'vimrc', target / '.vimrc')
+
+        statuses, _ = scan(target, repo)
+
+        assert statuses == {'.vimrc': 'outside'}
+
+    def test_unrelated_link_ignored(self, repo, target, tmp_path):
+        """Test that links unrelated to dotfiles are not reported"""
+        (tmp_path / 'somewhere').write_text('')
+        os.symlink(tmp_path / 'somewhere', target / '.unrelated')
+
+        statuses, _ = scan(target, repo)
+
+        assert statuses == {}
+
+
+class TestScan:
+    """Tests for finding links"""
+
+    def test_home_searched_one_level(self, repo, target):
+        """Test that the home directory is not searched recursively"""
+        (target / 'projects' / 'app').mkdir(parents=True)
+        os.symlink(repo / 'configs' / 'gone', target / 'projects' / 'app' / 'link')
+        (target / '.config' / 'deep' / 'er').mkdir(parents=True)
+        os.symlink(repo / 'configs' / 'gone', target / '.config' / 'deep' / 'er' / 'link')
+
+        links = find_symlinks(get_symlink_search_dirs(target))
+
+        assert links == [str(target / '.config' / 'deep' / 'er' / 'link')]
+
+    def test_folded_directory_not_descended(self, repo, target):
+        """Test that a symlinked directory is reported once, not walked"""
+        os.symlink(repo / 'configs' / 'nvim_common' / 'dot-config' / 'nvim', target / '.config' / 'nvim')
+        os.symlink(repo / 'configs' / 'nvim_common' / 'dot-config', target / '.config' / 'self')
+
+        links = find_symlinks(get_symlink_search_dirs(target))
+
+        assert len(links) == 2
+
+    def test_remove_broken(self, repo, target):
+        """Test that cleanup only removes broken links"""
+        os.symlink(repo / 'configs' / 'gone', target / '.gone')
+        os.symlink(repo / 'configs' / 'shell_common' / 'dot-zshrc', target / '.zshrc')
+        _, doctor = scan(target, repo)
+
+        removed, failed = doctor.remove_broken()
+
+        assert removed == [str(target / '.gone')]
+        assert failed == []
+        assert (target / '.zshrc').is_symlink()
+
+
+def make_executable(path, body='#!/bin/sh\n'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(body)
+    path.chmod(0o755)
+
+
+class TestPathIndex:
+    """Tests for the PATH binary index"""
+
+    def test_lookup_order_and_shadowing(self, tmp_path):
+        """Test that later copies of a binary are reported as shadowed"""
+        make_executable(tmp_path / 'a' / 'npm', '#!/bin/sh\necho a\n')
+        make_executable(tmp_path / 'b' / 'npm', '#!/bin/sh\necho b\n')
+        make_executable(tmp_path / 'b' / 'node')
+
+        index = build_path_index([str(tmp_path / 'a'), str(tmp_path / 'b')])
+
+        assert index.binaries['npm'] == [str(tmp_path / 'a' / 'npm'), str(tmp_path / 'b' / 'npm')]
+        assert index.shadowed(['npm', 'node']) == {'npm': index.binaries['npm']}
+
+    def test_aliases_are_not_shadowing(self, tmp_path):
+        """Test that symlinks to the same file don't count as shadowing"""
+        make_executable(tmp_path / 'lib' / 'npm-cli')
+        (tmp_path / 'a').mkdir()
+        (tmp_path / 'b').mkdir()
+        os.symlink(tmp_path / 'lib' / 'npm-cli', tmp_path / 'a' / 'npm')
+        os.symlink(tmp_path / 'lib' / 'npm-cli', tmp_path / 'b' / 'npm')
+
+        index = build_path_index([str(tmp_path / 'a'), str(tmp_path / 'b')])
+
+        assert index.shadowed(['npm']) == {}
+
+    def test_non_executables_and_missing_entries(self, tmp_path):
+        """Test that plain files are skipped and missing entries are recorded"""
+        (tmp_path / 'a').mkdir()
+        (tmp_path / 'a' / 'README').write_text('')
+        make_executable(tmp_path / 'a' / 'tool')
+
+        index = build_path_index([str(tmp_path / 'a'), str(tmp_path / 'gone')])
+
+        assert index.entries[0].binaries == ['tool']
+        assert not index.entries[1].exists
+        assert index.miss_cost() >= 0
+
+    def test_doctor_reports_shadowed_pm_binary(self, tmp_path, monkeypatch):
+        """Test the PATH doctor warning for PM binaries"""
+        make_executable(tmp_path / 'a' / 'pip3', '#!/bin/sh\necho a\n')
+        make_executable(tmp_path / 'b' / 'pip3', '#!/bin/sh\necho b\n')
+        monkeypatch.setenv('PATH', os.pathsep.join([str(tmp_path / 'a'), str(tmp_path / 'b')]))
+
+        doctor = PathDoctor()
+        doctor.check_shadowed_binaries()
+
+        assert [w['binary'] for w in doctor.warnings] == ['pip3']
+
+
+def make_check(name, func, timeout=5.0):
+    return DoctorCheck(name, name, func, timeout)
+
+
+class TestRunChecks:
+    """Tests for the concurrent check runner"""
+
+    def test_checks_run_concurrently(self):
+        """Test that slow checks overlap instead of adding up"""
+        def slow():
+            time.sleep(0.5)
+            return [], []
+
+        start = time.monotonic()
+        results = run_checks([make_check(f"slow{i}", slow) for i in range(4)])
+
+        assert [r.status for r in results] == ['ok'] * 4
+        assert time.monotonic() - start < 1.5
+
+    def test_timeout(self):
+        """Test that a hung check is reported without waiting for it"""
+        results = run_checks([make_check('hang', lambda: time.sleep(30), timeout=0.2),
+                              make_check('fine', lambda: ([], []))])
+
+        assert [r.status for r in results] == ['timeout', 'ok']
+        assert results[0].warnings[0]['type'] == 'check_timeout'
+
+    def test_crash_is_an_issue(self):
+        """Test that an exception in a check becomes an error result"""
+        def boom():
+            raise RuntimeError('boom')
+
+        result = run_checks([make_check('boom', boom)])[0]
+
+        assert result.status == 'error'
+        assert 'boom' in result.issues[0]['message']
+
+    def test_select_unknown_check(self):
+        """Test that misspelled check names are rejected"""
+        with pytest.raises(KeyError):
+            select_checks(['no-such-check'])
+
+    def test_json_output(self, temp_home, capsys):
+        """Test that --json prints one parseable document"""
+        with pytest.raises(SystemExit):
+            main(['--json', '--check', 'status-files', '--check', 'terminal-registry'])
+
+        report = json.loads(capsys.readouterr().out)
+        assert [c['name'] for c in report['checks']] == ['status-files', 'terminal-registry']
+        assert report['issues'] == 0
+
+
+class TestOperationChecks:
+    """Tests for tracked-operation leftovers"""
+
+    def test_orphaned_status_file(self, temp_home):
+        """Test that an old 'running' status is reported, a recent one is not"""
+        log_dir = temp_home / '.dotfiles' / 'logs'
+        log_dir.mkdir(parents=True)
+        (log_dir / 'brew-upgrade-old.status').write_text(json.dumps(
+            {'status': 'running', 'timestamp': time.time() - 7 * 3600}))
+        (log_dir / 'brew-upgrade-new.status').write_text(json.dumps(
+            {'status': 'running', 'timestamp': time.time()}))
+        (log_dir / 'brew-check-done.status').write_text(json.dumps(
+            {'status': 'completed', 'exit_code': 0, 'timestamp': 0}))
+
+        _, warnings = check_status_files()
+
+        assert len(warnings) == 1
+        assert warnings[0]['paths'] == [str(log_dir / 'brew-upgrade-old.status')]
+
+    def test_stale_terminal_registry(self, temp_home):
+        """Test that finished and dead terminals are reported"""
+        log_dir = temp_home / '.dotfiles' / 'logs'
+        log_dir.mkdir(parents=True)
+        done = log_dir / 'npm-check.status'
+        done.write_text(json.dumps({'status': 'completed', 'exit_code': 0}))
+        running = log_dir / 'brew-check.status'
+        running.write_text(json.dumps({'status': 'running'}))
+        (log_dir / 'terminal_registry.json').write_text(json.dumps([
+            {'operation': 'npm-check', 'status_file': str(done)},
+            {'operation': 'brew-check', 'status_file': str(running), 'pid': os.getpid()},
+        ]))
+
+        _, warnings = check_terminal_registry()
+
+        assert len(warnings) == 1
+        assert 'npm-check' in warnings[0]['message']
+        assert 'brew-check' not in warnings[0]['message']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
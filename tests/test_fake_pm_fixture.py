@@ -0,0 +1,117 @@
+"""
+Tests for the synthetic fake PM fixture
+
+Validates that large generated package sets are deterministic and that each
+output format is consumable by the PM parsers.
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+sys.path.insert(0, str(PROJECT_ROOT / 'tests' / 'fixtures'))
+
+from fake_pm import SyntheticFakePM, generate_packages
+from pm_parsers import parse_default_output
+
+FAKE_PM_SCRIPT = PROJECT_ROOT / 'tests' / 'fixtures' / 'fake_pm.py'
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    """Keep synthetic state files out of /tmp"""
+    monkeypatch.setenv('FAKE_PM_STATE_DIR', str(tmp_path))
+    return tmp_path
+
+
+class TestGeneratePackages:
+    """Tests for deterministic package generation"""
+
+    def test_same_seed_same_packages(self):
+        """Test that a seed always yields the same package set"""
+        assert generate_packages(500, seed=3) == generate_packages(500, seed=3)
+
+    def test_different_seed_different_packages(self):
+        """Test that different seeds yield different package sets"""
+        assert generate_packages(500, seed=3) != generate_packages(500, seed=4)
+
+    def test_count_and_outdated_ratio(self):
+        """Test package count and approximate outdated ratio"""
+        installed, latest = generate_packages(3000, seed=1, outdated_ratio=0.3)
+        assert len(installed) == 3000
+        outdated = sum(1 for pkg in installed if installed[pkg] != latest[pkg])
+        assert 700 < outdated < 1100
+
+
+class TestSyntheticOutput:
+    """Tests for realistic check output formats"""
+
+    def test_brew_format_one_line_per_package(self, state_dir, capsys):
+        """Test brew outdated --verbose output counts correctly"""
+        pm = SyntheticFakePM(count=2000, output_format='brew', seed=5)
+        count = pm.cmd_outdated()
+        out = capsys.readouterr().out
+        assert count == len(pm.outdated_packages())
+        assert parse_default_output(out) == count
+        assert ') < ' in out.splitlines()[0]
+
+    def test_apt_format_has_inst_lines(self, state_dir, capsys):
+        """Test apt-get upgrade --dry-run output structure"""
+        pm = SyntheticFakePM(count=3000, output_format='apt', seed=5)
+        count = pm.cmd_outdated()
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0] == 'Reading package lists...'
+        assert sum(1 for line in lines if line.startswith('Inst ')) == count
+        assert sum(1 for line in lines if line.startswith('Conf ')) == count
+
+    def test_npm_format_has_header(self, state_dir, capsys):
+        """Test npm outdated -g output has a header row"""
+        pm = SyntheticFakePM(count=200, output_format='npm', seed=5)
+        count = pm.cmd_outdated()
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0].startswith('Package')
+        assert len(lines) == count + 1
+
+    def test_unknown_format_rejected(self, state_dir):
+        """Test that unknown output formats raise"""
+        with pytest.raises(ValueError):
+            SyntheticFakePM(output_format='yum')
+
+
+class TestSyntheticFailures:
+    """Tests for partial failure emulation"""
+
+    def test_failures_go_to_stderr(self, state_dir, capsys):
+        """Test failing packages are reported on stderr, not stdout"""
+        pm = SyntheticFakePM(count=1000, seed=2, fail_rate=0.05)
+        count = pm.cmd_outdated()
+        captured = capsys.readouterr()
+        assert pm.failed
+        assert captured.err.count('Error:') == len(pm.failed)
+        assert count == len(pm.outdated_packages()) - len(pm.failed)
+
+    def test_upgrade_leaves_failed_packages_outdated(self, state_dir, capsys):
+        """Test that upgrade skips failing packages and persists the rest"""
+        pm = SyntheticFakePM(count=500, seed=2, fail_rate=0.05)
+        pm.cmd_upgrade()
+        remaining = {pkg for pkg, _, _ in pm.outdated_packages()}
+        assert remaining == set(pm.failed)
+
+    def test_cli_exits_nonzero_on_failure(self, state_dir):
+        """Test the CLI signals partial failure through the exit code"""
+        result = subprocess.run(
+            [sys.executable, str(FAKE_PM_SCRIPT), 'synthetic', 'outdated',
+             '--count', '500', '--fail-rate', '0.05'],
+            capture_output=True, text=True
+        )
+        assert result.returncode == 1
+        assert result.stdout.strip()
+        assert 'Error:' in result.stderr
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,102 @@
+"""
+Tests for login environment capture
+
+Uses a bash profile in a temp home directory so the capture, the mtime-keyed
+cache and run_tracked.sh's use of the captured script can be checked without
+touching the real profile.
+"""
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+import login_env
+from login_env import load_login_env
+
+RUN_TRACKED = PROJECT_ROOT / 'scripts' / 'run_tracked.sh'
+
+pytestmark = pytest.mark.skipif(shutil.which('bash') is None, reason="needs bash")
+
+
+@pytest.fixture
+def profile(temp_home, monkeypatch):
+    monkeypatch.setattr(login_env, 'get_login_shell', lambda: shutil.which('bash'))
+    profile = temp_home / '.bash_profile'
+    profile.write_text('echo "welcome"\nexport HOMEBREW_PREFIX=/opt/brew\nexport UNRELATED=1\n'
+                       'export PATH="/opt/brew/bin:$PATH"\n')
+    return profile
+
+
+def test_capture_filters_variables(profile):
+    """Test that the profile is sourced and only toolchain variables are kept"""
+    script = load_login_env().read_text()
+
+    assert "export HOMEBREW_PREFIX=/opt/brew\n" in script
+    assert "export PATH=/opt/brew/bin:" in script
+    assert 'UNRELATED' not in script
+
+
+def test_orchestrator_environment_not_captured(profile, monkeypatch):
+    """Test that a venv or nix shell the orchestrator runs in doesn't end up in the cache"""
+    monkeypatch.setenv('PATH', f"/venv/bin:{os.environ['PATH']}")
+    monkeypatch.setenv('LD_LIBRARY_PATH', '/nix/store/lib')
+    monkeypatch.setenv('HOMEBREW_NO_AUTO_UPDATE', '1')
+
+    script = load_login_env().read_text()
+
+    assert "export PATH=/opt/brew/bin:" in script
+    assert '/venv/bin' not in script
+    assert 'LD_LIBRARY_PATH' not in script
+    assert 'HOMEBREW_NO_AUTO_UPDATE' not in script
+
+
+def test_cache_reused_until_profile_changes(profile, monkeypatch):
+    """Test that an unchanged profile is not sourced again"""
+    first = load_login_env()
+
+    def fail(shell):
+        raise AssertionError("profile sourced again")
+    monkeypatch.setattr(login_env, 'capture_login_env', fail)
+    assert load_login_env() == first
+
+    monkeypatch.undo()
+    monkeypatch.setattr(login_env, 'get_login_shell', lambda: shutil.which('bash'))
+    profile.write_text('export HOMEBREW_PREFIX=/usr/local\n')
+    stat = profile.stat()
+    os.utime(profile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert "HOMEBREW_PREFIX=/usr/local" in load_login_env().read_text()
+
+
+def test_failed_capture_falls_back(profile):
+    """Test that a broken profile leaves the wrapper to source it itself"""
+    profile.write_text('exit 3\n')
+
+    assert load_login_env() is None
+
+
+def test_run_tracked_uses_captured_env(profile, tmp_path):
+    """Test that run_tracked.sh exports the captured environment instead of sourcing the profile"""
+    script = load_login_env()
+    profile.write_text('export HOMEBREW_PREFIX=/sourced-again\n')
+    log_file, status_file = tmp_path / 'op.log', tmp_path / 'op.status'
+
+    subprocess.run(
+        ['bash', str(RUN_TRACKED), 'env-op', 'echo "prefix=$HOMEBREW_PREFIX"',
+         str(log_file), str(status_file), 'true'],
+        env={**os.environ, 'TERM': 'dumb', 'DOTFILES_LOGIN_ENV': str(script)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30,
+    )
+
+    assert 'prefix=/opt/brew' in log_file.read_text()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
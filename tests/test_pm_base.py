@@ -11,7 +11,7 @@ import sys
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
 
-from pm_base import PackageManager, PMParser, DefaultParser
+from pm_base import PackageManager, PMParser, DefaultParser, DEFAULT_TIMEOUTS
 from pm_registry import get_pm, PM_REGISTRY
 from pms.zinit import ZinitPM, ZinitParser
 
@@ -98,6 +98,36 @@ class TestPMRegistry:
             get_pm('nonexistent-pm')
 
 
+class TestTimeouts:
+    """Test per-PM, per-operation timeout policies"""
+
+    @pytest.fixture(autouse=True)
+    def clean_env(self, temp_home, monkeypatch):
+        for name in ('DOTFILES_PM_TIMEOUT', 'DOTFILES_PM_TIMEOUT_CHECK', 'DOTFILES_PM_TIMEOUT_APT_CHECK'):
+            monkeypatch.delenv(name, raising=False)
+        return temp_home
+
+    def test_pm_policy(self):
+        """Test defaults and PM-specific policies"""
+        assert get_pm('zinit').get_timeout('upgrade') == DEFAULT_TIMEOUTS['upgrade']
+        assert get_pm('apt').get_timeout('check') == 300
+
+    def test_override_precedence(self, monkeypatch):
+        """Test --timeout beats PM settings, which beat operation settings"""
+        apt = get_pm('apt')
+        monkeypatch.setenv('DOTFILES_PM_TIMEOUT_CHECK', '30')
+        assert apt.get_timeout('check') == 30
+        monkeypatch.setenv('DOTFILES_PM_TIMEOUT_APT_CHECK', '45')
+        assert apt.get_timeout('check') == 45
+        monkeypatch.setenv('DOTFILES_PM_TIMEOUT', '0')
+        assert apt.get_timeout('check') is None
+
+    def test_dotfiles_env_config(self, clean_env):
+        """Test settings saved in ~/.dotfiles.env"""
+        (clean_env / '.dotfiles.env').write_text('export DOTFILES_PM_TIMEOUT_APT_CHECK="90"\n')
+        assert get_pm('apt').get_timeout('check') == 90
+
+
 class TestBackwardCompatibility:
     """Test new OOP design maintains backward compatibility"""
 
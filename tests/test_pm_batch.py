@@ -0,0 +1,71 @@
+"""
+Tests for batch mode
+
+Checks that batch mode skips the selection countdown and the
+terminal-close countdown even when attached to a tty.
+"""
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+import pm_select
+import terminal_executor
+from pm_select import batch_mode, select_pms
+
+
+class FakeTty(io.StringIO):
+    def isatty(self):
+        return True
+
+
+def test_batch_mode_from_config(temp_home, monkeypatch):
+    """Test that DOTFILES_PM_BATCH is read from the environment or ~/.dotfiles.env"""
+    monkeypatch.delenv('DOTFILES_PM_BATCH', raising=False)
+    assert not batch_mode()
+
+    (temp_home / '.dotfiles.env').write_text('export DOTFILES_PM_BATCH="true"\n')
+    assert batch_mode()
+
+    monkeypatch.setenv('DOTFILES_PM_BATCH', 'false')
+    assert not batch_mode()
+
+
+def test_selection_skips_countdown(monkeypatch):
+    """Test that batch mode selects every PM without waiting, even on a tty"""
+    monkeypatch.setattr(sys, 'stdin', FakeTty())
+    monkeypatch.setattr(sys, 'stdout', FakeTty())
+    monkeypatch.delenv('DOTFILES_PM_UI_SELECT', raising=False)
+    monkeypatch.setenv('DOTFILES_PM_BATCH', 'true')
+
+    def no_wait(prompt, timeout):
+        raise AssertionError("waited for input in batch mode")
+
+    monkeypatch.setattr(pm_select, '_input_with_timeout', no_wait)
+
+    assert select_pms(['npm', 'apt']) == ['apt', 'npm']
+
+
+def test_close_terminals_without_countdown(monkeypatch, capsys):
+    """Test that batch mode closes this session's terminals right away"""
+    monkeypatch.setenv('DOTFILES_PM_BATCH', 'true')
+    closed = []
+    monkeypatch.setattr(terminal_executor, 'close_all_terminals', lambda: closed.append(True) or 2)
+
+    monkeypatch.setattr(terminal_executor, '_load_terminal_registry', lambda: [])
+    terminal_executor.prompt_close_terminals()
+    assert closed == []
+
+    monkeypatch.setattr(terminal_executor, '_load_terminal_registry', lambda: [{'title': 'a'}, {'title': 'b'}])
+    terminal_executor.prompt_close_terminals()
+    assert closed == [True]
+    assert "Closed 2 terminal(s)" in capsys.readouterr().out
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
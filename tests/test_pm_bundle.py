@@ -0,0 +1,147 @@
+"""
+Tests for the compiled machine class bundle
+
+Builds a small machine-classes/ tree and checks what the bundle holds, when
+it is recompiled and that pm_install and the stow engine read from it.
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+import pm_bundle
+from pm_bundle import compile_bundle, get_bundle_path, load_bundle, main
+
+
+@pytest.fixture
+def dotfiles(tmp_path, temp_home, monkeypatch):
+    """A dotfiles root with one machine class, configured as the current one"""
+    root = tmp_path / 'dotfiles'
+    class_dir = root / 'machine-classes' / 'test_class'
+    (class_dir / 'apt').mkdir(parents=True)
+    (class_dir / 'apt' / 'packages.txt').write_text("# Tools\ngit\n\n  # indented comment\ncurl\n")
+    (class_dir / 'brew').mkdir()
+    (class_dir / 'brew' / 'Brewfile').write_text('brew "jq"\n')
+    (class_dir / 'brew-cask').mkdir()
+    (class_dir / 'stow').mkdir()
+    (class_dir / 'stow' / 'stow.txt').write_text("shell_common\ngit_common\n")
+    (class_dir / 'win-reg').mkdir()
+    for package in ('shell_common', 'git_common'):
+        (root / 'configs' / package).mkdir(parents=True)
+
+    monkeypatch.setattr(pm_bundle, 'DOTFILES_ROOT', root)
+    monkeypatch.setattr(pm_bundle, '_loaded', {})
+    monkeypatch.setenv('DOTFILES_MACHINE_CLASS', 'test_class')
+    return class_dir
+
+
+def touch_later(path):
+    """Move a file's mtime forward so a stat check sees it"""
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_compile_contents(dotfiles):
+    """Test the PM list, parsed packages, stow list and hashes"""
+    bundle = compile_bundle('test_class')
+
+    assert bundle['pms'] == ['apt', 'brew', 'brew-cask']
+    assert bundle['packages'] == {'apt': ['git', 'curl']}
+    assert bundle['stow'] == ['shell_common', 'git_common']
+    assert set(bundle['files']) == {'apt/packages.txt', 'brew/Brewfile', 'stow/stow.txt'}
+    assert len(bundle['files']['brew/Brewfile']['sha256']) == 64
+    assert bundle['warnings'] == []
+
+    with pytest.raises(FileNotFoundError):
+        compile_bundle('missing_class')
+
+
+def test_validation_warnings(dotfiles):
+    """Test that duplicates and unknown stow packages are reported"""
+    (dotfiles / 'apt' / 'packages.txt').write_text("git\ngit\n")
+    (dotfiles / 'stow' / 'stow.txt').write_text("shell_common\nnvim_common\n")
+
+    warnings = compile_bundle('test_class')['warnings']
+
+    assert warnings == ["apt/packages.txt: 'git' listed more than once",
+                        "stow/stow.txt: no configs/nvim_common package"]
+
+
+def test_recompiled_only_on_hash_change(dotfiles, monkeypatch):
+    """Test that unchanged sources reuse the bundle and changed ones recompile it"""
+    compiled = []
+    real_compile = pm_bundle.compile_bundle
+    monkeypatch.setattr(pm_bundle, 'compile_bundle', lambda *args: compiled.append(args) or real_compile(*args))
+
+    assert load_bundle()['packages']['apt'] == ['git', 'curl']
+    assert get_bundle_path('test_class').exists()
+    monkeypatch.setattr(pm_bundle, '_loaded', {})
+    load_bundle()
+    assert len(compiled) == 1
+
+    # Same content, new mtime: stats refreshed, not recompiled
+    touch_later(dotfiles / 'apt' / 'packages.txt')
+    load_bundle()
+    assert len(compiled) == 1
+    assert pm_bundle._stats_match(json.loads(get_bundle_path('test_class').read_text()), dotfiles)
+
+    (dotfiles / 'apt' / 'packages.txt').write_text("git\ncurl\nwget\n")
+    touch_later(dotfiles / 'apt' / 'packages.txt')
+    assert load_bundle()['packages']['apt'] == ['git', 'curl', 'wget']
+    assert len(compiled) == 2
+
+    (dotfiles / 'npm').mkdir()
+    touch_later(dotfiles)
+    assert 'npm' in load_bundle()['pms']
+    assert len(compiled) == 3
+
+
+def test_invalid_bundle_recompiled(dotfiles):
+    """Test that a corrupt or foreign bundle file is replaced"""
+    path = get_bundle_path('test_class')
+    path.parent.mkdir(parents=True)
+    for content in ('not json', json.dumps({'version': 0}),
+                    json.dumps(dict(compile_bundle('test_class'), class_dir='/elsewhere'))):
+        path.write_text(content)
+        pm_bundle._loaded.clear()
+        assert load_bundle()['class_dir'] == str(dotfiles)
+
+
+def test_no_machine_class(dotfiles, monkeypatch):
+    """Test that an unset or missing machine class has no bundle"""
+    monkeypatch.delenv('DOTFILES_MACHINE_CLASS')
+    assert load_bundle() is None
+    assert load_bundle('missing_class') is None
+
+
+def test_subsystems_read_bundle(dotfiles, capsys):
+    """Test that pm_detect, pm_install and the stow CLI use the bundle"""
+    from pm_detect import get_machine_class_pms
+    from src.dotfiles_pm import pm_install
+
+    assert get_machine_class_pms() == {'apt', 'brew', 'brew-cask'}
+    assert pm_install.get_machine_config_dir('brew') == dotfiles / 'brew'
+    assert pm_install.get_machine_config_dir('npm') is None
+    assert pm_install.get_machine_packages('apt') == ['git', 'curl']
+    assert pm_install.get_machine_packages('brew') is None
+
+    assert main(['--stow']) == 0
+    assert capsys.readouterr().out.split() == ['shell_common', 'git_common']
+
+
+def test_real_machine_classes_compile(temp_home):
+    """Test that every machine class in the repo compiles with its stow list"""
+    for class_dir in sorted((PROJECT_ROOT / 'machine-classes').iterdir()):
+        if class_dir.is_dir():
+            bundle = compile_bundle(class_dir.name, PROJECT_ROOT)
+            assert bundle['stow'], class_dir.name
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
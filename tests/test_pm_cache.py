@@ -0,0 +1,214 @@
+"""
+Tests for the shared package download cache
+
+Runs the cache in front of a stand-in HTTP origin on localhost and checks
+what reaches the origin.
+"""
+import hashlib
+import http.client
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+from pm_cache import (CacheServer, ContentStore, DEFAULT_MIRRORS, cache_env_prefix, is_artifact, parse_size,
+                      resolve_upstream)
+
+BOTTLE = '/v2/homebrew/core/wget/blobs/sha256:' + '0' * 64
+
+FILES = {
+    '/pool/main/w/wget_1.21.deb': b'deb package ' * 1000,
+    '/mirror2/wget_1.21.deb': b'deb package ' * 1000,
+    '/dists/jammy/InRelease': b'index v1',
+    '/typescript/-/typescript-5.4.5.tgz': b'npm tarball',
+    BOTTLE: b'brew bottle',
+}
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        body = FILES.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+@pytest.fixture
+def origin():
+    """Stand-in origin; its .requests lists the paths it served"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OriginHandler)
+    server.requests = []
+    _serve(server)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(origin, tmp_path):
+    """Cache server with the origin mirrored under /origin/"""
+    origin_url = f"http://127.0.0.1:{origin.server_address[1]}"
+    server = CacheServer(('127.0.0.1', 0), ContentStore(tmp_path / 'cache', parse_size('10M')),
+                         mirrors={'origin': origin_url})
+    server.origin_url = origin_url
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    _serve(server)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.read(), response.headers.get('X-Cache')
+
+
+def wait_for(condition, timeout=5.0):
+    """The cache stores a file after the client has it all; wait for that"""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_second_download_from_cache(cache, origin):
+    """Test that a package file reaches the origin once and is stored by hash"""
+    url = f"{cache.url}/origin/pool/main/w/wget_1.21.deb"
+    body = FILES['/pool/main/w/wget_1.21.deb']
+
+    assert fetch(url) == (body, 'MISS')
+    assert fetch(url) == (body, 'HIT')
+
+    assert origin.requests == ['/pool/main/w/wget_1.21.deb']
+    sha256 = hashlib.sha256(body).hexdigest()
+    assert wait_for(cache.store.object_path(sha256).exists)
+    assert cache.store.object_path(sha256).read_bytes() == body
+    assert cache.stats['hits'] == 1
+
+
+def test_indexes_not_cached(cache, origin):
+    """Test that metadata always goes to the origin"""
+    url = f"{cache.url}/origin/dists/jammy/InRelease"
+
+    fetch(url)
+    fetch(url)
+
+    assert origin.requests == ['/dists/jammy/InRelease'] * 2
+
+
+def test_url_path_and_proxy_requests(cache, origin):
+    """Test brew-style /<url> paths and apt-style absolute-URI proxy requests"""
+    tarball = f"{cache.origin_url}/typescript/-/typescript-5.4.5.tgz"
+    assert fetch(f"{cache.url}/{tarball}")[0] == b'npm tarball'
+
+    conn = http.client.HTTPConnection('127.0.0.1', cache.server_address[1], timeout=10)
+    conn.request('GET', tarball)
+    response = conn.getresponse()
+    assert (response.status, response.read(), response.getheader('X-Cache')) == (200, b'npm tarball', 'HIT')
+    conn.close()
+
+    assert origin.requests == ['/typescript/-/typescript-5.4.5.tgz']
+
+
+def test_ghcr_v2_paths(cache, origin):
+    """Test that HOMEBREW_ARTIFACT_DOMAIN's /v2/... requests go to ghcr.io and are cached"""
+    assert resolve_upstream(BOTTLE, DEFAULT_MIRRORS) == 'https://ghcr.io' + BOTTLE
+
+    cache.mirrors['v2'] = f"{cache.origin_url}/v2"
+    assert fetch(cache.url + BOTTLE) == (b'brew bottle', 'MISS')
+    assert fetch(cache.url + BOTTLE) == (b'brew bottle', 'HIT')
+    assert origin.requests == [BOTTLE]
+
+
+def test_other_hosts_refused(cache):
+    """Test that the cache only fetches from the mirrors and package hosts"""
+    conn = http.client.HTTPConnection('127.0.0.1', cache.server_address[1], timeout=10)
+    for target in ('http://169.254.169.254/latest/meta-data/', '/http://intranet.lan/secret.deb'):
+        conn.request('GET', target)
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 403
+    conn.close()
+
+    assert cache.stats['passed'] == cache.stats['misses'] == 0
+
+
+def test_missing_file_not_cached(cache, origin):
+    """Test that origin errors are relayed and not stored"""
+    for _ in range(2):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            fetch(f"{cache.url}/origin/pool/missing_1.0.deb")
+        assert error.value.code == 404
+
+    assert len(origin.requests) == 2
+    assert cache.store.index == {}
+
+
+def test_same_content_stored_once(cache):
+    """Test that identical files at different URLs share one object"""
+    fetch(f"{cache.url}/origin/pool/main/w/wget_1.21.deb")
+    fetch(f"{cache.url}/origin/mirror2/wget_1.21.deb")
+
+    assert wait_for(lambda: len(cache.store.index) == 2)
+    assert cache.store.total_size() == len(FILES['/mirror2/wget_1.21.deb'])
+
+
+def test_lru_eviction(tmp_path):
+    """Test that the least recently used URL is evicted past the size limit"""
+    store = ContentStore(tmp_path, max_bytes=25)
+
+    def add(url, content):
+        tmp = store.new_temp_file()
+        tmp.write_bytes(content)
+        store.store(url, tmp, hashlib.sha256(content).hexdigest(), len(content))
+
+    add('a.deb', b'a' * 10)
+    add('b.deb', b'b' * 10)
+    assert store.lookup('a.deb')
+    add('c.deb', b'c' * 10)
+
+    assert list(store.index) == ['a.deb', 'c.deb']
+    assert not store.object_path(hashlib.sha256(b'b' * 10).hexdigest()).exists()
+    assert list(ContentStore(tmp_path, max_bytes=25).index) == ['a.deb', 'c.deb']
+
+
+def test_artifacts_and_client_settings(monkeypatch, temp_home):
+    """Test what counts as a package file and the install-side settings"""
+    assert is_artifact('https://ghcr.io/v2/homebrew/core/wget/blobs/sha256:' + '0' * 64)
+    assert is_artifact('http://archive.ubuntu.com/ubuntu/pool/main/w/wget/wget_1.21.2-2ubuntu1_amd64.deb')
+    assert not is_artifact('https://registry.npmjs.org/typescript')
+
+    monkeypatch.delenv('DOTFILES_PM_CACHE_URL', raising=False)
+    assert cache_env_prefix('brew') == ''
+
+    monkeypatch.setenv('DOTFILES_PM_CACHE_URL', 'http://cache.lan:3142/')
+    assert cache_env_prefix('brew') == 'HOMEBREW_ARTIFACT_DOMAIN=http://cache.lan:3142 '
+    assert cache_env_prefix('npm') == 'npm_config_registry=http://cache.lan:3142/npm/ '
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,132 @@
+"""
+Tests for the pm daemon and its client
+
+Runs a real daemon server on a temporary socket with detection and PM
+commands faked out, and talks to it through pm_client.
+"""
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+import pm_client
+import pm_daemon
+from pm_client import DaemonUnavailable, request
+from pm_daemon import DaemonServer, DaemonState
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="Unix sockets are POSIX-only")
+
+NPM_OUTDATED = "typescript  5.2.2  5.4.5  5.4.5  node_modules/typescript  global\n"
+
+
+@pytest.fixture
+def fake_pms(monkeypatch, temp_home):
+    """Detect npm, pip and apt; record the commands the daemon runs"""
+    ran = []
+    outputs = {('npm', 'check'): NPM_OUTDATED, ('pip', 'check'): ''}
+
+    def fake_execute(pm_name, operation, interactive=True):
+        ran.append((pm_name, operation))
+        if operation == 'upgrade':
+            outputs[(pm_name, 'check')] = ''
+        return {'success': True, 'output': outputs.get((pm_name, operation), ''), 'error': ''}
+
+    monkeypatch.setattr(pm_daemon, 'detect_all_pms', lambda operation='check': ['apt', 'npm', 'pip'])
+    monkeypatch.setattr(pm_daemon, 'execute_pm_command', fake_execute)
+    return ran
+
+
+@pytest.fixture
+def daemon(tmp_path, fake_pms, monkeypatch):
+    """A daemon serving on a temporary socket (no background checks)"""
+    socket_path = tmp_path / 'pm.sock'
+    monkeypatch.setenv('DOTFILES_PM_DAEMON_SOCKET', str(socket_path))
+    server = DaemonServer(socket_path, DaemonState(interval=0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join(timeout=5)
+
+
+def test_check_then_outdated(daemon, fake_pms):
+    """Test that checks are cached and the outdated count comes from the cache"""
+    assert request('outdated')['total'] == 0
+
+    checks = request('check', timeout=None)['checks']
+    assert set(checks) == {'npm', 'pip'}  # apt needs sudo
+    assert checks['npm']['outdated_count'] == 1
+
+    request('check', timeout=None, max_age=3600)
+    assert fake_pms == [('npm', 'check'), ('pip', 'check')]
+
+    outdated = request('outdated')
+    assert outdated['total'] == 1 and outdated['pms']['npm'] == 1
+
+
+def test_upgrade_rechecks(daemon, fake_pms):
+    """Test that upgrades default to the outdated PMs and refresh their counts"""
+    request('check', timeout=None)
+
+    response = request('upgrade', timeout=None)
+
+    assert list(response['results']) == ['npm']
+    assert ('npm', 'upgrade') in fake_pms
+    assert request('outdated')['total'] == 0
+
+
+def test_sudo_upgrade_refused(daemon):
+    """Test that the daemon leaves sudo PMs to pm upgrade"""
+    results = request('upgrade', timeout=None, pms=['apt'])['results']
+
+    assert not results['apt']['success']
+    assert 'sudo' in results['apt']['error']
+
+
+def test_results_survive_restart(daemon, fake_pms):
+    """Test that a new daemon starts with the previous check results"""
+    request('check', timeout=None)
+
+    assert DaemonState(interval=0).outdated()['total'] == 1
+
+
+def test_one_daemon_per_socket(daemon, tmp_path):
+    """Test that a second daemon refuses a live socket"""
+    with pytest.raises(RuntimeError):
+        DaemonServer(daemon.socket_path, DaemonState(interval=0))
+
+
+def test_stale_socket_replaced(tmp_path, fake_pms):
+    """Test that a socket left by a crashed daemon doesn't block a new one"""
+    socket_path = tmp_path / 'pm.sock'
+    socket_path.touch()
+
+    server = DaemonServer(socket_path, DaemonState(interval=0))
+    server.server_close()
+
+    assert not socket_path.exists()
+
+
+def test_client_outdated_and_no_daemon(daemon, capsys, monkeypatch, tmp_path):
+    """Test the prompt-facing client output and its exit code without a daemon"""
+    request('check', timeout=None)
+    capsys.readouterr()  # the daemon's own log lines
+
+    assert pm_client.main(['outdated']) == 0
+    assert capsys.readouterr().out.strip() == '1'
+
+    monkeypatch.setenv('DOTFILES_PM_DAEMON_SOCKET', str(tmp_path / 'missing.sock'))
+    assert pm_client.main(['outdated']) == pm_client.EXIT_NO_DAEMON
+    with pytest.raises(DaemonUnavailable):
+        request('ping')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
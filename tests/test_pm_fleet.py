@@ -0,0 +1,126 @@
+"""
+Tests for the pm fleet runner
+
+Runs fleets against a fake `docker` on PATH that answers for a few
+containers the way `pm <operation> --output json` would.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+import pm_fleet
+from pm_fleet import FleetTarget, discover_targets, parse_target, read_targets_file, run_fleet
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="fake docker is a shell script")
+
+FAKE_DOCKER = """#!/bin/sh
+if [ "$1" = ps ]; then
+    printf 'fleet-1\\nfleet-2\\n'
+    exit 0
+fi
+shift
+if [ "$1" = --user ]; then shift 2; fi
+name=$1
+printf '%s\\n' "$4" >> "$FAKE_DOCKER_LOG"
+case $name in
+    fleet-1) echo '{"schema": 1, "command": "check", "failed": [], "outdated_count": 3}' ;;
+    fleet-2) echo '{"schema": 1, "command": "check", "failed": [], "outdated_count": 0}' ;;
+    partial) echo '{"schema": 1, "command": "check", "failed": ["pip"], "outdated_count": 1}' ;;
+    *) echo "sh: 1: python3: not found" >&2; exit 127 ;;
+esac
+"""
+
+
+@pytest.fixture
+def fake_docker(tmp_path, monkeypatch):
+    """A docker on PATH; returns the file logging the scripts run in containers"""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    docker = bin_dir / 'docker'
+    docker.write_text(FAKE_DOCKER)
+    docker.chmod(0o755)
+    log = tmp_path / 'docker.log'
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv('FAKE_DOCKER_LOG', str(log))
+    return log
+
+
+def test_parse_targets(tmp_path):
+    """Test target specs, bare names and targets files"""
+    assert parse_target('dev-1') == FleetTarget('docker', 'dev-1')
+    assert parse_target('podman:arch-1').label == 'podman:arch-1'
+    assert parse_target('chroot:/srv/jammy') == FleetTarget('chroot', '/srv/jammy')
+    for spec in ('ssh:host', 'docker:'):
+        with pytest.raises(ValueError):
+            parse_target(spec)
+
+    targets_file = tmp_path / 'fleet.txt'
+    targets_file.write_text("# developer boxes\ndev-1\n\npodman:arch-1  # arch\n")
+    assert read_targets_file(targets_file) == [FleetTarget('docker', 'dev-1'), FleetTarget('podman', 'arch-1')]
+
+
+def test_check_aggregates_targets(fake_docker):
+    """Test per-target results, failures and the command run in each container"""
+    targets = [parse_target(spec) for spec in ('fleet-1', 'fleet-2', 'partial', 'bare')]
+    reported = []
+
+    results = run_fleet(targets, 'check', ['npm', 'pip'], jobs=2, on_result=reported.append)
+
+    assert [r['target'] for r in results] == ['docker:fleet-1', 'docker:fleet-2', 'docker:partial', 'docker:bare']
+    assert sorted(r['target'] for r in reported) == sorted(r['target'] for r in results)
+    assert [r['success'] for r in results] == [True, True, False, False]
+    assert [r['outdated_count'] for r in results] == [3, 0, 1, 0]
+    assert results[0]['result']['command'] == 'check'
+    assert 'pip' in results[2]['error']
+    assert 'python3: not found' in results[3]['error'] and results[3]['exit_code'] == 127
+
+    scripts = fake_docker.read_text().splitlines()
+    assert len(scripts) == 4
+    assert all('pm check --yes --output json npm pip' in script for script in scripts)
+
+
+def test_jobs_bound_concurrency(monkeypatch):
+    """Test that no more than `jobs` targets run at the same time"""
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    class Done:
+        returncode = 0
+        stdout = json.dumps({'failed': []})
+        stderr = ''
+
+    def fake_run(command, timeout=None, shell=False):
+        with lock:
+            running.append(command)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(command)
+        return Done()
+
+    monkeypatch.setattr(pm_fleet, 'run_command', fake_run)
+
+    results = run_fleet([FleetTarget('docker', f'box-{i}') for i in range(6)], 'upgrade', jobs=2)
+
+    assert all(r['success'] for r in results)
+    assert max(peak) <= 2
+
+
+def test_discover_class_containers(fake_docker):
+    """Test that --class finds the running containers of a machine class image"""
+    assert discover_targets('docker', 'docker_developer_ubuntu') == [
+        FleetTarget('docker', 'fleet-1'), FleetTarget('docker', 'fleet-2')]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
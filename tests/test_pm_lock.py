@@ -0,0 +1,171 @@
+"""
+Tests for cross-process PM resource locks
+
+Competing holders run as child processes so the flock semantics match
+concurrent dotfiles-pm sessions.
+"""
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+import pm_refresh
+from pm_lock import ResourceLock, read_holder, lock_status, wrap_command
+
+PM_LOCK_SCRIPT = PROJECT_ROOT / 'src' / 'dotfiles_pm' / 'pm_lock.py'
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="flock is POSIX-only")
+
+
+def run_locked(resource, command, *extra):
+    """Start `pm_lock.py run` in the background"""
+    return subprocess.Popen(
+        [sys.executable, str(PM_LOCK_SCRIPT), 'run', resource, '--operation', f"{resource}-test",
+         *extra, '--', 'sh', '-c', command]
+    )
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestResourceLock:
+    """Tests for in-process locking against other processes"""
+
+    def test_exclusive_blocks_other_process(self, temp_home):
+        """Test that a held lock makes other acquirers wait"""
+        proc = run_locked('brew', 'sleep 10')
+        try:
+            assert wait_until(lambda: read_holder('brew') is not None)
+            assert not ResourceLock('brew').acquire(timeout=0.5)
+        finally:
+            proc.kill()
+            proc.wait()
+
+        # Holder exit releases the lock, even though its orphaned sleep lives on
+        lock = ResourceLock('brew')
+        assert lock.acquire(timeout=2)
+        lock.release()
+
+    def test_shared_locks_coexist(self, temp_home):
+        """Test that shared holders don't block each other but block exclusive"""
+        proc = run_locked('npm', 'sleep 10', '--shared')
+        try:
+            assert wait_until(lambda: read_holder('npm') is not None)
+            shared = ResourceLock('npm', shared=True)
+            assert shared.acquire(timeout=1)
+            shared.release()
+            assert not ResourceLock('npm').acquire(timeout=0.5)
+        finally:
+            proc.kill()
+            proc.wait()
+
+    def test_holder_record(self, temp_home):
+        """Test that the holder's PID and operation are readable and cleared on release"""
+        lock = ResourceLock('apt', operation='apt-upgrade')
+        assert read_holder('apt') is None
+        assert lock.acquire(timeout=1)
+        try:
+            holder = read_holder('apt')
+            assert holder['pid'] == os.getpid()
+            assert holder['operation'] == 'apt-upgrade'
+        finally:
+            lock.release()
+        assert read_holder('apt') is None
+
+    def test_stale_ticket_skipped(self, temp_home):
+        """Test that a ticket left by a dead process doesn't block the queue"""
+        dead = subprocess.Popen(['true'])
+        dead.wait()
+        lock = ResourceLock('brew')
+        lock.queue_dir.mkdir(parents=True)
+        stale = lock.queue_dir / f"{0:020d}-{dead.pid}-deadbeef"
+        stale.touch()
+
+        assert lock.acquire(timeout=1)
+        lock.release()
+        assert not stale.exists()
+
+
+class TestRunCommand:
+    """Tests for `pm_lock.py run`"""
+
+    def test_wrapper_is_recorded_holder(self, temp_home):
+        """Test that the run wrapper is recorded as the holder while the command runs"""
+        proc = run_locked('brew', 'sleep 10')
+        try:
+            assert wait_until(lambda: (read_holder('brew') or {}).get('pid') == proc.pid)
+        finally:
+            proc.kill()
+            proc.wait()
+
+    def test_exit_code_propagates(self, temp_home):
+        """Test that the command's exit code is returned"""
+        proc = run_locked('brew', 'exit 7')
+        assert proc.wait(timeout=10) == 7
+
+    def test_waiters_run_in_arrival_order(self, temp_home, tmp_path):
+        """Test FIFO ordering of queued sessions"""
+        order = tmp_path / 'order'
+        holder = run_locked('brew', 'sleep 1')
+        assert wait_until(lambda: read_holder('brew') is not None)
+
+        waiters = []
+        for i in range(3):
+            waiters.append(run_locked('brew', f"echo {i} >> {order}"))
+            queue_dir = temp_home / '.dotfiles' / 'locks' / 'brew.queue'
+            assert wait_until(lambda: len(os.listdir(queue_dir)) == i + 1)
+
+        for proc in [holder] + waiters:
+            assert proc.wait(timeout=15) == 0
+        assert order.read_text().split() == ['0', '1', '2']
+
+    def test_status_lists_waiting(self, temp_home):
+        """Test that lock_status reports holders and queue length"""
+        holder = run_locked('brew', 'sleep 10')
+        waiter = None
+        try:
+            assert wait_until(lambda: read_holder('brew') is not None)
+            waiter = run_locked('brew', 'true')
+            assert wait_until(lambda: lock_status()[0]['waiting'] == 1)
+            assert lock_status()[0]['holder']['operation'] == 'brew-test'
+        finally:
+            for proc in (holder, waiter):
+                if proc:
+                    proc.kill()
+                    proc.wait()
+
+
+def test_wrap_command_uses_pm_resource(monkeypatch):
+    """Test that brew-cask shares brew's lock and checks lock shared"""
+    monkeypatch.delenv('DOTFILES_PM_LOCKS', raising=False)
+    # Once brew update has run this session, checks only read the index
+    monkeypatch.setattr(pm_refresh, '_refreshed', {'brew': {'success': True}})
+    wrapped = wrap_command('brew-cask', 'check', 'brew outdated --cask')
+    assert ' run brew ' in wrapped
+    assert '--shared' in wrapped
+
+    assert '--shared' not in wrap_command('brew-cask', 'upgrade', 'brew upgrade --cask')
+    assert '--shared' not in wrap_command('npm', 'refresh', 'true')
+    assert '--shared' not in wrap_command('apt', 'check', 'sudo apt-get update')
+    # Checks that write PM state are exclusive too
+    assert '--shared' not in wrap_command('neovim', 'check', 'nvim --headless -c "Lazy check" -c qa')
+
+    monkeypatch.setenv('DOTFILES_PM_LOCKS', 'false')
+    assert wrap_command('brew', 'upgrade', 'brew upgrade') == 'brew upgrade'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
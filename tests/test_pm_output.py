@@ -0,0 +1,101 @@
+"""
+Tests for machine-readable output
+
+Checks the per-PM result schema, NDJSON streaming, and that the human
+report stays off stdout in json/ndjson mode.
+"""
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+from pm_output import SCHEMA_VERSION, OutputEmitter, format_result, open_output
+from pm_registry import get_pm
+
+NPM_OUTDATED = """Package     Current  Wanted  Latest  Location                 Depended by
+typescript  5.2.2    5.4.5   5.4.5   node_modules/typescript  global
+"""
+
+
+@pytest.mark.parametrize('pm_name, output, packages', [
+    ('brew', "wget (1.21.3) < 1.21.4\nnode (20.1.0) != 20.2.0\n",
+     [{'name': 'wget', 'current': '1.21.3', 'latest': '1.21.4'},
+      {'name': 'node', 'current': '20.1.0', 'latest': '20.2.0'}]),
+    ('brew-cask', "firefox\n",
+     [{'name': 'firefox', 'current': None, 'latest': None}]),
+    ('apt', "NOTE: This is only a simulation!\n"
+            "Inst libssl3 [3.0.2-0ubuntu1.14] (3.0.2-0ubuntu1.15 Ubuntu:22.04/jammy-updates [amd64])\n"
+            "Conf libssl3 (3.0.2-0ubuntu1.15 Ubuntu:22.04/jammy-updates [amd64])\n",
+     [{'name': 'libssl3', 'current': '3.0.2-0ubuntu1.14', 'latest': '3.0.2-0ubuntu1.15'}]),
+    ('npm', NPM_OUTDATED,
+     [{'name': 'typescript', 'current': '5.2.2', 'latest': '5.4.5'}]),
+    ('pip', "Package Version Latest Type\n------- ------- ------ -----\nrequests 2.31.0 2.32.3 wheel\n",
+     [{'name': 'requests', 'current': '2.31.0', 'latest': '2.32.3'}]),
+    ('cargo', "anything\n", None),
+])
+def test_outdated_packages(pm_name, output, packages):
+    """Test that check output is parsed into packages where the PM supports it"""
+    assert get_pm(pm_name).outdated_packages(output) == packages
+
+
+def test_check_result_schema():
+    """Test the per-PM check object for a success and a failure"""
+    ok = format_result('check', {'pm': 'npm', 'success': True, 'output': NPM_OUTDATED, 'outdated_count': 1})
+    failed = format_result('check', {'pm': 'pip', 'success': False, 'output': '', 'error': 'timed out'})
+
+    assert ok == {'pm': 'npm', 'success': True, 'error': None, 'outdated_count': 1,
+                  'packages': [{'name': 'typescript', 'current': '5.2.2', 'latest': '5.4.5'}]}
+    assert failed['error'] == 'timed out' and failed['outdated_count'] == 0 and failed['packages'] is None
+
+
+def test_ndjson_streams_each_result():
+    """Test that a result event is written as soon as the PM completes"""
+    stream = io.StringIO()
+    emitter = OutputEmitter('upgrade', 'ndjson', stream)
+    emitter.start()
+
+    emitter.result({'pm': 'npm', 'success': True})
+    events = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [e['event'] for e in events] == ['start', 'result']
+    assert events[1]['pm'] == 'npm' and events[1]['schema'] == SCHEMA_VERSION
+
+    emitter.result({'pm': 'pip', 'success': False, 'error': 'Upgrade failed with exit code 1'})
+    assert emitter.finish(1) == 1
+
+    summary = json.loads(stream.getvalue().splitlines()[-1])
+    assert summary['event'] == 'summary'
+    assert summary['exit_code'] == 1 and summary['succeeded'] == 1 and summary['failed'] == ['pip']
+
+
+def test_json_keeps_report_off_stdout(capsys):
+    """Test that prints go to stderr and stdout holds one JSON document"""
+    with open_output('install', 'json') as out:
+        print("📦 Package Manager Installation")
+        out.result({'pm': 'npm', 'success': True, 'installed_count': 3})
+        out.finish(0)
+
+    captured = capsys.readouterr()
+    document = json.loads(captured.out)
+    assert "Package Manager Installation" in captured.err
+    assert document['command'] == 'install'
+    assert document['results'][0]['installed_count'] == 3
+
+
+def test_text_mode_prints_as_usual(capsys):
+    """Test that the default output is untouched"""
+    with open_output('check') as out:
+        print("🔍 Package Manager Check")
+        out.result({'pm': 'npm', 'success': True})
+        assert out.finish(0) == 0
+
+    assert capsys.readouterr().out == "🔍 Package Manager Check\n"
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,115 @@
+"""
+Tests for download prefetching
+
+Checks that each PM turns its check output into the right download-only
+command, and that a plan runs and records its progress.
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+import pm_prefetch
+from pm_prefetch import build_prefetch_plan, read_status, run_plan
+from pm_registry import get_pm
+from pm_utils import atomic_write
+
+BREW_OUTDATED = """\
+Already up-to-date.
+wget (1.21.3) < 1.21.4
+python@3.12 (3.12.1) < 3.12.2
+"""
+
+CASK_OUTDATED = """\
+firefox
+visual-studio-code
+"""
+
+NPM_OUTDATED = """\
+Package     Current  Wanted  Latest  Location                  Depended by
+typescript    5.2.2   5.4.5   5.4.5  node_modules/typescript   global
+npm          10.2.4  10.5.2  10.5.2  node_modules/npm          global
+"""
+
+APT_OUTDATED = """\
+Reading package lists...
+Inst curl [7.81.0-1ubuntu1.15] (7.81.0-1ubuntu1.16 Ubuntu:22.04/jammy-updates [amd64])
+Conf curl (7.81.0-1ubuntu1.16 Ubuntu:22.04/jammy-updates [amd64])
+"""
+
+
+@pytest.mark.parametrize('pm_name, output, command', [
+    ('brew', BREW_OUTDATED, ['brew', 'fetch', 'wget', 'python@3.12']),
+    ('brew-cask', CASK_OUTDATED, ['brew', 'fetch', '--cask', 'firefox', 'visual-studio-code']),
+    ('npm', NPM_OUTDATED, ['npm', 'cache', 'add', 'typescript@5.4.5', 'npm@10.5.2']),
+    ('apt', APT_OUTDATED, ['sudo', '-n', 'apt-get', 'upgrade', '--download-only', '--yes', '--quiet']),
+])
+def test_prefetch_commands(pm_name, output, command):
+    """Test that outdated packages become a download-only command"""
+    assert get_pm(pm_name).prefetch_command(output) == command
+
+
+def test_plan_skips_up_to_date_and_failed():
+    """Test that only PMs with something to download are prefetched"""
+    plan = build_prefetch_plan([
+        {'pm': 'brew', 'success': True, 'output': BREW_OUTDATED},
+        {'pm': 'npm', 'success': True, 'output': ''},
+        {'pm': 'apt', 'success': True, 'output': 'Reading package lists...\n0 upgraded'},
+        {'pm': 'brew-cask', 'success': False, 'output': CASK_OUTDATED},
+        {'pm': 'pip', 'success': True, 'output': 'requests 2.31.0 2.32.0'},
+    ])
+
+    assert plan == {'brew': ['brew', 'fetch', 'wget', 'python@3.12']}
+
+
+def test_sudo_prefetch_needs_passwordless_sudo(monkeypatch):
+    """Test that sudo PMs are left out when the detached prefetch couldn't run sudo"""
+    results = [{'pm': 'apt', 'success': True, 'output': APT_OUTDATED},
+               {'pm': 'brew', 'success': True, 'output': BREW_OUTDATED}]
+
+    monkeypatch.setattr(pm_prefetch, 'sudo_unattended', lambda: False)
+    assert list(build_prefetch_plan(results)) == ['brew']
+    monkeypatch.setattr(pm_prefetch, 'sudo_unattended', lambda: True)
+    assert list(build_prefetch_plan(results)) == ['apt', 'brew']
+
+
+def test_run_plan_records_status(temp_home, monkeypatch):
+    """Test that every PM's prefetch runs and its outcome is recorded"""
+    monkeypatch.setenv('DOTFILES_PM_LOCKS', 'false')
+    monkeypatch.setenv('DOTFILES_PM_RETRIES', '0')
+
+    results = run_plan({
+        'npm': ['sh', '-c', 'echo added'],
+        'brew': ['sh', '-c', 'echo "Error: download failed" >&2; exit 1'],
+    })
+
+    assert results['npm']['success'] and not results['brew']['success']
+    status = read_status()
+    assert status['npm']['status'] == 'done'
+    assert status['brew']['status'] == 'failed'
+    assert 'download failed' in status['brew']['error']
+
+
+def test_concurrent_prefetch_entries_kept(temp_home, monkeypatch):
+    """Test that another prefetch's status entries survive this one's updates"""
+    status_file = pm_prefetch.get_prefetch_dir() / 'status.json'
+
+    def other_process_finishes(pm_name, command):
+        atomic_write(status_file, json.dumps({**read_status(), 'brew': {'status': 'done'}}))
+        return {'success': True, 'output': ''}
+
+    monkeypatch.setattr(pm_prefetch, 'prefetch_pm', other_process_finishes)
+    run_plan({'npm': ['true']})
+
+    status = read_status()
+    assert status['brew'] == {'status': 'done'}
+    assert status['npm']['status'] == 'done'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,84 @@
+"""
+Tests for PM process control
+
+Runs real shell commands to check that timeouts and cancellation stop the
+whole process group, not just the command's shell.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+import pm_process
+from pm_process import run_command, cancel_all, propagate_interrupt
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="process groups are POSIX-only")
+
+
+def gone(pid):
+    """True once pid has exited (zombies waiting for init to reap them count)"""
+    state = subprocess.run(['ps', '-o', 'stat=', '-p', str(pid)], capture_output=True, text=True).stdout
+    return not state.strip() or state.strip().startswith('Z')
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_captures_output():
+    """Test that output and exit code are returned like subprocess.run"""
+    result = run_command('echo out; echo err >&2; exit 4', shell=True)
+
+    assert (result.returncode, result.stdout, result.stderr) == (4, 'out\n', 'err\n')
+
+
+def test_timeout_stops_process_group():
+    """Test that a timeout kills the children a command started too"""
+    with pytest.raises(subprocess.TimeoutExpired) as exc:
+        run_command('sleep 30 & echo $!; wait', timeout=0.5, shell=True)
+
+    grandchild = int(exc.value.output.split()[0])
+    assert wait_until(lambda: gone(grandchild))
+    assert not pm_process._running
+
+
+def test_cancel_all_stops_running_commands():
+    """Test that cancellation stops commands running on other threads"""
+    results = []
+    worker = threading.Thread(target=lambda: results.append(run_command(['sleep', '30'])))
+    worker.start()
+    assert wait_until(lambda: bool(pm_process._running))
+
+    assert cancel_all(grace=1) == 1
+
+    worker.join(timeout=5)
+    assert results[0].returncode == -15
+
+
+def test_interrupt_cancels_and_reraises(monkeypatch):
+    """Test that Ctrl-C cancels running commands and still propagates"""
+    cancelled = []
+    monkeypatch.setattr(pm_process, 'cancel_all', lambda: cancelled.append(True) or 0)
+
+    with pytest.raises(KeyboardInterrupt):
+        with propagate_interrupt():
+            raise KeyboardInterrupt
+
+    assert cancelled == [True]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
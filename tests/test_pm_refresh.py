@@ -0,0 +1,136 @@
+"""
+Tests for the shared index refresh phase
+
+Checks refresh grouping, that each group refreshes once per session, that
+checks only refresh themselves when the phase hasn't covered them, and that
+fresh indexes are not refreshed at all.
+"""
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+import pm_refresh
+from pm_refresh import check_command_for, refresh_groups, run_refresh_phase
+from pm_registry import get_pm
+
+
+@pytest.fixture(autouse=True)
+def fresh_session(monkeypatch, temp_home):
+    """Start every test with nothing refreshed, no index timestamps and locks disabled"""
+    monkeypatch.setattr(pm_refresh, '_refreshed', {})
+    monkeypatch.setenv('DOTFILES_PM_LOCKS', 'false')
+    monkeypatch.delenv('DOTFILES_PM_REFRESH_MAX_AGE', raising=False)
+    for pm_name in ('apt', 'brew', 'brew-cask'):
+        monkeypatch.setattr(get_pm(pm_name), 'index_refreshed_at', lambda: None)
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    """Record refresh commands instead of running them"""
+    ran = []
+    lock = threading.Lock()
+
+    def fake_run(command, timeout=None, shell=False):
+        with lock:
+            ran.append(command)
+        return subprocess.CompletedProcess(command, 0, 'Already up-to-date.\n', '')
+
+    monkeypatch.setattr(pm_refresh, 'run_command', fake_run)
+    return ran
+
+
+def test_brew_and_cask_share_a_group():
+    """Test that brew-cask refreshes with brew and PMs without a refresh are left out"""
+    groups = refresh_groups(['brew', 'brew-cask', 'npm', 'apt'])
+
+    assert groups == {'brew': ['brew', 'brew-cask'], 'apt': ['apt']}
+
+
+def test_each_group_refreshes_once(refreshes):
+    """Test that one brew update serves both brew checks, however often the phase runs"""
+    results = run_refresh_phase(['brew', 'brew-cask', 'npm'])
+    run_refresh_phase(['brew-cask'])
+
+    assert refreshes == [['brew', 'update']]
+    assert results['brew']['success']
+
+
+def test_check_refreshes_only_when_needed(refreshes):
+    """Test that a check includes the refresh until its group has been refreshed"""
+    cask = get_pm('brew-cask')
+    assert check_command_for(cask) == ['brew', 'update', '&&'] + cask.check_command
+
+    run_refresh_phase(['brew'])
+
+    assert check_command_for(cask) == cask.check_command
+    assert check_command_for(get_pm('npm')) == get_pm('npm').check_command
+
+
+def test_sudo_refresh_left_to_check(refreshes):
+    """Test that apt-get update stays in apt's check, where sudo is handled"""
+    run_refresh_phase(['apt'])
+
+    assert refreshes == []
+    assert check_command_for(get_pm('apt'))[:3] == ['sudo', 'apt-get', 'update']
+
+
+def test_failed_refresh_not_repeated(monkeypatch):
+    """Test that checks run against the current index after a failed refresh"""
+    monkeypatch.setenv('DOTFILES_PM_RETRIES', '0')
+    monkeypatch.setattr(pm_refresh, 'run_command', lambda command, timeout=None, shell=False:
+                        subprocess.CompletedProcess(command, 1, '', 'Error: Fetching /opt/homebrew failed!'))
+
+    results = run_refresh_phase(['brew'])
+
+    assert not results['brew']['success']
+    assert check_command_for(get_pm('brew')) == get_pm('brew').check_command
+
+
+class TestFreshness:
+    """Tests for skipping refreshes of recently refreshed indexes"""
+
+    def test_journal_skips_next_session(self, refreshes):
+        """Test that a refresh recorded by an earlier session is not repeated"""
+        run_refresh_phase(['brew'])
+        pm_refresh._refreshed.clear()  # new session
+
+        results = run_refresh_phase(['brew', 'brew-cask'])
+
+        assert refreshes == [['brew', 'update']]
+        assert results == {}
+        assert check_command_for(get_pm('brew-cask')) == get_pm('brew-cask').check_command
+
+    def test_pm_timestamp_skips_sudo_refresh(self, monkeypatch):
+        """Test that apt's own update stamp drops apt-get update from its check"""
+        apt = get_pm('apt')
+        monkeypatch.setattr(apt, 'index_refreshed_at', lambda: time.time() - 600)
+
+        assert check_command_for(apt) == apt.check_command
+
+    def test_stale_index_refreshed(self, monkeypatch):
+        """Test that an index older than the window is refreshed"""
+        apt = get_pm('apt')
+        monkeypatch.setattr(apt, 'index_refreshed_at', lambda: time.time() - 7200)
+
+        assert check_command_for(apt)[:3] == ['sudo', 'apt-get', 'update']
+
+    def test_zero_window_always_refreshes(self, monkeypatch, refreshes):
+        """Test that DOTFILES_PM_REFRESH_MAX_AGE=0 (pm check --refresh) ignores freshness"""
+        pm_refresh.record_refresh('brew')
+        monkeypatch.setenv('DOTFILES_PM_REFRESH_MAX_AGE', '0')
+
+        run_refresh_phase(['brew'])
+
+        assert refreshes == [['brew', 'update']]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,200 @@
+"""
+Tests for PM retries
+
+Checks failure classification, backoff timing, the in-process retry loop
+(including brew's lock handling) and the `pm_retry.py run` wrapper used for
+terminal operations.
+"""
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+from pm_retry import RetryPolicy, classify_failure, get_retry_patterns, retry_call, TRANSIENT_PATTERNS
+from pms.brew import BrewPM
+from pms.brew_utils import BrewLockError
+
+PM_RETRY_SCRIPT = PROJECT_ROOT / 'src' / 'dotfiles_pm' / 'pm_retry.py'
+
+NO_WAIT = RetryPolicy(retries=2, base_delay=0)
+
+
+def failed(output='', error=''):
+    return {'success': False, 'output': output, 'error': error}
+
+
+class TestClassification:
+    """Tests for telling transient failures from permanent ones"""
+
+    @pytest.mark.parametrize('output, reason', [
+        ("curl: (6) Could not resolve host: ghcr.io", 'network'),
+        ("npm ERR! code ECONNRESET", 'network'),
+        ("curl: (22) The requested URL returned error: 503", 'server'),
+        ("Err:1 http://archive.ubuntu.com jammy InRelease\n  502  Bad Gateway", 'server'),
+        ("Error: No available formula with the name \"nope\"", None),
+        ("ERROR: Could not find a version that satisfies the requirement", None),
+    ])
+    def test_generic_patterns(self, output, reason):
+        """Test network and server errors are transient, others are not"""
+        assert classify_failure(output, TRANSIENT_PATTERNS) == reason
+
+    def test_pm_lock_patterns(self):
+        """Test that each PM's own lock message is recognised"""
+        apt_error = "E: Could not get lock /var/lib/dpkg/lock-frontend. It is held by process 1234"
+        assert classify_failure(apt_error, get_retry_patterns('apt')) == 'lock'
+        assert classify_failure(apt_error, get_retry_patterns('npm')) is None
+        assert classify_failure("Error: Another active Homebrew update process is already in progress.\n"
+                                "already locked", get_retry_patterns('brew')) == 'lock'
+
+
+class TestBackoff:
+    """Tests for retry timing"""
+
+    def test_exponential_with_jitter(self):
+        """Test waits double, stay within the jitter band and are capped"""
+        policy = RetryPolicy(base_delay=5, max_delay=30, jitter=0.5)
+        rng = random.Random(1)
+
+        for retry, full in [(1, 5), (2, 10), (3, 20), (4, 30), (8, 30)]:
+            delay = policy.delay(retry, rng)
+            assert full / 2 <= delay <= full
+
+
+class TestRetryCall:
+    """Tests for in-process retries"""
+
+    def test_retries_until_success(self):
+        """Test that transient failures are retried with growing waits"""
+        results = iter([failed(error="Connection timed out"), failed(error="503 Service Unavailable"),
+                        {'success': True, 'output': 'ok'}])
+        waits = []
+
+        result = retry_call(lambda: next(results), 'npm', RetryPolicy(retries=3, base_delay=1, jitter=0),
+                            sleep=waits.append)
+
+        assert result['success']
+        assert result['attempts'] == 3
+        assert result['retry_reason'] == 'server'
+        assert waits == [1, 2]
+
+    def test_permanent_failure_not_retried(self):
+        """Test that unrecognised failures return straight away"""
+        attempt = Mock(return_value=failed(error="E: Unable to locate package nope"))
+
+        result = retry_call(attempt, 'apt', NO_WAIT)
+
+        assert attempt.call_count == 1
+        assert result['attempts'] == 1
+
+    def test_gives_up_after_retries(self):
+        """Test that retries are bounded"""
+        attempt = Mock(return_value=failed(error="Could not resolve host"))
+
+        result = retry_call(attempt, 'npm', NO_WAIT)
+
+        assert attempt.call_count == 3
+        assert not result['success']
+
+    def test_timeout_not_retried(self):
+        """Test that a command stopped by its timeout is not started again"""
+        attempt = Mock(return_value={**failed(error="Connection timed out"), 'timed_out': True})
+
+        retry_call(attempt, 'npm', NO_WAIT)
+
+        assert attempt.call_count == 1
+
+
+class TestBrewLock:
+    """Tests for brew lock retries"""
+
+    def brew(self, side_effect, monkeypatch):
+        monkeypatch.setenv('DOTFILES_PM_RETRY_DELAY', '0')
+        brew = BrewPM()
+        brew.lock_manager = Mock()
+        brew.lock_manager.execute_with_lock_detection.side_effect = side_effect
+        return brew
+
+    def test_lock_retried(self, monkeypatch):
+        """Test that a brief brew lock no longer fails the run"""
+        ok = subprocess.CompletedProcess(['brew', 'outdated'], 0, 'wget\n', '')
+        brew = self.brew([BrewLockError("Brew locked: Error: already locked"), ok], monkeypatch)
+
+        result = brew.execute_command(['brew', 'outdated'], 'check')
+
+        assert result['success']
+        assert result['attempts'] == 2
+
+    def test_persistent_lock_exits_41(self, monkeypatch):
+        """Test that the justfile still gets exit code 41 once retries run out"""
+        brew = self.brew(BrewLockError("Brew locked: Error: already locked"), monkeypatch)
+
+        with pytest.raises(SystemExit) as exc:
+            brew.execute_command(['brew', 'outdated'], 'check')
+
+        assert exc.value.code == 41
+        assert brew.lock_manager.execute_with_lock_detection.call_count == 3
+
+    def test_lock_released_between_attempts(self, monkeypatch):
+        """Test that the PM resource lock isn't held while backing off"""
+        import contextlib
+        import pms.brew
+
+        events = []
+
+        @contextlib.contextmanager
+        def lock_pm(pm_name, operation):
+            events.append('lock')
+            yield
+            events.append('unlock')
+
+        def run(command, timeout=None):
+            events.append('run')
+            if events.count('run') == 1:
+                raise BrewLockError("Brew locked: Error: already locked")
+            return subprocess.CompletedProcess(command, 0, 'wget\n', '')
+
+        monkeypatch.setattr(pms.brew, 'lock_pm', lock_pm)
+        brew = self.brew(run, monkeypatch)
+
+        assert brew.execute_command(['brew', 'outdated'], 'check')['success']
+        assert events == ['lock', 'run', 'unlock', 'lock', 'run', 'unlock']
+
+
+class TestRunWrapper:
+    """Tests for `pm_retry.py run`"""
+
+    def run(self, command):
+        return subprocess.run(
+            [sys.executable, str(PM_RETRY_SCRIPT), 'run', 'npm', '--operation', 'check', '--', 'sh', '-c', command],
+            capture_output=True, text=True, timeout=30,
+            env={**os.environ, 'DOTFILES_PM_RETRY_DELAY': '0'},
+        )
+
+    def test_transient_failure_rerun(self, tmp_path):
+        """Test that the command runs again after a network error and its output streams through"""
+        marker = tmp_path / 'attempted'
+        proc = self.run(f'if [ -f {marker} ]; then echo fetched; '
+                        f'else touch {marker}; echo "npm ERR! code ETIMEDOUT"; exit 1; fi')
+
+        assert proc.returncode == 0
+        assert 'ETIMEDOUT' in proc.stdout and 'fetched' in proc.stdout
+        assert 'retrying' in proc.stderr
+
+    def test_permanent_failure_exit_code(self):
+        """Test that other failures keep their exit code and run once"""
+        proc = self.run('echo "npm ERR! 404 Not Found"; exit 7')
+
+        assert proc.returncode == 7
+        assert proc.stdout.count('404') == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
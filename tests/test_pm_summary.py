@@ -0,0 +1,79 @@
+"""
+Tests for the outdated package summary
+
+Checks that check results fold into the summary files and that the prompt
+segment is read back from the one-line file.
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+import pm_summary
+from pm_summary import format_segment, get_prompt_file, read_summary, update_summary
+
+
+def test_results_folded_in(temp_home):
+    """Test that a partial check keeps the other PMs' counts and records failures"""
+    update_summary([
+        {'pm': 'brew', 'success': True, 'outdated_count': 5},
+        {'pm': 'npm', 'success': True, 'outdated_count': 2},
+    ], checked_at=1000)
+
+    summary = update_summary([
+        {'pm': 'npm', 'success': True, 'outdated_count': 0},
+        {'pm': 'pip', 'success': False, 'outdated_count': 0, 'error': 'pip: command not found'},
+    ], checked_at=2000)
+
+    assert summary['total'] == 5
+    assert summary['failed'] == ['pip']
+    assert summary['pms']['brew']['checked_at'] == 1000
+    assert read_summary() == summary
+    assert get_prompt_file().read_text() == "5 1 2000\n"
+
+
+def test_concurrent_updates_kept(temp_home):
+    """Test that simultaneous updates (daemon and pm check) don't drop each other's PMs"""
+    pms = [f"pm{i}" for i in range(8)]
+    threads = [threading.Thread(target=update_summary, args=([{'pm': pm, 'success': True, 'outdated_count': 1}],))
+               for pm in pms]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(read_summary()['pms']) == pms
+    assert read_summary()['total'] == 8
+
+
+@pytest.mark.parametrize('total, failed, age, segment', [
+    (0, 0, 60, ''),
+    (12, 0, 60, '⬆12'),
+    (12, 1, 60, '⬆12 ✗1'),
+    (3, 0, 2 * 86400, '⬆3?'),
+])
+def test_segment(total, failed, age, segment):
+    """Test the prompt segment for counts, failures and stale summaries"""
+    now = time.time()
+    assert format_segment(total, failed, now - age, now) == segment
+
+
+def test_reader_prints_segment(temp_home, capsys):
+    """Test the reader entry point, with and without a summary"""
+    assert pm_summary.main([]) == 0
+    assert capsys.readouterr().out == ''
+
+    update_summary([{'pm': 'brew', 'success': True, 'outdated_count': 4}])
+
+    pm_summary.main([])
+    assert capsys.readouterr().out == '⬆4\n'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,166 @@
+"""
+Tests for the inline PTY executor
+
+Uses shell commands that print the sudo prompt marker and read a line, so the
+password forwarding logic is exercised without a real sudo.
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+import pty_executor
+from pty_executor import PtyExecutor, SudoPasswordCache, pty_available
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="PTYs are POSIX-only")
+
+# Mimic sudo: echo off, print $SUDO_PROMPT, read the password
+FAKE_SUDO = 'stty -echo; printf "%s" "$SUDO_PROMPT"; read pw; stty echo; echo; echo "auth:$pw"'
+
+
+class CountingProvider:
+    """Password provider that records how often it was asked"""
+
+    def __init__(self, *passwords):
+        self.passwords = list(passwords)
+        self.calls = 0
+
+    def __call__(self, pm_name):
+        self.calls += 1
+        return self.passwords.pop(0) if self.passwords else None
+
+
+class TestPtyExecutor:
+    """Tests for concurrent PTY execution"""
+
+    def test_captures_output_and_exit_code(self, tmp_path):
+        """Test that output and exit codes come back per PM"""
+        executor = PtyExecutor(password_provider=CountingProvider(), log_dir=tmp_path)
+
+        results = executor.run({'ok': 'echo hello', 'bad': 'echo oops; exit 3'})
+
+        assert results['ok']['exit_code'] == 0
+        assert results['ok']['output'] == 'hello'
+        assert results['bad']['exit_code'] == 3
+        assert Path(results['ok']['log_file']).read_text().strip() == 'hello'
+
+    def test_commands_have_a_tty(self, tmp_path):
+        """Test that commands see a controlling terminal"""
+        executor = PtyExecutor(password_provider=CountingProvider(), log_dir=tmp_path)
+
+        results = executor.run({'tty': 'test -t 0 && tty >/dev/null && echo yes'})
+
+        assert results['tty']['output'] == 'yes'
+
+    def test_password_prompted_once_for_all_pms(self, tmp_path):
+        """Test that concurrent sudo prompts share one password prompt"""
+        provider = CountingProvider('secret')
+        executor = PtyExecutor(password_provider=provider, log_dir=tmp_path)
+
+        results = executor.run({'pm1': FAKE_SUDO, 'pm2': FAKE_SUDO, 'pm3': FAKE_SUDO})
+
+        assert provider.calls == 1
+        for result in results.values():
+            assert result['exit_code'] == 0
+            assert 'auth:secret' in result['output']
+            assert '[dotfiles-pm]' not in result['output']
+
+    def test_rejected_password_prompts_again(self, tmp_path):
+        """Test that 'Sorry, try again' invalidates the cached password"""
+        provider = CountingProvider('wrong', 'right')
+        retry = ('stty -echo; printf "%s" "$SUDO_PROMPT"; read pw; '
+                 'echo "Sorry, try again."; printf "%s" "$SUDO_PROMPT"; read pw; stty echo; echo "auth:$pw"')
+        executor = PtyExecutor(password_provider=provider, log_dir=tmp_path)
+
+        results = executor.run({'pm': retry})
+
+        assert provider.calls == 2
+        assert 'auth:right' in results['pm']['output']
+
+    def test_declined_password_terminates(self, tmp_path):
+        """Test that a declined prompt kills the command instead of hanging"""
+        executor = PtyExecutor(password_provider=CountingProvider(), log_dir=tmp_path)
+
+        results = executor.run({'pm': FAKE_SUDO})
+
+        assert results['pm']['exit_code'] != 0
+
+    def test_password_collected_before_start(self, tmp_path, monkeypatch):
+        """Test that the password is asked up front and the pump never prompts"""
+        checked = []
+        monkeypatch.setattr(pty_executor, 'sudo_needs_password', lambda: True)
+        monkeypatch.setattr(pty_executor, '_sudo_accepts', lambda pw: checked.append(pw) or pw == 'right')
+        provider = CountingProvider('wrong', 'right')
+        executor = PtyExecutor(password_provider=provider, log_dir=tmp_path)
+
+        assert executor.collect_sudo_password('pm1')
+        assert (checked, provider.calls) == (['wrong', 'right'], 2)
+
+        results = executor.run({'pm1': FAKE_SUDO, 'pm2': FAKE_SUDO})
+
+        assert provider.calls == 2
+        assert all('auth:right' in result['output'] for result in results.values())
+
+    def test_declined_up_front_not_asked_from_pump(self, tmp_path, monkeypatch):
+        """Test that declining the up-front prompt isn't followed by a mid-run prompt"""
+        monkeypatch.setattr(pty_executor, 'sudo_needs_password', lambda: True)
+        provider = CountingProvider()
+        executor = PtyExecutor(password_provider=provider, log_dir=tmp_path)
+
+        assert not executor.collect_sudo_password('pm')
+        results = executor.run({'pm': FAKE_SUDO})
+
+        assert provider.calls == 1
+        assert results['pm']['exit_code'] != 0
+
+
+class TestCheckAllPmsInline:
+    """Tests for inline sudo PMs in the check orchestration"""
+
+    def test_sudo_pm_runs_inline(self, temp_home, monkeypatch):
+        """Test that sudo PMs are checked in a PTY instead of a terminal window"""
+        sys.path.insert(0, str(PROJECT_ROOT))
+        from src.dotfiles_pm import pty_executor as package_pty_executor
+        from src.dotfiles_pm.pm_check import check_all_pms
+
+        monkeypatch.setenv('DOTFILES_SUDO_INLINE', 'true')
+        monkeypatch.setattr(package_pty_executor, 'sudo_needs_password', lambda: False)
+
+        results = check_all_pms(['fake-sudo-pm'])
+
+        assert results[0]['pm'] == 'fake-sudo-pm'
+        assert results[0]['success']
+        assert results[0]['output'] == 'fake-sudo-pm: 7 packages outdated'
+        assert results[0]['outdated_count'] == 1
+
+
+class TestSudoPasswordCache:
+    """Tests for password caching"""
+
+    def test_declined_not_asked_again(self):
+        """Test that a declined prompt is not repeated for other PMs"""
+        provider = CountingProvider()
+        cache = SudoPasswordCache(provider)
+        assert cache.get('a') is None
+        assert cache.get('b') is None
+        assert provider.calls == 1
+
+
+class TestPtyAvailable:
+    """Tests for inline mode selection"""
+
+    def test_env_override(self, monkeypatch):
+        """Test DOTFILES_SUDO_INLINE forces the mode"""
+        monkeypatch.setenv('DOTFILES_SUDO_INLINE', 'false')
+        assert not pty_available()
+        monkeypatch.setenv('DOTFILES_SUDO_INLINE', 'true')
+        assert pty_available()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,283 @@
+"""
+Tests for the Python stow engine
+
+Builds small configs/ trees in a temp directory and stows them into a temp
+target, checking GNU Stow-compatible folding, dotfiles translation, ignore
+handling and conflict resolution.
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+from stow import build_plan, apply_plan, read_stow_list, main, load_manifest, save_manifest
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="symlinks need POSIX")
+
+
+def make_files(root, files):
+    for rel, content in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+@pytest.fixture
+def configs(tmp_path):
+    configs = tmp_path / 'configs'
+    make_files(configs, {
+        'shell_common/dot-zshrc': 'zshrc',
+        'shell_common/README.md': 'docs',
+        'shell_common/.git': 'gitdir: elsewhere',
+        'nvim_common/dot-config/nvim/init.lua': 'nvim',
+        'git_common/dot-config/git/ignore': '*.o',
+        'ssh_common/.stowrc': '--no-folding\n',
+        'ssh_common/.stow-local-ignore': '\\.stowrc\n',
+        'ssh_common/dot-ssh/config': 'Host *',
+        'ssh_common/README.md': 'kept: local ignore replaces the defaults',
+        '.stowrc': "--dotfiles\n--ignore='\\.DS_Store'\n",
+    })
+    (configs / 'shell_common' / '.DS_Store').write_text('')
+    return configs
+
+
+@pytest.fixture
+def target(tmp_path):
+    target = tmp_path / 'target'
+    target.mkdir()
+    return target
+
+
+def stow(configs, target, packages, backup='shell'):
+    plan = build_plan(packages, configs, target, backup=backup)
+    assert apply_plan(plan) == []
+    return plan
+
+
+class TestLinkPlan:
+    """Tests for link layout"""
+
+    def test_dotfiles_and_relative_links(self, configs, target):
+        """Test dot- translation and relative symlinks"""
+        stow(configs, target, ['shell_common'])
+
+        zshrc = target / '.zshrc'
+        assert zshrc.is_symlink()
+        assert not os.path.isabs(os.readlink(zshrc))
+        assert zshrc.read_text() == 'zshrc'
+
+    def test_default_ignores(self, configs, target):
+        """Test GNU Stow's default and --ignore lists"""
+        stow(configs, target, ['shell_common'])
+
+        assert not (target / 'README.md').exists()
+        assert not (target / '.git').exists()
+        assert not (target / '.DS_Store').exists()
+
+    def test_local_ignore_replaces_defaults(self, configs, target):
+        """Test .stow-local-ignore replaces the default list"""
+        stow(configs, target, ['ssh_common'])
+
+        assert (target / 'README.md').is_symlink()
+        assert not (target / '.stowrc').exists()
+
+    def test_folding(self, configs, target):
+        """Test a directory owned by one package becomes one symlink"""
+        stow(configs, target, ['nvim_common'])
+
+        assert (target / '.config').is_symlink()
+        assert (target / '.config' / 'nvim' / 'init.lua').read_text() == 'nvim'
+
+    def test_no_folding(self, configs, target):
+        """Test --no-folding packages get real directories"""
+        stow(configs, target, ['ssh_common'])
+
+        assert (target / '.ssh').is_dir() and not (target / '.ssh').is_symlink()
+        assert (target / '.ssh' / 'config').is_symlink()
+        assert (target / '.ssh' / 'config').stat().st_mode & 0o777 == 0o600
+
+    def test_shared_directory_not_folded(self, configs, target):
+        """Test a directory used by two packages is real, its children folded"""
+        stow(configs, target, ['nvim_common', 'git_common'])
+
+        config = target / '.config'
+        assert config.is_dir() and not config.is_symlink()
+        assert (config / 'nvim').is_symlink()
+        assert (config / 'git').is_symlink()
+
+    def test_unfold_existing_link(self, configs, target):
+        """Test a folded directory is split when another package joins it"""
+        stow(configs, target, ['nvim_common'])
+        plan = stow(configs, target, ['nvim_common', 'git_common'])
+
+        assert 'unfold' in [a.kind for a in plan.actions]
+        assert not (target / '.config').is_symlink()
+        assert (target / '.config' / 'nvim' / 'init.lua').read_text() == 'nvim'
+        assert (target / '.config' / 'git' / 'ignore').read_text() == '*.o'
+
+    def test_restow_is_noop(self, configs, target):
+        """Test that stowing twice changes nothing the second time"""
+        stow(configs, target, ['shell_common', 'nvim_common', 'git_common', 'ssh_common'])
+        plan = build_plan(['shell_common', 'nvim_common', 'git_common', 'ssh_common'], configs, target)
+
+        assert plan.actions == []
+        assert plan.unchanged > 0
+
+
+class TestConflicts:
+    """Tests for conflict detection"""
+
+    def test_existing_file_backed_up(self, configs, target):
+        """Test that a real shell startup file in the way is moved aside"""
+        (target / '.zshrc').write_text('mine')
+
+        stow(configs, target, ['shell_common'])
+
+        backups = list(target.glob('.zshrc.backup-*'))
+        assert len(backups) == 1
+        assert backups[0].read_text() == 'mine'
+        assert (target / '.zshrc').is_symlink()
+
+    def test_existing_file_reported_without_backup(self, configs, target):
+        """Test --no-backup reports instead of moving files"""
+        (target / '.zshrc').write_text('mine')
+
+        plan = build_plan(['shell_common'], configs, target, backup='none')
+
+        assert len(plan.conflicts) == 1
+        assert not [a for a in plan.actions if a.target.endswith('.zshrc')]
+
+    def test_other_files_reported_by_default(self, configs, target):
+        """Test that only shell startup files are backed up unless --backup is given"""
+        make_files(target, {'.ssh/config': 'Host mine', '.config/git/ignore': 'mine'})
+
+        plan = build_plan(['git_common', 'ssh_common'], configs, target)
+
+        assert len(plan.conflicts) == 2
+        assert not [a for a in plan.actions if a.kind == 'backup']
+
+        stow(configs, target, ['git_common', 'ssh_common'], backup='all')
+        assert (target / '.ssh' / 'config').is_symlink()
+        assert len(list((target / '.ssh').glob('config.backup-*'))) == 1
+
+    def test_two_packages_same_file(self, configs, target):
+        """Test that packages providing the same file conflict"""
+        make_files(configs, {'shell_other/dot-zshrc': 'other'})
+
+        plan = build_plan(['shell_common', 'shell_other'], configs, target)
+
+        assert any('shell_other conflicts with shell_common' in c for c in plan.conflicts)
+        apply_plan(plan)
+        assert (target / '.zshrc').read_text() == 'zshrc'
+
+
+class TestIncremental:
+    """Tests for manifest-based restows"""
+
+    ALL = ['shell_common', 'nvim_common', 'git_common', 'ssh_common']
+
+    def restow(self, configs, target, packages, tmp_path):
+        manifest_path = tmp_path / 'manifest.json'
+        manifest = load_manifest(manifest_path, configs, target)
+        plan = build_plan(packages, configs, target, manifest=manifest)
+        assert apply_plan(plan) == []
+        save_manifest(plan.manifest, manifest_path)
+        return plan
+
+    def test_unchanged_packages_reused(self, configs, target, tmp_path):
+        """Test that a restow with no changes rescans nothing"""
+        self.restow(configs, target, self.ALL, tmp_path)
+        plan = self.restow(configs, target, self.ALL, tmp_path)
+
+        assert plan.reused == self.ALL
+        assert plan.actions == []
+        assert plan.unchanged == len(plan.links)
+
+    def test_new_file_rescans_only_its_package(self, configs, target, tmp_path):
+        """Test that adding a file replans just that package"""
+        self.restow(configs, target, self.ALL, tmp_path)
+        make_files(configs, {'shell_common/dot-bashrc': 'bashrc'})
+
+        plan = self.restow(configs, target, self.ALL, tmp_path)
+
+        assert 'shell_common' not in plan.reused
+        assert len(plan.reused) == 3
+        assert [a.kind for a in plan.actions] == ['link']
+        assert (target / '.bashrc').read_text() == 'bashrc'
+
+    def test_removed_file_unlinked(self, configs, target, tmp_path):
+        """Test that a file deleted from a package loses its link"""
+        make_files(configs, {'shell_common/dot-profile': 'profile'})
+        self.restow(configs, target, self.ALL, tmp_path)
+        (configs / 'shell_common' / 'dot-profile').unlink()
+
+        self.restow(configs, target, self.ALL, tmp_path)
+
+        assert not os.path.lexists(target / '.profile')
+        assert (target / '.zshrc').is_symlink()
+
+    def test_removed_package_unstowed(self, configs, target, tmp_path):
+        """Test that dropping a package from the list removes its links and empty dirs"""
+        self.restow(configs, target, self.ALL, tmp_path)
+        plan = self.restow(configs, target, ['shell_common', 'nvim_common', 'git_common'], tmp_path)
+
+        assert {a.kind for a in plan.actions} == {'unlink', 'rmdir'}
+        assert not (target / '.ssh').exists()
+        assert (target / '.zshrc').is_symlink()
+
+    def test_unfolds_when_package_joins_reused_directory(self, configs, target, tmp_path):
+        """Test that a folded link from a reused package is split for a new package"""
+        self.restow(configs, target, ['nvim_common'], tmp_path)
+        plan = self.restow(configs, target, ['nvim_common', 'git_common'], tmp_path)
+
+        assert plan.reused == ['nvim_common']
+        assert not (target / '.config').is_symlink()
+        assert (target / '.config' / 'nvim' / 'init.lua').read_text() == 'nvim'
+        assert (target / '.config' / 'git' / 'ignore').read_text() == '*.o'
+
+        plan = self.restow(configs, target, ['nvim_common', 'git_common'], tmp_path)
+        assert plan.actions == []
+
+    def test_deleted_link_restored(self, configs, target, tmp_path):
+        """Test that a link removed from the target is noticed"""
+        self.restow(configs, target, self.ALL, tmp_path)
+        (target / '.zshrc').unlink()
+
+        plan = self.restow(configs, target, self.ALL, tmp_path)
+
+        assert 'shell_common' not in plan.reused
+        assert (target / '.zshrc').is_symlink()
+
+    def test_manifest_for_other_target_ignored(self, configs, target, tmp_path):
+        """Test that a manifest is only used for the target it was written for"""
+        self.restow(configs, target, self.ALL, tmp_path)
+        other = tmp_path / 'other'
+        other.mkdir()
+
+        assert load_manifest(tmp_path / 'manifest.json', configs, other) is None
+
+
+def test_read_stow_list(tmp_path):
+    """Test stow.txt parsing"""
+    stow_file = tmp_path / 'stow.txt'
+    stow_file.write_text("# -*- mode: conf -*-\n\ngit_common\n  # comment\nshell_common\n")
+
+    assert read_stow_list(stow_file) == ['git_common', 'shell_common']
+
+
+def test_dry_run_changes_nothing(configs, target, temp_home, capsys):
+    """Test that --dry-run prints the plan without touching the target"""
+    exit_code = main(['--dry-run', '--target', str(target), '--configs', str(configs), 'shell_common'])
+
+    assert exit_code == 0
+    assert '~/.zshrc' in capsys.readouterr().out
+    assert list(target.iterdir()) == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
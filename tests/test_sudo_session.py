@@ -0,0 +1,245 @@
+"""
+Tests for the sudo session manager
+
+A fake `sudo` on PATH logs its arguments, succeeds for `-n` only while a
+ticket file exists and creates the ticket when given the password in the
+password file, so authentication, keepalive and the askpass hand-off are
+exercised without real credentials.
+"""
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+from sudo_helper import SudoSession, get_keepalive_interval
+
+FAKE_SUDO = """#!/bin/sh
+echo "$*" >> "{log}"
+case "$*" in
+    "-n -k true") [ -f "{nopasswd}" ] ;;
+    -n*) [ -f "{ticket}" ] ;;
+    -k) rm -f "{ticket}" ;;
+    -S*) read password; [ "$password" = "$(cat {password})" ] && touch "{ticket}" ;;
+    -A*)
+        shift
+        [ -f "{ticket}" ] || {{ [ "$("$SUDO_ASKPASS")" = "$(cat {password})" ] && touch "{ticket}"; }} || exit 1
+        exec "$@" ;;
+    *) exit 1 ;;
+esac
+"""
+
+
+@pytest.fixture
+def fake_sudo(tmp_path, monkeypatch):
+    """Put a fake sudo on PATH; returns (log, ticket) paths"""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    log = tmp_path / 'sudo.log'
+    ticket = tmp_path / 'ticket'
+    (tmp_path / 'password').write_text('secret\n')
+    sudo = bin_dir / 'sudo'
+    sudo.write_text(FAKE_SUDO.format(log=log, ticket=ticket, password=tmp_path / 'password',
+                                     nopasswd=tmp_path / 'nopasswd'))
+    sudo.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bin_dir}:{os.environ['PATH']}")
+    return log, ticket
+
+
+@pytest.fixture
+def typed(monkeypatch):
+    """Answer password prompts with the given passwords, in order"""
+    answers = ['secret']
+
+    def read_password(self):
+        return answers.pop(0) if answers else None
+
+    monkeypatch.setattr(SudoSession, '_read_password', read_password)
+    return answers
+
+
+def calls(log):
+    return log.read_text().splitlines() if log.exists() else []
+
+
+class TestAuthenticate:
+    """Tests for up-front authentication"""
+
+    def test_passwordless_sudo_not_prompted(self, fake_sudo, tmp_path, typed):
+        """Test that NOPASSWD sudo is used without asking for a password"""
+        log, _ = fake_sudo
+        (tmp_path / 'nopasswd').touch()
+
+        assert SudoSession(mode='tty').authenticate()
+        assert calls(log) == ['-n -k true']
+        assert typed == ['secret']
+
+    def test_password_checked_and_reasked(self, fake_sudo, typed):
+        """Test that an existing ticket isn't trusted and a wrong password is asked again"""
+        log, ticket = fake_sudo
+        ticket.touch()
+        typed[:] = ['wrong', 'secret']
+
+        session = SudoSession(mode='tty')
+        assert session.authenticate()
+        assert calls(log) == ['-n -k true', '-k', '-S -p  -v', '-S -p  -v']
+        assert ticket.exists()
+
+    def test_skip_mode(self, fake_sudo):
+        """Test that skip mode never runs sudo"""
+        log, _ = fake_sudo
+
+        assert not SudoSession(mode='skip').authenticate()
+        assert calls(log) == []
+
+    def test_gui_uses_askpass(self, fake_sudo, tmp_path, monkeypatch):
+        """Test that gui mode reads the password from the SUDO_ASKPASS dialog"""
+        log, _ = fake_sudo
+        dialog = tmp_path / 'dialog'
+        dialog.write_text('#!/bin/sh\necho secret\n')
+        dialog.chmod(0o755)
+        monkeypatch.setattr('sudo_helper.get_sudo_askpass_env', lambda: {'SUDO_ASKPASS': str(dialog)})
+
+        assert SudoSession(mode='gui').authenticate()
+        assert calls(log)[-1] == '-S -p  -v'
+
+
+class TestKeepalive:
+    """Tests for the background refresh"""
+
+    def test_refreshes_until_stopped(self, fake_sudo, typed):
+        """Test that the credential is refreshed on the interval and stops cleanly"""
+        log, ticket = fake_sudo
+        ticket.touch()
+
+        with SudoSession(mode='tty', interval=1) as session:
+            assert session.active
+            time.sleep(2.5)
+
+        refreshes = calls(log).count('-n -v')
+        assert refreshes >= 2
+        time.sleep(1.5)
+        assert calls(log).count('-n -v') == refreshes
+
+    def test_expired_ticket_renewed_with_password(self, fake_sudo, typed):
+        """Test that a timed-out ticket is validated again with the session password"""
+        log, ticket = fake_sudo
+
+        with SudoSession(mode='tty', interval=1) as session:
+            ticket.unlink()
+            time.sleep(1.5)
+            assert session.active
+            assert ticket.exists()
+
+    def test_expired_credential_stops_keepalive(self, fake_sudo, tmp_path, typed):
+        """Test that a revoked credential marks the session expired"""
+        log, ticket = fake_sudo
+
+        session = SudoSession(mode='tty', interval=1)
+        session.start()
+        (tmp_path / 'password').write_text('changed\n')
+        ticket.unlink()
+        time.sleep(1.5)
+
+        assert session.expired
+        assert not session.active
+        session.stop()
+
+
+class TestWrapCommand:
+    """Tests for in-terminal keepalive wrapping"""
+
+    def test_inactive_session_leaves_command(self):
+        """Test that commands are untouched without an authenticated session"""
+        assert SudoSession(mode='skip').wrap_command('apt upgrade') == 'apt upgrade'
+
+    def test_wrapped_command_keeps_exit_code_and_stops_loop(self, fake_sudo, typed):
+        """Test that the refresh loop runs alongside the command and dies with it"""
+        log, ticket = fake_sudo
+
+        with SudoSession(mode='tty', interval=1) as session:
+            wrapped = session.wrap_command('sleep 1.5; exit 3')
+            result = subprocess.run(['bash', '-c', wrapped], timeout=10)
+            assert result.returncode == 3
+
+        refreshes = calls(log).count('-n -v')
+        time.sleep(1.5)
+        assert calls(log).count('-n -v') == refreshes
+
+    @pytest.mark.skipif(not Path('/proc/self/stat').exists(), reason="checks the loop through /proc")
+    def test_keepalive_through_tracked_terminal_command(self, fake_sudo, typed, temp_home, monkeypatch):
+        """Test that $$ and the loop PID survive the run_tracked.sh command line"""
+        import terminal_executor
+
+        class Executor(terminal_executor.TerminalExecutor):
+            spawn = can_close_terminals = close_all_terminals = None
+
+        monkeypatch.setattr(terminal_executor, 'login_env_prefix', lambda: '', raising=False)
+        with SudoSession(mode='tty', interval=30) as session:
+            wrapped = session.wrap_command('echo "keepalive=$_dotfiles_sudo_keepalive"')
+            tracked_cmd, log_file, _ = Executor().create_tracked_command(wrapped, 'apt-upgrade', auto_close=True)
+            result = subprocess.run(['bash', '-c', tracked_cmd], timeout=60, env={**os.environ, 'TERM': 'dumb'},
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        assert result.returncode == 0
+        line = next(l for l in Path(log_file).read_text().splitlines() if l.startswith('keepalive='))
+        loop_pid = int(line.split('=', 1)[1])
+        # The EXIT trap killed the loop rather than leaving it for its next 30s check
+        assert not running(loop_pid)
+
+
+    def test_spawned_terminal_gets_password_without_prompt(self, fake_sudo, typed):
+        """Test that sudo in a new terminal (no ticket) authenticates through the session askpass"""
+        log, ticket = fake_sudo
+
+        with SudoSession(mode='tty', interval=30) as session:
+            ticket.unlink()
+            wrapped = session.wrap_command('sudo echo upgraded')
+            result = subprocess.run(['bash', '-c', wrapped], stdin=subprocess.DEVNULL,
+                                    capture_output=True, text=True, timeout=30)
+            askpass_dir = session._askpass_dir
+
+        assert (result.returncode, result.stdout) == (0, 'upgraded\n')
+        assert calls(log)[-1] == '-A echo upgraded'
+        assert ticket.exists()
+        # Password and helper are gone once the run ends
+        assert not askpass_dir.exists()
+
+    def test_askpass_needs_session_token(self, fake_sudo, typed, monkeypatch, capsys):
+        """Test that the askpass socket only answers its own helper"""
+        from sudo_helper import askpass_main
+
+        with SudoSession(mode='tty', interval=30) as session:
+            monkeypatch.setenv('DOTFILES_SUDO_SOCKET', str(session._askpass_dir / 'askpass.sock'))
+            monkeypatch.setenv('DOTFILES_SUDO_TOKEN', 'guess')
+            assert askpass_main() == 1
+            monkeypatch.setenv('DOTFILES_SUDO_TOKEN', session._token)
+            assert askpass_main() == 0
+
+        assert capsys.readouterr().out == 'secret\n'
+
+
+def running(pid):
+    """Whether pid is a live (not zombie) process"""
+    try:
+        return Path(f'/proc/{pid}/stat').read_text().split(') ')[-1][0] != 'Z'
+    except OSError:
+        return False
+
+
+def test_keepalive_interval_env(monkeypatch):
+    """Test DOTFILES_SUDO_KEEPALIVE parsing"""
+    monkeypatch.setenv('DOTFILES_SUDO_KEEPALIVE', '30')
+    assert get_keepalive_interval() == 30
+    monkeypatch.setenv('DOTFILES_SUDO_KEEPALIVE', 'soon')
+    assert get_keepalive_interval() == 60
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,122 @@
+"""
+Tests for the tmux terminal executor
+
+Runs against a private tmux server (tmux -L) so the user's sessions are
+never touched.
+"""
+import shutil
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+from terminal_executor import TmuxTerminalExecutor, TmuxControlClient, _save_terminal_registry
+
+pytestmark = pytest.mark.skipif(shutil.which('tmux') is None, reason="tmux not installed")
+
+
+@pytest.fixture
+def tmux_server():
+    """Start a private tmux server with one detached session"""
+    socket_name = f"dotfiles-pm-test-{uuid.uuid4().hex[:8]}"
+    subprocess.run(['tmux', '-L', socket_name, 'new-session', '-d', '-s', 'test', '-x', '200', '-y', '60'],
+                   check=True)
+    yield socket_name
+    subprocess.run(['tmux', '-L', socket_name, 'kill-server'], capture_output=True)
+
+
+def list_panes(socket_name):
+    result = subprocess.run(
+        ['tmux', '-L', socket_name, 'list-panes', '-a', '-F', '#{window_name} #{pane_id}'],
+        capture_output=True, text=True
+    )
+    return result.stdout.splitlines()
+
+
+class TestTmuxControlClient:
+    """Tests for the control-mode connection"""
+
+    def test_command_returns_output(self, tmux_server):
+        """Test that commands round-trip over control mode"""
+        client = TmuxControlClient(tmux_server, 'test')
+        try:
+            ok, lines = client.command('display-message', '-p', '#{session_name}')
+            assert ok
+            assert lines == ['test']
+        finally:
+            client.close()
+
+    def test_command_error(self, tmux_server):
+        """Test that failing commands report failure"""
+        client = TmuxControlClient(tmux_server, 'test')
+        try:
+            ok, _ = client.command('kill-pane', '-t', '%999')
+            assert not ok
+        finally:
+            client.close()
+
+
+class TestTmuxExecutor:
+    """Tests for pane multiplexing and completion tracking"""
+
+    def test_spawns_panes_in_one_window(self, tmux_server, tmp_path):
+        """Test that each command gets a pane in the dotfiles-pm window"""
+        executor = TmuxTerminalExecutor(socket_name=tmux_server, session='test')
+
+        results = [executor.spawn(f"echo {i} > {tmp_path}/out{i}", title=f"op{i}") for i in range(3)]
+
+        assert all(r.status == 'spawned' for r in results)
+        assert results[0].method == 'tmux window'
+        assert all(r.method == 'tmux pane' for r in results[1:])
+        pm_panes = [line for line in list_panes(tmux_server) if line.startswith('dotfiles-pm ')]
+        assert len(pm_panes) == 3
+
+    def test_wait_for_change(self, tmux_server, tmp_path):
+        """Test that polling wakes when the command exits instead of sleeping out the timeout"""
+        executor = TmuxTerminalExecutor(socket_name=tmux_server, session='test')
+
+        result = executor.spawn(f"sleep 0.2; echo done > {tmp_path}/out", title="wait")
+
+        start = time.monotonic()
+        while not (tmp_path / 'out').exists():
+            executor.wait_for_change([result.to_dict()], timeout=10)
+            assert time.monotonic() - start < 5
+        assert (tmp_path / 'out').read_text().strip() == 'done'
+
+    def test_wait_for_failed_command(self, tmux_server):
+        """Test that the channel is signalled even when the command fails"""
+        executor = TmuxTerminalExecutor(socket_name=tmux_server, session='test')
+
+        result = executor.spawn("exit 3", title="fail")
+
+        start = time.monotonic()
+        executor.wait_for_change([result.to_dict()], timeout=10)
+        assert time.monotonic() - start < 5
+
+    def test_window_layout(self, tmux_server):
+        """Test one window per command with the windows layout"""
+        executor = TmuxTerminalExecutor(socket_name=tmux_server, session='test', layout='windows')
+
+        results = [executor.spawn("true", title=f"op{i}") for i in range(2)]
+
+        assert all(r.method == 'tmux window' for r in results)
+
+    def test_close_all_terminals(self, tmux_server, temp_home):
+        """Test that registered panes are killed"""
+        executor = TmuxTerminalExecutor(socket_name=tmux_server, session='test')
+        results = [executor.spawn("sleep 30", title=f"op{i}") for i in range(2)]
+        _save_terminal_registry([r.to_dict() for r in results])
+
+        assert executor.close_all_terminals() == 2
+        assert not [line for line in list_panes(tmux_server) if line.startswith('dotfiles-pm ')]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,211 @@
+"""
+Tests for tracked operation status
+
+Runs scripts/run_tracked.sh directly (no terminal) to check the status
+protocol, and feeds status dicts to the watchdog to check stall, timeout and
+lost-wrapper handling against real child processes.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'src' / 'dotfiles_pm'))
+
+from tracked_status import OperationWatchdog, read_status, stall_limit, tracked_env
+
+RUN_TRACKED = PROJECT_ROOT / 'scripts' / 'run_tracked.sh'
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="signals and run_tracked.sh are POSIX-only")
+
+
+def running(**fields):
+    return {'protocol': 2, 'status': 'running', 'pid': os.getpid(), **fields}
+
+
+@pytest.fixture
+def sleeper():
+    proc = subprocess.Popen(['sleep', '30'])
+    # Reap it as soon as it dies, like init would for a real tracked command
+    reaper = threading.Thread(target=proc.wait, daemon=True)
+    reaper.start()
+    yield proc
+    proc.kill()
+    proc.wait()
+
+
+class TestWatchdog:
+    """Tests for stall and timeout detection"""
+
+    def test_progress_keeps_running(self):
+        """Test that a command producing output is left alone"""
+        watchdog = OperationWatchdog(stall_timeout=0.3, heartbeat_interval=0.1)
+        for beat in range(5):
+            status = watchdog.check(running(heartbeat=beat, bytes=beat * 10))
+            time.sleep(0.1)
+
+        assert status['status'] == 'running'
+
+    def test_stalled_command_killed(self, sleeper):
+        """Test that a command with no new output is killed and reported"""
+        watchdog = OperationWatchdog(stall_timeout=0.2, heartbeat_interval=0.1)
+        watchdog.check(running(heartbeat=0, bytes=5, child_pid=sleeper.pid))
+        time.sleep(0.3)
+
+        status = watchdog.check(running(heartbeat=1, bytes=5, child_pid=sleeper.pid))
+
+        assert status['status'] == 'error'
+        assert status['reason'] == 'stalled'
+        assert sleeper.wait(timeout=10) == -15
+
+    def test_timeout_from_status_file(self, sleeper):
+        """Test that the limit recorded by the wrapper wins and counts wrapper time"""
+        watchdog = OperationWatchdog(timeout=3600)
+
+        status = watchdog.check(running(heartbeat=0, bytes=0, elapsed=61, timeout=60, child_pid=sleeper.pid))
+
+        assert status['reason'] == 'timeout'
+        assert sleeper.wait(timeout=10) == -15
+
+    def test_zero_disables_stall_check(self):
+        """Test that stall_timeout 0 in the status file turns stall detection off"""
+        watchdog = OperationWatchdog(stall_timeout=0.1, heartbeat_interval=0.1)
+        watchdog.check(running(heartbeat=0, bytes=0, stall_timeout=0))
+        time.sleep(0.2)
+
+        assert watchdog.check(running(heartbeat=1, bytes=0, stall_timeout=0))['status'] == 'running'
+
+    def test_wrapper_lost(self):
+        """Test that missing heartbeats from a dead wrapper fail the operation"""
+        dead = subprocess.Popen(['true'])
+        dead.wait()
+        watchdog = OperationWatchdog(heartbeat_interval=0.05)
+        watchdog.check(running(heartbeat=3, bytes=0, pid=dead.pid))
+        time.sleep(0.3)
+
+        status = watchdog.check(running(heartbeat=3, bytes=0, pid=dead.pid))
+
+        assert status['reason'] == 'wrapper_lost'
+
+    def test_old_protocol_only_times_out(self):
+        """Test that statuses without heartbeats are never called stalled"""
+        watchdog = OperationWatchdog(stall_timeout=0.05)
+        watchdog.check({'status': 'running'})
+        time.sleep(0.1)
+
+        assert watchdog.check({'status': 'running'})['status'] == 'running'
+
+    def test_finished_status_passes_through(self):
+        """Test that completed statuses are returned unchanged"""
+        status = {'status': 'completed', 'exit_code': 0}
+        assert OperationWatchdog(timeout=0).check(status) == status
+
+
+def test_read_missing_status(tmp_path):
+    """Test that a status file not written yet reads as running"""
+    assert read_status(str(tmp_path / 'none.status')) == {'status': 'running'}
+
+
+def test_tracked_env():
+    """Test the limit prefix passed to the wrapper"""
+    assert tracked_env() == ''
+    assert tracked_env(60, 0) == 'DOTFILES_TRACKED_TIMEOUT=60 DOTFILES_TRACKED_STALL_TIMEOUT=0 '
+
+
+def test_stall_limit_spares_interactive_operations(monkeypatch):
+    """Test that upgrades and installs waiting at a prompt aren't killed by default"""
+    monkeypatch.delenv('DOTFILES_PM_STALL_TIMEOUT', raising=False)
+    assert stall_limit('check') == 600
+    assert stall_limit('check', 1800) == 1800
+    assert stall_limit('upgrade') == 0
+    assert stall_limit('install', 1800) == 0
+
+    monkeypatch.setenv('DOTFILES_PM_STALL_TIMEOUT', '120')
+    assert stall_limit('upgrade') == 120
+    monkeypatch.setenv('DOTFILES_PM_STALL_TIMEOUT', '0')
+    assert stall_limit('check') == 0
+
+
+class TestRunTracked:
+    """Tests for the run_tracked.sh status protocol"""
+
+    def run(self, tmp_path, command, **env):
+        log_file, status_file = tmp_path / 'op.log', tmp_path / 'op.status'
+        proc = subprocess.Popen(
+            ['bash', str(RUN_TRACKED), 'test-op', command, str(log_file), str(status_file), 'true'],
+            env={**os.environ, 'TERM': 'dumb', 'DOTFILES_TRACKED_HEARTBEAT': '0.2', **env},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        return proc, status_file
+
+    def test_heartbeats_then_completion(self, tmp_path):
+        """Test running heartbeats with the command's PID, then the exit code"""
+        proc, status_file = self.run(tmp_path, 'echo hello; sleep 1; exit 3',
+                                     DOTFILES_TRACKED_STALL_TIMEOUT='30')
+        deadline = time.monotonic() + 5
+        status = {}
+        while time.monotonic() < deadline and not status.get('child_pid'):
+            time.sleep(0.1)
+            status = read_status(str(status_file))
+
+        assert status['protocol'] == 2
+        assert status['status'] == 'running'
+        assert status['stall_timeout'] == 30
+        assert status['timeout'] is None
+
+        proc.wait(timeout=10)
+        status = json.loads(status_file.read_text())
+        assert status['status'] == 'completed'
+        assert status['exit_code'] == 3
+        assert status['bytes'] > 0
+        assert not Path(f"{status_file}.child").exists()
+
+    def test_watchdog_kills_hung_command(self, tmp_path):
+        """Test the end-to-end stall kill of a silent command"""
+        proc, status_file = self.run(tmp_path, 'sleep 30', DOTFILES_TRACKED_STALL_TIMEOUT='1')
+        watchdog = OperationWatchdog(heartbeat_interval=0.2)
+        deadline = time.monotonic() + 10
+        status = read_status(str(status_file))
+        while time.monotonic() < deadline and status['status'] == 'running':
+            time.sleep(0.2)
+            status = watchdog.check(read_status(str(status_file)))
+
+        assert status.get('reason') == 'stalled'
+        proc.wait(timeout=15)
+        assert json.loads(status_file.read_text())['exit_code'] != 0
+
+    def test_wrapped_command_through_create_tracked_command(self, tmp_path, temp_home, monkeypatch):
+        """Test that lock- and retry-wrapped commands survive the terminal command line"""
+        import terminal_executor
+        from pm_lock import wrap_command as wrap_with_lock
+        from pm_retry import wrap_command as wrap_with_retry
+
+        class Executor(terminal_executor.TerminalExecutor):
+            spawn = can_close_terminals = close_all_terminals = None
+
+        monkeypatch.setattr(terminal_executor, 'login_env_prefix', lambda: '')
+        marker = tmp_path / 'ran'
+        command = wrap_with_retry('apt', 'check', wrap_with_lock('apt', 'check', f"echo 'it ran' > {marker}"))
+        tracked_cmd, log_file, status_file = Executor().create_tracked_command(command, 'apt-check', auto_close=True)
+
+        result = subprocess.run(['bash', '-c', tracked_cmd], cwd=tmp_path, timeout=60,
+                                env={**os.environ, 'TERM': 'dumb'},
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        assert result.returncode == 0
+        assert marker.read_text() == 'it ran\n'
+        assert Path(log_file).parent == temp_home / '.dotfiles' / 'logs'
+        assert Path(log_file).exists()
+        assert json.loads(Path(status_file).read_text())['exit_code'] == 0
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['home', 'ran']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])